@@ -0,0 +1,86 @@
+import json
+import sys
+import tempfile
+
+from pathlib import Path
+from typing import Any
+
+import structlog
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from services.summarise_excel.benchmarks import (
+    BENCHMARKS,
+    DEFAULT_THRESHOLD,
+    DEFAULT_WORKBOOK_SPECS,
+    compare_with_baseline,
+    run_benchmarks,
+)
+
+
+DEFAULT_BASELINE_PATH = Path(settings.BASE_DIR).parent / "benchmarks" / "baseline.json"
+WORKBOOK_SPECS = {spec.name: spec for spec in DEFAULT_WORKBOOK_SPECS}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every layer of the summary on synthetic workbooks, reporting items per second, megabytes per "
+        "second and peak RSS, and fail when they regressed against the baseline"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--workbooks", nargs="+", choices=list(WORKBOOK_SPECS), default=list(WORKBOOK_SPECS))
+        parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+        parser.add_argument("--scale", type=float, default=1.0, help="Factor of the rows of every workbook")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs of every benchmark, the fastest is kept")
+        parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE_PATH, help="Baseline results file")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=DEFAULT_THRESHOLD,
+            help="Relative throughput drop or peak RSS growth above which a benchmark regressed",
+        )
+        parser.add_argument(
+            "--save-baseline", action="store_true", help="Store the results as the baseline instead of comparing them"
+        )
+        parser.add_argument("--output", type=Path, help="File the results are written to as JSON")
+        parser.add_argument("--directory", type=Path, help="Directory the workbooks are generated in, kept afterwards")
+
+    def handle(self, *_args: Any, **options: Any) -> None:
+        # Logs go to stderr, so that the results written to stdout can be piped
+        structlog.configure(logger_factory=structlog.PrintLoggerFactory(file=sys.stderr))
+        specs = [WORKBOOK_SPECS[name].scaled(options["scale"]) for name in options["workbooks"]]
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            results = run_benchmarks(
+                directory=options["directory"] or temporary_directory,
+                specs=specs,
+                benchmarks=options["benchmarks"],
+                repeat=options["repeat"],
+            )
+
+        for key, result in results["results"].items():
+            megabytes_per_second = result["megabytes_per_second"]
+            self.stdout.write(
+                f"{key:<40} {result['items_per_second']:>14,.0f} {result['unit'] + '/s':<8}"
+                f" {megabytes_per_second if megabytes_per_second is not None else '-':>10} MB/s"
+                f" {result['peak_rss_bytes'] >> 20:>8} MiB"
+            )
+        if options["output"] is not None:
+            options["output"].write_text(json.dumps(results, indent=2) + "\n")
+
+        baseline_path: Path = options["baseline"]
+        if options["save_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+            self.stdout.write(f"Stored the baseline in {baseline_path}")
+            return
+        if not baseline_path.exists():
+            self.stdout.write(f"No baseline in {baseline_path}, nothing to compare with")
+            return
+        regressions = compare_with_baseline(
+            results, json.loads(baseline_path.read_text()), threshold=options["threshold"]
+        )
+        if regressions:
+            raise CommandError("Benchmarks regressed:\n" + "\n".join(regressions))
+        self.stdout.write(f"No regression above {options['threshold']:.0%} of the baseline")
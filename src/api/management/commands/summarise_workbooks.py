@@ -0,0 +1,112 @@
+import json
+import sys
+
+from io import TextIOBase
+from pathlib import Path
+from typing import Any
+
+import structlog
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.v1.serializers import OutFileSummarySerializer, SummaryOptionsSerializer
+from api.v1.views import build_summary_options
+from services.summarise_excel.batch_summaries import find_files, iter_file_summaries
+from services.summarise_excel.generator_factory import SUMMARY_ENGINE_DECIMAL, SUMMARY_ENGINES
+from services.summarise_excel.summary_generator import AGGREGATES, DEFAULT_AGGREGATES
+
+
+logger = structlog.getLogger(__name__)
+
+
+def read_checkpoint(path: Path) -> set[str]:
+    """Return the files a previous run recorded as summarised"""
+    if not path.exists():
+        return set()
+    with path.open() as checkpoint:
+        return {line.rstrip("\n") for line in checkpoint if line.strip()}
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarise the workbooks of directories and glob patterns on disk, writing the summary of every file "
+        "as a JSON line as soon as it is generated"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("paths", nargs="+", help="Directories and glob patterns of the files to summarise")
+        parser.add_argument("--columns", nargs="+", required=True, help="Names of the columns to summarise")
+        parser.add_argument("--engine", choices=SUMMARY_ENGINES, default=SUMMARY_ENGINE_DECIMAL)
+        parser.add_argument("--aggregates", nargs="+", choices=AGGREGATES, default=list(DEFAULT_AGGREGATES))
+        parser.add_argument("--filter", help="Expression of the rows to summarise, e.g. 'Status == \"Paid\"'")
+        parser.add_argument("--group-by", nargs="+", default=[], help="Columns whose values group the rows")
+        parser.add_argument("--top", type=int, help="Number of groups written, holding the most rows")
+        parser.add_argument("--header-row", type=int, help="Number of the row holding the column names")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.EXCEL_SUMMARY_BATCH["MAX_WORKERS"],
+            help="Processes summarising files in parallel, capped by the CPU count",
+        )
+        parser.add_argument("--recursive", action="store_true", help="Search directories and ** patterns in depth")
+        parser.add_argument("--output", type=Path, help="File the JSON lines are written to, stdout by default")
+        parser.add_argument(
+            "--checkpoint", type=Path, help="File recording the summarised files, one path per line, as they finish"
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip the files recorded in the checkpoint and append to the output instead of replacing it",
+        )
+
+    def handle(self, *_args: Any, **options: Any) -> None:
+        # Logs go to stderr, so that the JSON lines written to stdout can be piped
+        structlog.configure(logger_factory=structlog.PrintLoggerFactory(file=sys.stderr))
+        if options["resume"] and options["checkpoint"] is None:
+            message = "--resume needs a --checkpoint"
+            raise CommandError(message)
+        request = {
+            "column_names": options["columns"],
+            "engine": options["engine"],
+            "aggregates": options["aggregates"],
+            "filter": options["filter"],
+            "group_by": options["group_by"],
+            "top": options["top"],
+            "header_row": options["header_row"],
+        }
+        # The options are validated as those of API requests, so files are summarised as if they were uploaded
+        serializer = SummaryOptionsSerializer(data={key: value for key, value in request.items() if value is not None})
+        if not serializer.is_valid():
+            raise CommandError(json.dumps(serializer.errors))
+        summary_options = build_summary_options(serializer.validated_data)
+
+        files = find_files(options["paths"], recursive=options["recursive"])
+        checkpoint_path: Path | None = options["checkpoint"]
+        if options["resume"] and checkpoint_path is not None:
+            summarised = read_checkpoint(checkpoint_path)
+            files = [file for file in files if file not in summarised]
+        logger.info("Summarising files", files=len(files), workers=options["workers"])
+
+        mode = "a" if options["resume"] else "w"
+        output: TextIOBase = options["output"].open(mode) if options["output"] is not None else self.stdout
+        checkpoint = checkpoint_path.open(mode) if checkpoint_path is not None else None
+        try:
+            for file_summary in iter_file_summaries(
+                files,
+                column_names=serializer.validated_data["column_names"],
+                max_workers=options["workers"],
+                **summary_options,
+            ):
+                output.write(json.dumps(OutFileSummarySerializer(file_summary).data, cls=JSONEncoder) + "\n")
+                output.flush()
+                # Recorded once its summary is written, so that an interrupted run at worst writes a summary twice
+                if checkpoint is not None:
+                    checkpoint.write(file_summary["file"] + "\n")
+                    checkpoint.flush()
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+            if output is not self.stdout:
+                output.close()
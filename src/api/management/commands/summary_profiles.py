@@ -0,0 +1,50 @@
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from services.summarise_excel.exceptions import ProfileNotFoundError
+from services.summarise_excel.profiles import DEFAULT_SORT_KEY, DEFAULT_TOP_FUNCTIONS, SORT_KEYS, ProfileStore
+
+
+class Command(BaseCommand):
+    help = (
+        "List the profiles of the summary requests sent with an X-Summary-Profile header, or print the functions "
+        "the given profiles spent the most time in"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("profile_ids", nargs="*", help="Correlation ids of the profiles to print")
+        parser.add_argument(
+            "--top", type=int, default=DEFAULT_TOP_FUNCTIONS, help="Number of functions printed per profile"
+        )
+        parser.add_argument("--sort", choices=SORT_KEYS, default=DEFAULT_SORT_KEY, help="Order of the functions")
+        parser.add_argument(
+            "--directory",
+            default=settings.EXCEL_SUMMARY_PROFILING["DIRECTORY"],
+            help="Directory of the profiles, EXCEL_SUMMARY_PROFILING['DIRECTORY'] by default",
+        )
+
+    def handle(self, *_args: Any, **options: Any) -> None:
+        store = ProfileStore(directory=options["directory"])
+        if not options["profile_ids"]:
+            profiles = store.list_profiles()
+            if not profiles:
+                self.stdout.write(f"No profile in {store.directory}")
+            for profile in profiles:
+                self.stdout.write(
+                    f"{profile['id']}  {profile['created_at']}  {profile['status']}  {profile['seconds']:>10.3f}s"
+                    f"  {profile['file'] or '-'}"
+                )
+            return
+        for profile_id in options["profile_ids"]:
+            try:
+                profile = store.get(profile_id)
+                top_functions = store.top_functions(profile_id, limit=options["top"], sort_key=options["sort"])
+            except ProfileNotFoundError as e:
+                raise CommandError(e.detail)
+            self.stdout.write(
+                f"Profile {profile_id} of {profile['file'] or 'a refused request'}, status {profile['status']}, "
+                f"{profile['seconds']:.3f}s"
+            )
+            self.stdout.write(top_functions)
@@ -0,0 +1,37 @@
+import json
+
+from typing import Any, Mapping
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renders every record as one line of JSON"""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(
+        self, data: Any, _accepted_media_type: str | None = None, _renderer_context: Mapping[str, Any] | None = None
+    ) -> bytes:
+        if data is None:
+            return b""
+        return json.dumps(data, cls=JSONEncoder).encode() + b"\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Renders every record as a server-sent event, named after the type of the record"""
+
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = None
+
+    def render(
+        self, data: Any, _accepted_media_type: str | None = None, _renderer_context: Mapping[str, Any] | None = None
+    ) -> bytes:
+        if data is None:
+            return b""
+        event = f"event: {data['type']}\n" if isinstance(data, dict) and "type" in data else ""
+        return f"{event}data: {json.dumps(data, cls=JSONEncoder)}\n\n".encode()
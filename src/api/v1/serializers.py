@@ -1,11 +1,212 @@
 from rest_framework import serializers
 
+from services.summarise_excel.exceptions import InvalidRowFilterError
+from services.summarise_excel.generator_factory import SUMMARY_ENGINE_DECIMAL, SUMMARY_ENGINES
+from services.summarise_excel.jobs import JOB_STATUSES
+from services.summarise_excel.row_filters import RowFilter
+from services.summarise_excel.sampling import DEFAULT_CONFIDENCE, SAMPLE_AGGREGATES, SAMPLE_METHODS
+from services.summarise_excel.sheet_summaries import ALL_SHEETS
+from services.summarise_excel.summary_generator import AGGREGATES, DEFAULT_AGGREGATES
 
-class InSummarySerializer(serializers.Serializer):
-    file = serializers.FileField()
+
+SUMMARY_MODE_EXACT = "exact"
+SUMMARY_MODE_SAMPLE = "sample"
+SUMMARY_MODES = [SUMMARY_MODE_EXACT, SUMMARY_MODE_SAMPLE]
+SAMPLE_FIELDS = ["sample_rows", "sample_fraction", "sample_method", "confidence"]
+
+
+class SummaryOptionsSerializer(serializers.Serializer):
     column_names = serializers.ListField(child=serializers.CharField())
+    engine = serializers.ChoiceField(
+        choices=SUMMARY_ENGINES,
+        default=SUMMARY_ENGINE_DECIMAL,
+        help_text="Summary engine: exact row by row Decimal aggregation or vectorized NumPy aggregation",
+    )
+    aggregates = serializers.ListField(
+        child=serializers.ChoiceField(choices=AGGREGATES),
+        default=list(DEFAULT_AGGREGATES),
+        allow_empty=False,
+        help_text="Aggregates calculated for every column, all of them in a single pass over the file",
+    )
+    filter = serializers.CharField(
+        required=False,
+        help_text='Rows summarised, e.g. `Status == "Paid" and Date >= 2026-01-01`. Comparisons (==, !=, <, <=, >, >=),'
+        " `in (...)` and `not in (...)` are combined with and, or, not and parentheses. Defaults to every row.",
+    )
+    group_by = serializers.ListField(
+        child=serializers.CharField(),
+        default=list,
+        help_text="Columns whose values group the rows, every group is summarised besides the whole columns",
+    )
+    top = serializers.IntegerField(
+        min_value=1,
+        required=False,
+        allow_null=True,
+        help_text="Number of groups returned, holding the most rows. Defaults to every group.",
+    )
+
+    header_row = serializers.IntegerField(
+        min_value=1,
+        required=False,
+        allow_null=True,
+        help_text="Number of the row holding the column names. Defaults to the first row holding all of them.",
+    )
+
+    def validate_filter(self, expression: str) -> str:
+        try:
+            RowFilter(expression)
+        except InvalidRowFilterError as e:
+            raise serializers.ValidationError(e.detail)
+        return expression
+
+    def validate(self, attrs: dict) -> dict:
+        grouped_columns = set(attrs["column_names"]) & set(attrs.get("group_by", []))
+        if grouped_columns:
+            message = f"Columns cannot be both summarised and grouped by: {', '.join(sorted(grouped_columns))}"
+            raise serializers.ValidationError({"group_by": message})
+        if attrs.get("top") is not None and not attrs.get("group_by"):
+            message = "Only grouped summaries take top, set group_by"
+            raise serializers.ValidationError({"top": message})
+        return attrs
+
+
+class InSummarySerializer(SummaryOptionsSerializer):
+    file = serializers.FileField()
+    sheets = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        allow_empty=False,
+        help_text=f'Names of the sheets to summarise, or "{ALL_SHEETS}" for every sheet. Defaults to the active sheet.',
+    )
+
+    def validate_sheets(self, sheets: list[str]) -> list[str]:
+        if ALL_SHEETS in sheets and len(sheets) > 1:
+            message = f'"{ALL_SHEETS}" cannot be combined with sheet names'
+            raise serializers.ValidationError(message)
+        return sheets
+
+
+class InSummaryModeSerializer(InSummarySerializer):
+    mode = serializers.ChoiceField(
+        choices=SUMMARY_MODES,
+        default=SUMMARY_MODE_EXACT,
+        help_text="Exact summary of every row, or sum and avg estimated with confidence intervals from sampled rows",
+    )
+    sample_method = serializers.ChoiceField(
+        choices=SAMPLE_METHODS,
+        required=False,
+        help_text="stride examines every n-th row and skips parsing the others, reservoir a uniform random sample "
+        "of rows read in full. Only xlsx sheets storing their dimension skip rows, sample_rows of other files is "
+        "sampled with reservoir. Defaults to stride.",
+    )
+    sample_rows = serializers.IntegerField(
+        min_value=1, required=False, help_text="Number of rows examined. Defaults to a number set by the service."
+    )
+    sample_fraction = serializers.FloatField(
+        min_value=0.000001, max_value=1, required=False, help_text="Fraction of the rows examined"
+    )
+    confidence = serializers.FloatField(
+        min_value=0.5,
+        max_value=0.999,
+        required=False,
+        help_text=f"Confidence level of the intervals, defaults to {DEFAULT_CONFIDENCE}",
+    )
+
+    def validate(self, attrs: dict) -> dict:
+        attrs = super().validate(attrs)
+        if attrs["mode"] != SUMMARY_MODE_SAMPLE:
+            sample_fields = [field for field in SAMPLE_FIELDS if field in attrs]
+            if sample_fields:
+                message = f'Only sampled summaries take {", ".join(sample_fields)}, set mode to "{SUMMARY_MODE_SAMPLE}"'
+                raise serializers.ValidationError({"mode": message})
+            return attrs
+        if "sample_rows" in attrs and "sample_fraction" in attrs:
+            message = "Sample either a number or a fraction of the rows"
+            raise serializers.ValidationError({"sample_fraction": message})
+        unsupported = [aggregate for aggregate in attrs["aggregates"] if aggregate not in SAMPLE_AGGREGATES]
+        if unsupported:
+            message = f"Sampled summaries only estimate {', '.join(SAMPLE_AGGREGATES)}"
+            raise serializers.ValidationError({"aggregates": message})
+        if attrs.get("group_by"):
+            message = "Sampled summaries cannot be grouped"
+            raise serializers.ValidationError({"group_by": message})
+        if attrs.get("sheets"):
+            message = "Sampled summaries only read the active sheet"
+            raise serializers.ValidationError({"sheets": message})
+        return attrs
+
+
+class InStreamSummarySerializer(SummaryOptionsSerializer):
+    file = serializers.FileField(help_text="Workbook whose active sheet is summarised")
+
+
+class InBatchSummarySerializer(SummaryOptionsSerializer):
+    files = serializers.ListField(
+        child=serializers.FileField(),
+        allow_empty=False,
+        help_text="Workbooks or zip archives of workbooks, the active sheet of every workbook is summarised",
+    )
+
+
+class OutGroupSummarySerializer(serializers.Serializer):
+    group = serializers.DictField(help_text="Values of the group columns")
+    rows = serializers.IntegerField(help_text="Most values summarised in a column of the group")
+    summary = serializers.ListField(child=serializers.DictField())
+
+
+class OutSheetSummarySerializer(serializers.Serializer):
+    sheet = serializers.CharField()
+    summary = serializers.ListField(child=serializers.DictField(), allow_null=True)
+    groups = OutGroupSummarySerializer(many=True, required=False)
+    detail = serializers.CharField(allow_null=True, help_text="Why the sheet cannot be summarised")
+
+
+class OutSampleSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=SAMPLE_METHODS)
+    rows_examined = serializers.IntegerField(help_text="Rows after the column row which were summarised")
+    rows_total = serializers.IntegerField(help_text="Rows the sample stands for, estimated by stride sampling")
+    fraction = serializers.FloatField(help_text="Share of the rows examined")
+    confidence = serializers.FloatField(help_text="Confidence level of the intervals of the estimates")
 
 
 class OutSummarySerializer(serializers.Serializer):
     file = serializers.CharField()
-    summary = serializers.ListField(child=serializers.DictField())
+    summary = serializers.ListField(child=serializers.DictField(), help_text="Summary of all the requested sheets")
+    groups = OutGroupSummarySerializer(
+        many=True, required=False, help_text="Summaries of the groups, when the rows are grouped"
+    )
+    sheets = OutSheetSummarySerializer(many=True, required=False)
+    sample = OutSampleSerializer(
+        required=False, help_text="How the rows were sampled, when the sum and avg are estimated from a sample"
+    )
+
+
+class OutFileSummarySerializer(serializers.Serializer):
+    file = serializers.CharField(help_text="Name of the uploaded file, or of the archive and the file in it")
+    summary = serializers.ListField(child=serializers.DictField(), allow_null=True)
+    groups = OutGroupSummarySerializer(many=True, required=False)
+    detail = serializers.CharField(allow_null=True, help_text="Why the file cannot be summarised")
+
+
+class OutBatchSummarySerializer(serializers.Serializer):
+    summary = serializers.ListField(
+        child=serializers.DictField(), allow_null=True, help_text="Summary of all the files which could be summarised"
+    )
+    groups = OutGroupSummarySerializer(many=True, required=False)
+    files = OutFileSummarySerializer(many=True)
+
+
+class OutJobSerializer(serializers.Serializer):
+    id = serializers.CharField()
+    status = serializers.ChoiceField(choices=JOB_STATUSES)
+    file = serializers.CharField()
+    column_names = serializers.ListField(child=serializers.CharField())
+    requested_sheets = serializers.ListField(child=serializers.CharField(), allow_null=True)
+    rows_scanned = serializers.IntegerField(help_text="Rows read from the file so far")
+    summary = serializers.ListField(child=serializers.DictField(), allow_null=True)
+    groups = OutGroupSummarySerializer(many=True, allow_null=True, required=False)
+    sheets = OutSheetSummarySerializer(many=True, allow_null=True, required=False)
+    detail = serializers.CharField(allow_null=True, help_text="Why the job failed")
+    cancel_requested = serializers.BooleanField()
+    created_at = serializers.DateTimeField()
+    updated_at = serializers.DateTimeField()
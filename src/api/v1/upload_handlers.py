@@ -0,0 +1,92 @@
+import hashlib
+
+from typing import Any
+
+import structlog
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+logger = structlog.getLogger(__name__)
+
+
+class UploadTooLargeError(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Uploaded file is too large"
+    default_code = "upload_too_large"
+
+
+class HashedTemporaryUploadedFile(TemporaryUploadedFile):
+    """Upload stored in a temporary file, with the SHA-256 of its content computed while it was received"""
+
+    file_hash: str
+
+
+class HashingTemporaryFileUploadHandler(FileUploadHandler):
+    """
+    Streams uploaded files straight to temporary files, hashing them on the way, so that a request holds
+    a single chunk in memory whatever the size of the file. Files above the configured size are refused
+    before their content is read when the request size tells it, and as soon as the limit is passed otherwise.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.max_bytes: int | None = settings.EXCEL_SUMMARY_UPLOAD.get("MAX_BYTES")
+        self.file: HashedTemporaryUploadedFile | None = None
+        self.digest = hashlib.sha256()
+        self.received = 0
+
+    def handle_raw_input(
+        self,
+        _input_data: Any,
+        _meta: dict,
+        content_length: int,
+        _boundary: str,
+        _encoding: str | None = None,
+    ) -> None:
+        # Other form fields are limited by DATA_UPLOAD_MAX_MEMORY_SIZE, so larger requests cannot hold a valid file
+        max_content_length = self.max_bytes
+        if max_content_length is not None:
+            max_content_length += settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0
+        if max_content_length is not None and content_length > max_content_length:
+            logger.info("Refused upload", content_length=content_length, max_bytes=self.max_bytes)
+            raise UploadTooLargeError
+
+    def new_file(self, *args: Any, **kwargs: Any) -> None:
+        super().new_file(*args, **kwargs)
+        self.file = HashedTemporaryUploadedFile(
+            self.file_name or "", self.content_type, 0, self.charset, self.content_type_extra
+        )
+        self.digest = hashlib.sha256()
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data: bytes, _start: int) -> None:
+        if self.file is None:
+            return
+        self.received += len(raw_data)
+        if self.max_bytes is not None and self.received > self.max_bytes:
+            logger.info("Refused upload", received=self.received, max_bytes=self.max_bytes)
+            # The file is not handed to the parser yet, so it would not be closed and removed otherwise
+            self.file.close()
+            self.file = None
+            raise UploadTooLargeError
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size: int) -> HashedTemporaryUploadedFile | None:
+        file, self.file = self.file, None
+        if file is None:
+            return None
+        file.seek(0)
+        file.size = file_size
+        file.file_hash = self.digest.hexdigest()
+        return file
+
+    def upload_interrupted(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
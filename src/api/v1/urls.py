@@ -1,8 +1,18 @@
 from django.urls import path
 
-from api.v1.views import ExcelSummaryView
+from api.v1.views import (
+    ExcelSummaryBatchView,
+    ExcelSummaryJobListView,
+    ExcelSummaryJobView,
+    ExcelSummaryStreamView,
+    ExcelSummaryView,
+)
 
 
 urlpatterns = [
     path("excel-summary/", ExcelSummaryView.as_view(), name="excel-summary"),
+    path("excel-summary/batch/", ExcelSummaryBatchView.as_view(), name="excel-summary-batch"),
+    path("excel-summary/stream/", ExcelSummaryStreamView.as_view(), name="excel-summary-stream"),
+    path("excel-summary/jobs/", ExcelSummaryJobListView.as_view(), name="excel-summary-jobs"),
+    path("excel-summary/jobs/<uuid:job_id>/", ExcelSummaryJobView.as_view(), name="excel-summary-job"),
 ]
@@ -1,7 +1,16 @@
+import cProfile
+import functools
+import json
+import tempfile
 import uuid
 
+from typing import Any
+
 import structlog
 
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from drf_spectacular.utils import extend_schema
 from rest_framework import status
 from rest_framework.request import Request
@@ -9,50 +18,477 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from structlog.contextvars import bound_contextvars
 
-from api.v1.serializers import InSummarySerializer, OutSummarySerializer
-from services.summarise_excel.column_row_finder import ExcelColumnRowFinder
-from services.summarise_excel.exceptions import BaseExcelSummaryError
-from services.summarise_excel.file_readers import ExcelFileReader
-from services.summarise_excel.row_converter import ExcelRowConverter
-from services.summarise_excel.row_processors import ExcelRowProcessor
-from services.summarise_excel.summary_generator import ExcelSummaryGenerator
-from services.summarise_excel.value_processors import ExcelValueProcessor
+from api.v1.renderers import EventStreamRenderer, NDJSONRenderer
+from api.v1.serializers import (
+    SUMMARY_MODE_SAMPLE,
+    InBatchSummarySerializer,
+    InStreamSummarySerializer,
+    InSummaryModeSerializer,
+    InSummarySerializer,
+    OutBatchSummarySerializer,
+    OutJobSerializer,
+    OutSummarySerializer,
+)
+from api.v1.upload_handlers import HashedTemporaryUploadedFile
+from services.summarise_excel.batch_summaries import expand_archives, summarise_files
+from services.summarise_excel.exceptions import BaseExcelSummaryError, JobNotFoundError, JobQueueFullError
+from services.summarise_excel.extract_cache import ColumnarExtractCache
+from services.summarise_excel.generator_factory import FILE_READER_XLSX, build_summary_generator, open_file_reader
+from services.summarise_excel.jobs import DEFAULT_RETENTION_SECONDS, FINISHED_JOB_STATUSES, JobRunner, JobStore
+from services.summarise_excel.metrics import (
+    BYTES_READ,
+    PEAK_RSS,
+    REGISTRY,
+    REQUESTS,
+    STAGE_CACHE,
+    STAGE_SERIALIZE,
+    STAGE_SUMMARY,
+    STAGE_TOTAL,
+    STAGE_UPLOAD,
+    StageTimings,
+    observe_summary_stats,
+    peak_rss_bytes,
+)
+from services.summarise_excel.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from services.summarise_excel.parallel_summary_generator import ParallelSummaryGenerator
+from services.summarise_excel.profiles import DEFAULT_MAX_PROFILES, ProfileStore
+from services.summarise_excel.result_cache import (
+    RESULT_CACHE_BACKENDS,
+    BaseResultCache,
+    build_cache_key,
+    hash_file,
+)
+from services.summarise_excel.sampling import DEFAULT_CONFIDENCE, SAMPLE_METHOD_STRIDE, SampledSummaryGenerator
+from services.summarise_excel.sheet_summaries import summarise_sheets
+from services.summarise_excel.summary_generator import BaseSummaryGenerator
+from services.summarise_excel.summary_streams import RECORD_SUMMARY, iter_summary_records
+from services.summarise_excel.worker_pool import WorkerPool
 
 
 logger = structlog.getLogger(__name__)
 
+RESULT_CACHE_HEADER = "X-Summary-Cache"
+RESULT_CACHE_HIT = "hit"
+RESULT_CACHE_MISS = "miss"
+SERVER_TIMING_HEADER = "Server-Timing"
+PROFILE_HEADER = "X-Summary-Profile"
+
+_result_caches: dict[str, BaseResultCache] = {}
+_extract_caches: dict[str, ColumnarExtractCache] = {}
+_job_runners: dict[str, JobRunner] = {}
+_worker_pools: dict[str, WorkerPool] = {}
+
+
+def get_file_hash(file: UploadedFile) -> str:
+    """Return the SHA-256 of the upload, computed while it was received when the upload handler could do it"""
+    if isinstance(file, HashedTemporaryUploadedFile):
+        return file.file_hash
+    return hash_file(file)
+
+
+def get_upload_source(file: UploadedFile) -> str | UploadedFile:
+    """Return the path of uploads stored in a file, which worker processes can open as well, or the upload itself"""
+    return file.temporary_file_path() if isinstance(file, TemporaryUploadedFile) else file
+
+
+def build_summary_options(validated_data: dict[str, Any]) -> dict[str, Any]:
+    """Return the options of the summary generators from the validated request and the settings"""
+    return {
+        "engine": validated_data["engine"],
+        "file_reader": settings.EXCEL_SUMMARY_FILE_READER,
+        "aggregates": validated_data["aggregates"],
+        "quantile_sketch_size": settings.EXCEL_SUMMARY_SKETCHES["QUANTILE_SIZE"],
+        "distinct_sketch_precision": settings.EXCEL_SUMMARY_SKETCHES["DISTINCT_PRECISION"],
+        "group_by": validated_data["group_by"],
+        "max_groups": settings.EXCEL_SUMMARY_GROUPS["MAX_GROUPS"],
+        "top_groups": validated_data.get("top"),
+        "row_filter": validated_data.get("filter"),
+        "header_row": validated_data.get("header_row"),
+        "max_header_scan_rows": settings.EXCEL_SUMMARY_HEADER["MAX_SCAN_ROWS"],
+    }
+
+
+def build_sample_options(validated_data: dict[str, Any]) -> dict[str, Any] | None:
+    """Return the options of the sampled summary of the validated request, None when every row is summarised"""
+    if validated_data.get("mode") != SUMMARY_MODE_SAMPLE:
+        return None
+    sample_fraction = validated_data.get("sample_fraction")
+    sample_rows = validated_data.get("sample_rows")
+    if sample_rows is None and sample_fraction is None:
+        sample_rows = settings.EXCEL_SUMMARY_SAMPLING["DEFAULT_ROWS"]
+    return {
+        "method": validated_data.get("sample_method", SAMPLE_METHOD_STRIDE),
+        "sample_rows": sample_rows,
+        "sample_fraction": sample_fraction,
+        "confidence": validated_data.get("confidence", DEFAULT_CONFIDENCE),
+    }
+
+
+def get_result_cache() -> BaseResultCache | None:
+    """Return the result cache configured in settings, reusing it between requests"""
+    config = settings.EXCEL_SUMMARY_RESULT_CACHE
+    if not config or not config.get("BACKEND"):
+        return None
+    config_key = json.dumps(config, sort_keys=True, default=str)
+    if config_key not in _result_caches:
+        _result_caches[config_key] = RESULT_CACHE_BACKENDS[config["BACKEND"]](**config.get("OPTIONS", {}))
+    return _result_caches[config_key]
+
+
+def get_extract_cache() -> ColumnarExtractCache | None:
+    """Return the columnar extract cache configured in settings, reusing it between requests"""
+    config = settings.EXCEL_SUMMARY_EXTRACT_CACHE
+    if not config or not config.get("DIRECTORY"):
+        return None
+    config_key = json.dumps(config, sort_keys=True, default=str)
+    if config_key not in _extract_caches:
+        _extract_caches[config_key] = ColumnarExtractCache(
+            directory=config["DIRECTORY"], max_bytes=config.get("MAX_BYTES", 1 << 30)
+        )
+    return _extract_caches[config_key]
+
+
+def get_profile_store() -> ProfileStore:
+    config = settings.EXCEL_SUMMARY_PROFILING
+    return ProfileStore(directory=config["DIRECTORY"], max_profiles=config.get("MAX_PROFILES", DEFAULT_MAX_PROFILES))
+
+
+def get_job_runner() -> JobRunner:
+    """Return the job runner configured in settings, its worker processes are started with the first job"""
+    config = settings.EXCEL_SUMMARY_JOBS
+    config_key = json.dumps(config, sort_keys=True, default=str)
+    if config_key not in _job_runners:
+        _job_runners[config_key] = JobRunner(
+            store=JobStore(
+                directory=config["DIRECTORY"],
+                retention_seconds=config.get("RETENTION_SECONDS", DEFAULT_RETENTION_SECONDS),
+            ),
+            max_workers=config.get("MAX_WORKERS", 2),
+            max_queued=config.get("MAX_QUEUED", 16),
+        )
+    return _job_runners[config_key]
+
+
+def get_worker_pool() -> WorkerPool:
+    """Return the pool summarising sheets and row ranges of large sheets, shared by the requests of this process"""
+    config = settings.EXCEL_SUMMARY_PARALLEL
+    config_key = json.dumps(config, sort_keys=True, default=str)
+    if config_key not in _worker_pools:
+        _worker_pools[config_key] = WorkerPool(max_workers=config["MAX_WORKERS"])
+    return _worker_pools[config_key]
+
 
 class ExcelSummaryView(APIView):
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        # Views are instantiated for every request
+        self.timings = StageTimings()
+        self.correlation_id = str(uuid.uuid4())
+        self.file_name: str | None = None
+        self.profiler: cProfile.Profile | None = None
+
     @extend_schema(
-        request=InSummarySerializer,
+        request=InSummaryModeSerializer,
         responses=OutSummarySerializer,
-        description="Upload an Excel file and generate column-wise summaries (sum and avg).",
+        description=(
+            "Upload an Excel file and generate column-wise summaries (sum and avg), exact or estimated from a sample "
+            "of the rows."
+        ),
     )
     def post(self, request: Request) -> Response:
-        with bound_contextvars(request_data=request.data, correlation_id=str(uuid.uuid4())):
-            in_serializer = InSummarySerializer(data=request.data)
+        # Requests without the header are not slowed down by profiling at all
+        if PROFILE_HEADER in request.headers and settings.EXCEL_SUMMARY_PROFILING["ENABLED"]:
+            self.profiler = cProfile.Profile()
+            return self.profiler.runcall(self.summarise, request)
+        return self.summarise(request)
+
+    def summarise(self, request: Request) -> Response:
+        # The request body, the upload included, is received and parsed when it is first accessed
+        with self.timings.stage(STAGE_UPLOAD):
+            data = request.data
+        with bound_contextvars(request_data=data, correlation_id=self.correlation_id):
+            in_serializer = InSummaryModeSerializer(data=data)
             in_serializer.is_valid(raise_exception=True)
-            file_reader = ExcelFileReader(file=in_serializer.validated_data["file"])
-            value_processor = ExcelValueProcessor()
-            row_converter = ExcelRowConverter()
-            column_row_finder = ExcelColumnRowFinder()
-            row_processor = ExcelRowProcessor(value_processor=value_processor)
-            generator = ExcelSummaryGenerator(
-                file_reader=file_reader,
-                row_converter=row_converter,
-                column_row_finder=column_row_finder,
-                row_processor=row_processor,
+            file = in_serializer.validated_data["file"]
+            self.file_name = file.name
+            column_names = in_serializer.validated_data["column_names"]
+            sheets = in_serializer.validated_data.get("sheets")
+            options = build_summary_options(in_serializer.validated_data)
+            sample = build_sample_options(in_serializer.validated_data)
+
+            result_cache = get_result_cache()
+            extract_cache = get_extract_cache()
+            cache_key = None
+            result = None
+            with self.timings.stage(STAGE_CACHE):
+                file_hash = get_file_hash(file) if result_cache is not None or extract_cache is not None else None
+                if result_cache is not None and file_hash is not None:
+                    cache_options = dict(options, sheets=sheets)
+                    if sample is not None:
+                        cache_options["sample"] = sample
+                    cache_key = build_cache_key(file_hash=file_hash, column_names=column_names, options=cache_options)
+                    result = result_cache.get(cache_key)
+                    logger.debug("Result cache lookup", cache_key=cache_key, hit=result is not None)
+            cache_status = RESULT_CACHE_HIT if result is not None else RESULT_CACHE_MISS
+
+            if result is None:
+                try:
+                    with self.timings.stage(STAGE_SUMMARY):
+                        result = self.generate(
+                            file=file,
+                            column_names=column_names,
+                            sheets=sheets,
+                            sample=sample,
+                            timings=self.timings,
+                            extract_cache=extract_cache,
+                            file_hash=file_hash,
+                            **options,
+                        )
+                except BaseExcelSummaryError as e:
+                    return Response(status=status.HTTP_400_BAD_REQUEST, data={"detail": e.detail})
+                except Exception:
+                    return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                if settings.EXCEL_SUMMARY_METRICS["ENABLED"]:
+                    BYTES_READ.inc(file.size)
+                if result_cache is not None and cache_key is not None:
+                    result_cache.set(cache_key, result)
+
+            with self.timings.stage(STAGE_SERIALIZE):
+                data = OutSummarySerializer({"file": file.name, **result}).data
+        headers = {RESULT_CACHE_HEADER: cache_status} if result_cache is not None else None
+        return Response(data, headers=headers)
+
+    def finalize_response(self, request: Request, response: Response, *args: Any, **kwargs: Any) -> Response:
+        """Record the timings of every request, those refused by validation or failing included"""
+        finalized_response = super().finalize_response(request, response, *args, **kwargs)
+        self.timings.finish()
+        config = settings.EXCEL_SUMMARY_METRICS
+        if config["ENABLED"]:
+            self.timings.observe()
+            REQUESTS.inc(status=str(finalized_response.status_code))
+            PEAK_RSS.set(peak_rss_bytes())
+        if config["SERVER_TIMING"]:
+            finalized_response[SERVER_TIMING_HEADER] = self.timings.server_timing()
+        logger.info("Served summary request", status=finalized_response.status_code, **self.timings.as_dict())
+        if self.profiler is not None:
+            # Saved once the response is final, so that the profiles of refused requests tell their status as well
+            get_profile_store().save(
+                self.correlation_id,
+                self.profiler,
+                file=self.file_name,
+                status=finalized_response.status_code,
+                seconds=round(self.timings.seconds[STAGE_TOTAL], 6),
             )
+            finalized_response[PROFILE_HEADER] = self.correlation_id
+        return finalized_response
+
+    @staticmethod
+    def generate(
+        file: UploadedFile,
+        column_names: list[str],
+        sheets: list[str] | None,
+        sample: dict[str, Any] | None = None,
+        timings: StageTimings | None = None,
+        **options: Any,
+    ) -> dict[str, Any]:
+        source = get_upload_source(file)
+        if sheets is None:
+            parallel = settings.EXCEL_SUMMARY_PARALLEL
+            generator: BaseSummaryGenerator
+            if sample is not None:
+                generator = SampledSummaryGenerator(
+                    file=source,
+                    engine=options["engine"],
+                    file_reader=options["file_reader"],
+                    aggregates=options["aggregates"],
+                    row_filter=options["row_filter"],
+                    header_row=options["header_row"],
+                    max_header_scan_rows=options["max_header_scan_rows"],
+                    **sample,
+                )
+            elif isinstance(source, str) and options["file_reader"] == FILE_READER_XLSX and parallel["MAX_WORKERS"] > 1:
+                generator = ParallelSummaryGenerator(
+                    file=source,
+                    max_workers=parallel["MAX_WORKERS"],
+                    min_range_size=parallel["MIN_RANGE_BYTES"],
+                    worker_pool=get_worker_pool(),
+                    engine=options["engine"],
+                    extract_cache=options.get("extract_cache"),
+                    file_hash=options.get("file_hash"),
+                    aggregates=options["aggregates"],
+                    quantile_sketch_size=options["quantile_sketch_size"],
+                    distinct_sketch_precision=options["distinct_sketch_precision"],
+                    group_by=options["group_by"],
+                    max_groups=options["max_groups"],
+                    top_groups=options["top_groups"],
+                    row_filter=options["row_filter"],
+                    header_row=options["header_row"],
+                    max_header_scan_rows=options["max_header_scan_rows"],
+                )
+            else:
+                generator = build_summary_generator(file=source, **options)
+            summary = generator.generate_summary(column_names=column_names)
+            if generator.stats is not None:
+                if timings is not None:
+                    timings.update(generator.stats.stages)
+                if settings.EXCEL_SUMMARY_METRICS["ENABLED"]:
+                    observe_summary_stats(generator.stats)
+            return summary
+        # Sheets are summarised by worker processes, whose stages are only timed as a whole
+        return summarise_sheets(
+            file=source,
+            sheets=sheets,
+            column_names=column_names,
+            max_workers=settings.EXCEL_SUMMARY_SHEET_WORKERS,
+            worker_pool=get_worker_pool(),
+            **options,
+        )
+
+
+class MetricsView(APIView):
+    @extend_schema(exclude=True)
+    def get(self, _request: Request) -> HttpResponse:
+        """Return the metrics of this process in the Prometheus text format"""
+        if not settings.EXCEL_SUMMARY_METRICS["ENABLED"]:
+            raise Http404
+        PEAK_RSS.set(peak_rss_bytes())
+        return HttpResponse(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+class ExcelSummaryStreamView(APIView):
+    renderer_classes = [NDJSONRenderer, EventStreamRenderer]
+
+    @extend_schema(
+        request=InStreamSummarySerializer,
+        responses={(200, NDJSONRenderer.media_type): OutSummarySerializer, (200, EventStreamRenderer.media_type): None},
+        description=(
+            "Upload an Excel file and stream progress records while its active sheet is summarised, as JSON lines "
+            "or, when text/event-stream is accepted, as server-sent events. The last record holds the summary."
+        ),
+    )
+    def post(self, request: Request) -> StreamingHttpResponse:
+        with bound_contextvars(request_data=request.data, correlation_id=str(uuid.uuid4())):
+            in_serializer = InStreamSummarySerializer(data=request.data)
+            in_serializer.is_valid(raise_exception=True)
+            file = in_serializer.validated_data["file"]
+            options = build_summary_options(in_serializer.validated_data)
+            source = get_upload_source(file)
             try:
-                summary = generator.generate(column_names=in_serializer.validated_data["column_names"])
-            except BaseExcelSummaryError as e:
-                return Response(status=status.HTTP_400_BAD_REQUEST, data={"detail": e.detail})
-            except Exception:
-                return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            out_serializer = OutSummarySerializer(
-                {
-                    "file": in_serializer.validated_data["file"].name,
-                    "summary": summary,
-                }
+                row_count = open_file_reader(file=source, file_reader=options["file_reader"]).row_count()
+            except BaseExcelSummaryError:
+                # Reported by the summary, as an error record
+                row_count = None
+            records = iter_summary_records(
+                build_generator=functools.partial(
+                    build_summary_generator,
+                    file=source,
+                    progress_hook_interval=settings.EXCEL_SUMMARY_STREAMING["PROGRESS_INTERVAL"],
+                    **options,
+                ),
+                column_names=in_serializer.validated_data["column_names"],
+                row_count=row_count,
+            )
+            renderer = request.accepted_renderer
+            response = StreamingHttpResponse(
+                (renderer.render(self.format_record(record, file_name=file.name)) for record in records),
+                content_type=renderer.media_type,
             )
-        return Response(out_serializer.data)
+        # Proxies must pass the records on as they come
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    @staticmethod
+    def format_record(record: dict[str, Any], file_name: str) -> dict[str, Any]:
+        if record["type"] != RECORD_SUMMARY:
+            return record
+        return {"type": RECORD_SUMMARY, **OutSummarySerializer({"file": file_name, **record}).data}
+
+
+class ExcelSummaryBatchView(APIView):
+    @extend_schema(
+        request=InBatchSummarySerializer,
+        responses=OutBatchSummarySerializer,
+        description="Upload many Excel files, or zip archives of them, and summarise every file and all of them.",
+    )
+    def post(self, request: Request) -> Response:
+        with bound_contextvars(correlation_id=str(uuid.uuid4())):
+            in_serializer = InBatchSummarySerializer(data=request.data)
+            in_serializer.is_valid(raise_exception=True)
+            uploads = [(file.name, get_upload_source(file)) for file in in_serializer.validated_data["files"]]
+            options = build_summary_options(in_serializer.validated_data)
+            batch = settings.EXCEL_SUMMARY_BATCH
+            logger.info("Summarising batch", files=[name for name, _source in uploads])
+            # Workbooks extracted from archives only live as long as the request
+            with tempfile.TemporaryDirectory() as directory:
+                try:
+                    files = expand_archives(
+                        files=uploads,
+                        directory=directory,
+                        max_files=batch["MAX_FILES"],
+                        max_archive_bytes=batch["MAX_ARCHIVE_BYTES"],
+                    )
+                    result = summarise_files(
+                        files=files,
+                        column_names=in_serializer.validated_data["column_names"],
+                        max_workers=batch["MAX_WORKERS"],
+                        worker_pool=get_worker_pool(),
+                        **options,
+                    )
+                except BaseExcelSummaryError as e:
+                    return Response(status=status.HTTP_400_BAD_REQUEST, data={"detail": e.detail})
+                except Exception:
+                    return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(OutBatchSummarySerializer(result).data)
+
+
+class ExcelSummaryJobListView(APIView):
+    @extend_schema(
+        request=InSummarySerializer,
+        responses={202: OutJobSerializer},
+        description="Upload an Excel file and queue a job generating its column-wise summaries.",
+    )
+    def post(self, request: Request) -> Response:
+        with bound_contextvars(request_data=request.data, correlation_id=str(uuid.uuid4())):
+            in_serializer = InSummarySerializer(data=request.data)
+            in_serializer.is_valid(raise_exception=True)
+            file = in_serializer.validated_data["file"]
+            options = build_summary_options(in_serializer.validated_data)
+            try:
+                job = get_job_runner().submit(
+                    file_name=file.name,
+                    chunks=file.chunks(),
+                    column_names=in_serializer.validated_data["column_names"],
+                    sheets=in_serializer.validated_data.get("sheets"),
+                    options=options,
+                )
+            except JobQueueFullError as e:
+                return Response(status=status.HTTP_503_SERVICE_UNAVAILABLE, data={"detail": e.detail})
+        return Response(OutJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ExcelSummaryJobView(APIView):
+    @extend_schema(
+        responses=OutJobSerializer,
+        description="Return the status, the progress and, once finished, the summaries of a job.",
+    )
+    def get(self, _request: Request, job_id: uuid.UUID) -> Response:
+        try:
+            job = get_job_runner().store.get(str(job_id))
+        except JobNotFoundError as e:
+            return Response(status=status.HTTP_404_NOT_FOUND, data={"detail": e.detail})
+        return Response(OutJobSerializer(job).data)
+
+    @extend_schema(
+        request=None,
+        responses={202: OutJobSerializer, 409: None},
+        description="Cancel a queued or running job. Running jobs stop at their next progress report.",
+    )
+    def delete(self, _request: Request, job_id: uuid.UUID) -> Response:
+        try:
+            job = get_job_runner().cancel(str(job_id))
+        except JobNotFoundError as e:
+            return Response(status=status.HTTP_404_NOT_FOUND, data={"detail": e.detail})
+        if job["status"] in FINISHED_JOB_STATUSES and not job["cancel_requested"]:
+            return Response(status=status.HTTP_409_CONFLICT, data={"detail": "Job already finished"})
+        return Response(OutJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
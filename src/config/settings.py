@@ -1,4 +1,9 @@
+import os
+import tempfile
+
 from pathlib import Path
+from typing import Any
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -9,6 +14,7 @@ ALLOWED_HOSTS = ["*"]
 INSTALLED_APPS = [
     "rest_framework",
     "drf_spectacular",
+    "api",
 ]
 
 MIDDLEWARE = [
@@ -53,3 +59,101 @@ SPECTACULAR_SETTINGS = {
     "DESCRIPTION": "API for generating summaries from uploaded Excel files.",
     "VERSION": "1.0.0",
 }
+
+# Reader used for uploaded workbooks: "xlsx" streams the sheet XML directly, "openpyxl" goes through openpyxl
+EXCEL_SUMMARY_FILE_READER = "xlsx"
+
+# Cache of generated summaries, keyed by the content of the uploaded file, the requested columns and the processing
+# options. BACKEND is one of "memory", "django" or "file", None disables the cache.
+EXCEL_SUMMARY_RESULT_CACHE = {
+    "BACKEND": "memory",
+    "OPTIONS": {"max_size": 256, "ttl": 3600},
+}
+
+# Columnar extracts of scanned sheets, keyed by the content of the uploaded file, so that summaries of other columns
+# of the same file skip parsing it. Extracts used least recently are removed above MAX_BYTES. Disabled by default, as
+# the first summary of a file then parses every column of the sheet rather than the summarised ones, e.g.
+# {"DIRECTORY": Path(tempfile.gettempdir()) / "excel-summary-extracts", "MAX_BYTES": 1 << 30} enables them.
+EXCEL_SUMMARY_EXTRACT_CACHE: dict[str, Any] | None = None
+
+# Asynchronous summary jobs: uploads and job states are kept in DIRECTORY and run by a pool of MAX_WORKERS local
+# processes, with at most MAX_QUEUED jobs waiting for a free worker. Jobs not updated for RETENTION_SECONDS are removed.
+EXCEL_SUMMARY_JOBS = {
+    "DIRECTORY": Path(tempfile.gettempdir()) / "excel-summary-jobs",
+    "MAX_WORKERS": 2,
+    "MAX_QUEUED": 16,
+    "RETENTION_SECONDS": 24 * 60 * 60,
+}
+
+# Sheets of one request summarised in parallel, capped by the CPU count, by the worker pool of EXCEL_SUMMARY_PARALLEL
+EXCEL_SUMMARY_SHEET_WORKERS = 4
+
+# Single sheets of uploads stored on disk are split into row ranges summarised by a pool of up to MAX_WORKERS
+# processes shared by the requests of a web process, each range holding at least MIN_RANGE_BYTES of decompressed
+# worksheet XML. Split sheets neither read nor fill EXCEL_SUMMARY_EXTRACT_CACHE, only sheets summarised in the request
+# process do, e.g. when a worker died.
+EXCEL_SUMMARY_PARALLEL = {
+    "MAX_WORKERS": os.cpu_count() or 1,
+    "MIN_RANGE_BYTES": 16 << 20,
+}
+
+# Uploaded files are streamed to temporary files and hashed while they are received. Files above MAX_BYTES are refused
+# with 413, up front when the request Content-Length shows it and otherwise once that many bytes were received.
+FILE_UPLOAD_HANDLERS = ["api.v1.upload_handlers.HashingTemporaryFileUploadHandler"]
+EXCEL_SUMMARY_UPLOAD = {
+    "MAX_BYTES": 512 << 20,
+}
+
+# Files of one batch request, once zip archives of workbooks are extracted, are summarised by up to MAX_WORKERS
+# processes of the worker pool of EXCEL_SUMMARY_PARALLEL, capped by the CPU count. Batches of more than MAX_FILES
+# files and archives decompressing to more than MAX_ARCHIVE_BYTES are refused.
+EXCEL_SUMMARY_BATCH = {
+    "MAX_WORKERS": 4,
+    "MAX_FILES": 500,
+    "MAX_ARCHIVE_BYTES": 1 << 30,
+}
+
+# Rows grouped by key columns are refused once they make more than MAX_GROUPS groups, as every group keeps the results
+# of every column in memory
+EXCEL_SUMMARY_GROUPS = {
+    "MAX_GROUPS": 10000,
+}
+
+# Rows searched for the column row when a request does not tell its number, a missing column is then reported after
+# MAX_SCAN_ROWS rows rather than after the whole sheet. None searches every row.
+EXCEL_SUMMARY_HEADER = {
+    "MAX_SCAN_ROWS": 1000,
+}
+
+# Streamed summaries send a progress record every PROGRESS_INTERVAL rows
+EXCEL_SUMMARY_STREAMING = {
+    "PROGRESS_INTERVAL": 10000,
+}
+
+# Sampled summaries (mode "sample") examine DEFAULT_ROWS rows when a request tells neither a number nor a fraction of
+# the rows
+EXCEL_SUMMARY_SAMPLING = {
+    "DEFAULT_ROWS": 10000,
+}
+
+# Stage timings, rows and bytes read of the summary requests, exposed at /metrics in the Prometheus text format. Every
+# process keeps its own metrics. SERVER_TIMING returns the stage timings of every request in a Server-Timing header.
+EXCEL_SUMMARY_METRICS = {
+    "ENABLED": True,
+    "SERVER_TIMING": False,
+}
+
+# Summary requests sent with an X-Summary-Profile header are run under cProfile when ENABLED. Their profiles are kept
+# in DIRECTORY under the correlation id of the request, returned in the same header, the latest MAX_PROFILES of them.
+EXCEL_SUMMARY_PROFILING = {
+    "ENABLED": False,
+    "DIRECTORY": Path(tempfile.gettempdir()) / "excel-summary-profiles",
+    "MAX_PROFILES": 100,
+}
+
+# Sizes of the sketches behind the approximate aggregates: quantiles are within about 2.3 / QUANTILE_SIZE ** 0.97 of
+# their rank and distinct counts have a relative standard error of 1.04 / sqrt(2 ** DISTINCT_PRECISION), 4 to 16
+EXCEL_SUMMARY_SKETCHES = {
+    "QUANTILE_SIZE": 200,
+    "DISTINCT_PRECISION": 14,
+}
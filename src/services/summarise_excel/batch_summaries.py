@@ -0,0 +1,182 @@
+import concurrent.futures
+import glob
+import os
+import tempfile
+import zipfile
+
+from itertools import islice
+from pathlib import Path, PurePosixPath
+from typing import IO, Any, Iterator, Sequence
+
+import structlog
+
+from services.summarise_excel.exceptions import ArchiveTooLargeError, BaseExcelSummaryError, TooManyFilesError
+from services.summarise_excel.generator_factory import build_summary_generator
+from services.summarise_excel.ods import MIMETYPE_PART
+from services.summarise_excel.sheet_summaries import calculate_part_summary, merge_summaries
+from services.summarise_excel.summary_generator import ColumnGroups, ColumnResult
+from services.summarise_excel.worker_pool import WorkerPool, borrow_worker_pool
+from services.summarise_excel.xlsx import CHUNK_SIZE
+
+
+logger = structlog.getLogger(__name__)
+
+# Parts every OOXML and OpenDocument package holds, which tell a workbook from an archive of workbooks
+CONTENT_TYPES_PART = "[Content_Types].xml"
+DEFAULT_MAX_FILES = 500
+DEFAULT_MAX_ARCHIVE_BYTES = 1 << 30
+
+BatchFile = tuple[str, str | IO[bytes]]
+
+
+def is_workbook_archive(file: str | IO[bytes]) -> bool:
+    """Return whether the file is a zip of workbooks rather than a workbook, which is a zip as well"""
+    try:
+        if not zipfile.is_zipfile(file):
+            return False
+        with zipfile.ZipFile(file) as archive:
+            names = archive.namelist()
+            return CONTENT_TYPES_PART not in names and MIMETYPE_PART not in names
+    finally:
+        if not isinstance(file, str):
+            file.seek(0)
+
+
+def is_hidden_member(member: zipfile.ZipInfo) -> bool:
+    """Return whether an archive member is a directory or metadata added by archivers, e.g. __MACOSX/ or .DS_Store"""
+    path = PurePosixPath(member.filename)
+    return member.is_dir() or any(part.startswith((".", "__")) for part in path.parts)
+
+
+def extract_workbooks(
+    name: str, file: str | IO[bytes], directory: str | Path, max_bytes: int = DEFAULT_MAX_ARCHIVE_BYTES
+) -> list[BatchFile]:
+    """Extract the files of an archive to the directory, refusing archives larger than `max_bytes` once decompressed"""
+    files: list[BatchFile] = []
+    with zipfile.ZipFile(file) as archive:
+        members = [member for member in archive.infolist() if not is_hidden_member(member)]
+        if sum(member.file_size for member in members) > max_bytes:
+            raise ArchiveTooLargeError(name)
+        extracted = 0
+        for member in members:
+            file_descriptor, path = tempfile.mkstemp(dir=directory, suffix=PurePosixPath(member.filename).suffix)
+            with archive.open(member) as source, os.fdopen(file_descriptor, "wb") as target:
+                # Sizes in the archive directory can lie, so the decompressed bytes are counted as well
+                while chunk := source.read(CHUNK_SIZE):
+                    extracted += len(chunk)
+                    if extracted > max_bytes:
+                        raise ArchiveTooLargeError(name)
+                    target.write(chunk)
+            files.append((f"{name}/{member.filename}", path))
+    logger.debug("Extracted workbooks", archive=name, files=len(files))
+    return files
+
+
+def expand_archives(
+    files: Sequence[BatchFile],
+    directory: str | Path,
+    max_files: int = DEFAULT_MAX_FILES,
+    max_archive_bytes: int = DEFAULT_MAX_ARCHIVE_BYTES,
+) -> list[BatchFile]:
+    """Replace every archive of workbooks by the workbooks it holds, extracted to the directory"""
+    expanded: list[BatchFile] = []
+    for name, file in files:
+        if is_workbook_archive(file):
+            expanded.extend(extract_workbooks(name=name, file=file, directory=directory, max_bytes=max_archive_bytes))
+        else:
+            expanded.append((name, file))
+        if len(expanded) > max_files:
+            raise TooManyFilesError(max_files)
+    return expanded
+
+
+def summarise_file(
+    file: str | IO[bytes], column_names: Sequence[str], options: dict[str, Any]
+) -> tuple[list[ColumnResult] | None, ColumnGroups | None, str | None]:
+    """Return the column results and groups of one file, or why they cannot be generated. Runs in a worker process."""
+    try:
+        # Building the generator opens the file, whose format may not be readable
+        generator = build_summary_generator(file=file, **options)
+        return generator.generate_column_results(column_names=column_names), generator.groups, None
+    except BaseExcelSummaryError as e:
+        return None, None, e.detail
+    except Exception:
+        # One broken file must not fail the other files of the batch
+        logger.exception("File summary failed")
+        return None, None, "Unexpected processing error"
+
+
+def summarise_files(
+    files: Sequence[BatchFile],
+    column_names: Sequence[str],
+    max_workers: int = 1,
+    worker_pool: WorkerPool | None = None,
+    **options: Any,
+) -> dict[str, Any]:
+    """
+    Summarise every file and total the columns over the files which could be summarised. Files on disk
+    are summarised in `worker_pool`, shared between summaries, or in a pool of `max_workers` processes, capped by
+    the CPU count, file objects in turn. The total summary is None when no file could be summarised.
+    """
+    names = [name for name, _file in files]
+    paths = [file for _name, file in files]
+    max_workers = min(max_workers, os.cpu_count() or 1, len(files))
+    if max_workers > 1 and all(isinstance(file, str) for file in paths):
+        logger.debug("Summarising files in worker processes", files=len(files), max_workers=max_workers)
+        with borrow_worker_pool(worker_pool, max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(summarise_file, file=file, column_names=column_names, options=options) for file in paths
+            ]
+            outcomes = [future.result() for future in futures]
+    else:
+        outcomes = [summarise_file(file, column_names, options) for file in paths]
+    return merge_summaries(names=names, outcomes=outcomes, key="file")
+
+
+def find_files(patterns: Sequence[str], recursive: bool = False) -> list[str]:
+    """
+    Return the files of directories and glob patterns in name order, without hidden files or duplicates.
+    Directories are searched in their subdirectories as well when `recursive`, as are `**` patterns.
+    """
+    paths: list[str] = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*") if recursive else os.path.join(pattern, "*")
+        paths.extend(path for path in sorted(glob.glob(pattern, recursive=recursive)) if os.path.isfile(path))
+    return list(dict.fromkeys(paths))
+
+
+def calculate_file_summary(file: str, column_names: Sequence[str], options: dict[str, Any]) -> dict[str, Any]:
+    """Return the calculated summary of one file. Runs in a worker process."""
+    return calculate_part_summary(file, *summarise_file(file, column_names, options), key="file")
+
+
+def iter_file_summaries(
+    files: Sequence[str], column_names: Sequence[str], max_workers: int = 1, **options: Any
+) -> Iterator[dict[str, Any]]:
+    """
+    Yield the summary of every file on disk as soon as it is calculated, so in the order files finish when they
+    are summarised in a pool of `max_workers` processes. Only a few files per worker are submitted ahead,
+    so that neither the queued files nor the summaries waiting to be read grow with the number of files.
+    """
+    max_workers = min(max_workers, os.cpu_count() or 1, len(files))
+    if max_workers < 2:
+        for file in files:
+            yield calculate_file_summary(file, column_names, options)
+        return
+    logger.debug("Summarising files in worker processes", files=len(files), max_workers=max_workers)
+    pending_files = iter(files)
+    with borrow_worker_pool(None, max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(calculate_file_summary, file=file, column_names=column_names, options=options)
+            for file in islice(pending_files, 2 * max_workers)
+        }
+        while futures:
+            done, futures = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                next_file = next(pending_files, None)
+                if next_file is not None:
+                    futures.add(
+                        pool.submit(calculate_file_summary, file=next_file, column_names=column_names, options=options)
+                    )
+                yield future.result()
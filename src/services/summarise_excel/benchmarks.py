@@ -0,0 +1,362 @@
+import concurrent.futures
+import hashlib
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from pathlib import Path
+from typing import Any, Callable, Generator, Iterable, Sequence
+
+import structlog
+
+from openpyxl import Workbook
+
+from services.summarise_excel.column_row_finder import ExcelColumnRowFinder
+from services.summarise_excel.exceptions import ColumnRowNotFoundError
+from services.summarise_excel.extract_cache import ColumnarExtractCache
+from services.summarise_excel.file_readers import BaseFileReader, ColumnProjection, ExcelFileReader, XlsxFileReader
+from services.summarise_excel.generator_factory import (
+    SUMMARY_ENGINE_DECIMAL,
+    SUMMARY_ENGINE_NUMPY,
+    build_summary_generator,
+)
+from services.summarise_excel.metrics import peak_rss_bytes
+from services.summarise_excel.row_processors import ExcelRowProcessor, UnprocessableRowError
+from services.summarise_excel.value_processors import (
+    CachedValueProcessor,
+    ColumnValueUnprocessableError,
+    ExcelValueProcessor,
+)
+
+
+logger = structlog.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.2
+# Cells of dirty rows, which cannot be summarised, and values of the text columns, stored once as shared strings
+DIRTY_VALUES = ["n/a", "", None, "1,5", "-"]
+TEXT_VALUES = [f"label {index}" for index in range(64)]
+
+
+class WorkbookSpec:
+    """Shape of a synthetic workbook, whose cells only depend on the spec, so that runs compare the same data"""
+
+    def __init__(
+        self,
+        name: str,
+        rows: int,
+        columns: int,
+        dirty_ratio: float = 0.0,
+        shared_string_ratio: float = 0.0,
+        header_offset: int = 0,
+        seed: int = 0,
+    ) -> None:
+        self.name = name
+        self.rows = rows
+        self.columns = columns
+        self.dirty_ratio = dirty_ratio
+        self.shared_string_ratio = shared_string_ratio
+        self.header_offset = header_offset
+        self.seed = seed
+
+    @property
+    def text_columns(self) -> int:
+        return round(self.columns * self.shared_string_ratio)
+
+    @property
+    def column_names(self) -> list[str]:
+        """Names of the numeric columns, which are summarised"""
+        return [f"value_{index}" for index in range(self.columns - self.text_columns)]
+
+    @property
+    def header(self) -> list[str]:
+        return self.column_names + [f"label_{index}" for index in range(self.text_columns)]
+
+    def scaled(self, scale: float) -> "WorkbookSpec":
+        return WorkbookSpec(
+            name=self.name,
+            rows=max(1, round(self.rows * scale)),
+            columns=self.columns,
+            dirty_ratio=self.dirty_ratio,
+            shared_string_ratio=self.shared_string_ratio,
+            header_offset=self.header_offset,
+            seed=self.seed,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "rows": self.rows,
+            "columns": self.columns,
+            "dirty_ratio": self.dirty_ratio,
+            "shared_string_ratio": self.shared_string_ratio,
+            "header_offset": self.header_offset,
+            "seed": self.seed,
+        }
+
+
+DEFAULT_WORKBOOK_SPECS = [
+    WorkbookSpec(name="narrow", rows=50000, columns=4),
+    WorkbookSpec(name="wide", rows=5000, columns=60),
+    WorkbookSpec(name="dirty", rows=50000, columns=4, dirty_ratio=0.2),
+    WorkbookSpec(name="text", rows=50000, columns=8, shared_string_ratio=0.5),
+    WorkbookSpec(name="offset", rows=50000, columns=4, header_offset=200),
+]
+
+
+def iter_workbook_rows(spec: WorkbookSpec) -> Iterable[list[Any]]:
+    """Yield the rows of the workbook: title rows up to the header offset, the column row and the data rows"""
+    generator = random.Random(spec.seed)
+    for index in range(spec.header_offset):
+        yield [f"Report line {index}"] if index % 2 == 0 else []
+    yield spec.header
+    numeric_columns = len(spec.column_names)
+    for _ in range(spec.rows):
+        row: list[Any] = [
+            generator.randint(-1000, 100000) if generator.random() < 0.5 else round(generator.uniform(-1000, 1e5), 2)
+            for _ in range(numeric_columns)
+        ]
+        if spec.dirty_ratio and generator.random() < spec.dirty_ratio:
+            row[generator.randrange(numeric_columns)] = generator.choice(DIRTY_VALUES)
+        row.extend(generator.choice(TEXT_VALUES) for _ in range(spec.text_columns))
+        yield row
+
+
+def generate_workbook(spec: WorkbookSpec, path: str | Path) -> Path:
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title="data")
+    for row in iter_workbook_rows(spec):
+        worksheet.append(row)
+    workbook.save(path)
+    return Path(path)
+
+
+class RowsFileReader(BaseFileReader):
+    """Yields rows read beforehand, so that the layers after the file reader are timed without parsing"""
+
+    def __init__(self, rows: Sequence[Sequence[Any]]) -> None:
+        self.rows = rows
+
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator:
+        for row in self.rows[max(min_row - 1, 0) :]:
+            if projection is not None and projection.max_column is not None:
+                row = row[: projection.max_column + 1]
+            yield row
+
+
+def read_rows(path: str) -> list[tuple]:
+    return list(XlsxFileReader(file=path).iter_rows())
+
+
+def data_rows(rows: list[tuple], spec: WorkbookSpec) -> list[tuple]:
+    return rows[spec.header_offset + 1 :]
+
+
+def benchmark_file_reader(file_reader: type[ExcelFileReader] | type[XlsxFileReader]) -> Callable:
+    def prepare(path: str, _spec: WorkbookSpec) -> Callable[[], int]:
+        def run() -> int:
+            return sum(1 for _row in file_reader(file=path).iter_rows())
+
+        return run
+
+    return prepare
+
+
+def benchmark_column_row_finder(path: str, spec: WorkbookSpec) -> Callable[[], int]:
+    rows = read_rows(path)
+    finder = ExcelColumnRowFinder(max_scan_rows=None)
+    # A misspelled column name, the worst case, in which every row is compared
+    column_names = [*spec.column_names, "missing"]
+
+    def run() -> int:
+        try:
+            finder.find(file_reader=RowsFileReader(rows), column_names=column_names)
+        except ColumnRowNotFoundError:
+            pass
+        return len(rows)
+
+    return run
+
+
+def benchmark_value_processor(
+    value_processor_class: type[ExcelValueProcessor] | type[CachedValueProcessor],
+) -> Callable:
+    def prepare(path: str, spec: WorkbookSpec) -> Callable[[], int]:
+        numeric_columns = len(spec.column_names)
+        values = [value for row in data_rows(read_rows(path), spec) for value in row[:numeric_columns]]
+
+        def run() -> int:
+            value_processor = value_processor_class()
+            for value in values:
+                try:
+                    value_processor.process(value)
+                except ColumnValueUnprocessableError:
+                    pass
+            return len(values)
+
+        return run
+
+    return prepare
+
+
+def benchmark_row_processor(path: str, spec: WorkbookSpec) -> Callable[[], int]:
+    column_names = spec.column_names
+    row_dicts = [dict(zip(column_names, row)) for row in data_rows(read_rows(path), spec)]
+
+    def run() -> int:
+        row_processor = ExcelRowProcessor(value_processor=ExcelValueProcessor())
+        for row_dict in row_dicts:
+            try:
+                row_processor.process(row_dict)
+            except UnprocessableRowError:
+                pass
+        return len(row_dicts)
+
+    return run
+
+
+def benchmark_summary(engine: str) -> Callable:
+    def prepare(path: str, spec: WorkbookSpec) -> Callable[[], int]:
+        def run() -> int:
+            build_summary_generator(file=path, engine=engine).generate(column_names=spec.column_names)
+            return spec.rows
+
+        return run
+
+    return prepare
+
+
+def benchmark_first_column_summary(path: str, spec: WorkbookSpec) -> Callable[[], int]:
+    """Summarise a single column, as most requests do, reading only that column of the sheet"""
+
+    def run() -> int:
+        build_summary_generator(file=path).generate(column_names=spec.column_names[:1])
+        return spec.rows
+
+    return run
+
+
+def benchmark_extract_miss(path: str, spec: WorkbookSpec) -> Callable[[], int]:
+    """Summarise a single column while its file is missing from the extract cache, which stores every column"""
+    with open(path, "rb") as file:
+        file_hash = hashlib.file_digest(file, "sha256").hexdigest()
+
+    def run() -> int:
+        with tempfile.TemporaryDirectory() as directory:
+            build_summary_generator(
+                file=path, extract_cache=ColumnarExtractCache(directory=directory), file_hash=file_hash
+            ).generate(column_names=spec.column_names[:1])
+        return spec.rows
+
+    return run
+
+
+# Benchmarks of every layer, by name. Those reading the file also report the bytes read per second.
+BENCHMARKS: dict[str, Callable[[str, WorkbookSpec], Callable[[], int]]] = {
+    "file_reader_openpyxl": benchmark_file_reader(ExcelFileReader),
+    "file_reader_xlsx": benchmark_file_reader(XlsxFileReader),
+    "column_row_finder": benchmark_column_row_finder,
+    "value_processor": benchmark_value_processor(ExcelValueProcessor),
+    "value_processor_cached": benchmark_value_processor(CachedValueProcessor),
+    "row_processor": benchmark_row_processor,
+    "summary_decimal": benchmark_summary(SUMMARY_ENGINE_DECIMAL),
+    "summary_numpy": benchmark_summary(SUMMARY_ENGINE_NUMPY),
+    "summary_first_column": benchmark_first_column_summary,
+    "summary_extract_miss": benchmark_extract_miss,
+}
+FILE_BENCHMARKS = frozenset(
+    [
+        "file_reader_openpyxl",
+        "file_reader_xlsx",
+        "summary_decimal",
+        "summary_numpy",
+        "summary_first_column",
+        "summary_extract_miss",
+    ]
+)
+# Benchmarks counting cell values rather than rows
+VALUE_BENCHMARKS = frozenset(["value_processor", "value_processor_cached"])
+
+
+def quiet_logging() -> None:
+    """Keep the logs of the summaries out of the timings of a benchmark process"""
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.ERROR))
+
+
+def run_benchmark(benchmark: str, path: str, spec: WorkbookSpec, repeat: int = 3) -> dict[str, Any]:
+    """Time the best of `repeat` runs of one benchmark. Runs in a process of its own, whose peak RSS it reports."""
+    run = BENCHMARKS[benchmark](path, spec)
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        items = run()
+        timings.append(time.perf_counter() - started_at)
+    seconds = min(timings)
+    result: dict[str, Any] = {
+        "seconds": round(seconds, 6),
+        "items": items,
+        "unit": "values" if benchmark in VALUE_BENCHMARKS else "rows",
+        "items_per_second": round(items / seconds, 1),
+        "megabytes_per_second": None,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+    if benchmark in FILE_BENCHMARKS:
+        result["megabytes_per_second"] = round(os.path.getsize(path) / (1 << 20) / seconds, 3)
+    return result
+
+
+def run_benchmarks(
+    directory: str | Path,
+    specs: Sequence[WorkbookSpec] = DEFAULT_WORKBOOK_SPECS,
+    benchmarks: Sequence[str] = tuple(BENCHMARKS),
+    repeat: int = 3,
+) -> dict[str, Any]:
+    """
+    Generate the workbooks in the directory and run every benchmark on every workbook. Every benchmark runs in
+    a fresh process, so that its peak RSS is not the one of the benchmarks run before it.
+    """
+    results: dict[str, Any] = {"workbooks": {}, "results": {}}
+    context = multiprocessing.get_context("spawn")
+    for spec in specs:
+        path = str(Path(directory) / f"{spec.name}.xlsx")
+        generate_workbook(spec, path)
+        results["workbooks"][spec.name] = dict(spec.as_dict(), bytes=os.path.getsize(path))
+        for benchmark in benchmarks:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=1, mp_context=context, initializer=quiet_logging
+            ) as executor:
+                result = executor.submit(run_benchmark, benchmark, path, spec, repeat).result()
+            logger.info("Benchmarked", workbook=spec.name, benchmark=benchmark, **result)
+            results["results"][f"{spec.name}/{benchmark}"] = result
+    return results
+
+
+def compare_with_baseline(
+    results: dict[str, Any], baseline: dict[str, Any], threshold: float = DEFAULT_THRESHOLD
+) -> list[str]:
+    """
+    Return the regressions against the baseline: benchmarks whose throughput dropped or whose peak RSS grew by more
+    than `threshold`. Benchmarks missing from the baseline, or run on workbooks of another shape, are not compared.
+    """
+    regressions = []
+    for key, result in results["results"].items():
+        baseline_result = baseline["results"].get(key)
+        workbook = key.split("/", 1)[0]
+        baseline_workbook = baseline["workbooks"].get(workbook, {})
+        if baseline_result is None or baseline_workbook.get("rows") != results["workbooks"][workbook]["rows"]:
+            continue
+        slowdown = 1 - result["items_per_second"] / baseline_result["items_per_second"]
+        if slowdown > threshold:
+            regressions.append(
+                f"{key}: {result['items_per_second']:.0f} items/s, {slowdown:.0%} slower than the baseline"
+                f" {baseline_result['items_per_second']:.0f} items/s"
+            )
+        growth = result["peak_rss_bytes"] / baseline_result["peak_rss_bytes"] - 1
+        if growth > threshold:
+            regressions.append(
+                f"{key}: peak RSS of {result['peak_rss_bytes'] >> 20} MiB, {growth:.0%} above the baseline"
+                f" {baseline_result['peak_rss_bytes'] >> 20} MiB"
+            )
+    return regressions
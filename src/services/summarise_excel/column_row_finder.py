@@ -1,30 +1,125 @@
 import abc
+import difflib
+import heapq
 
-from typing import Iterable, Tuple
+from typing import Iterable, Iterator, Sequence, Tuple
 
 import structlog
 
 from services.summarise_excel.exceptions import ColumnRowNotFoundError
-from services.summarise_excel.file_readers import BaseFileReader
+from services.summarise_excel.file_readers import BaseFileReader, ColumnProjection
 
 
 logger = structlog.getLogger(__name__)
 
+DEFAULT_MAX_HEADER_SCAN_ROWS = 1000
+DEFAULT_MAX_CANDIDATES = 3
+# Distinct text values kept to suggest names close to missing column names
+MAX_VALUES_SEEN = 10000
+
 
 class BaseColumnRowFinder(abc.ABC):
     @abc.abstractmethod
-    def find(self, file_reader: BaseFileReader, column_names: Iterable[str]) -> Tuple[Iterable, int]: ...
+    def find(
+        self,
+        file_reader: BaseFileReader,
+        column_names: Iterable[str],
+        projection: ColumnProjection | None = None,
+    ) -> Tuple[list, Iterator[Sequence]]:
+        """Return the column row and the live row iterator positioned right after it"""
 
 
 class ExcelColumnRowFinder(BaseColumnRowFinder):
-    def find(self, file_reader: BaseFileReader, column_names: Iterable[str]) -> Tuple[Iterable, int]:
-        logger.debug("Finding column row", column_names=column_names)
-        column_names_set = set(column_names)
-        for row_number, row in enumerate(file_reader.iter_rows(), start=1):
-            stripped_row = [item.strip(" ") if isinstance(item, str) else item for item in row]
+    """
+    Finds the first row holding every column name, among the first `max_scan_rows` rows or in row `header_row` only.
+    Rows without text cannot hold column names and are skipped before their cells are compared.
+    """
+
+    def __init__(
+        self,
+        max_scan_rows: int | None = DEFAULT_MAX_HEADER_SCAN_ROWS,
+        header_row: int | None = None,
+        max_candidates: int = DEFAULT_MAX_CANDIDATES,
+    ) -> None:
+        self.max_scan_rows = max_scan_rows
+        self.header_row = header_row
+        self.max_candidates = max_candidates
 
-            if column_names_set.issubset(set(stripped_row)):
+    def find(
+        self,
+        file_reader: BaseFileReader,
+        column_names: Iterable[str],
+        projection: ColumnProjection | None = None,
+    ) -> Tuple[list, Iterator[Sequence]]:
+        logger.debug("Finding column row", column_names=column_names, header_row=self.header_row)
+        column_names_set = set(column_names)
+        first_row = self.header_row or 1
+        max_rows = 1 if self.header_row is not None else self.max_scan_rows
+        # (matched column names, row number, missing column names) of the rows holding the most column names
+        candidates: list[tuple[int, int, list[str]]] = []
+        values_seen: set[str] = set()
+        rows = iter(file_reader.iter_rows(projection=projection))
+        for row_number, row in enumerate(rows, start=1):
+            if row_number < first_row:
+                continue
+            if max_rows is not None and row_number >= first_row + max_rows:
+                raise self._not_found(column_names_set, candidates, values_seen, max_rows=max_rows)
+            if not any(isinstance(item, str) for item in row):
+                continue
+            values = {item.strip(" ") for item in row if isinstance(item, str)}
+            if column_names_set.issubset(values):
+                stripped_row = [item.strip(" ") if isinstance(item, str) else item for item in row]
                 logger.debug("Found column row", row_number=row_number, column_names=stripped_row)
-                return stripped_row, row_number
-        logger.warning("No column row found", column_names=column_names)
-        raise ColumnRowNotFoundError
+                return stripped_row, rows
+            matched = len(column_names_set & values)
+            if matched:
+                candidates.append((matched, row_number, sorted(column_names_set - values)))
+                candidates = heapq.nlargest(self.max_candidates, candidates, key=lambda candidate: candidate[0])
+            if len(values_seen) < MAX_VALUES_SEEN:
+                values_seen.update(values)
+        raise self._not_found(column_names_set, candidates, values_seen)
+
+    def _not_found(
+        self,
+        column_names: set[str],
+        candidates: list[tuple[int, int, list[str]]],
+        values_seen: set[str],
+        max_rows: int | None = None,
+    ) -> ColumnRowNotFoundError:
+        """Return the error telling the rows which came closest to holding every column name"""
+        missing = candidates[0][2] if candidates else sorted(column_names)
+        suggestions = {
+            column_name: close_values
+            for column_name in missing
+            if (close_values := difflib.get_close_matches(column_name, values_seen - column_names, n=3))
+        }
+        logger.warning(
+            "No column row found",
+            column_names=column_names,
+            max_rows=max_rows,
+            header_row=self.header_row,
+            suggestions=suggestions,
+        )
+        return ColumnRowNotFoundError(
+            # The explicit header row is the only row searched, told instead of the number of rows searched
+            max_rows=max_rows if self.header_row is None else None,
+            header_row=self.header_row,
+            candidates=[{"row": row_number, "missing": missing} for _matched, row_number, missing in candidates],
+            suggestions=suggestions,
+        )
+
+
+class FixedColumnRowFinder(BaseColumnRowFinder):
+    """Returns a column row found beforehand, e.g. when the rows after it are read in ranges by several processes"""
+
+    def __init__(self, column_row: list) -> None:
+        self.column_row = column_row
+
+    def find(
+        self,
+        file_reader: BaseFileReader,
+        column_names: Iterable[str],
+        projection: ColumnProjection | None = None,
+    ) -> Tuple[list, Iterator[Sequence]]:
+        logger.debug("Using column row found beforehand", column_names=column_names)
+        return self.column_row, iter(file_reader.iter_rows(projection=projection))
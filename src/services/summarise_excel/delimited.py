@@ -0,0 +1,117 @@
+import codecs
+import csv
+import io
+import re
+
+from typing import IO, TYPE_CHECKING, Any, Iterator
+
+from services.summarise_excel.xlsx import parse_number
+
+
+if TYPE_CHECKING:
+    from services.summarise_excel.file_readers import ColumnProjection
+
+
+# Bytes at the start of the file the encoding and the delimiter are guessed from
+SAMPLE_SIZE = 1 << 16
+DELIMITERS = ",;\t|"
+DEFAULT_DELIMITER = ","
+BYTE_ORDER_MARKS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+# Tried in turn for files without a byte order mark, latin-1 decodes any byte
+FALLBACK_ENCODINGS = ["utf-8", "cp1252", "latin-1"]
+NUMBER_PATTERN = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+
+def sniff_encoding(sample: bytes) -> str:
+    for byte_order_mark, encoding in BYTE_ORDER_MARKS:
+        if sample.startswith(byte_order_mark):
+            return encoding
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            # Not final, as the sample may end in the middle of a character
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        except UnicodeDecodeError:
+            continue
+        return encoding
+    return FALLBACK_ENCODINGS[-1]
+
+
+def sniff_delimiter(sample: str) -> str:
+    # Only complete lines are looked at, the last line of the sample may be cut
+    lines = sample.splitlines()
+    if len(lines) > 1:
+        lines = lines[:-1]
+    try:
+        return csv.Sniffer().sniff("\n".join(lines), delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        # The delimiter found most in the first line, e.g. for single line files
+        first_line = lines[0] if lines else ""
+        counts = {delimiter: first_line.count(delimiter) for delimiter in DELIMITERS}
+        delimiter = max(counts, key=lambda delimiter: counts[delimiter])
+        return delimiter if counts[delimiter] else DEFAULT_DELIMITER
+
+
+def parse_cell(value: str) -> Any:
+    """Return numbers as the int and float cells of workbooks, empty cells as None and other cells as text"""
+    if not value:
+        return None
+    if NUMBER_PATTERN.fullmatch(value):
+        return parse_number(value)
+    return value
+
+
+class DelimitedRowParser:
+    """
+    Streams the rows of CSV and TSV files as value tuples like those of workbooks. The encoding and the delimiter
+    are guessed from the first bytes unless given, the file is then decoded in chunks and split by the C csv reader.
+    """
+
+    def __init__(self, delimiter: str | None = None, encoding: str | None = None) -> None:
+        self.delimiter = delimiter
+        self.encoding = encoding
+
+    def sniff(self, source: IO[bytes]) -> tuple[str, str]:
+        """Return the encoding and the delimiter of the file, leaving it at its start"""
+        sample = source.read(SAMPLE_SIZE)
+        source.seek(0)
+        encoding = self.encoding or sniff_encoding(sample)
+        delimiter = self.delimiter
+        if delimiter is None:
+            delimiter = sniff_delimiter(codecs.getincrementaldecoder(encoding)(errors="replace").decode(sample))
+        return encoding, delimiter
+
+    def iter_rows(
+        self, source: IO[bytes], min_row: int = 0, projection: "ColumnProjection | None" = None
+    ) -> Iterator[tuple]:
+        encoding, delimiter = self.sniff(source)
+        # Undecodable bytes of files with a wrongly guessed encoding are replaced rather than failing the whole file
+        text = io.TextIOWrapper(source, encoding=encoding, errors="replace", newline="")
+        try:
+            columns: frozenset[int] | None = None
+            sorted_columns: list[int] = []
+            for row_number, row in enumerate(csv.reader(text, delimiter=delimiter), start=1):
+                if row_number < min_row:
+                    continue
+                if projection is None or projection.columns is None:
+                    yield tuple(map(parse_cell, row))
+                    continue
+                # The projection can be updated while rows are read, e.g. once the column row is found
+                if projection.columns is not columns:
+                    columns = projection.columns
+                    sorted_columns = sorted(columns)
+                # Only the projected cells are parsed, the others are left empty
+                values: list[Any] = [None] * len(row)
+                for column in sorted_columns:
+                    if column >= len(values):
+                        break
+                    values[column] = parse_cell(row[column])
+                yield tuple(values)
+        finally:
+            # The source belongs to the caller, it is not closed with the wrapper
+            text.detach()
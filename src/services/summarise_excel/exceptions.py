@@ -1,3 +1,6 @@
+from typing import Any, Mapping, Sequence
+
+
 class BaseExcelSummaryError(Exception):
     """Base exception for summary generator"""
 
@@ -6,8 +9,34 @@ class BaseExcelSummaryError(Exception):
 
 
 class ColumnRowNotFoundError(BaseExcelSummaryError):
-    def __init__(self) -> None:
-        super().__init__("Column row cannot be found")
+    """
+    Raised when no row holds every column name. The rows holding the most of them and the cell values closest to the
+    missing names are told, so that the column names can be fixed.
+    """
+
+    def __init__(
+        self,
+        max_rows: int | None = None,
+        candidates: Sequence[dict[str, Any]] = (),
+        suggestions: Mapping[str, Sequence[str]] | None = None,
+        header_row: int | None = None,
+    ) -> None:
+        self.max_rows = max_rows
+        self.candidates = list(candidates)
+        self.suggestions = dict(suggestions or {})
+        self.header_row = header_row
+        if header_row is not None:
+            details = [f"Column row cannot be found in row {header_row}"]
+        elif max_rows is not None:
+            details = [f"Column row cannot be found in the first {max_rows} rows"]
+        else:
+            details = ["Column row cannot be found"]
+        if self.candidates:
+            best = self.candidates[0]
+            details.append(f"row {best['row']} lacks {', '.join(map(repr, best['missing']))}")
+        for column_name, close_values in self.suggestions.items():
+            details.append(f"{column_name!r} may be {' or '.join(map(repr, close_values))}")
+        super().__init__("; ".join(details))
 
 
 class CannotReadFileError(BaseExcelSummaryError):
@@ -15,3 +44,63 @@ class CannotReadFileError(BaseExcelSummaryError):
 
     def __init__(self) -> None:
         super().__init__("Cannot read file")
+
+
+class SheetNotFoundError(BaseExcelSummaryError):
+    def __init__(self, sheet: str) -> None:
+        super().__init__(f"Sheet {sheet!r} cannot be found")
+
+
+class JobNotFoundError(BaseExcelSummaryError):
+    def __init__(self) -> None:
+        super().__init__("Job cannot be found")
+
+
+class ProfileNotFoundError(BaseExcelSummaryError):
+    def __init__(self, profile_id: str) -> None:
+        super().__init__(f"Profile {profile_id!r} cannot be found")
+
+
+class JobQueueFullError(BaseExcelSummaryError):
+    """Raised when too many jobs are already waiting for a worker"""
+
+    def __init__(self) -> None:
+        super().__init__("Too many queued jobs, try again later")
+
+
+class SummaryCancelledError(BaseExcelSummaryError):
+    """Raised in a summary whose results are no longer awaited, e.g. by a client which disconnected"""
+
+    def __init__(self) -> None:
+        super().__init__("Summary was cancelled")
+
+
+class JobCancelledError(BaseExcelSummaryError):
+    """Raised in a worker to stop a job whose cancellation was requested"""
+
+    def __init__(self) -> None:
+        super().__init__("Job cancelled")
+
+
+class TooManyGroupsError(BaseExcelSummaryError):
+    """Raised when the group columns hold more distinct keys than groups can be kept"""
+
+    def __init__(self, max_groups: int) -> None:
+        super().__init__(f"Rows cannot be grouped in more than {max_groups} groups")
+
+
+class InvalidRowFilterError(BaseExcelSummaryError):
+    def __init__(self, reason: str) -> None:
+        super().__init__(f"Invalid filter: {reason}")
+
+
+class TooManyFilesError(BaseExcelSummaryError):
+    def __init__(self, max_files: int) -> None:
+        super().__init__(f"A batch cannot hold more than {max_files} files")
+
+
+class ArchiveTooLargeError(BaseExcelSummaryError):
+    """Raised when an archive of workbooks decompresses to more bytes than allowed"""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(f"Archive {name!r} is too large once decompressed")
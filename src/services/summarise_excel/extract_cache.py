@@ -0,0 +1,398 @@
+import array
+import datetime
+import itertools
+import json
+import os
+import shutil
+import tempfile
+
+from pathlib import Path
+from typing import Any, Generator, Iterator, Sequence
+
+import numpy as np
+import structlog
+
+from services.summarise_excel.file_readers import BaseFileReader, ColumnProjection
+
+
+logger = structlog.getLogger(__name__)
+
+# Bump when the layout of extracts changes, so that extracts written the old way are rebuilt
+EXTRACT_VERSION = 2
+META_FILE_NAME = "meta.json"
+ROW_LENGTHS_FILE_NAME = "row_lengths.bin"
+
+MIN_INT64 = -(2**63)
+MAX_INT64 = 2**63 - 1
+# Rows are rebuilt in blocks growing up to the maximum size, so that finding the column row stays cheap
+FIRST_BLOCK_SIZE = 64
+MAX_BLOCK_SIZE = 65536
+# Rows written to the extract at a time while it is built
+BLOCK_ROWS = 65536
+# Distinct text values of a column kept once, further ones are stored with every row holding them
+MAX_DISTINCT_TEXTS = 65536
+
+KIND_EMPTY = 0
+KIND_INT = 1
+KIND_FLOAT = 2
+KIND_BOOL = 3
+KIND_TEXT = 4
+KIND_OBJECT = 5
+
+
+def encode_object(value: Any) -> list:
+    """Encode a cell value which has no typed buffer as a JSON-serialisable [tag, payload] pair"""
+    if isinstance(value, int):
+        return ["int", str(value)]
+    if isinstance(value, datetime.datetime):
+        return ["datetime", value.isoformat()]
+    if isinstance(value, datetime.date):
+        return ["date", value.isoformat()]
+    if isinstance(value, datetime.time):
+        return ["time", value.isoformat()]
+    if isinstance(value, datetime.timedelta):
+        return ["timedelta", [value.days, value.seconds, value.microseconds]]
+    return ["text", str(value)]
+
+
+def decode_object(encoded: list) -> Any:
+    tag, payload = encoded
+    if tag == "int":
+        return int(payload)
+    if tag == "datetime":
+        return datetime.datetime.fromisoformat(payload)
+    if tag == "date":
+        return datetime.date.fromisoformat(payload)
+    if tag == "time":
+        return datetime.time.fromisoformat(payload)
+    if tag == "timedelta":
+        return datetime.timedelta(*payload)
+    return payload
+
+
+class ColumnBuilder:
+    """
+    Collects the typed values of one column while the sheet is scanned, and appends them to the files of the column
+    a block of rows at a time, so that the memory it holds does not grow with the sheet
+    """
+
+    def __init__(self, directory: Path, index: int, row_count: int = 0) -> None:
+        self.kinds_path = directory / f"column_{index}.kinds.bin"
+        self.values_path = directory / f"column_{index}.values.bin"
+        self.texts_path = directory / f"column_{index}.texts.jsonl"
+        self.objects_path = directory / f"column_{index}.objects.jsonl"
+        self.text_indexes: dict[str, int] = {}
+        self.text_count = 0
+        self.object_count = 0
+        self._start_block()
+        # The rows read before the column first appeared are empty
+        with self.kinds_path.open("wb") as kinds_file, self.values_path.open("wb") as values_file:
+            for start in range(0, row_count, BLOCK_ROWS):
+                block_rows = min(BLOCK_ROWS, row_count - start)
+                kinds_file.write(bytes(block_rows))
+                values_file.write(bytes(8 * block_rows))
+        self.texts_path.touch()
+        self.objects_path.touch()
+
+    def _start_block(self) -> None:
+        self.kinds = bytearray()
+        self.integers = array.array("q")
+        self.floats = array.array("d")
+        self.texts: list[str] = []
+        self.objects: list[list] = []
+
+    def append(self, value: Any) -> None:
+        kind = KIND_EMPTY
+        integer = 0
+        number = 0.0
+        if value is None:
+            pass
+        elif value is True or value is False:
+            kind, integer = KIND_BOOL, int(value)
+        elif isinstance(value, int) and MIN_INT64 <= value <= MAX_INT64:
+            kind, integer = KIND_INT, value
+        elif isinstance(value, float):
+            kind, number = KIND_FLOAT, value
+        elif isinstance(value, str):
+            # Text values repeat a lot, so every column keeps each of them once, up to a number of distinct values
+            index = self.text_indexes.get(value)
+            if index is None:
+                index = self.text_count
+                if index < MAX_DISTINCT_TEXTS:
+                    self.text_indexes[value] = index
+                self.texts.append(value)
+                self.text_count += 1
+            kind, integer = KIND_TEXT, index
+        else:
+            kind, integer = KIND_OBJECT, self.object_count
+            self.objects.append(encode_object(value))
+            self.object_count += 1
+        self.kinds.append(kind)
+        self.integers.append(integer)
+        self.floats.append(number)
+
+    def flush(self) -> None:
+        """Append the values of the block to the files of the column"""
+        kinds = np.frombuffer(self.kinds, dtype=np.uint8)
+        # Integers and the bits of floats share one buffer, the kind tells how to read every value
+        values = np.where(
+            kinds == KIND_FLOAT,
+            np.frombuffer(self.floats, dtype=np.float64).view(np.int64),
+            np.frombuffer(self.integers, dtype=np.int64),
+        )
+        with self.kinds_path.open("ab") as file:
+            file.write(self.kinds)
+        with self.values_path.open("ab") as file:
+            file.write(values.astype(np.int64).tobytes())
+        if self.texts:
+            with self.texts_path.open("a") as file:
+                file.writelines(json.dumps(text) + "\n" for text in self.texts)
+        if self.objects:
+            with self.objects_path.open("a") as file:
+                file.writelines(json.dumps(encoded) + "\n" for encoded in self.objects)
+        self._start_block()
+
+
+class ExtractWriter:
+    """Writes the rows of a sheet to the directory of an extract column by column, a block of rows at a time"""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.columns: list[ColumnBuilder] = []
+        self.row_lengths = array.array("I")
+        self.row_count = 0
+        (directory / ROW_LENGTHS_FILE_NAME).touch()
+
+    def append(self, row: Sequence) -> None:
+        columns = self.columns
+        while len(columns) < len(row):
+            columns.append(ColumnBuilder(directory=self.directory, index=len(columns), row_count=self.row_count))
+        for column, value in zip(columns, row):
+            column.append(value)
+        for column in columns[len(row) :]:
+            column.append(None)
+        self.row_lengths.append(len(row))
+        self.row_count += 1
+        if len(self.row_lengths) >= BLOCK_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        for column in self.columns:
+            column.flush()
+        with (self.directory / ROW_LENGTHS_FILE_NAME).open("ab") as file:
+            file.write(self.row_lengths.tobytes())
+        self.row_lengths = array.array("I")
+
+    def finish(self) -> None:
+        self.flush()
+        with (self.directory / META_FILE_NAME).open("w") as file:
+            json.dump(
+                {"version": EXTRACT_VERSION, "row_count": self.row_count, "column_count": len(self.columns)}, file
+            )
+
+
+def load_buffer(path: Path, dtype: type, row_count: int) -> np.ndarray:
+    """Memory-map a buffer of the extract, empty files cannot be mapped"""
+    if not row_count:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(row_count,))
+
+
+def load_lines(path: Path) -> list:
+    with path.open() as file:
+        return [json.loads(line) for line in file]
+
+
+class ExtractColumn:
+    """Typed buffers of one column, memory-mapped from the extract"""
+
+    def __init__(self, directory: Path, index: int, row_count: int) -> None:
+        self.kinds = load_buffer(directory / f"column_{index}.kinds.bin", dtype=np.uint8, row_count=row_count)
+        self.values = load_buffer(directory / f"column_{index}.values.bin", dtype=np.int64, row_count=row_count)
+        self.texts: list[str] = load_lines(directory / f"column_{index}.texts.jsonl")
+        self.objects = [decode_object(encoded) for encoded in load_lines(directory / f"column_{index}.objects.jsonl")]
+
+    def values_between(self, start: int, stop: int) -> list:
+        kinds = np.asarray(self.kinds[start:stop])
+        values = np.asarray(self.values[start:stop])
+        result = np.full(stop - start, None, dtype=object)
+        for kind in np.unique(kinds).tolist():
+            if kind == KIND_EMPTY:
+                continue
+            indexes = np.flatnonzero(kinds == kind)
+            selected = values[indexes]
+            if kind == KIND_INT:
+                result[indexes] = selected.tolist()
+            elif kind == KIND_FLOAT:
+                result[indexes] = selected.view(np.float64).tolist()
+            elif kind == KIND_BOOL:
+                result[indexes] = (selected != 0).tolist()
+            elif kind == KIND_TEXT:
+                texts = self.texts
+                result[indexes] = [texts[text_index] for text_index in selected.tolist()]
+            else:
+                objects = self.objects
+                result[indexes] = [objects[object_index] for object_index in selected.tolist()]
+        return result.tolist()
+
+
+class ColumnarExtract:
+    """Every row of a sheet stored column by column, so that only the needed columns are ever read back"""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        with (directory / META_FILE_NAME).open() as file:
+            meta = json.load(file)
+        self.version: int | None = meta.get("version")
+        self.row_count: int = meta["row_count"]
+        self.column_count: int = meta["column_count"]
+        self.row_lengths = load_buffer(directory / ROW_LENGTHS_FILE_NAME, dtype=np.uint32, row_count=self.row_count)
+        self._columns: dict[int, ExtractColumn] = {}
+
+    def column(self, index: int) -> ExtractColumn:
+        if index not in self._columns:
+            self._columns[index] = ExtractColumn(directory=self.directory, index=index, row_count=self.row_count)
+        return self._columns[index]
+
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator:
+        # Row numbers are 1-based, as in the file readers
+        start = max(min_row - 1, 0)
+        block_size = FIRST_BLOCK_SIZE
+        while start < self.row_count:
+            stop = min(start + block_size, self.row_count)
+            # The projection is read for every block, as it may be updated while the rows are being iterated
+            width = self.column_count
+            if projection is not None and projection.max_column is not None:
+                width = min(width, projection.max_column + 1)
+            empty = [None] * (stop - start)
+            columns = [
+                self.column(index).values_between(start, stop)
+                if projection is None or projection.columns is None or index in projection.columns
+                else empty
+                for index in range(width)
+            ]
+            lengths = np.asarray(self.row_lengths[start:stop]).tolist()
+            rows = zip(*columns) if columns else (() for _ in range(stop - start))
+            for row, length in zip(rows, lengths):
+                yield row if length >= width else row[:length]
+            start = stop
+            block_size = min(block_size * 2, MAX_BLOCK_SIZE)
+
+
+class ColumnarExtractCache:
+    """
+    Keeps columnar extracts of scanned sheets in a directory, keyed by the content hash of the file.
+    Extracts used least recently are removed once their total size exceeds the disk budget.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int = 1 << 30) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key
+
+    def get(self, key: str) -> ColumnarExtract | None:
+        path = self._path(key)
+        try:
+            extract = ColumnarExtract(directory=path)
+        except (OSError, ValueError, KeyError):
+            return None
+        if extract.version != EXTRACT_VERSION:
+            return None
+        # The modification time of the metadata tells which extracts were used least recently
+        try:
+            os.utime(path / META_FILE_NAME)
+        except OSError:
+            pass
+        return extract
+
+    def build(self, key: str, file_reader: BaseFileReader) -> ColumnarExtract | None:
+        """Scan every row of the file into a new extract, None when it cannot be stored"""
+        for _row in self.iter_rows_building(key=key, file_reader=file_reader):
+            pass
+        return self.get(key)
+
+    def iter_rows_building(self, key: str, file_reader: BaseFileReader) -> Iterator[tuple]:
+        """
+        Yield every row of the file while it is written to a new extract, so that the rows are summarised as they are
+        read rather than once the whole sheet is scanned. The extract is only stored once every row is read, it is
+        dropped when the rows are not read to the end, e.g. when the column row cannot be found.
+        """
+        writer: ExtractWriter | None = None
+        temporary_path: Path | None = None
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temporary_path = Path(tempfile.mkdtemp(dir=self.directory, prefix=f".{key}-"))
+            writer = ExtractWriter(directory=temporary_path)
+        except OSError:
+            logger.warning("Cannot store columnar extract", key=key, exc_info=True)
+        stored = False
+        try:
+            for row in file_reader.iter_rows():
+                if writer is not None:
+                    try:
+                        writer.append(row)
+                    except OSError:
+                        logger.warning("Cannot store columnar extract", key=key, exc_info=True)
+                        writer = None
+                yield row
+            if writer is not None and temporary_path is not None:
+                stored = self._store(key=key, writer=writer, temporary_path=temporary_path)
+        finally:
+            if temporary_path is not None and not stored:
+                shutil.rmtree(temporary_path, ignore_errors=True)
+        if stored:
+            logger.debug("Stored columnar extract", key=key)
+            self.evict(keep=key)
+
+    def _store(self, key: str, writer: ExtractWriter, temporary_path: Path) -> bool:
+        """Move the written extract in place, returning whether its directory is now the one of the key"""
+        try:
+            writer.finish()
+            os.rename(temporary_path, self._path(key))
+        except OSError:
+            # Another process may have just stored the same extract
+            logger.debug("Columnar extract not stored", key=key, exc_info=True)
+            return False
+        return True
+
+    def evict(self, keep: str | None = None) -> None:
+        """Remove the extracts used least recently until the rest fits in the disk budget"""
+        extracts = []
+        for path in self.directory.iterdir():
+            if not path.is_dir() or path.name.startswith("."):
+                continue
+            try:
+                size = sum(file.stat().st_size for file in path.iterdir())
+                used_at = (path / META_FILE_NAME).stat().st_mtime
+            except OSError:
+                continue
+            extracts.append((used_at, size, path))
+        total_size = sum(size for _, size, _ in extracts)
+        for _, size, path in sorted(extracts, key=lambda extract: extract[0]):
+            if total_size <= self.max_bytes:
+                break
+            if path.name == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+            logger.debug("Evicted columnar extract", key=path.name, size=size)
+
+
+class ExtractFileReader(BaseFileReader):
+    """Reads rows from the columnar extract of the file, building it with the source reader on the first scan"""
+
+    def __init__(self, extract_cache: ColumnarExtractCache, key: str, source: BaseFileReader) -> None:
+        self.extract_cache = extract_cache
+        self.key = key
+        self.source = source
+
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator:
+        extract = self.extract_cache.get(self.key)
+        if extract is not None:
+            yield from extract.iter_rows(min_row=min_row, projection=projection)
+            return
+        # The extract needs every column of every row, the rows before `min_row` are read but not yielded
+        rows = self.extract_cache.iter_rows_building(key=self.key, file_reader=self.source)
+        yield from itertools.islice(rows, max(min_row - 1, 0), None)
@@ -1,30 +1,363 @@
 import abc
+import itertools
+import random
+import zipfile
 
-from typing import Generator
+from typing import IO, Callable, Generator, Iterable, Iterator
 
 from openpyxl import load_workbook
 
-from services.summarise_excel.exceptions import CannotReadFileError
+from services.summarise_excel.delimited import DelimitedRowParser
+from services.summarise_excel.exceptions import CannotReadFileError, SheetNotFoundError
+from services.summarise_excel.ods import MIMETYPE_PART, ODS_MIMETYPE, OdsDocument
+from services.summarise_excel.xlsx import CHUNK_SIZE, UnnumberedRowError, XlsxWorkbook, read_sheet_layout
+
+
+FILE_FORMAT_XLSX = "xlsx"
+FILE_FORMAT_ODS = "ods"
+FILE_FORMAT_XLS = "xls"
+FILE_FORMAT_CSV = "csv"
+
+ZIP_MAGIC = b"PK\x03\x04"
+OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+# Offset of the name of the first member of a zip, the mimetype member of OpenDocument packages
+ZIP_FIRST_NAME_OFFSET = 30
+# Single sheet files such as CSV are read as a workbook with one sheet of this name
+SINGLE_SHEET_NAME = "Sheet1"
+
+
+def sniff_file_format(file: str | IO[bytes]) -> str:
+    """Tell the format of a file from its first bytes rather than its name, files which are no known package are CSV"""
+    mimetype_start = ZIP_FIRST_NAME_OFFSET + len(MIMETYPE_PART)
+    size = mimetype_start + len(ODS_MIMETYPE)
+    try:
+        if isinstance(file, str):
+            with open(file, "rb") as source:
+                head = source.read(size)
+        else:
+            head = file.read(size)
+            file.seek(0)
+    except Exception:
+        raise CannotReadFileError
+    if head.startswith(ZIP_MAGIC):
+        is_ods = head[ZIP_FIRST_NAME_OFFSET:mimetype_start] == MIMETYPE_PART.encode() and head.endswith(ODS_MIMETYPE)
+        return FILE_FORMAT_ODS if is_ods else FILE_FORMAT_XLSX
+    if head.startswith(OLE2_MAGIC):
+        return FILE_FORMAT_XLS
+    return FILE_FORMAT_CSV
+
+
+class ColumnProjection:
+    """
+    Column indexes the consumer of a row iterator needs. It can be updated while the rows are being iterated,
+    e.g. once the column row is found. Readers keep column positions, but may leave cells outside the projection
+    empty and cut rows after the maximum needed column.
+    """
+
+    def __init__(self, columns: Iterable[int] | None = None) -> None:
+        self.columns: frozenset[int] | None = None
+        self.max_column: int | None = None
+        if columns is not None:
+            self.update(columns)
+
+    def update(self, columns: Iterable[int]) -> None:
+        self.columns = frozenset(columns)
+        self.max_column = max(self.columns, default=-1)
 
 
 class BaseFileReader(abc.ABC):
     @abc.abstractmethod
-    def iter_rows(self, min_row: int = 0) -> Generator: ...
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator: ...
+
+    def row_count(self) -> int | None:
+        """Return the number of rows of the sheet when the file tells it without reading them, None otherwise"""
+        return None
+
+    def iter_rows_stride(
+        self, stride: int, start: int = 0, min_row: int = 0, projection: ColumnProjection | None = None
+    ) -> Iterator:
+        """Yield every `stride`-th row from `min_row` on, the `start`-th one first"""
+        return itertools.islice(self.iter_rows(min_row=min_row, projection=projection), start, None, stride)
 
 
 class ExcelFileReader(BaseFileReader):
-    def __init__(self, file: str):
+    def __init__(self, file: str | IO[bytes], sheet: str | None = None):
         self.file = file
+        self.sheet = sheet
+
+    def sheet_names(self) -> list[str]:
+        try:
+            workbook = load_workbook(self.file, read_only=True)
+        except Exception:
+            raise CannotReadFileError
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
 
-    def iter_rows(self, min_row: int = 0) -> Generator:
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator:
         workbook = load_workbook(self.file, read_only=True)
+        if self.sheet is not None and self.sheet not in workbook.sheetnames:
+            workbook.close()
+            raise SheetNotFoundError(self.sheet)
         try:
-            worksheet = workbook.active
+            worksheet = workbook[self.sheet] if self.sheet is not None else workbook.active
 
             if worksheet is not None:
                 for row in worksheet.iter_rows(values_only=True, min_row=min_row):
+                    # openpyxl parses whole rows anyway, so only cells after the maximum needed column are cut
+                    if projection is not None and projection.max_column is not None:
+                        row = row[: projection.max_column + 1]
                     yield row
         except Exception:
             raise CannotReadFileError
         finally:
             workbook.close()
+
+
+class XlsxFileReader(BaseFileReader):
+    """Streams a sheet, the active one by default, straight from the xlsx package, without openpyxl cell objects"""
+
+    def __init__(self, file: str | IO[bytes], sheet: str | None = None):
+        self.file = file
+        self.sheet = sheet
+
+    def sheet_names(self) -> list[str]:
+        try:
+            with zipfile.ZipFile(self.file) as archive:
+                return list(XlsxWorkbook(archive=archive).sheet_paths)
+        except Exception:
+            raise CannotReadFileError
+
+    def row_count(self) -> int | None:
+        """Return the last row of the dimension of the sheet, which writers may leave out or get wrong"""
+        try:
+            with zipfile.ZipFile(self.file) as archive:
+                workbook = XlsxWorkbook(archive=archive)
+                sheet_path = workbook.sheet_paths[self.sheet] if self.sheet is not None else workbook.active_sheet_path
+                with archive.open(sheet_path) as source:
+                    layout, _ = read_sheet_layout(source)
+        except Exception:
+            return None
+        return layout.max_row
+
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator:
+        try:
+            archive = zipfile.ZipFile(self.file)
+            workbook = XlsxWorkbook(archive=archive)
+        except Exception:
+            raise CannotReadFileError
+        if self.sheet is not None and self.sheet not in workbook.sheet_paths:
+            archive.close()
+            raise SheetNotFoundError(self.sheet)
+        sheet_path = workbook.sheet_paths[self.sheet] if self.sheet is not None else workbook.active_sheet_path
+        try:
+            row_parser = workbook.row_parser()
+            with archive.open(sheet_path) as source:
+                yield from row_parser.iter_rows(source=source, min_row=min_row, projection=projection)
+        except Exception:
+            raise CannotReadFileError
+        finally:
+            archive.close()
+
+    def iter_rows_stride(
+        self, stride: int, start: int = 0, min_row: int = 0, projection: ColumnProjection | None = None
+    ) -> Generator:
+        """Yield every `stride`-th row, skipping the others in the sheet XML without parsing them"""
+        try:
+            archive = zipfile.ZipFile(self.file)
+            workbook = XlsxWorkbook(archive=archive)
+        except Exception:
+            raise CannotReadFileError
+        if self.sheet is not None and self.sheet not in workbook.sheet_paths:
+            archive.close()
+            raise SheetNotFoundError(self.sheet)
+        sheet_path = workbook.sheet_paths[self.sheet] if self.sheet is not None else workbook.active_sheet_path
+        try:
+            row_parser = workbook.row_parser()
+            with archive.open(sheet_path) as source:
+                yield from row_parser.iter_rows_stride(
+                    source=source, stride=stride, start=start, min_row=min_row, projection=projection
+                )
+        except Exception:
+            raise CannotReadFileError
+        finally:
+            archive.close()
+
+
+class CsvFileReader(BaseFileReader):
+    """
+    Streams a CSV or TSV file as a workbook with a single sheet. The delimiter and the encoding are guessed
+    unless given. Numbers are read as the int and float cells of workbooks, other cells as text.
+    """
+
+    def __init__(
+        self,
+        file: str | IO[bytes],
+        sheet: str | None = None,
+        delimiter: str | None = None,
+        encoding: str | None = None,
+    ) -> None:
+        self.file = file
+        self.sheet = sheet
+        self.row_parser = DelimitedRowParser(delimiter=delimiter, encoding=encoding)
+
+    def sheet_names(self) -> list[str]:
+        return [SINGLE_SHEET_NAME]
+
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator:
+        if self.sheet is not None and self.sheet != SINGLE_SHEET_NAME:
+            raise SheetNotFoundError(self.sheet)
+        try:
+            if isinstance(self.file, str):
+                with open(self.file, "rb", buffering=CHUNK_SIZE) as source:
+                    yield from self.row_parser.iter_rows(source=source, min_row=min_row, projection=projection)
+            else:
+                yield from self.row_parser.iter_rows(source=self.file, min_row=min_row, projection=projection)
+        except Exception:
+            raise CannotReadFileError
+
+
+class OdsFileReader(BaseFileReader):
+    """Streams a sheet, the active one by default, of an OpenDocument spreadsheet"""
+
+    def __init__(self, file: str | IO[bytes], sheet: str | None = None):
+        self.file = file
+        self.sheet = sheet
+
+    def sheet_names(self) -> list[str]:
+        try:
+            with zipfile.ZipFile(self.file) as archive:
+                return OdsDocument(archive=archive).sheet_names()
+        except Exception:
+            raise CannotReadFileError
+
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator:
+        try:
+            archive = zipfile.ZipFile(self.file)
+            document = OdsDocument(archive=archive)
+            sheet = self.sheet if self.sheet is not None else document.active_sheet_name()
+            sheet_names = document.sheet_names()
+        except Exception:
+            raise CannotReadFileError
+        if self.sheet is not None and self.sheet not in sheet_names:
+            archive.close()
+            raise SheetNotFoundError(self.sheet)
+        if sheet not in sheet_names:
+            # The active sheet of the settings is stale, the first sheet is read instead
+            sheet = None
+        try:
+            yield from document.iter_rows(sheet=sheet, min_row=min_row, projection=projection)
+        except Exception:
+            raise CannotReadFileError
+        finally:
+            archive.close()
+
+
+class XlsxRowRangeFileReader(BaseFileReader):
+    """
+    Streams the rows of a byte range of a worksheet part which was decompressed to `sheet_part_path` beforehand,
+    so that ranges of one sheet can be read in parallel. Rows missing from the sheet are not yielded.
+    """
+
+    def __init__(self, file: str | IO[bytes], sheet_part_path: str, start: int, end: int, first_row: int = 0) -> None:
+        self.file = file
+        self.sheet_part_path = sheet_part_path
+        self.start = start
+        self.end = end
+        self.first_row = first_row
+
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator:
+        try:
+            with zipfile.ZipFile(self.file) as archive:
+                row_parser = XlsxWorkbook(archive=archive).row_parser()
+            with open(self.sheet_part_path, "rb") as source:
+                layout, _ = read_sheet_layout(source)
+                yield from row_parser.iter_rows_between(
+                    source=source,
+                    layout=layout,
+                    start=self.start,
+                    end=self.end,
+                    min_row=max(min_row, self.first_row),
+                    projection=projection,
+                )
+        except UnnumberedRowError:
+            raise
+        except Exception:
+            raise CannotReadFileError
+
+
+class CountingFileReader(BaseFileReader):
+    """Counts the rows read so far from another file reader"""
+
+    def __init__(self, file_reader: BaseFileReader) -> None:
+        self.file_reader = file_reader
+        self.rows_read = 0
+
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator:
+        self.rows_read = 0
+        for row in self.file_reader.iter_rows(min_row=min_row, projection=projection):
+            self.rows_read += 1
+            yield row
+
+
+class ProgressFileReader(BaseFileReader):
+    """Reports the number of rows read so far to a callback every `interval` rows and once all rows are read"""
+
+    def __init__(self, file_reader: BaseFileReader, callback: Callable[[int], None], interval: int = 10000) -> None:
+        self.file_reader = file_reader
+        self.callback = callback
+        self.interval = interval
+
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator:
+        rows_read = 0
+        for row in self.file_reader.iter_rows(min_row=min_row, projection=projection):
+            yield row
+            rows_read += 1
+            if rows_read % self.interval == 0:
+                self.callback(rows_read)
+        self.callback(rows_read)
+
+
+class StrideFileReader(BaseFileReader):
+    """Yields every `stride`-th row of another file reader from `first_row` on, the `start`-th one first"""
+
+    def __init__(self, file_reader: BaseFileReader, stride: int, start: int = 0, first_row: int = 0) -> None:
+        self.file_reader = file_reader
+        self.stride = stride
+        self.start = start
+        self.first_row = first_row
+
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator:
+        yield from self.file_reader.iter_rows_stride(
+            stride=self.stride, start=self.start, min_row=max(min_row, self.first_row), projection=projection
+        )
+
+
+class ReservoirFileReader(BaseFileReader):
+    """
+    Yields a uniform random sample of `size` rows of another file reader from `first_row` on, kept with
+    reservoir sampling while every row is read and counted, so the number of rows need not be known beforehand
+    """
+
+    def __init__(
+        self, file_reader: BaseFileReader, size: int, first_row: int = 0, generator: random.Random | None = None
+    ) -> None:
+        self.file_reader = file_reader
+        self.size = size
+        self.first_row = first_row
+        self.generator = generator or random.Random()
+        self.rows_read = 0
+
+    def iter_rows(self, min_row: int = 0, projection: ColumnProjection | None = None) -> Generator:
+        reservoir: list = []
+        self.rows_read = 0
+        for row in self.file_reader.iter_rows(min_row=max(min_row, self.first_row), projection=projection):
+            if self.rows_read < self.size:
+                reservoir.append(row)
+            else:
+                index = self.generator.randrange(self.rows_read + 1)
+                if index < self.size:
+                    reservoir[index] = row
+            self.rows_read += 1
+        yield from reservoir
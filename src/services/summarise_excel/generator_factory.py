@@ -0,0 +1,176 @@
+import hashlib
+
+from typing import IO, Callable, Sequence
+
+from services.summarise_excel.column_row_finder import (
+    DEFAULT_MAX_HEADER_SCAN_ROWS,
+    BaseColumnRowFinder,
+    ExcelColumnRowFinder,
+)
+from services.summarise_excel.exceptions import CannotReadFileError
+from services.summarise_excel.extract_cache import ColumnarExtractCache, ExtractFileReader
+from services.summarise_excel.file_readers import (
+    FILE_FORMAT_CSV,
+    FILE_FORMAT_ODS,
+    FILE_FORMAT_XLSX,
+    BaseFileReader,
+    CsvFileReader,
+    ExcelFileReader,
+    OdsFileReader,
+    ProgressFileReader,
+    XlsxFileReader,
+    sniff_file_format,
+)
+from services.summarise_excel.numpy_summary_generator import NumpySummaryGenerator
+from services.summarise_excel.row_converter import ExcelRowConverter
+from services.summarise_excel.row_filters import RowFilter
+from services.summarise_excel.row_processors import ExcelRowProcessor
+from services.summarise_excel.sketches import DEFAULT_DISTINCT_SKETCH_PRECISION, DEFAULT_QUANTILE_SKETCH_SIZE
+from services.summarise_excel.summary_generator import (
+    DEFAULT_AGGREGATES,
+    DEFAULT_MAX_GROUPS,
+    DEFAULT_PROGRESS_HOOK_INTERVAL,
+    BaseSummaryGenerator,
+    ExcelSummaryGenerator,
+    ProgressHook,
+)
+from services.summarise_excel.value_processors import CachedValueProcessor
+
+
+SUMMARY_ENGINE_DECIMAL = "decimal"
+SUMMARY_ENGINE_NUMPY = "numpy"
+SUMMARY_ENGINES = [SUMMARY_ENGINE_DECIMAL, SUMMARY_ENGINE_NUMPY]
+
+FILE_READER_OPENPYXL = "openpyxl"
+FILE_READER_XLSX = "xlsx"
+FILE_READERS: dict[str, type[ExcelFileReader] | type[XlsxFileReader]] = {
+    FILE_READER_OPENPYXL: ExcelFileReader,
+    FILE_READER_XLSX: XlsxFileReader,
+}
+
+
+SheetFileReader = ExcelFileReader | XlsxFileReader | CsvFileReader | OdsFileReader
+
+
+def open_file_reader(
+    file: str | IO[bytes], file_reader: str = FILE_READER_XLSX, sheet: str | None = None
+) -> SheetFileReader:
+    """Return the reader of the file format told by its first bytes, `file_reader` picks the one of xlsx files"""
+    file_format = sniff_file_format(file)
+    if file_format == FILE_FORMAT_XLSX:
+        return FILE_READERS[file_reader](file=file, sheet=sheet)
+    if file_format == FILE_FORMAT_ODS:
+        return OdsFileReader(file=file, sheet=sheet)
+    if file_format == FILE_FORMAT_CSV:
+        return CsvFileReader(file=file, sheet=sheet)
+    # Legacy binary workbooks are not supported
+    raise CannotReadFileError
+
+
+def build_file_reader(
+    file: str | IO[bytes],
+    file_reader: str = FILE_READER_XLSX,
+    sheet: str | None = None,
+    extract_cache: ColumnarExtractCache | None = None,
+    file_hash: str | None = None,
+) -> BaseFileReader:
+    source = open_file_reader(file=file, file_reader=file_reader, sheet=sheet)
+    if extract_cache is None or file_hash is None:
+        return source
+    key = file_hash if sheet is None else hashlib.sha256(f"{file_hash}:{sheet}".encode()).hexdigest()
+    return ExtractFileReader(extract_cache=extract_cache, key=key, source=source)
+
+
+def build_summary_generator(
+    file: str | IO[bytes],
+    engine: str = SUMMARY_ENGINE_DECIMAL,
+    file_reader: str = FILE_READER_XLSX,
+    sheet: str | None = None,
+    supported_currencies: list[str] | None = None,
+    extract_cache: ColumnarExtractCache | None = None,
+    file_hash: str | None = None,
+    progress_callback: Callable[[int], None] | None = None,
+    progress_interval: int = 10000,
+    aggregates: Sequence[str] = DEFAULT_AGGREGATES,
+    quantile_sketch_size: int = DEFAULT_QUANTILE_SKETCH_SIZE,
+    distinct_sketch_precision: int = DEFAULT_DISTINCT_SKETCH_PRECISION,
+    group_by: Sequence[str] = (),
+    max_groups: int = DEFAULT_MAX_GROUPS,
+    top_groups: int | None = None,
+    row_filter: str | None = None,
+    header_row: int | None = None,
+    max_header_scan_rows: int | None = DEFAULT_MAX_HEADER_SCAN_ROWS,
+    column_row_finder: BaseColumnRowFinder | None = None,
+    progress_hook: ProgressHook | None = None,
+    progress_hook_interval: int = DEFAULT_PROGRESS_HOOK_INTERVAL,
+) -> BaseSummaryGenerator:
+    reader = build_file_reader(
+        file=file, file_reader=file_reader, sheet=sheet, extract_cache=extract_cache, file_hash=file_hash
+    )
+    if progress_callback is not None:
+        reader = ProgressFileReader(file_reader=reader, callback=progress_callback, interval=progress_interval)
+    return build_reader_summary_generator(
+        file_reader=reader,
+        engine=engine,
+        supported_currencies=supported_currencies,
+        aggregates=aggregates,
+        quantile_sketch_size=quantile_sketch_size,
+        distinct_sketch_precision=distinct_sketch_precision,
+        group_by=group_by,
+        max_groups=max_groups,
+        top_groups=top_groups,
+        row_filter=RowFilter(row_filter) if row_filter else None,
+        column_row_finder=column_row_finder
+        or ExcelColumnRowFinder(max_scan_rows=max_header_scan_rows, header_row=header_row),
+        progress_hook=progress_hook,
+        progress_hook_interval=progress_hook_interval,
+    )
+
+
+def build_reader_summary_generator(
+    file_reader: BaseFileReader,
+    engine: str = SUMMARY_ENGINE_DECIMAL,
+    supported_currencies: list[str] | None = None,
+    column_row_finder: BaseColumnRowFinder | None = None,
+    aggregates: Sequence[str] = DEFAULT_AGGREGATES,
+    quantile_sketch_size: int = DEFAULT_QUANTILE_SKETCH_SIZE,
+    distinct_sketch_precision: int = DEFAULT_DISTINCT_SKETCH_PRECISION,
+    group_by: Sequence[str] = (),
+    max_groups: int = DEFAULT_MAX_GROUPS,
+    top_groups: int | None = None,
+    row_filter: RowFilter | None = None,
+    progress_hook: ProgressHook | None = None,
+    progress_hook_interval: int = DEFAULT_PROGRESS_HOOK_INTERVAL,
+) -> BaseSummaryGenerator:
+    value_processor = CachedValueProcessor(supported_currencies=supported_currencies)
+    column_row_finder = column_row_finder or ExcelColumnRowFinder()
+    if engine == SUMMARY_ENGINE_NUMPY:
+        return NumpySummaryGenerator(
+            value_processor=value_processor,
+            file_reader=file_reader,
+            column_row_finder=column_row_finder,
+            aggregates=aggregates,
+            quantile_sketch_size=quantile_sketch_size,
+            distinct_sketch_precision=distinct_sketch_precision,
+            group_by=group_by,
+            max_groups=max_groups,
+            top_groups=top_groups,
+            row_filter=row_filter,
+            progress_hook=progress_hook,
+            progress_hook_interval=progress_hook_interval,
+        )
+    return ExcelSummaryGenerator(
+        row_processor=ExcelRowProcessor(value_processor=value_processor),
+        row_converter=ExcelRowConverter(),
+        file_reader=file_reader,
+        column_row_finder=column_row_finder,
+        aggregates=aggregates,
+        quantile_sketch_size=quantile_sketch_size,
+        distinct_sketch_precision=distinct_sketch_precision,
+        group_by=group_by,
+        max_groups=max_groups,
+        top_groups=top_groups,
+        row_filter=row_filter,
+        progress_hook=progress_hook,
+        progress_hook_interval=progress_hook_interval,
+    )
@@ -0,0 +1,297 @@
+import concurrent.futures
+import contextlib
+import datetime
+import fcntl
+import functools
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence
+
+import structlog
+
+from services.summarise_excel.exceptions import (
+    BaseExcelSummaryError,
+    JobCancelledError,
+    JobNotFoundError,
+    JobQueueFullError,
+)
+from services.summarise_excel.generator_factory import build_summary_generator
+from services.summarise_excel.sheet_summaries import summarise_sheets
+from services.summarise_excel.worker_pool import WORKER_START_METHOD
+
+
+logger = structlog.getLogger(__name__)
+
+JOB_FILE_NAME = "job.json"
+CANCEL_FILE_NAME = "cancel"
+UPLOAD_FILE_NAME = "upload"
+LOCK_FILE_NAME = "lock"
+PROGRESS_INTERVAL = 10000
+# Jobs not updated for this many seconds are removed with their uploads and results
+DEFAULT_RETENTION_SECONDS = 24 * 60 * 60
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_SUCCEEDED = "succeeded"
+JOB_STATUS_FAILED = "failed"
+JOB_STATUS_CANCELLED = "cancelled"
+JOB_STATUSES = [JOB_STATUS_QUEUED, JOB_STATUS_RUNNING, JOB_STATUS_SUCCEEDED, JOB_STATUS_FAILED, JOB_STATUS_CANCELLED]
+FINISHED_JOB_STATUSES = frozenset([JOB_STATUS_SUCCEEDED, JOB_STATUS_FAILED, JOB_STATUS_CANCELLED])
+
+
+def now() -> str:
+    return datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
+
+
+class JobStore:
+    """
+    Keeps every job in its own directory: the uploaded file, the job state as JSON and a cancel flag file.
+    The state is shared through the file system, so the web and the worker processes only need the directory.
+    Jobs not updated for `retention_seconds` are removed whenever a job is created.
+    """
+
+    def __init__(self, directory: str | Path, retention_seconds: float = DEFAULT_RETENTION_SECONDS) -> None:
+        self.directory = Path(directory)
+        self.retention_seconds = retention_seconds
+
+    def _path(self, job_id: str) -> Path:
+        return self.directory / job_id
+
+    def upload_path(self, job_id: str) -> Path:
+        return self._path(job_id) / UPLOAD_FILE_NAME
+
+    def create(
+        self,
+        file_name: str,
+        chunks: Iterable[bytes],
+        column_names: Sequence[str],
+        options: dict[str, Any],
+        sheets: Sequence[str] | None = None,
+    ) -> dict[str, Any]:
+        self.remove_expired()
+        job_id = str(uuid.uuid4())
+        path = self._path(job_id)
+        path.mkdir(parents=True)
+        with self.upload_path(job_id).open("wb") as upload:
+            for chunk in chunks:
+                upload.write(chunk)
+        job = {
+            "id": job_id,
+            "status": JOB_STATUS_QUEUED,
+            "file": file_name,
+            "column_names": list(column_names),
+            "requested_sheets": list(sheets) if sheets is not None else None,
+            "sheets": None,
+            "groups": None,
+            "options": options,
+            "rows_scanned": 0,
+            "summary": None,
+            "detail": None,
+            "created_at": now(),
+            "updated_at": now(),
+        }
+        self.save(job)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict[str, Any]:
+        try:
+            with (self._path(job_id) / JOB_FILE_NAME).open() as file:
+                job = json.load(file)
+        except (OSError, ValueError):
+            raise JobNotFoundError
+        job["cancel_requested"] = self.is_cancel_requested(job_id)
+        return job
+
+    def save(self, job: dict[str, Any]) -> None:
+        path = self._path(job["id"])
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=path, suffix=".tmp")
+        with os.fdopen(file_descriptor, "w") as file:
+            json.dump(job, file)
+        os.replace(temporary_path, path / JOB_FILE_NAME)
+
+    @contextlib.contextmanager
+    def _locked(self, job_id: str) -> Iterator[None]:
+        """Hold the lock of the job, which the web and the worker processes both take to change its state"""
+        try:
+            file_descriptor = os.open(self._path(job_id) / LOCK_FILE_NAME, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            raise JobNotFoundError
+        try:
+            fcntl.flock(file_descriptor, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(file_descriptor)
+
+    def update(self, job_id: str, **changes: Any) -> dict[str, Any]:
+        # Read, changed and written under the lock, so that concurrent updates do not undo each other
+        with self._locked(job_id):
+            job = self.get(job_id)
+            job.update(changes, updated_at=now())
+            job.pop("cancel_requested", None)
+            self.save(job)
+        return self.get(job_id)
+
+    def remove_expired(self) -> int:
+        """Remove the jobs not updated for `retention_seconds`, returning how many were removed"""
+        if not self.directory.is_dir():
+            return 0
+        expires_before = time.time() - self.retention_seconds
+        removed = 0
+        for path in self.directory.iterdir():
+            try:
+                # The state is replaced on every update, so its modification time is the one of the last update
+                updated_at = (path / JOB_FILE_NAME).stat().st_mtime
+            except OSError:
+                # A job being created has no state yet
+                continue
+            if updated_at < expires_before:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        if removed:
+            logger.info("Removed expired summary jobs", jobs=removed)
+        return removed
+
+    def remove(self, job_id: str) -> None:
+        shutil.rmtree(self._path(job_id), ignore_errors=True)
+
+    def request_cancel(self, job_id: str) -> None:
+        (self._path(job_id) / CANCEL_FILE_NAME).touch()
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        return (self._path(job_id) / CANCEL_FILE_NAME).exists()
+
+
+def run_job(directory: str, job_id: str) -> None:
+    """Run the summary of one job, called in a worker process"""
+    store = JobStore(directory=directory)
+    if store.is_cancel_requested(job_id):
+        store.update(job_id, status=JOB_STATUS_CANCELLED)
+        return
+    job = store.update(job_id, status=JOB_STATUS_RUNNING)
+
+    def report_progress(rows_read: int) -> None:
+        # Cancelling is cooperative: the flag is checked every time the progress is reported
+        if store.is_cancel_requested(job_id):
+            raise JobCancelledError
+        store.update(job_id, rows_scanned=rows_read)
+
+    file = str(store.upload_path(job_id))
+    try:
+        if job["requested_sheets"] is None:
+            generator = build_summary_generator(
+                file=file, progress_callback=report_progress, progress_interval=PROGRESS_INTERVAL, **job["options"]
+            )
+            result = generator.generate_summary(column_names=job["column_names"])
+        else:
+            # Jobs already run in worker processes, so their sheets are summarised in turn
+            result = summarise_sheets(
+                file=file,
+                sheets=job["requested_sheets"],
+                column_names=job["column_names"],
+                progress_callback=report_progress,
+                progress_interval=PROGRESS_INTERVAL,
+                **job["options"],
+            )
+    except JobCancelledError:
+        store.update(job_id, status=JOB_STATUS_CANCELLED)
+    except BaseExcelSummaryError as e:
+        store.update(job_id, status=JOB_STATUS_FAILED, detail=e.detail)
+    except Exception:
+        logger.exception("Summary job failed", job_id=job_id)
+        store.update(job_id, status=JOB_STATUS_FAILED, detail="Unexpected processing error")
+    else:
+        store.update(job_id, status=JOB_STATUS_SUCCEEDED, **result)
+    finally:
+        # The result is all that is needed once the job is finished
+        store.upload_path(job_id).unlink(missing_ok=True)
+
+
+class JobRunner:
+    """
+    Runs jobs in a local pool of worker processes. At most `max_workers` jobs run at the same time
+    and at most `max_queued` jobs wait for a free worker, new jobs are refused above it.
+    """
+
+    def __init__(self, store: JobStore, max_workers: int = 2, max_queued: int = 16) -> None:
+        self.store = store
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._executor: concurrent.futures.ProcessPoolExecutor | None = None
+        self._futures: dict[str, concurrent.futures.Future] = {}
+        # Reentrant, as done callbacks of futures which are already done run in the calling thread
+        self._lock = threading.RLock()
+
+    def _pending_count(self) -> int:
+        return sum(1 for future in self._futures.values() if not future.done())
+
+    def _check_queue(self) -> None:
+        with self._lock:
+            if self._pending_count() >= self.max_workers + self.max_queued:
+                raise JobQueueFullError
+
+    def submit(
+        self,
+        file_name: str,
+        chunks: Iterable[bytes],
+        column_names: Sequence[str],
+        options: dict[str, Any],
+        sheets: Sequence[str] | None = None,
+    ) -> dict[str, Any]:
+        self._check_queue()
+        # The upload is written without the lock, so that a slow upload does not hold up the other requests
+        job = self.store.create(
+            file_name=file_name, chunks=chunks, column_names=column_names, options=options, sheets=sheets
+        )
+        with self._lock:
+            try:
+                # Other jobs may have been queued while the upload was written
+                self._check_queue()
+            except JobQueueFullError:
+                self.store.remove(job["id"])
+                raise
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context(WORKER_START_METHOD)
+                )
+            future = self._executor.submit(run_job, str(self.store.directory), job["id"])
+            self._futures[job["id"]] = future
+            future.add_done_callback(functools.partial(self._on_done, job["id"]))
+        logger.info("Queued summary job", job_id=job["id"])
+        return job
+
+    def _on_done(self, job_id: str, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if not future.cancelled() and future.exception() is not None:
+            # The worker process died before the job could record how it ended
+            logger.error("Summary job worker failed", job_id=job_id, exc_info=future.exception())
+            self.store.update(job_id, status=JOB_STATUS_FAILED, detail="Unexpected processing error")
+
+    def cancel(self, job_id: str) -> dict[str, Any]:
+        job = self.store.get(job_id)
+        if job["status"] in FINISHED_JOB_STATUSES:
+            return job
+        self.store.request_cancel(job_id)
+        job = self.store.get(job_id)
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            # The job never reached a worker, so nothing else would mark it as cancelled
+            job = self.store.update(job_id, status=JOB_STATUS_CANCELLED)
+            self.store.upload_path(job_id).unlink(missing_ok=True)
+        logger.info("Cancelled summary job", job_id=job_id, status=job["status"])
+        return job
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+            self._futures.clear()
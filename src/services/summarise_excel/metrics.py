@@ -0,0 +1,229 @@
+import abc
+import bisect
+import contextlib
+import math
+import resource
+import sys
+import threading
+import time
+
+from typing import TYPE_CHECKING, Iterator, Mapping, Sequence, TypeVar
+
+
+if TYPE_CHECKING:
+    from services.summarise_excel.summary_stats import SummaryStats
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Upper bounds of the buckets of the stage timings, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+STAGE_UPLOAD = "upload"
+STAGE_CACHE = "cache"
+STAGE_HEADER_SEARCH = "header_search"
+STAGE_SPLIT = "split"
+STAGE_ROWS = "rows"
+STAGE_SUMMARY = "summary"
+STAGE_SERIALIZE = "serialize"
+STAGE_TOTAL = "total"
+
+MetricT = TypeVar("MetricT", bound="BaseMetric")
+
+
+def peak_rss_bytes() -> int:
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(labels: Mapping[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class BaseMetric(abc.ABC):
+    """Metric of the process, whose values are kept per combination of label values and rendered for Prometheus"""
+
+    type_name: str
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Requests served by threads update the metrics concurrently
+        self.lock = threading.Lock()
+
+    def label_values(self, labels: Mapping[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            message = f"{self.name} takes the labels {list(self.labelnames)}, not {list(labels)}"
+            raise ValueError(message)
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}", *self.samples()]
+
+    @abc.abstractmethod
+    def samples(self) -> list[str]:
+        """Return the sample lines of the metric"""
+
+
+class Counter(BaseMetric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name=name, documentation=documentation, labelnames=labelnames)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self.label_values(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self.values.get(self.label_values(labels), 0)
+
+    def samples(self) -> list[str]:
+        with self.lock:
+            values = sorted(self.values.items())
+        return [
+            f"{self.name}{format_labels(dict(zip(self.labelnames, key)))} {format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self.label_values(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(BaseMetric):
+    """Counts of the observed values below every bucket bound, with their sum"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name=name, documentation=documentation, labelnames=labelnames)
+        self.buckets = sorted(buckets)
+        # Per label values, the count of the values falling in every bucket, the last one being unbounded
+        self.counts: dict[tuple[str, ...], list[int]] = {}
+        self.sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self.label_values(labels)
+        with self.lock:
+            counts = self.counts.get(key)
+            if counts is None:
+                counts = self.counts[key] = [0] * (len(self.buckets) + 1)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sums[key] = self.sums.get(key, 0.0) + value
+
+    def count(self, **labels: str) -> int:
+        return sum(self.counts.get(self.label_values(labels), []))
+
+    def samples(self) -> list[str]:
+        with self.lock:
+            values = sorted((key, list(counts), self.sums[key]) for key, counts in self.counts.items())
+        lines = []
+        for key, counts, total in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative_count = 0
+            for bound, count in zip([*self.buckets, math.inf], counts):
+                cumulative_count += count
+                bucket_labels = format_labels({**labels, "le": format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative_count}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {cumulative_count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics of the process, rendered in the Prometheus text format"""
+
+    def __init__(self) -> None:
+        self.metrics: dict[str, BaseMetric] = {}
+
+    def register(self, metric: MetricT) -> MetricT:
+        if metric.name in self.metrics:
+            message = f"Metric {metric.name} is already registered"
+            raise ValueError(message)
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "".join(line + "\n" for metric in self.metrics.values() for line in metric.render())
+
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.register(
+    Histogram("excel_summary_stage_seconds", "Seconds spent in every stage of the summary requests", ("stage",))
+)
+ROWS = REGISTRY.register(
+    Counter("excel_summary_rows_total", "Rows read after the column row, by what became of them", ("outcome",))
+)
+BYTES_READ = REGISTRY.register(Counter("excel_summary_bytes_read_total", "Bytes of the summarised files"))
+REQUESTS = REGISTRY.register(
+    Counter("excel_summary_requests_total", "Summary requests by response status", ("status",))
+)
+PEAK_RSS = REGISTRY.register(Gauge("excel_summary_peak_rss_bytes", "Peak resident set size of the process"))
+
+
+def observe_summary_stats(stats: "SummaryStats") -> None:
+    ROWS.inc(stats.rows_scanned, outcome="scanned")
+    ROWS.inc(stats.rows_filtered, outcome="filtered")
+    ROWS.inc(stats.rows_unconvertible, outcome="unconvertible")
+    ROWS.inc(stats.rows_unprocessable, outcome="unprocessable")
+
+
+class StageTimings:
+    """Seconds spent in every stage of one summary, timed around whole stages rather than rows"""
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.seconds: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started_at)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def update(self, other: "StageTimings") -> None:
+        for name, seconds in other.seconds.items():
+            self.add(name, seconds)
+
+    def finish(self) -> None:
+        self.seconds[STAGE_TOTAL] = time.perf_counter() - self.started_at
+
+    def observe(self) -> None:
+        for name, seconds in self.seconds.items():
+            STAGE_SECONDS.observe(seconds, stage=name)
+
+    def as_dict(self) -> dict[str, float]:
+        return {name: round(seconds, 6) for name, seconds in self.seconds.items()}
+
+    def server_timing(self) -> str:
+        """Return the value of a Server-Timing header, durations being in milliseconds"""
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.seconds.items())
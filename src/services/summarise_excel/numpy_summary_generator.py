@@ -0,0 +1,322 @@
+import logging
+import operator
+
+from decimal import Decimal
+from typing import Any, Sequence
+
+import numpy as np
+import structlog
+
+from services.summarise_excel.column_row_finder import BaseColumnRowFinder
+from services.summarise_excel.file_readers import BaseFileReader, ColumnProjection
+from services.summarise_excel.metrics import STAGE_HEADER_SEARCH, STAGE_ROWS
+from services.summarise_excel.row_filters import RowFilter, RowPredicate
+from services.summarise_excel.sketches import DEFAULT_DISTINCT_SKETCH_PRECISION, DEFAULT_QUANTILE_SKETCH_SIZE
+from services.summarise_excel.summary_generator import (
+    DEFAULT_AGGREGATES,
+    DEFAULT_MAX_GROUPS,
+    DEFAULT_PROGRESS_HOOK_INTERVAL,
+    BaseSummaryGenerator,
+    ColumnGroups,
+    ColumnResult,
+    ProgressHook,
+)
+from services.summarise_excel.summary_stats import SummaryStats
+from services.summarise_excel.value_processors import BaseValueProcessor, ColumnValueUnprocessableError
+
+
+logger = structlog.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 65536
+MAX_SAFE_INTEGER = 2**53
+MAX_INT64 = 2**63 - 1
+
+
+def group_row_indexes(keys: list[tuple]) -> list[tuple[tuple, np.ndarray]]:
+    """Return every distinct key, in the order they first appear, with the indexes of the rows holding it"""
+    key_ids: dict[tuple, int] = {}
+    ids = np.fromiter((key_ids.setdefault(key, len(key_ids)) for key in keys), dtype=np.intp, count=len(keys))
+    order = np.argsort(ids, kind="stable")
+    return list(zip(key_ids, np.split(order, np.flatnonzero(np.diff(ids[order])) + 1)))
+
+
+class NumpyColumnChunk:
+    """Values of one column in a chunk of rows, with a mask of the values that could be processed"""
+
+    def __init__(self, values: np.ndarray | list[Decimal], valid: np.ndarray) -> None:
+        self.values = values
+        self.valid = valid
+
+    def sum(self, mask: np.ndarray) -> Decimal:
+        if isinstance(self.values, list):
+            return sum((value for value, selected in zip(self.values, mask.tolist()) if selected), Decimal(0))
+        selected = self.values[mask]
+        if self.values.dtype.kind == "i":
+            if not selected.size or int(np.abs(selected).max()) * selected.size <= MAX_INT64:
+                return Decimal(int(selected.sum()))
+            return Decimal(sum(selected.tolist()))
+        return Decimal(float(selected.sum()))
+
+    def take(self, indexes: np.ndarray) -> "NumpyColumnChunk":
+        """Return the chunk of the rows at the indexes"""
+        if isinstance(self.values, list):
+            return NumpyColumnChunk(
+                values=[self.values[index] for index in indexes.tolist()], valid=self.valid[indexes]
+            )
+        return NumpyColumnChunk(values=self.values[indexes], valid=self.valid[indexes])
+
+    def selected_values(self, mask: np.ndarray) -> list:
+        if isinstance(self.values, list):
+            return [value for value, selected in zip(self.values, mask.tolist()) if selected]
+        return self.values[mask].tolist()
+
+    def extremes(self, mask: np.ndarray) -> tuple[Decimal, Decimal]:
+        if isinstance(self.values, list):
+            selected_values = [value for value, selected in zip(self.values, mask.tolist()) if selected]
+            return min(selected_values), max(selected_values)
+        selected = self.values[mask]
+        if self.values.dtype.kind == "i":
+            return Decimal(int(selected.min())), Decimal(int(selected.max()))
+        return Decimal(float(selected.min())), Decimal(float(selected.max()))
+
+    def squared_deviations(self, mask: np.ndarray, total_value: Decimal, count: int) -> Decimal:
+        """Sum of the squared differences of the selected values from their mean"""
+        if isinstance(self.values, list):
+            mean = total_value / count
+            return sum(
+                ((value - mean) ** 2 for value, selected in zip(self.values, mask.tolist()) if selected), Decimal(0)
+            )
+        selected = self.values[mask]
+        if self.values.dtype.kind == "i" and int(np.abs(selected).max()) ** 2 * selected.size <= MAX_INT64:
+            # Exact for integers, as (n * sum(x^2) - sum(x)^2) / n
+            squares = int(np.dot(selected, selected))
+            total = int(selected.sum())
+            return Decimal(count * squares - total * total) / count
+        deviations = selected - selected.mean()
+        return Decimal(float(np.dot(deviations, deviations)))
+
+
+class NumpySummaryGenerator(BaseSummaryGenerator):
+    """
+    Collects projected column values in chunks of rows and reduces every chunk with NumPy.
+    Columns holding only numbers which are safe as float64 are summed in float64 (or int64),
+    every other column falls back to the exact Decimal values returned by the value processor.
+    The variance of float64 columns is merged from the moments of every chunk, computed in float64.
+    """
+
+    def __init__(
+        self,
+        value_processor: BaseValueProcessor,
+        file_reader: BaseFileReader,
+        column_row_finder: BaseColumnRowFinder,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        aggregates: Sequence[str] = DEFAULT_AGGREGATES,
+        quantile_sketch_size: int = DEFAULT_QUANTILE_SKETCH_SIZE,
+        distinct_sketch_precision: int = DEFAULT_DISTINCT_SKETCH_PRECISION,
+        group_by: Sequence[str] = (),
+        max_groups: int = DEFAULT_MAX_GROUPS,
+        top_groups: int | None = None,
+        row_filter: RowFilter | None = None,
+        progress_hook: ProgressHook | None = None,
+        progress_hook_interval: int = DEFAULT_PROGRESS_HOOK_INTERVAL,
+    ) -> None:
+        self.value_processor = value_processor
+        self.file_reader = file_reader
+        self.column_row_finder = column_row_finder
+        self.chunk_size = chunk_size
+        self.aggregates = aggregates
+        self.quantile_sketch_size = quantile_sketch_size
+        self.distinct_sketch_precision = distinct_sketch_precision
+        self.group_by = group_by
+        self.max_groups = max_groups
+        self.top_groups = top_groups
+        self.row_filter = row_filter
+        self.progress_hook = progress_hook
+        self.progress_hook_interval = progress_hook_interval
+        self.stats: SummaryStats | None = None
+        self.groups: ColumnGroups | None = None
+
+    def generate_column_results(self, column_names: Sequence[str]) -> list[ColumnResult]:
+        logger.debug(
+            "Generating summary", column_names=column_names, group_by=self.group_by, chunk_size=self.chunk_size
+        )
+        self.stats = stats = SummaryStats()
+        projection = ColumnProjection()
+        header_column_names = self.header_column_names(column_names)
+        # The file is opened and its first rows read while the column row is searched
+        with stats.stages.stage(STAGE_HEADER_SEARCH):
+            column_row, rows = self.column_row_finder.find(
+                column_names=header_column_names, file_reader=self.file_reader, projection=projection
+            )
+
+        column_to_index_mapper = {
+            column_name: column_index
+            for column_index, column_name in enumerate(column_row)
+            if column_name in column_names
+        }
+        group_to_index_mapper = {
+            column_name: column_index
+            for column_index, column_name in enumerate(column_row)
+            if column_name in self.group_by
+        }
+        group_indexes = [group_to_index_mapper[column_name] for column_name in self.group_by]
+        projection.update(
+            column_index for column_index, column_name in enumerate(column_row) if column_name in header_column_names
+        )
+        column_results = self.build_column_results(column_names)
+        self.groups = groups = self.build_column_groups(column_names)
+        if column_to_index_mapper:
+            with stats.stages.stage(STAGE_ROWS):
+                self._aggregate(
+                    rows=rows,
+                    indexes=list(column_to_index_mapper.values()),
+                    group_indexes=group_indexes,
+                    column_names=list(column_to_index_mapper),
+                    column_results=[column_results[column_name] for column_name in column_to_index_mapper],
+                    groups=groups,
+                    stats=stats,
+                    row_predicate=self.row_filter.compile(column_row) if self.row_filter is not None else None,
+                )
+        stats.finish()
+        logger.info("Finished generating summary", **stats.as_dict())
+        if groups is not None:
+            return groups.totals()
+        return list(column_results.values())
+
+    def _aggregate(
+        self,
+        rows: Any,
+        indexes: list[int],
+        group_indexes: list[int],
+        column_names: list[str],
+        column_results: list[ColumnResult],
+        groups: ColumnGroups | None,
+        stats: SummaryStats,
+        row_predicate: RowPredicate | None = None,
+    ) -> None:
+        # Checked once, so that rows are not formatted for a disabled debug level
+        debug = logger.is_enabled_for(logging.DEBUG)
+        # The values of the group columns follow those of the summarised columns
+        getter = operator.itemgetter(*indexes, *group_indexes)
+        width = max(indexes + group_indexes) + 1
+        progress_hook = self.progress_hook
+        # A single comparison per row, the rows scanned never reach -1 when there is no hook
+        next_progress_row = self.progress_hook_interval if progress_hook is not None else -1
+        chunk: list = []
+        for row in rows:
+            stats.rows_scanned += 1
+            if stats.rows_scanned == next_progress_row and progress_hook is not None:
+                # The rows read so far are reduced, so that the running results cover every one of them
+                if chunk:
+                    self._reduce_chunk(
+                        chunk=chunk,
+                        column_names=column_names,
+                        column_results=column_results,
+                        groups=groups,
+                        stats=stats,
+                    )
+                    chunk = []
+                progress_hook(stats, groups.totals() if groups is not None else column_results)
+                next_progress_row += self.progress_hook_interval
+            if row_predicate is not None and not row_predicate(row):
+                stats.rows_filtered += 1
+                continue
+            # Rows too short to hold every column are unconvertible and skipped
+            if len(row) < width:
+                stats.add_unconvertible_row(row)
+                if debug:
+                    logger.debug("Unconvertible row", row=row, indexes=indexes)
+                continue
+            chunk.append(getter(row))
+            if len(chunk) == self.chunk_size:
+                self._reduce_chunk(
+                    chunk=chunk, column_names=column_names, column_results=column_results, groups=groups, stats=stats
+                )
+                chunk = []
+        if chunk:
+            self._reduce_chunk(
+                chunk=chunk, column_names=column_names, column_results=column_results, groups=groups, stats=stats
+            )
+
+    def _reduce_chunk(
+        self,
+        chunk: list,
+        column_names: list[str],
+        column_results: list[ColumnResult],
+        groups: ColumnGroups | None,
+        stats: SummaryStats,
+    ) -> None:
+        column_count = len(column_names)
+        columns = [chunk] if column_count == 1 and groups is None else list(zip(*chunk))
+        column_chunks = [self._parse_column(values) for values in columns[:column_count]]
+        # A row is processed only if every one of its values can be processed
+        mask = np.logical_and.reduce([column_chunk.valid for column_chunk in column_chunks])
+        for index in np.flatnonzero(~mask).tolist():
+            # The values of the group columns are left out, as the other engines sample the summarised ones
+            stats.add_unprocessable_row(
+                {column_name: values[index] for column_name, values in zip(column_names, columns)}
+            )
+        if groups is None:
+            self._add_rows(columns=columns, column_chunks=column_chunks, mask=mask, column_results=column_results)
+            return
+        for key, row_indexes in group_row_indexes(list(zip(*columns[column_count:]))):
+            group_results = groups.get(key)
+            self._add_rows(
+                columns=[[values[index] for index in row_indexes.tolist()] for values in columns[:column_count]],
+                column_chunks=[column_chunk.take(row_indexes) for column_chunk in column_chunks],
+                mask=mask[row_indexes],
+                column_results=[group_results[column_name] for column_name in column_names],
+            )
+
+    def _add_rows(
+        self,
+        columns: Sequence[Sequence],
+        column_chunks: list[NumpyColumnChunk],
+        mask: np.ndarray,
+        column_results: list[ColumnResult],
+    ) -> None:
+        for values, column_chunk, column_result in zip(columns, column_chunks, column_results):
+            if column_result.tracks_invalid:
+                for index in np.flatnonzero(~column_chunk.valid).tolist():
+                    column_result.add_invalid(values[index])
+        count = int(np.count_nonzero(mask))
+        if not count:
+            return
+        for column_chunk, column_result in zip(column_chunks, column_results):
+            total_value = column_chunk.sum(mask)
+            min_value = max_value = None
+            if column_result.tracks_extremes:
+                min_value, max_value = column_chunk.extremes(mask)
+            m2 = Decimal(0)
+            if column_result.tracks_variance:
+                m2 = column_chunk.squared_deviations(mask, total_value=total_value, count=count)
+            column_result.add_chunk(
+                total_value=total_value, count=count, min_value=min_value, max_value=max_value, m2=m2
+            )
+            if column_result.tracks_sketches:
+                column_result.add_to_sketches(column_chunk.selected_values(mask))
+
+    def _parse_column(self, values: Sequence) -> NumpyColumnChunk:
+        types = set(map(type, values))
+        if types <= {int, bool}:
+            try:
+                return NumpyColumnChunk(values=np.array(values, dtype=np.int64), valid=np.ones(len(values), bool))
+            except OverflowError:
+                return self._parse_column_exactly(values)
+        if types <= {int, bool, float}:
+            array = np.array(values, dtype=np.float64)
+            if int not in types or not np.any(np.abs(array) > MAX_SAFE_INTEGER):
+                return NumpyColumnChunk(values=array, valid=np.ones(len(values), bool))
+        return self._parse_column_exactly(values)
+
+    def _parse_column_exactly(self, values: Sequence) -> NumpyColumnChunk:
+        decimals = []
+        valid = []
+        for value in values:
+            try:
+                decimals.append(self.value_processor.process(value))
+                valid.append(True)
+            except ColumnValueUnprocessableError:
+                decimals.append(Decimal(0))
+                valid.append(False)
+        return NumpyColumnChunk(values=decimals, valid=np.array(valid, dtype=bool))
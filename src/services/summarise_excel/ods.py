@@ -0,0 +1,139 @@
+import datetime
+import zipfile
+
+from typing import TYPE_CHECKING, Any, Iterator
+from xml.etree import ElementTree
+
+from services.summarise_excel.xlsx import parse_number
+
+
+if TYPE_CHECKING:
+    from services.summarise_excel.file_readers import ColumnProjection
+
+
+ODS_MIMETYPE = b"application/vnd.oasis.opendocument.spreadsheet"
+# First member of every OpenDocument package, stored uncompressed so that the format can be told from the first bytes
+MIMETYPE_PART = "mimetype"
+CONTENT_PART = "content.xml"
+SETTINGS_PART = "settings.xml"
+
+TABLE_NAMESPACE = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+OFFICE_NAMESPACE = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+CONFIG_NAMESPACE = "urn:oasis:names:tc:opendocument:xmlns:config:1.0"
+
+TABLE_TAG = f"{{{TABLE_NAMESPACE}}}table"
+TABLE_ROW_TAG = f"{{{TABLE_NAMESPACE}}}table-row"
+TABLE_CELL_TAG = f"{{{TABLE_NAMESPACE}}}table-cell"
+COVERED_TABLE_CELL_TAG = f"{{{TABLE_NAMESPACE}}}covered-table-cell"
+CONFIG_ITEM_TAG = f"{{{CONFIG_NAMESPACE}}}config-item"
+NAME_ATTRIBUTE = f"{{{TABLE_NAMESPACE}}}name"
+CONFIG_NAME_ATTRIBUTE = f"{{{CONFIG_NAMESPACE}}}name"
+ROWS_REPEATED_ATTRIBUTE = f"{{{TABLE_NAMESPACE}}}number-rows-repeated"
+COLUMNS_REPEATED_ATTRIBUTE = f"{{{TABLE_NAMESPACE}}}number-columns-repeated"
+VALUE_TYPE_ATTRIBUTE = f"{{{OFFICE_NAMESPACE}}}value-type"
+VALUE_ATTRIBUTE = f"{{{OFFICE_NAMESPACE}}}value"
+DATE_VALUE_ATTRIBUTE = f"{{{OFFICE_NAMESPACE}}}date-value"
+TIME_VALUE_ATTRIBUTE = f"{{{OFFICE_NAMESPACE}}}time-value"
+BOOLEAN_VALUE_ATTRIBUTE = f"{{{OFFICE_NAMESPACE}}}boolean-value"
+NUMERIC_VALUE_TYPES = frozenset(["float", "percentage", "currency"])
+
+
+def parse_cell(cell: ElementTree.Element) -> Any:
+    """Return the value of a cell, the cached value for formulas"""
+    value_type = cell.get(VALUE_TYPE_ATTRIBUTE)
+    if value_type is None:
+        return None
+    if value_type in NUMERIC_VALUE_TYPES:
+        return parse_number(cell.get(VALUE_ATTRIBUTE, "0"))
+    if value_type == "date":
+        return datetime.datetime.fromisoformat(cell.get(DATE_VALUE_ATTRIBUTE, ""))
+    if value_type == "boolean":
+        return cell.get(BOOLEAN_VALUE_ATTRIBUTE) == "true"
+    if value_type == "time":
+        return cell.get(TIME_VALUE_ATTRIBUTE)
+    # Text is held by paragraphs, one per line
+    return "\n".join("".join(paragraph.itertext()) for paragraph in cell)
+
+
+def parse_row(row: ElementTree.Element, projection: "ColumnProjection | None") -> tuple:
+    columns = projection.columns if projection is not None else None
+    limit = projection.max_column + 1 if projection is not None and projection.max_column is not None else None
+    values: list[Any] = []
+    column = 0
+    for cell in row:
+        if cell.tag != TABLE_CELL_TAG and cell.tag != COVERED_TABLE_CELL_TAG:
+            continue
+        if limit is not None and column >= limit:
+            break
+        repeat = int(cell.get(COLUMNS_REPEATED_ATTRIBUTE, 1))
+        # Trailing empty cells are often repeated up to the last column of the sheet, so empty cells are not expanded
+        if repeat > 1 or columns is None or column in columns:
+            value = parse_cell(cell)
+            if value is not None:
+                if limit is not None:
+                    repeat = min(repeat, limit - column)
+                values.extend([None] * (column - len(values)))
+                values.extend([value] * repeat)
+        column += repeat
+    return tuple(values)
+
+
+class OdsDocument:
+    """OpenDocument spreadsheet, whose sheets are tables of the content part"""
+
+    def __init__(self, archive: zipfile.ZipFile) -> None:
+        self.archive = archive
+
+    def sheet_names(self) -> list[str]:
+        sheet_names = []
+        with self.archive.open(CONTENT_PART) as source:
+            for _event, element in ElementTree.iterparse(source, events=("start",)):
+                if element.tag == TABLE_TAG:
+                    sheet_names.append(element.get(NAME_ATTRIBUTE, ""))
+        return sheet_names
+
+    def active_sheet_name(self) -> str | None:
+        """Return the sheet selected when the document was saved, None when the settings do not tell"""
+        if SETTINGS_PART not in self.archive.namelist():
+            return None
+        with self.archive.open(SETTINGS_PART) as source:
+            for _event, element in ElementTree.iterparse(source):
+                if element.tag == CONFIG_ITEM_TAG and element.get(CONFIG_NAME_ATTRIBUTE) == "ActiveTable":
+                    return element.text
+        return None
+
+    def iter_rows(
+        self, sheet: str | None = None, min_row: int = 0, projection: "ColumnProjection | None" = None
+    ) -> Iterator[tuple]:
+        """Yield the rows of the sheet, the first one by default, from row `min_row` on"""
+        min_row = min_row or 1
+        row_number = 0
+        # Empty rows are only yielded once a row with values follows, as sheets often end with many repeated ones
+        pending_empty_rows = 0
+        in_sheet = False
+        parents: list[ElementTree.Element] = []
+        with self.archive.open(CONTENT_PART) as source:
+            for event, element in ElementTree.iterparse(source, events=("start", "end")):
+                if event == "start":
+                    if element.tag == TABLE_TAG and (sheet is None or element.get(NAME_ATTRIBUTE) == sheet):
+                        in_sheet = True
+                    parents.append(element)
+                    continue
+                parents.pop()
+                if element.tag == TABLE_TAG and in_sheet:
+                    return
+                if element.tag != TABLE_ROW_TAG:
+                    continue
+                if in_sheet:
+                    repeat = int(element.get(ROWS_REPEATED_ATTRIBUTE, 1))
+                    values = parse_row(element, projection)
+                    if not values:
+                        pending_empty_rows += repeat
+                    else:
+                        for row_values in ((),) * pending_empty_rows + (values,) * repeat:
+                            row_number += 1
+                            if row_number >= min_row:
+                                yield row_values
+                        pending_empty_rows = 0
+                # Rows are dropped once read, so that memory does not grow with the sheet
+                parents[-1].remove(element)
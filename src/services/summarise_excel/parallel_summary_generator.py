@@ -0,0 +1,319 @@
+import concurrent.futures
+import mmap
+import os
+import shutil
+import tempfile
+import zipfile
+
+from pathlib import Path
+from typing import Sequence
+
+import structlog
+
+from services.summarise_excel.column_row_finder import (
+    DEFAULT_MAX_HEADER_SCAN_ROWS,
+    BaseColumnRowFinder,
+    ExcelColumnRowFinder,
+    FixedColumnRowFinder,
+)
+from services.summarise_excel.exceptions import CannotReadFileError, SheetNotFoundError
+from services.summarise_excel.extract_cache import ColumnarExtractCache
+from services.summarise_excel.file_readers import (
+    FILE_FORMAT_XLSX,
+    CountingFileReader,
+    XlsxFileReader,
+    XlsxRowRangeFileReader,
+    sniff_file_format,
+)
+from services.summarise_excel.generator_factory import (
+    FILE_READER_XLSX,
+    SUMMARY_ENGINE_DECIMAL,
+    build_reader_summary_generator,
+    build_summary_generator,
+)
+from services.summarise_excel.metrics import STAGE_HEADER_SEARCH, STAGE_ROWS, STAGE_SPLIT
+from services.summarise_excel.row_filters import RowFilter
+from services.summarise_excel.sketches import DEFAULT_DISTINCT_SKETCH_PRECISION, DEFAULT_QUANTILE_SKETCH_SIZE
+from services.summarise_excel.summary_generator import (
+    DEFAULT_AGGREGATES,
+    DEFAULT_MAX_GROUPS,
+    BaseSummaryGenerator,
+    ColumnGroups,
+    ColumnResult,
+)
+from services.summarise_excel.summary_stats import SummaryStats
+from services.summarise_excel.worker_pool import WorkerPool, borrow_worker_pool
+from services.summarise_excel.xlsx import (
+    CHUNK_SIZE,
+    UnnumberedRowError,
+    XlsxWorkbook,
+    read_sheet_layout,
+    split_row_ranges,
+)
+
+
+logger = structlog.getLogger(__name__)
+
+# Decompressed worksheet bytes below which a range is not worth a worker process
+DEFAULT_MIN_RANGE_SIZE = 16 << 20
+# Attribute every row of a range must have, as rows of one range cannot be numbered from the rows of other ranges.
+# Only the first row is checked before the sheet is split, ranges finding a row without it are read in turn instead.
+ROW_REFERENCE_ATTRIBUTE = b" r="
+
+
+def aggregate_row_range(
+    file: str,
+    sheet_part_path: str,
+    start: int,
+    end: int,
+    first_row: int,
+    column_row: list,
+    column_names: Sequence[str],
+    engine: str,
+    supported_currencies: list[str] | None,
+    aggregates: Sequence[str] = DEFAULT_AGGREGATES,
+    quantile_sketch_size: int = DEFAULT_QUANTILE_SKETCH_SIZE,
+    distinct_sketch_precision: int = DEFAULT_DISTINCT_SKETCH_PRECISION,
+    group_by: Sequence[str] = (),
+    max_groups: int = DEFAULT_MAX_GROUPS,
+    top_groups: int | None = None,
+    row_filter: RowFilter | None = None,
+) -> tuple[list[ColumnResult], ColumnGroups | None, SummaryStats | None]:
+    """Return the partial column results and groups of one byte range of a sheet. Runs in a worker process."""
+    generator = build_reader_summary_generator(
+        file_reader=XlsxRowRangeFileReader(
+            file=file, sheet_part_path=sheet_part_path, start=start, end=end, first_row=first_row
+        ),
+        engine=engine,
+        supported_currencies=supported_currencies,
+        column_row_finder=FixedColumnRowFinder(column_row=column_row),
+        aggregates=aggregates,
+        quantile_sketch_size=quantile_sketch_size,
+        distinct_sketch_precision=distinct_sketch_precision,
+        group_by=group_by,
+        max_groups=max_groups,
+        top_groups=top_groups,
+        row_filter=row_filter,
+    )
+    return generator.generate_column_results(column_names=column_names), generator.groups, generator.stats
+
+
+class ParallelSummaryGenerator(BaseSummaryGenerator):
+    """
+    Summarises one sheet on several cores: the worksheet part is decompressed once, split at row boundaries into
+    byte ranges and each range is aggregated by a worker process, whose partial column results are merged.
+    The ranges are aggregated in `worker_pool`, shared between summaries, or in a pool started for this summary.
+    Sheets too small to fill two ranges, or whose rows cannot all be numbered, are summarised in this process, as are
+    sheets whose worker died. Only summaries in this process read and fill the extract cache.
+    """
+
+    def __init__(
+        self,
+        file: str,
+        sheet: str | None = None,
+        engine: str = SUMMARY_ENGINE_DECIMAL,
+        supported_currencies: list[str] | None = None,
+        max_workers: int | None = None,
+        min_range_size: int = DEFAULT_MIN_RANGE_SIZE,
+        column_row_finder: BaseColumnRowFinder | None = None,
+        extract_cache: ColumnarExtractCache | None = None,
+        file_hash: str | None = None,
+        aggregates: Sequence[str] = DEFAULT_AGGREGATES,
+        quantile_sketch_size: int = DEFAULT_QUANTILE_SKETCH_SIZE,
+        distinct_sketch_precision: int = DEFAULT_DISTINCT_SKETCH_PRECISION,
+        group_by: Sequence[str] = (),
+        max_groups: int = DEFAULT_MAX_GROUPS,
+        top_groups: int | None = None,
+        row_filter: str | None = None,
+        header_row: int | None = None,
+        max_header_scan_rows: int | None = DEFAULT_MAX_HEADER_SCAN_ROWS,
+        worker_pool: WorkerPool | None = None,
+    ) -> None:
+        self.file = file
+        self.sheet = sheet
+        self.engine = engine
+        self.supported_currencies = supported_currencies
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_range_size = min_range_size
+        self.column_row_finder = column_row_finder or ExcelColumnRowFinder(
+            max_scan_rows=max_header_scan_rows, header_row=header_row
+        )
+        self.extract_cache = extract_cache
+        self.file_hash = file_hash
+        self.aggregates = aggregates
+        self.quantile_sketch_size = quantile_sketch_size
+        self.distinct_sketch_precision = distinct_sketch_precision
+        self.group_by = group_by
+        self.max_groups = max_groups
+        self.top_groups = top_groups
+        # Parsed once here, the parsed filter is sent to the worker processes
+        self.row_filter_expression = row_filter
+        self.row_filter = RowFilter(row_filter) if row_filter else None
+        self.worker_pool = worker_pool
+        self.stats: SummaryStats | None = None
+        self.groups: ColumnGroups | None = None
+
+    def generate_column_results(self, column_names: Sequence[str]) -> list[ColumnResult]:
+        # Only worksheet parts of xlsx packages can be split into ranges, other formats are read in turn
+        if self.max_workers < 2 or sniff_file_format(self.file) != FILE_FORMAT_XLSX:
+            return self._generate_in_process(column_names)
+        if self._sheet_part_size() < 2 * self.min_range_size:
+            return self._generate_in_process(column_names)
+
+        stats = SummaryStats()
+        # The column row is found by reading the sheet from its start, its number tells where the data rows start
+        counting_reader = CountingFileReader(file_reader=XlsxFileReader(file=self.file, sheet=self.sheet))
+        with stats.stages.stage(STAGE_HEADER_SEARCH):
+            column_row, rows = self.column_row_finder.find(
+                file_reader=counting_reader, column_names=self.header_column_names(column_names)
+            )
+        first_row = counting_reader.rows_read + 1
+        # Closes the workbook, the rest of the rows is read by the worker processes
+        del rows
+
+        with tempfile.TemporaryDirectory() as directory:
+            with stats.stages.stage(STAGE_SPLIT):
+                sheet_part_path = self._decompress_sheet_part(directory=directory)
+                ranges = self._split_row_ranges(sheet_part_path=sheet_part_path)
+            if ranges is None:
+                return self._generate_in_process(column_names)
+            with stats.stages.stage(STAGE_ROWS):
+                partials = self._aggregate_row_ranges(
+                    sheet_part_path=sheet_part_path,
+                    ranges=ranges,
+                    first_row=first_row,
+                    column_row=column_row,
+                    column_names=column_names,
+                )
+            if partials is None:
+                return self._generate_in_process(column_names)
+
+        column_results = self.build_column_results(column_names)
+        self.groups = groups = self.build_column_groups(column_names)
+        for partial_results, partial_groups, partial_stats in partials:
+            for column_result, partial_result in zip(column_results.values(), partial_results):
+                column_result.merge(partial_result)
+            if groups is not None and partial_groups is not None:
+                groups.merge(partial_groups)
+            if partial_stats is not None:
+                stats.merge(partial_stats)
+        self.stats = stats
+        stats.finish()
+        logger.info("Finished generating summary", ranges=len(partials), **stats.as_dict())
+        return list(column_results.values())
+
+    def _aggregate_row_ranges(
+        self,
+        sheet_part_path: str,
+        ranges: list[tuple[int, int]],
+        first_row: int,
+        column_row: list,
+        column_names: Sequence[str],
+    ) -> list[tuple[list[ColumnResult], ColumnGroups | None, SummaryStats | None]] | None:
+        """
+        Return the partial results of every range, or None when a range holds rows which cannot be numbered
+        or a worker process died
+        """
+        if not ranges:
+            return []
+        logger.debug("Summarising row ranges in worker processes", ranges=len(ranges), first_row=first_row)
+        with borrow_worker_pool(self.worker_pool, max_workers=min(self.max_workers, len(ranges))) as worker_pool:
+            futures = [
+                worker_pool.submit(
+                    aggregate_row_range,
+                    file=self.file,
+                    sheet_part_path=sheet_part_path,
+                    start=start,
+                    end=end,
+                    first_row=first_row,
+                    column_row=column_row,
+                    column_names=column_names,
+                    engine=self.engine,
+                    supported_currencies=self.supported_currencies,
+                    aggregates=self.aggregates,
+                    quantile_sketch_size=self.quantile_sketch_size,
+                    distinct_sketch_precision=self.distinct_sketch_precision,
+                    group_by=self.group_by,
+                    max_groups=self.max_groups,
+                    top_groups=self.top_groups,
+                    row_filter=self.row_filter,
+                )
+                for start, end in ranges
+            ]
+            try:
+                return [future.result() for future in futures]
+            except UnnumberedRowError:
+                logger.info("Row ranges hold rows without a reference, summarising the sheet in process")
+                return None
+            except concurrent.futures.process.BrokenProcessPool:
+                # The pool starts new workers for the next tasks
+                logger.warning("Worker process died, summarising the sheet in process")
+                return None
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _generate_in_process(self, column_names: Sequence[str]) -> list[ColumnResult]:
+        generator = build_summary_generator(
+            file=self.file,
+            engine=self.engine,
+            file_reader=FILE_READER_XLSX,
+            sheet=self.sheet,
+            supported_currencies=self.supported_currencies,
+            extract_cache=self.extract_cache,
+            file_hash=self.file_hash,
+            aggregates=self.aggregates,
+            quantile_sketch_size=self.quantile_sketch_size,
+            distinct_sketch_precision=self.distinct_sketch_precision,
+            group_by=self.group_by,
+            max_groups=self.max_groups,
+            top_groups=self.top_groups,
+            row_filter=self.row_filter_expression,
+            column_row_finder=self.column_row_finder,
+        )
+        column_results = generator.generate_column_results(column_names=column_names)
+        self.stats = generator.stats
+        self.groups = generator.groups
+        return column_results
+
+    def _sheet_part_name(self, archive: zipfile.ZipFile) -> str:
+        workbook = XlsxWorkbook(archive=archive)
+        if self.sheet is None:
+            return workbook.active_sheet_path
+        if self.sheet not in workbook.sheet_paths:
+            raise SheetNotFoundError(self.sheet)
+        return workbook.sheet_paths[self.sheet]
+
+    def _sheet_part_size(self) -> int:
+        try:
+            with zipfile.ZipFile(self.file) as archive:
+                return archive.getinfo(self._sheet_part_name(archive)).file_size
+        except SheetNotFoundError:
+            raise
+        except Exception:
+            raise CannotReadFileError
+
+    def _decompress_sheet_part(self, directory: str) -> str:
+        sheet_part_path = str(Path(directory) / "sheet.xml")
+        with zipfile.ZipFile(self.file) as archive:
+            with archive.open(self._sheet_part_name(archive)) as source, open(sheet_part_path, "wb") as target:
+                shutil.copyfileobj(source, target, CHUNK_SIZE)
+        return sheet_part_path
+
+    def _split_row_ranges(self, sheet_part_path: str) -> list[tuple[int, int]] | None:
+        """Return the byte ranges of rows, or None when the rows cannot be read in ranges"""
+        with open(sheet_part_path, "rb") as source:
+            layout, buffer = read_sheet_layout(source)
+            if not layout.sheet_data_end:
+                return []
+            start = source.tell() - len(buffer)
+            with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as sheet_part:
+                end = sheet_part.rfind(layout.sheet_data_end)
+                first_row_start = layout.next_row_start(sheet_part, start)
+                if end == -1 or first_row_start == -1:
+                    return []
+                first_row_tag = sheet_part[first_row_start : sheet_part.find(b">", first_row_start)]
+                if ROW_REFERENCE_ATTRIBUTE not in first_row_tag:
+                    return None
+                count = max(1, min(self.max_workers, (end - start) // self.min_range_size))
+                return split_row_ranges(sheet_part, layout, start, end, count)
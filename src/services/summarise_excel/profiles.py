@@ -0,0 +1,96 @@
+import cProfile
+import datetime
+import io
+import json
+import os
+import pstats
+import tempfile
+import uuid
+
+from pathlib import Path
+from typing import Any
+
+import structlog
+
+from services.summarise_excel.exceptions import ProfileNotFoundError
+
+
+logger = structlog.getLogger(__name__)
+
+PROFILE_SUFFIX = ".prof"
+METADATA_SUFFIX = ".json"
+DEFAULT_MAX_PROFILES = 100
+DEFAULT_TOP_FUNCTIONS = 20
+SORT_KEYS = ["cumulative", "tottime", "calls"]
+DEFAULT_SORT_KEY = "cumulative"
+
+
+class ProfileStore:
+    """
+    Keeps the cProfile statistics of profiled requests in a directory, keyed by the correlation id of the request,
+    each with a JSON file describing the request. Above `max_profiles` profiles, the oldest ones are removed.
+    """
+
+    def __init__(self, directory: str | Path, max_profiles: int = DEFAULT_MAX_PROFILES) -> None:
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+
+    def _path(self, profile_id: str, suffix: str) -> Path:
+        # Ids given on the command line must not point outside the directory
+        try:
+            uuid.UUID(profile_id)
+        except ValueError:
+            raise ProfileNotFoundError(profile_id)
+        return self.directory / f"{profile_id}{suffix}"
+
+    def save(self, profile_id: str, profiler: cProfile.Profile, **metadata: Any) -> dict[str, Any]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(self._path(profile_id, PROFILE_SUFFIX))
+        profile = {
+            "id": profile_id,
+            "created_at": datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+            **metadata,
+        }
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(file_descriptor, "w") as file:
+            json.dump(profile, file)
+        # Written last, so that listed profiles always have their statistics
+        os.replace(temporary_path, self._path(profile_id, METADATA_SUFFIX))
+        logger.info("Saved profile", **profile)
+        self._remove_oldest()
+        return profile
+
+    def get(self, profile_id: str) -> dict[str, Any]:
+        try:
+            with self._path(profile_id, METADATA_SUFFIX).open() as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            raise ProfileNotFoundError(profile_id)
+
+    def list_profiles(self) -> list[dict[str, Any]]:
+        """Return the profiles, the latest first"""
+        profiles = []
+        for path in self.directory.glob(f"*{METADATA_SUFFIX}"):
+            try:
+                profiles.append(self.get(path.stem))
+            except ProfileNotFoundError:
+                # Removed meanwhile, or a file which is not a profile
+                continue
+        return sorted(profiles, key=lambda profile: profile["created_at"], reverse=True)
+
+    def top_functions(
+        self, profile_id: str, limit: int = DEFAULT_TOP_FUNCTIONS, sort_key: str = DEFAULT_SORT_KEY
+    ) -> str:
+        """Return the table of the `limit` functions ranking first by the sort key"""
+        path = self._path(profile_id, PROFILE_SUFFIX)
+        if not path.exists():
+            raise ProfileNotFoundError(profile_id)
+        stream = io.StringIO()
+        pstats.Stats(str(path), stream=stream).strip_dirs().sort_stats(sort_key).print_stats(limit)
+        return stream.getvalue()
+
+    def _remove_oldest(self) -> None:
+        paths = sorted(self.directory.glob(f"*{METADATA_SUFFIX}"), key=lambda path: path.stat().st_mtime)
+        for path in paths[: max(len(paths) - self.max_profiles, 0)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(PROFILE_SUFFIX).unlink(missing_ok=True)
@@ -0,0 +1,141 @@
+import abc
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+from typing import IO, Any, Iterable, Mapping
+
+import structlog
+
+from django.core.cache import caches
+
+
+logger = structlog.getLogger(__name__)
+
+# Bump when the way summaries are computed changes, so that entries computed the old way are not served
+RESULT_CACHE_VERSION = 2
+HASH_CHUNK_SIZE = 1 << 20
+
+# The summary of the requested columns, with the summaries of every sheet when sheets were requested
+Summary = dict[str, Any]
+
+
+def hash_file(file: IO[bytes], chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Return the SHA-256 of the file content, reading it in chunks and rewinding it afterwards"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    while chunk := file.read(chunk_size):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def build_cache_key(file_hash: str, column_names: Iterable[str], options: Mapping[str, Any]) -> str:
+    payload = json.dumps(
+        {
+            "version": RESULT_CACHE_VERSION,
+            "file_hash": file_hash,
+            "column_names": list(column_names),
+            "options": options,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class BaseResultCache(abc.ABC):
+    @abc.abstractmethod
+    def get(self, key: str) -> Summary | None: ...
+
+    @abc.abstractmethod
+    def set(self, key: str, summary: Summary) -> None: ...
+
+
+class InMemoryResultCache(BaseResultCache):
+    """Process-local LRU cache evicting entries by count and age"""
+
+    def __init__(self, max_size: int = 256, ttl: float | None = 3600) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: collections.OrderedDict[str, tuple[float, Summary]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Summary | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, summary = entry
+            if self.ttl is not None and time.monotonic() - created_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return summary
+
+    def set(self, key: str, summary: Summary) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), summary)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class DjangoResultCache(BaseResultCache):
+    """Stores summaries in one of the caches configured in Django's CACHES setting"""
+
+    def __init__(self, alias: str = "default", ttl: float | None = 3600, key_prefix: str = "excel-summary") -> None:
+        self.alias = alias
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+
+    def get(self, key: str) -> Summary | None:
+        return caches[self.alias].get(f"{self.key_prefix}:{key}")
+
+    def set(self, key: str, summary: Summary) -> None:
+        caches[self.alias].set(f"{self.key_prefix}:{key}", summary, timeout=self.ttl)
+
+
+class FileResultCache(BaseResultCache):
+    """Stores every summary as a JSON file, shared by all the processes using the same directory"""
+
+    def __init__(self, directory: str | Path, ttl: float | None = 3600) -> None:
+        self.directory = Path(directory)
+        self.ttl = ttl
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Summary | None:
+        path = self._path(key)
+        try:
+            if self.ttl is not None and time.time() - path.stat().st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            with path.open() as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, summary: Summary) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w") as file:
+                json.dump(summary, file)
+            os.replace(temporary_path, self._path(key))
+        except OSError:
+            logger.warning("Cannot store summary in file cache", key=key, exc_info=True)
+            Path(temporary_path).unlink(missing_ok=True)
+
+
+RESULT_CACHE_BACKENDS: dict[str, type[InMemoryResultCache] | type[DjangoResultCache] | type[FileResultCache]] = {
+    "memory": InMemoryResultCache,
+    "django": DjangoResultCache,
+    "file": FileResultCache,
+}
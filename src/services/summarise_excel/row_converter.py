@@ -1,17 +1,32 @@
 import abc
+import operator
 
-from typing import Any, Mapping, Sequence
+from typing import Any, Callable, Mapping, Sequence
 
-import structlog
 
-
-logger = structlog.getLogger(__name__)
+# Picks the cells of a row at fixed indexes as a tuple, raising IndexError for rows too short to hold them
+RowProjection = Callable[[Sequence], tuple]
 
 
 class UnconvertibleRowError(Exception):
     pass
 
 
+def build_row_projection(column_indexes: Sequence[int]) -> RowProjection:
+    """Return the projection of the cells at the indexes, resolved once rather than looked up by name every row"""
+    if len(column_indexes) == 1:
+        getter = operator.itemgetter(column_indexes[0])
+
+        # A getter of a single index returns the cell itself rather than a tuple
+        def project(row: Sequence) -> tuple:
+            return (getter(row),)
+
+        return project
+    if not column_indexes:
+        return lambda _row: ()
+    return operator.itemgetter(*column_indexes)
+
+
 class BaseRowConverter(abc.ABC):
     @abc.abstractmethod
     def convert(self, row: Sequence, index_mapping: Mapping[str, int]) -> Mapping[str, Any]: ...
@@ -19,9 +34,7 @@ class BaseRowConverter(abc.ABC):
 
 class ExcelRowConverter(BaseRowConverter):
     def convert(self, row: Sequence, index_mapping: Mapping[str, int]) -> Mapping[str, Any]:
-        logger.debug("Converting row", row=row, index_mapping=index_mapping)
         try:
             return {column_name: row[column_index] for column_name, column_index in index_mapping.items()}
         except IndexError:
-            logger.warning("Unconvertible row", row=row, index_mapping=index_mapping)
             raise UnconvertibleRowError
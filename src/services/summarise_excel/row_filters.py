@@ -0,0 +1,322 @@
+import abc
+import datetime
+import functools
+import operator
+import re
+
+from typing import Any, Callable, Mapping, Sequence
+
+from services.summarise_excel.exceptions import InvalidRowFilterError
+
+
+RowPredicate = Callable[[Sequence[Any]], bool]
+
+COMPARISON_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+KEYWORDS = frozenset(["and", "or", "not", "in", "true", "false", "null"])
+KEYWORD_LITERALS = {"true": True, "false": False, "null": None}
+# Parentheses and negations nest the parser calls, so deeper expressions are refused before the recursion limit
+MAX_NESTING_DEPTH = 100
+
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+        |(?P<quoted_name>`[^`]+`)
+        |(?P<date>\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?)?)
+        |(?P<number>-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+        |(?P<operator>==|!=|<=|>=|<|>)
+        |(?P<punctuation>[(),])
+        |(?P<name>[^\W\d]\w*)
+    )
+    """,
+    re.VERBOSE,
+)
+ESCAPE_PATTERN = re.compile(r"\\(.)")
+
+
+class Token:
+    def __init__(self, kind: str, text: str, position: int) -> None:
+        self.kind = kind
+        self.text = text
+        self.position = position
+
+
+def skip_whitespace(expression: str, position: int) -> int:
+    while position < len(expression) and expression[position].isspace():
+        position += 1
+    return position
+
+
+def tokenize(expression: str) -> list[Token]:
+    tokens = []
+    position = skip_whitespace(expression, 0)
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if match is None or match.lastgroup is None:
+            message = f"unexpected character {expression[position]!r} at position {position}"
+            raise InvalidRowFilterError(message)
+        kind, text = match.lastgroup, match.group(match.lastgroup)
+        if kind == "name" and text.lower() in KEYWORDS:
+            kind, text = "keyword", text.lower()
+        tokens.append(Token(kind=kind, text=text, position=position))
+        position = skip_whitespace(expression, match.end())
+    return tokens
+
+
+class FilterNode(abc.ABC):
+    """Node of a parsed filter, compiled into a closure once the column indexes are known"""
+
+    @abc.abstractmethod
+    def column_names(self) -> list[str]: ...
+
+    @abc.abstractmethod
+    def compile(self, index_mapping: Mapping[str, int]) -> RowPredicate: ...
+
+
+def cell_getter(index: int) -> Callable[[Sequence[Any]], Any]:
+    """Return a getter of one cell, rows too short to hold it read as empty cells"""
+
+    def get(row: Sequence[Any]) -> Any:
+        return row[index] if index < len(row) else None
+
+    return get
+
+
+def both(first: RowPredicate, second: RowPredicate) -> RowPredicate:
+    return lambda row: first(row) and second(row)
+
+
+def either(first: RowPredicate, second: RowPredicate) -> RowPredicate:
+    return lambda row: first(row) or second(row)
+
+
+class Comparison(FilterNode):
+    def __init__(self, column_name: str, operator_text: str, value: Any) -> None:
+        self.column_name = column_name
+        self.operator_text = operator_text
+        self.value = value
+
+    def column_names(self) -> list[str]:
+        return [self.column_name]
+
+    def compile(self, index_mapping: Mapping[str, int]) -> RowPredicate:
+        get = cell_getter(index_mapping[self.column_name])
+        compare = COMPARISON_OPERATORS[self.operator_text]
+        value = self.value
+
+        def predicate(row: Sequence[Any]) -> bool:
+            cell = get(row)
+            try:
+                return bool(compare(cell, value))
+            except TypeError:
+                # Cells of another type than the value, e.g. text compared with a number, never match
+                return False
+
+        return predicate
+
+
+class Membership(FilterNode):
+    def __init__(self, column_name: str, values: Sequence[Any], negated: bool = False) -> None:
+        self.column_name = column_name
+        self.values = frozenset(values)
+        self.negated = negated
+
+    def column_names(self) -> list[str]:
+        return [self.column_name]
+
+    def compile(self, index_mapping: Mapping[str, int]) -> RowPredicate:
+        get = cell_getter(index_mapping[self.column_name])
+        values = self.values
+        if self.negated:
+            return lambda row: get(row) not in values
+        return lambda row: get(row) in values
+
+
+class Not(FilterNode):
+    def __init__(self, operand: FilterNode) -> None:
+        self.operand = operand
+
+    def column_names(self) -> list[str]:
+        return self.operand.column_names()
+
+    def compile(self, index_mapping: Mapping[str, int]) -> RowPredicate:
+        operand = self.operand.compile(index_mapping)
+        return lambda row: not operand(row)
+
+
+class And(FilterNode):
+    def __init__(self, operands: list[FilterNode]) -> None:
+        self.operands = operands
+
+    def column_names(self) -> list[str]:
+        return [column_name for operand in self.operands for column_name in operand.column_names()]
+
+    def compile(self, index_mapping: Mapping[str, int]) -> RowPredicate:
+        return functools.reduce(both, [operand.compile(index_mapping) for operand in self.operands])
+
+
+class Or(And):
+    def compile(self, index_mapping: Mapping[str, int]) -> RowPredicate:
+        return functools.reduce(either, [operand.compile(index_mapping) for operand in self.operands])
+
+
+class FilterParser:
+    """
+    Recursive descent parser of filter expressions:
+
+        expression := conjunction ("or" conjunction)*
+        conjunction := negation ("and" negation)*
+        negation := "not" negation | "(" expression ")" | condition
+        condition := column operator literal | column ["not"] "in" "(" literal ("," literal)* ")"
+    """
+
+    def __init__(self, expression: str) -> None:
+        self.tokens = tokenize(expression)
+        self.position = 0
+        self.depth = 0
+
+    def parse(self) -> FilterNode:
+        if not self.tokens:
+            message = "expression is empty"
+            raise InvalidRowFilterError(message)
+        node = self._expression()
+        if self._peek() is not None:
+            raise self._error()
+        return node
+
+    def _peek(self) -> Token | None:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self) -> Token:
+        token = self._peek()
+        if token is None:
+            message = "expression ends unexpectedly"
+            raise InvalidRowFilterError(message)
+        self.position += 1
+        return token
+
+    def _accept(self, kind: str, text: str) -> bool:
+        token = self._peek()
+        if token is not None and token.kind == kind and token.text == text:
+            self.position += 1
+            return True
+        return False
+
+    def _expect(self, kind: str, text: str) -> None:
+        if not self._accept(kind, text):
+            raise self._error(expected=repr(text))
+
+    def _error(self, expected: str | None = None) -> InvalidRowFilterError:
+        """Return the error of the next token, which is not what was expected"""
+        token = self._peek()
+        if token is None:
+            return InvalidRowFilterError("expression ends unexpectedly")
+        reason = f"expected {expected}, got" if expected is not None else "unexpected"
+        return InvalidRowFilterError(f"{reason} {token.text!r} at position {token.position}")
+
+    def _expression(self) -> FilterNode:
+        operands = [self._conjunction()]
+        while self._accept("keyword", "or"):
+            operands.append(self._conjunction())
+        return operands[0] if len(operands) == 1 else Or(operands)
+
+    def _conjunction(self) -> FilterNode:
+        operands = [self._negation()]
+        while self._accept("keyword", "and"):
+            operands.append(self._negation())
+        return operands[0] if len(operands) == 1 else And(operands)
+
+    def _negation(self) -> FilterNode:
+        if self.depth > MAX_NESTING_DEPTH:
+            position = self.tokens[self.position - 1].position
+            message = f"more than {MAX_NESTING_DEPTH} nested parentheses or negations at position {position}"
+            raise InvalidRowFilterError(message)
+        self.depth += 1
+        try:
+            if self._accept("keyword", "not"):
+                return Not(self._negation())
+            if self._accept("punctuation", "("):
+                node = self._expression()
+                self._expect("punctuation", ")")
+                return node
+            return self._condition()
+        finally:
+            self.depth -= 1
+
+    def _condition(self) -> FilterNode:
+        token = self._next()
+        if token.kind == "name":
+            column_name = token.text
+        elif token.kind == "quoted_name":
+            column_name = token.text[1:-1]
+        else:
+            self.position -= 1
+            raise self._error(expected="a column name")
+        if self._accept("keyword", "in"):
+            return Membership(column_name=column_name, values=self._literals())
+        if self._accept("keyword", "not"):
+            self._expect("keyword", "in")
+            return Membership(column_name=column_name, values=self._literals(), negated=True)
+        token = self._next()
+        if token.kind != "operator":
+            self.position -= 1
+            raise self._error(expected="a comparison operator")
+        return Comparison(column_name=column_name, operator_text=token.text, value=self._literal())
+
+    def _literals(self) -> list[Any]:
+        self._expect("punctuation", "(")
+        values = [self._literal()]
+        while self._accept("punctuation", ","):
+            values.append(self._literal())
+        self._expect("punctuation", ")")
+        return values
+
+    def _literal(self) -> Any:
+        token = self._next()
+        if token.kind == "string":
+            return ESCAPE_PATTERN.sub(r"\1", token.text[1:-1])
+        if token.kind == "number":
+            # Integers compare exactly with every numeric cell, other numbers are read as the float cells they match
+            return int(token.text) if token.text.lstrip("-").isdigit() else float(token.text)
+        if token.kind == "date":
+            try:
+                return datetime.datetime.fromisoformat(token.text)
+            except ValueError:
+                message = f"invalid date {token.text!r} at position {token.position}"
+                raise InvalidRowFilterError(message)
+        if token.kind == "keyword" and token.text in KEYWORD_LITERALS:
+            return KEYWORD_LITERALS[token.text]
+        self.position -= 1
+        raise self._error(expected="a value")
+
+
+class RowFilter:
+    """
+    Filter of rows parsed from an expression such as `Status == "Paid" and Date >= 2026-01-01`.
+    It is parsed once and compiled into a closure over the raw cells of a row once the column row is found,
+    so that rows it rejects are skipped before they are converted or processed.
+    """
+
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        self.root = FilterParser(expression).parse()
+
+    @property
+    def column_names(self) -> list[str]:
+        return list(dict.fromkeys(self.root.column_names()))
+
+    def compile(self, column_row: Sequence[Any]) -> RowPredicate:
+        column_names = self.column_names
+        index_mapping = {
+            column_name: column_index
+            for column_index, column_name in enumerate(column_row)
+            if column_name in column_names
+        }
+        return self.root.compile(index_mapping)
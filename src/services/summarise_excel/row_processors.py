@@ -1,15 +1,10 @@
 import abc
 
-from typing import Any, Mapping
-
-import structlog
+from typing import Any, Mapping, Sequence
 
 from services.summarise_excel.value_processors import BaseValueProcessor, ColumnValueUnprocessableError
 
 
-logger = structlog.getLogger(__name__)
-
-
 class UnprocessableRowError(Exception):
     pass
 
@@ -18,18 +13,26 @@ class BaseRowProcessor(abc.ABC):
     @abc.abstractmethod
     def process(self, row_dict: Mapping[str, Any]) -> dict[str, Any]: ...
 
+    @abc.abstractmethod
+    def process_values(self, values: Sequence) -> tuple: ...
+
 
 class ExcelRowProcessor(BaseRowProcessor):
     def __init__(self, value_processor: BaseValueProcessor) -> None:
         self.value_processor = value_processor
 
     def process(self, row_dict: Mapping[str, Any]) -> dict[str, Any]:
-        logger.debug("Processing row", row_dict=row_dict)
         try:
             return {
                 column_name: self.value_processor.process(column_value)
                 for column_name, column_value in row_dict.items()
             }
         except (ColumnValueUnprocessableError, IndexError):
-            logger.warning("Failed to process row", row_dict=row_dict, exc_info=True)
+            raise UnprocessableRowError
+
+    def process_values(self, values: Sequence) -> tuple:
+        """Process the cells of a row by position, without building a dict of them"""
+        try:
+            return tuple(map(self.value_processor.process, values))
+        except (ColumnValueUnprocessableError, IndexError):
             raise UnprocessableRowError
@@ -0,0 +1,268 @@
+import math
+import random
+import statistics
+
+from decimal import Decimal
+from typing import IO, Any, Sequence
+
+import structlog
+
+from services.summarise_excel.column_row_finder import (
+    DEFAULT_MAX_HEADER_SCAN_ROWS,
+    BaseColumnRowFinder,
+    ExcelColumnRowFinder,
+    FixedColumnRowFinder,
+)
+from services.summarise_excel.file_readers import (
+    BaseFileReader,
+    CountingFileReader,
+    ReservoirFileReader,
+    StrideFileReader,
+)
+from services.summarise_excel.generator_factory import (
+    FILE_READER_XLSX,
+    SUMMARY_ENGINE_DECIMAL,
+    build_reader_summary_generator,
+    open_file_reader,
+)
+from services.summarise_excel.metrics import STAGE_HEADER_SEARCH
+from services.summarise_excel.row_filters import RowFilter
+from services.summarise_excel.summary_generator import (
+    AGGREGATE_AVG,
+    AGGREGATE_COUNT,
+    AGGREGATE_SUM,
+    AGGREGATE_VARIANCE,
+    DEFAULT_AGGREGATES,
+    NOT_AVAILABLE,
+    BaseSummaryGenerator,
+    ColumnResult,
+)
+from services.summarise_excel.summary_stats import SummaryStats
+
+
+logger = structlog.getLogger(__name__)
+
+SAMPLE_METHOD_STRIDE = "stride"
+SAMPLE_METHOD_RESERVOIR = "reservoir"
+SAMPLE_METHODS = [SAMPLE_METHOD_STRIDE, SAMPLE_METHOD_RESERVOIR]
+# Aggregates which can be estimated from a sample
+SAMPLE_AGGREGATES = [AGGREGATE_SUM, AGGREGATE_AVG]
+DEFAULT_SAMPLE_ROWS = 10000
+DEFAULT_CONFIDENCE = 0.95
+# The sample keeps the moments of the values, from which the intervals are estimated
+SAMPLE_COLUMN_AGGREGATES = (AGGREGATE_SUM, AGGREGATE_COUNT, AGGREGATE_VARIANCE)
+
+
+def z_score(confidence: float) -> Decimal:
+    """Return the bound of the normal distribution holding `confidence` of it around its mean"""
+    return Decimal(repr(statistics.NormalDist().inv_cdf(0.5 + confidence / 2)))
+
+
+def estimate_column(
+    column_result: ColumnResult,
+    rows_examined: int,
+    rows_total: Decimal,
+    fraction: Decimal,
+    z: Decimal,
+    aggregates: Sequence[str] = DEFAULT_AGGREGATES,
+) -> dict[str, Any]:
+    """
+    Return the estimated sum and average of a column with the bounds of their confidence intervals, from its
+    values in a sample of `rows_examined` rows out of `rows_total`. The sum counts the rows without a value as 0.
+    """
+    count = column_result.count
+    total = column_result.total_value
+    # Finite population correction, the intervals shrink to the estimates once every row is examined
+    correction = max(Decimal(1) - fraction, Decimal(0))
+    estimate: dict[str, Any] = {"column": column_result.name}
+    if AGGREGATE_SUM in aggregates:
+        low = high = value = None
+        if count:
+            value = total * rows_total / rows_examined
+            low = high = value
+            if correction and rows_examined > 1:
+                squares = column_result.m2 + total * total / count
+                variance = max(squares - total * total / rows_examined, Decimal(0)) / (rows_examined - 1)
+                margin = z * rows_total * (correction * variance / rows_examined).sqrt()
+                low, high = value - margin, value + margin
+        estimate.update(format_estimate(AGGREGATE_SUM, value, low, high))
+    if AGGREGATE_AVG in aggregates:
+        low = high = value = None
+        if count:
+            value = total / count
+            low = high = value
+            sample_variance = column_result.variance()
+            if correction and sample_variance is not None:
+                margin = z * (correction * sample_variance / count).sqrt()
+                low, high = value - margin, value + margin
+        estimate.update(format_estimate(AGGREGATE_AVG, value, low, high))
+    estimate[AGGREGATE_COUNT] = count
+    return estimate
+
+
+def format_estimate(aggregate: str, value: Decimal | None, low: Decimal | None, high: Decimal | None) -> dict[str, str]:
+    return {
+        aggregate: str(value) if value is not None else NOT_AVAILABLE,
+        f"{aggregate}_low": str(low) if low is not None else NOT_AVAILABLE,
+        f"{aggregate}_high": str(high) if high is not None else NOT_AVAILABLE,
+    }
+
+
+class SampledSummaryGenerator(BaseSummaryGenerator):
+    """
+    Estimates the sum and average of the columns from a sample of the rows after the column row, either a fixed
+    number of rows or a fraction of them. Stride sampling examines every n-th row from a random start, skipping
+    the other rows of xlsx sheets without parsing them. Reservoir sampling reads every row and keeps a uniform
+    random sample of them, which is slower but not biased by values repeating with a period of rows.
+    Only xlsx sheets storing their dimension are sampled faster than they are read, the rows of other files are all
+    parsed. The intervals are those of the normal approximation.
+    """
+
+    def __init__(
+        self,
+        file: str | IO[bytes],
+        sheet: str | None = None,
+        engine: str = SUMMARY_ENGINE_DECIMAL,
+        file_reader: str = FILE_READER_XLSX,
+        supported_currencies: list[str] | None = None,
+        column_row_finder: BaseColumnRowFinder | None = None,
+        aggregates: Sequence[str] = DEFAULT_AGGREGATES,
+        row_filter: str | None = None,
+        header_row: int | None = None,
+        max_header_scan_rows: int | None = DEFAULT_MAX_HEADER_SCAN_ROWS,
+        method: str = SAMPLE_METHOD_STRIDE,
+        sample_rows: int | None = None,
+        sample_fraction: float | None = None,
+        confidence: float = DEFAULT_CONFIDENCE,
+        seed: int | None = None,
+    ) -> None:
+        self.file = file
+        self.sheet = sheet
+        self.engine = engine
+        self.file_reader = file_reader
+        self.supported_currencies = supported_currencies
+        self.column_row_finder = column_row_finder or ExcelColumnRowFinder(
+            max_scan_rows=max_header_scan_rows, header_row=header_row
+        )
+        self.aggregates = aggregates
+        self.row_filter = RowFilter(row_filter) if row_filter else None
+        self.method = method
+        self.sample_rows = (
+            sample_rows if sample_rows is not None or sample_fraction is not None else DEFAULT_SAMPLE_ROWS
+        )
+        self.sample_fraction = sample_fraction
+        self.confidence = confidence
+        self.generator = random.Random(seed)
+        self.stats: SummaryStats | None = None
+        # Rows of the sheet the sample stands for, and the share of them examined, known once the sample is read
+        self.rows_total = Decimal(0)
+        self.fraction = Decimal(1)
+
+    def generate_column_results(self, column_names: Sequence[str]) -> list[ColumnResult]:
+        """Return the results of the columns over the sample, before they are scaled to the whole sheet"""
+        header_stats = SummaryStats()
+        reader = open_file_reader(file=self.file, file_reader=self.file_reader, sheet=self.sheet)
+        counting_reader = CountingFileReader(file_reader=reader)
+        with header_stats.stages.stage(STAGE_HEADER_SEARCH):
+            column_row, rows = self.column_row_finder.find(
+                file_reader=counting_reader, column_names=self.header_column_names(column_names)
+            )
+        first_row = counting_reader.rows_read + 1
+        # Closes the file, the sample is read anew from the first row after the column row
+        del rows
+
+        row_count = reader.row_count()
+        # Data rows after the column row, when the file tells the size of the sheet
+        data_rows = max(row_count - first_row + 1, 0) if row_count is not None else None
+        sample_reader = self._build_sample_reader(reader=reader, first_row=first_row, data_rows=data_rows)
+        generator = build_reader_summary_generator(
+            file_reader=sample_reader,
+            engine=self.engine,
+            supported_currencies=self.supported_currencies,
+            column_row_finder=FixedColumnRowFinder(column_row=column_row),
+            aggregates=SAMPLE_COLUMN_AGGREGATES,
+            row_filter=self.row_filter,
+        )
+        column_results = generator.generate_column_results(column_names=column_names)
+        self.stats = stats = generator.stats or SummaryStats()
+        stats.stages.update(header_stats.stages)
+
+        rows_examined = stats.rows_scanned
+        if isinstance(sample_reader, StrideFileReader) and data_rows:
+            self.rows_total = Decimal(data_rows)
+            self.fraction = Decimal(rows_examined) / data_rows
+        elif isinstance(sample_reader, StrideFileReader):
+            # Only a fraction given for a sheet of unknown size is sampled by stride, every row stands for a stride
+            self.rows_total = Decimal(rows_examined * sample_reader.stride)
+            self.fraction = Decimal(1) / sample_reader.stride
+        elif isinstance(sample_reader, ReservoirFileReader):
+            self.rows_total = Decimal(sample_reader.rows_read)
+            self.fraction = Decimal(rows_examined) / sample_reader.rows_read if sample_reader.rows_read else Decimal(1)
+        logger.info(
+            "Finished sampling summary",
+            method=self.method,
+            rows_examined=rows_examined,
+            rows_total=int(self.rows_total),
+        )
+        return column_results
+
+    def _build_sample_reader(
+        self, reader: BaseFileReader, first_row: int, data_rows: int | None
+    ) -> StrideFileReader | ReservoirFileReader:
+        """
+        Return the reader of the sample. A number of rows is turned into a stride, and a fraction into a reservoir
+        size, from the size of the sheet its file tells. Files which do not tell it are sampled the other way, so
+        a number of rows of files other than xlsx sheets storing their dimension is sampled by reading every row.
+        """
+        method = self.method
+        if method == SAMPLE_METHOD_STRIDE and self.sample_fraction is None and data_rows is None:
+            method = SAMPLE_METHOD_RESERVOIR
+        elif method == SAMPLE_METHOD_RESERVOIR and self.sample_rows is None and data_rows is None:
+            method = SAMPLE_METHOD_STRIDE
+        if method != self.method:
+            logger.info("Sheet size unknown, sampling with another method", requested=self.method, method=method)
+            self.method = method
+
+        if method == SAMPLE_METHOD_STRIDE:
+            if self.sample_fraction is not None:
+                stride = max(1, round(1 / self.sample_fraction))
+            else:
+                stride = max(1, math.ceil((data_rows or 0) / (self.sample_rows or DEFAULT_SAMPLE_ROWS)))
+            return StrideFileReader(
+                file_reader=reader, stride=stride, start=self.generator.randrange(stride), first_row=first_row
+            )
+        if self.sample_rows is not None:
+            size = self.sample_rows
+        else:
+            size = max(1, math.ceil((data_rows or 0) * (self.sample_fraction or 1)))
+        return ReservoirFileReader(file_reader=reader, size=size, first_row=first_row, generator=self.generator)
+
+    def generate(self, column_names: Sequence[str]) -> list[dict[str, Any]]:
+        column_results = self.generate_column_results(column_names)
+        z = z_score(self.confidence)
+        rows_examined = self.stats.rows_scanned if self.stats is not None else 0
+        return [
+            estimate_column(
+                column_result,
+                rows_examined=rows_examined,
+                rows_total=self.rows_total,
+                fraction=self.fraction,
+                z=z,
+                aggregates=self.aggregates,
+            )
+            for column_result in column_results
+        ]
+
+    def generate_summary(self, column_names: Sequence[str]) -> dict[str, Any]:
+        """Return the estimated summary of the columns, with how the rows were sampled"""
+        summary = self.generate(column_names)
+        return {
+            "summary": summary,
+            "sample": {
+                "method": self.method,
+                "rows_examined": self.stats.rows_scanned if self.stats is not None else 0,
+                "rows_total": int(self.rows_total),
+                "fraction": round(float(self.fraction), 6),
+                "confidence": self.confidence,
+            },
+        }
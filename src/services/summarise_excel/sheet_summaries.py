@@ -0,0 +1,156 @@
+import os
+
+from typing import IO, Any, Callable, Sequence
+
+import structlog
+
+from services.summarise_excel.exceptions import BaseExcelSummaryError, SheetNotFoundError
+from services.summarise_excel.generator_factory import FILE_READER_XLSX, build_summary_generator, open_file_reader
+from services.summarise_excel.summary_generator import ColumnGroups, ColumnResult
+from services.summarise_excel.worker_pool import WorkerPool, borrow_worker_pool
+
+
+logger = structlog.getLogger(__name__)
+
+ALL_SHEETS = "*"
+
+
+class SheetsProgress:
+    """Adds up the rows read in sheets summarised in turn"""
+
+    def __init__(self, callback: Callable[[int], None]) -> None:
+        self.callback = callback
+        self.rows_read_before = 0
+        self.rows_read = 0
+
+    def __call__(self, rows_read: int) -> None:
+        self.rows_read = rows_read
+        self.callback(self.rows_read_before + rows_read)
+
+    def next_sheet(self) -> None:
+        self.rows_read_before += self.rows_read
+        self.rows_read = 0
+
+
+def resolve_sheet_names(file: str | IO[bytes], sheets: Sequence[str], file_reader: str = FILE_READER_XLSX) -> list[str]:
+    """Return the requested sheet names in workbook order for "*", or in the requested order otherwise"""
+    sheet_names = open_file_reader(file=file, file_reader=file_reader).sheet_names()
+    if list(sheets) == [ALL_SHEETS]:
+        return sheet_names
+    for sheet in sheets:
+        if sheet not in sheet_names:
+            raise SheetNotFoundError(sheet)
+    return list(dict.fromkeys(sheets))
+
+
+def summarise_sheet(
+    file: str | IO[bytes], sheet: str, column_names: Sequence[str], options: dict[str, Any]
+) -> tuple[list[ColumnResult] | None, ColumnGroups | None, str | None]:
+    """Return the column results and groups of one sheet, or why they cannot be generated. Runs in a worker process."""
+    try:
+        # Building the generator opens the file, whose format may not be readable
+        generator = build_summary_generator(file=file, sheet=sheet, **options)
+        return generator.generate_column_results(column_names=column_names), generator.groups, None
+    except BaseExcelSummaryError as e:
+        return None, None, e.detail
+    except Exception:
+        # One broken sheet must not fail the other sheets of the workbook
+        logger.exception("Sheet summary failed", sheet=sheet)
+        return None, None, "Unexpected processing error"
+
+
+def calculate_part_summary(
+    name: str,
+    column_results: list[ColumnResult] | None,
+    groups: ColumnGroups | None,
+    detail: str | None,
+    key: str,
+) -> dict[str, Any]:
+    """Calculate the summary of one part, e.g. a sheet or a file, or tell why it cannot be summarised"""
+    if column_results is None:
+        logger.info("Part cannot be summarised", **{key: name}, detail=detail)
+        return {key: name, "summary": None, "detail": detail}
+    part_summary: dict[str, Any] = {
+        key: name,
+        "summary": [column_result.calculate() for column_result in column_results],
+    }
+    if groups is not None:
+        part_summary["groups"] = groups.calculate()
+    part_summary["detail"] = None
+    return part_summary
+
+
+def merge_summaries(
+    names: Sequence[str],
+    outcomes: Sequence[tuple[list[ColumnResult] | None, ColumnGroups | None, str | None]],
+    key: str,
+) -> dict[str, Any]:
+    """
+    Calculate the summary of every part, e.g. a sheet or a file, and total the columns over the parts which could be
+    summarised. The total summary is None when no part could be summarised, the parts are listed under `key`s.
+    """
+    # The results of the first part which could be summarised, once calculated, collect the totals
+    total: list[ColumnResult] | None = None
+    total_groups: ColumnGroups | None = None
+    part_summaries: list[dict[str, Any]] = []
+    for name, (column_results, groups, detail) in zip(names, outcomes):
+        part_summaries.append(calculate_part_summary(name, column_results, groups, detail, key=key))
+        if column_results is None:
+            continue
+        if total is None:
+            total, total_groups = column_results, groups
+            continue
+        for total_result, column_result in zip(total, column_results):
+            total_result.merge(column_result)
+        if total_groups is not None and groups is not None:
+            total_groups.merge(groups)
+    summary: dict[str, Any] = {"summary": None}
+    if total is not None:
+        summary["summary"] = [total_result.calculate() for total_result in total]
+    if total_groups is not None:
+        summary["groups"] = total_groups.calculate()
+    summary[f"{key}s"] = part_summaries
+    return summary
+
+
+def summarise_sheets(
+    file: str | IO[bytes],
+    sheets: Sequence[str],
+    column_names: Sequence[str],
+    max_workers: int = 1,
+    progress_callback: Callable[[int], None] | None = None,
+    worker_pool: WorkerPool | None = None,
+    **options: Any,
+) -> dict[str, Any]:
+    """
+    Summarise every sheet and total the columns over the sheets which could be summarised.
+    Sheets are separate parts of the xlsx package, so files on disk are summarised in `worker_pool`, shared between
+    summaries, or in a pool of `max_workers` processes, capped by the CPU count. Progress is only reported when
+    sheets are summarised in turn.
+    """
+    sheet_names = resolve_sheet_names(
+        file=file, sheets=sheets, file_reader=options.get("file_reader", FILE_READER_XLSX)
+    )
+    max_workers = min(max_workers, os.cpu_count() or 1, len(sheet_names))
+    if max_workers > 1 and isinstance(file, str) and progress_callback is None:
+        logger.debug("Summarising sheets in worker processes", sheets=sheet_names, max_workers=max_workers)
+        with borrow_worker_pool(worker_pool, max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(summarise_sheet, file=file, sheet=sheet, column_names=column_names, options=options)
+                for sheet in sheet_names
+            ]
+            outcomes = [future.result() for future in futures]
+    else:
+        progress = SheetsProgress(callback=progress_callback) if progress_callback is not None else None
+        outcomes = []
+        for sheet in sheet_names:
+            sheet_options = dict(options, progress_callback=progress) if progress is not None else options
+            outcomes.append(summarise_sheet(file, sheet, column_names, sheet_options))
+            if progress is not None:
+                progress.next_sheet()
+
+    summary = merge_summaries(names=sheet_names, outcomes=outcomes, key="sheet")
+    if summary["summary"] is None:
+        details = "; ".join(f"{summary['sheet']}: {summary['detail']}" for summary in summary["sheets"])
+        raise BaseExcelSummaryError(details or "Workbook has no sheets")
+    return summary
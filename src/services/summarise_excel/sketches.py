@@ -0,0 +1,161 @@
+import math
+import random
+
+from decimal import Decimal
+from typing import Iterable
+
+import numpy as np
+
+
+DEFAULT_QUANTILE_SKETCH_SIZE = 200
+DEFAULT_DISTINCT_SKETCH_PRECISION = 14
+MIN_DISTINCT_SKETCH_PRECISION = 4
+MAX_DISTINCT_SKETCH_PRECISION = 16
+
+# Capacity ratio of consecutive compactors of the quantile sketch
+COMPACTOR_CAPACITY_RATIO = 2 / 3
+MASK_64 = (1 << 64) - 1
+
+Number = Decimal | int | float
+
+
+class QuantileSketch:
+    """
+    KLL sketch of the values of a column: values are kept in compactors of geometrically decreasing capacity,
+    a full compactor keeps every other one of its sorted values at the next level with twice the weight.
+    Holds about 3 * `size` values whatever the count of values added, sketches of the same size can be merged.
+    """
+
+    def __init__(self, size: int = DEFAULT_QUANTILE_SKETCH_SIZE, seed: int = 0) -> None:
+        self.size = size
+        self.compactors: list[list[Number]] = []
+        self.count = 0
+        self._stored = 0
+        self._max_stored = 0
+        # Seeded, so that the same values always give the same quantiles
+        self._random = random.Random(seed)
+        self._grow()
+
+    @property
+    def rank_error(self) -> float:
+        """Normalised rank error of the quantiles, with 99% confidence"""
+        return 2.296 / self.size**0.9723
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, math.ceil(COMPACTOR_CAPACITY_RATIO**depth * self.size))
+
+    def _grow(self) -> None:
+        self.compactors.append([])
+        self._max_stored = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def add(self, value: Number) -> None:
+        self.compactors[0].append(value)
+        self.count += 1
+        self._stored += 1
+        if self._stored >= self._max_stored:
+            self._compress()
+
+    def update(self, values: Iterable[Number]) -> None:
+        for value in values:
+            self.add(value)
+
+    def _compress(self) -> None:
+        while self._stored >= self._max_stored:
+            for level, compactor in enumerate(self.compactors):
+                if len(compactor) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self._grow()
+                    compactor.sort()
+                    # An odd value out stays at its level
+                    kept = compactor.pop() if len(compactor) % 2 else None
+                    self.compactors[level + 1].extend(compactor[self._random.randint(0, 1) :: 2])
+                    self._stored -= len(compactor) // 2
+                    compactor.clear()
+                    if kept is not None:
+                        compactor.append(kept)
+                    break
+
+    def merge(self, other: "QuantileSketch") -> None:
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for compactor, other_compactor in zip(self.compactors, other.compactors):
+            compactor.extend(other_compactor)
+        self.count += other.count
+        self._stored = sum(len(compactor) for compactor in self.compactors)
+        self._compress()
+
+    def quantile(self, fraction: float) -> Number | None:
+        """Return the value whose rank is closest to `fraction` of the values, None without values"""
+        if not self.count:
+            return None
+        weighted_values = sorted(
+            (value, 1 << level) for level, compactor in enumerate(self.compactors) for value in compactor
+        )
+        rank = fraction * self.count
+        cumulative_weight = 0
+        for value, weight in weighted_values:
+            cumulative_weight += weight
+            if cumulative_weight >= rank:
+                return value
+        return weighted_values[-1][0]
+
+
+def mix_hash(value: Number) -> int:
+    """Spread the bits of the hash of a number over 64 bits, equal numbers of any type having the same hash"""
+    mixed = (hash(value) + 0x9E3779B97F4A7C15) & MASK_64
+    mixed = ((mixed ^ (mixed >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    mixed = ((mixed ^ (mixed >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return mixed ^ (mixed >> 31)
+
+
+class DistinctCountSketch:
+    """
+    HyperLogLog sketch counting the distinct values of a column in 2 ** `precision` one-byte registers.
+    Sketches of the same precision are merged by keeping the highest of every register.
+    """
+
+    def __init__(self, precision: int = DEFAULT_DISTINCT_SKETCH_PRECISION) -> None:
+        if not MIN_DISTINCT_SKETCH_PRECISION <= precision <= MAX_DISTINCT_SKETCH_PRECISION:
+            message = f"Precision must be between {MIN_DISTINCT_SKETCH_PRECISION} and {MAX_DISTINCT_SKETCH_PRECISION}"
+            raise ValueError(message)
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self._value_bits = 64 - precision
+        self._value_mask = (1 << self._value_bits) - 1
+
+    @property
+    def relative_error(self) -> float:
+        """Standard error of the distinct count, relative to it"""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, value: Number) -> None:
+        hashed = mix_hash(value)
+        register = hashed >> self._value_bits
+        # Position of the first set bit of the rest of the hash
+        rank = self._value_bits - (hashed & self._value_mask).bit_length() + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def update(self, values: Iterable[Number]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "DistinctCountSketch") -> None:
+        self.registers = bytearray(
+            np.maximum(np.frombuffer(self.registers, dtype=np.uint8), np.frombuffer(other.registers, dtype=np.uint8))
+        )
+
+    def estimate(self) -> int:
+        register_count = len(self.registers)
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        if register_count >= 128:
+            alpha = 0.7213 / (1 + 1.079 / register_count)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[register_count]
+        estimate = alpha * register_count**2 / float(np.sum(np.ldexp(1.0, -registers.astype(np.int32))))
+        empty_registers = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * register_count and empty_registers:
+            # Linear counting is more accurate for small counts
+            estimate = register_count * math.log(register_count / empty_registers)
+        return round(estimate)
@@ -1,40 +1,376 @@
 import abc
+import logging
 
 from decimal import Decimal
-from typing import Any, Sequence
+from typing import Any, Callable, Mapping, Sequence
 
 import structlog
 
 from services.summarise_excel.column_row_finder import BaseColumnRowFinder
-from services.summarise_excel.file_readers import BaseFileReader
-from services.summarise_excel.row_converter import BaseRowConverter, UnconvertibleRowError
+from services.summarise_excel.exceptions import TooManyGroupsError
+from services.summarise_excel.file_readers import BaseFileReader, ColumnProjection
+from services.summarise_excel.metrics import STAGE_HEADER_SEARCH, STAGE_ROWS
+from services.summarise_excel.row_converter import BaseRowConverter, build_row_projection
+from services.summarise_excel.row_filters import RowFilter
 from services.summarise_excel.row_processors import BaseRowProcessor, UnprocessableRowError
+from services.summarise_excel.sketches import (
+    DEFAULT_DISTINCT_SKETCH_PRECISION,
+    DEFAULT_QUANTILE_SKETCH_SIZE,
+    DistinctCountSketch,
+    Number,
+    QuantileSketch,
+)
+from services.summarise_excel.summary_stats import SummaryStats
 
 
 logger = structlog.getLogger(__name__)
 
 
+AGGREGATE_SUM = "sum"
+AGGREGATE_AVG = "avg"
+AGGREGATE_MIN = "min"
+AGGREGATE_MAX = "max"
+AGGREGATE_COUNT = "count"
+AGGREGATE_NULLS = "nulls"
+AGGREGATE_INVALID = "invalid"
+AGGREGATE_VARIANCE = "variance"
+AGGREGATE_STDDEV = "stddev"
+AGGREGATE_MEDIAN = "median"
+AGGREGATE_P90 = "p90"
+AGGREGATE_P99 = "p99"
+AGGREGATE_DISTINCT = "distinct"
+QUANTILE_AGGREGATES = {AGGREGATE_MEDIAN: 0.5, AGGREGATE_P90: 0.9, AGGREGATE_P99: 0.99}
+AGGREGATES = [
+    AGGREGATE_SUM,
+    AGGREGATE_AVG,
+    AGGREGATE_MIN,
+    AGGREGATE_MAX,
+    AGGREGATE_COUNT,
+    AGGREGATE_NULLS,
+    AGGREGATE_INVALID,
+    AGGREGATE_VARIANCE,
+    AGGREGATE_STDDEV,
+    AGGREGATE_MEDIAN,
+    AGGREGATE_P90,
+    AGGREGATE_P99,
+    AGGREGATE_DISTINCT,
+]
+DEFAULT_AGGREGATES = (AGGREGATE_SUM, AGGREGATE_AVG)
+NOT_AVAILABLE = "N/A"
+DEFAULT_MAX_GROUPS = 10000
+# Error bounds of the sketches, returned with the approximate aggregates
+QUANTILE_RANK_ERROR = "quantile_rank_error"
+DISTINCT_RELATIVE_ERROR = "distinct_relative_error"
+ERROR_BOUND_DIGITS = 4
+DEFAULT_PROGRESS_HOOK_INTERVAL = 10000
+
+# Called every `progress_hook_interval` rows with the counters and the running results of the columns
+ProgressHook = Callable[[SummaryStats, list["ColumnResult"]], None]
+
+
+def is_null(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
 class ColumnResult:
-    def __init__(self, name: str) -> None:
+    """
+    Running aggregates of one column. Extremes, the variance and the sketches of quantiles and distinct values
+    are only kept when they are requested, and results of the same column collected separately, e.g. in chunks,
+    row ranges or sheets, can be merged.
+    """
+
+    # Added to for every value of the column, so its attributes are slots rather than a dict of the instance
+    __slots__ = (
+        "name",
+        "aggregates",
+        "total_value",
+        "count",
+        "min_value",
+        "max_value",
+        "null_count",
+        "invalid_count",
+        "mean",
+        "m2",
+        "tracks_extremes",
+        "tracks_variance",
+        "tracks_invalid",
+        "quantiles",
+        "distinct",
+        "tracks_sketches",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        aggregates: Sequence[str] = DEFAULT_AGGREGATES,
+        quantile_sketch_size: int = DEFAULT_QUANTILE_SKETCH_SIZE,
+        distinct_sketch_precision: int = DEFAULT_DISTINCT_SKETCH_PRECISION,
+    ) -> None:
         self.name = name
+        self.aggregates = tuple(dict.fromkeys(aggregates))
         self.total_value: Decimal = Decimal(0)
         self.count: int = 0
+        self.min_value: Decimal | None = None
+        self.max_value: Decimal | None = None
+        self.null_count: int = 0
+        self.invalid_count: int = 0
+        # Running mean and sum of squared differences from it, updated with Welford's algorithm
+        self.mean: Decimal = Decimal(0)
+        self.m2: Decimal = Decimal(0)
+        self.tracks_extremes = AGGREGATE_MIN in self.aggregates or AGGREGATE_MAX in self.aggregates
+        self.tracks_variance = AGGREGATE_VARIANCE in self.aggregates or AGGREGATE_STDDEV in self.aggregates
+        self.tracks_invalid = AGGREGATE_NULLS in self.aggregates or AGGREGATE_INVALID in self.aggregates
+        self.quantiles: QuantileSketch | None = None
+        if any(aggregate in QUANTILE_AGGREGATES for aggregate in self.aggregates):
+            self.quantiles = QuantileSketch(size=quantile_sketch_size)
+        self.distinct: DistinctCountSketch | None = None
+        if AGGREGATE_DISTINCT in self.aggregates:
+            self.distinct = DistinctCountSketch(precision=distinct_sketch_precision)
+        self.tracks_sketches = self.quantiles is not None or self.distinct is not None
 
     def add(self, value: Decimal) -> None:
         self.total_value += value
         self.count += 1
+        if self.tracks_extremes:
+            if self.min_value is None or value < self.min_value:
+                self.min_value = value
+            if self.max_value is None or value > self.max_value:
+                self.max_value = value
+        if self.tracks_variance:
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+        if self.tracks_sketches:
+            self.add_to_sketches([value])
 
-    def calculate(self) -> dict[str, str]:
-        return {
-            "column": self.name,
-            "sum": str(self.total_value) if self.count else "N/A",
-            "avg": str(self.total_value / self.count) if self.count else "N/A",
+    def add_to_sketches(self, values: Sequence[Number]) -> None:
+        """Add values to the sketches only, their other aggregates being added with `add_chunk`"""
+        if self.quantiles is not None:
+            self.quantiles.update(values)
+        if self.distinct is not None:
+            self.distinct.update(values)
+
+    def add_invalid(self, value: Any) -> None:
+        """Count a value of the column which cannot be summarised"""
+        if is_null(value):
+            self.null_count += 1
+        else:
+            self.invalid_count += 1
+
+    def add_chunk(
+        self,
+        total_value: Decimal,
+        count: int,
+        min_value: Decimal | None = None,
+        max_value: Decimal | None = None,
+        m2: Decimal = Decimal(0),
+    ) -> None:
+        """Add the aggregates of `count` values, `m2` being the sum of their squared differences from their mean"""
+        if not count:
+            return
+        if self.tracks_variance:
+            # Chan's formula for combining the moments of two sets of values
+            chunk_mean = total_value / count
+            combined_count = self.count + count
+            delta = chunk_mean - self.mean
+            self.mean += delta * count / combined_count
+            self.m2 += m2 + delta * delta * self.count * count / combined_count
+        self.total_value += total_value
+        self.count += count
+        if self.tracks_extremes:
+            if min_value is not None and (self.min_value is None or min_value < self.min_value):
+                self.min_value = min_value
+            if max_value is not None and (self.max_value is None or max_value > self.max_value):
+                self.max_value = max_value
+
+    def merge(self, other: "ColumnResult") -> None:
+        """Add the values collected by another result of the same column, e.g. in another sheet"""
+        self.add_chunk(
+            total_value=other.total_value,
+            count=other.count,
+            min_value=other.min_value,
+            max_value=other.max_value,
+            m2=other.m2,
+        )
+        self.null_count += other.null_count
+        self.invalid_count += other.invalid_count
+        if self.quantiles is not None and other.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        if self.distinct is not None and other.distinct is not None:
+            self.distinct.merge(other.distinct)
+
+    def variance(self) -> Decimal | None:
+        """Sample variance of the values, None below two values"""
+        if self.count < 2:
+            return None
+        return self.m2 / (self.count - 1)
+
+    def calculate(self) -> dict[str, Any]:
+        result: dict[str, Any] = {"column": self.name}
+        for aggregate in self.aggregates:
+            result[aggregate] = self._calculate_aggregate(aggregate)
+        if self.quantiles is not None:
+            result[QUANTILE_RANK_ERROR] = round(self.quantiles.rank_error, ERROR_BOUND_DIGITS)
+        if self.distinct is not None:
+            result[DISTINCT_RELATIVE_ERROR] = round(self.distinct.relative_error, ERROR_BOUND_DIGITS)
+        return result
+
+    def _calculate_aggregate(self, aggregate: str) -> str | int:
+        if aggregate == AGGREGATE_COUNT:
+            return self.count
+        if aggregate == AGGREGATE_NULLS:
+            return self.null_count
+        if aggregate == AGGREGATE_INVALID:
+            return self.invalid_count
+        if aggregate == AGGREGATE_DISTINCT and self.distinct is not None:
+            return self.distinct.estimate()
+        value: Number | None = None
+        if aggregate == AGGREGATE_SUM:
+            value = self.total_value if self.count else None
+        elif aggregate == AGGREGATE_AVG:
+            value = self.total_value / self.count if self.count else None
+        elif aggregate == AGGREGATE_MIN:
+            value = self.min_value
+        elif aggregate == AGGREGATE_MAX:
+            value = self.max_value
+        elif aggregate == AGGREGATE_VARIANCE:
+            value = self.variance()
+        elif aggregate == AGGREGATE_STDDEV:
+            variance = self.variance()
+            value = variance.sqrt() if variance is not None else None
+        elif aggregate in QUANTILE_AGGREGATES and self.quantiles is not None:
+            value = self.quantiles.quantile(QUANTILE_AGGREGATES[aggregate])
+        return str(Decimal(value)) if value is not None else NOT_AVAILABLE
+
+
+def format_group_value(value: Any) -> Any:
+    """Return a cell value of a group key as a JSON value"""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+class ColumnGroups:
+    """
+    Results of the columns for every distinct key of the group columns, built while the rows are streamed.
+    At most `max_groups` groups are kept, and only the `top` groups holding the most rows are calculated.
+    """
+
+    def __init__(
+        self,
+        group_by: Sequence[str],
+        column_names: Sequence[str],
+        max_groups: int = DEFAULT_MAX_GROUPS,
+        top: int | None = None,
+        **column_options: Any,
+    ) -> None:
+        self.group_by = list(group_by)
+        self.column_names = list(dict.fromkeys(column_names))
+        self.max_groups = max_groups
+        self.top = top
+        self.column_options = column_options
+        self.groups: dict[tuple, dict[str, ColumnResult]] = {}
+
+    def get(self, key: tuple) -> dict[str, ColumnResult]:
+        """Return the results of the group of the key, adding the group when it is new"""
+        column_results = self.groups.get(key)
+        if column_results is None:
+            if len(self.groups) >= self.max_groups:
+                raise TooManyGroupsError(self.max_groups)
+            column_results = self.groups[key] = self._build_column_results()
+        return column_results
+
+    def _build_column_results(self) -> dict[str, ColumnResult]:
+        return {column_name: ColumnResult(name=column_name, **self.column_options) for column_name in self.column_names}
+
+    def merge(self, other: "ColumnGroups") -> None:
+        for key, other_column_results in other.groups.items():
+            for column_name, column_result in self.get(key).items():
+                column_result.merge(other_column_results[column_name])
+
+    def totals(self) -> list[ColumnResult]:
+        """Return the results of the columns over every group"""
+        totals = {
+            column_name: ColumnResult(name=column_name, **self.column_options) for column_name in self.column_names
+        }
+        for column_results in self.groups.values():
+            for column_name, total in totals.items():
+                total.merge(column_results[column_name])
+        return list(totals.values())
+
+    def calculate(self) -> list[dict[str, Any]]:
+        """Return the groups holding the most summarised rows first"""
+        sizes = {
+            key: max((result.count for result in results.values()), default=0) for key, results in self.groups.items()
         }
+        keys = sorted(self.groups, key=lambda key: sizes[key], reverse=True)
+        if self.top is not None:
+            keys = keys[: self.top]
+        return [
+            {
+                "group": {column_name: format_group_value(value) for column_name, value in zip(self.group_by, key)},
+                "rows": sizes[key],
+                "summary": [column_result.calculate() for column_result in self.groups[key].values()],
+            }
+            for key in keys
+        ]
 
 
 class BaseSummaryGenerator(abc.ABC):
+    stats: SummaryStats | None = None
+    groups: ColumnGroups | None = None
+    aggregates: Sequence[str] = DEFAULT_AGGREGATES
+    quantile_sketch_size: int = DEFAULT_QUANTILE_SKETCH_SIZE
+    distinct_sketch_precision: int = DEFAULT_DISTINCT_SKETCH_PRECISION
+    group_by: Sequence[str] = ()
+    max_groups: int = DEFAULT_MAX_GROUPS
+    top_groups: int | None = None
+    row_filter: RowFilter | None = None
+    progress_hook: ProgressHook | None = None
+    progress_hook_interval: int = DEFAULT_PROGRESS_HOOK_INTERVAL
+
     @abc.abstractmethod
-    def generate(self, column_names: Sequence[str]) -> list[dict[str, Any]]: ...
+    def generate_column_results(self, column_names: Sequence[str]) -> list[ColumnResult]:
+        """
+        Return the results of the columns, in the order of the column names, before they are calculated.
+        When the rows are grouped, the results are the totals of the groups, which are kept in `groups`.
+        """
+
+    def generate(self, column_names: Sequence[str]) -> list[dict[str, Any]]:
+        return [column_result.calculate() for column_result in self.generate_column_results(column_names)]
+
+    def generate_summary(self, column_names: Sequence[str]) -> dict[str, Any]:
+        """Return the summary of the columns, with the summaries of the groups when the rows are grouped"""
+        summary: dict[str, Any] = {"summary": self.generate(column_names)}
+        if self.groups is not None:
+            summary["groups"] = self.groups.calculate()
+        return summary
+
+    def header_column_names(self, column_names: Sequence[str]) -> list[str]:
+        """Return the columns the column row must hold: the summarised, the group and the filter columns"""
+        filter_column_names = self.row_filter.column_names if self.row_filter is not None else []
+        return list(dict.fromkeys([*column_names, *self.group_by, *filter_column_names]))
+
+    def column_options(self) -> dict[str, Any]:
+        return {
+            "aggregates": self.aggregates,
+            "quantile_sketch_size": self.quantile_sketch_size,
+            "distinct_sketch_precision": self.distinct_sketch_precision,
+        }
+
+    def build_column_results(self, column_names: Sequence[str]) -> dict[str, ColumnResult]:
+        return {column_name: ColumnResult(name=column_name, **self.column_options()) for column_name in column_names}
+
+    def build_column_groups(self, column_names: Sequence[str]) -> ColumnGroups | None:
+        if not self.group_by:
+            return None
+        return ColumnGroups(
+            group_by=self.group_by,
+            column_names=column_names,
+            max_groups=self.max_groups,
+            top=self.top_groups,
+            **self.column_options(),
+        )
 
 
 class ExcelSummaryGenerator(BaseSummaryGenerator):
@@ -44,34 +380,131 @@ class ExcelSummaryGenerator(BaseSummaryGenerator):
         row_converter: BaseRowConverter,
         file_reader: BaseFileReader,
         column_row_finder: BaseColumnRowFinder,
+        aggregates: Sequence[str] = DEFAULT_AGGREGATES,
+        quantile_sketch_size: int = DEFAULT_QUANTILE_SKETCH_SIZE,
+        distinct_sketch_precision: int = DEFAULT_DISTINCT_SKETCH_PRECISION,
+        group_by: Sequence[str] = (),
+        max_groups: int = DEFAULT_MAX_GROUPS,
+        top_groups: int | None = None,
+        row_filter: RowFilter | None = None,
+        progress_hook: ProgressHook | None = None,
+        progress_hook_interval: int = DEFAULT_PROGRESS_HOOK_INTERVAL,
     ) -> None:
         self.row_processor = row_processor
         self.row_converter = row_converter
         self.file_reader = file_reader
         self.column_row_finder = column_row_finder
+        self.aggregates = aggregates
+        self.quantile_sketch_size = quantile_sketch_size
+        self.distinct_sketch_precision = distinct_sketch_precision
+        self.group_by = group_by
+        self.max_groups = max_groups
+        self.top_groups = top_groups
+        self.row_filter = row_filter
+        self.progress_hook = progress_hook
+        self.progress_hook_interval = progress_hook_interval
+        self.stats: SummaryStats | None = None
+        self.groups: ColumnGroups | None = None
 
-    def generate(self, column_names: Sequence[str]) -> list[dict[str, Any]]:
-        logger.debug("Generating summary", column_names=column_names)
-        column_row, row_number = self.column_row_finder.find(column_names=column_names, file_reader=self.file_reader)
+    def generate_column_results(self, column_names: Sequence[str]) -> list[ColumnResult]:
+        logger.debug(
+            "Generating summary",
+            column_names=column_names,
+            group_by=self.group_by,
+            row_filter=self.row_filter.expression if self.row_filter is not None else None,
+        )
+        self.stats = stats = SummaryStats()
+        # Checked once, so that rows are not formatted for a disabled debug level
+        debug = logger.is_enabled_for(logging.DEBUG)
+        projection = ColumnProjection()
+        header_column_names = self.header_column_names(column_names)
+        # The file is opened and its first rows read while the column row is searched
+        with stats.stages.stage(STAGE_HEADER_SEARCH):
+            column_row, rows = self.column_row_finder.find(
+                column_names=header_column_names, file_reader=self.file_reader, projection=projection
+            )
 
         column_to_index_mapper = {
             column_name: column_index
             for column_index, column_name in enumerate(column_row)
-            if column_name in column_names
+            if column_name in column_names or column_name in self.group_by
         }
-        column_results = {column_name: ColumnResult(name=column_name) for column_name in column_names}
+        # Filter columns are read even when they are not summarised, as the filter is applied to the raw rows
+        projection.update(
+            column_index for column_index, column_name in enumerate(column_row) if column_name in header_column_names
+        )
+        row_predicate = self.row_filter.compile(column_row) if self.row_filter is not None else None
+        column_results = self.build_column_results(column_names)
+        self.groups = groups = self.build_column_groups(column_names)
+        # The summarised columns, in the order of the column row or of the results of a group
+        if groups is not None:
+            summarised_names = list(groups.column_names)
+        else:
+            summarised_names = [column_name for column_name in column_to_index_mapper if column_name in column_results]
+        summarised_mapping = {column_name: column_to_index_mapper[column_name] for column_name in summarised_names}
+        # The indexes are resolved once, the cells of every row are picked as tuples rather than dicts
+        project = build_row_projection(list(summarised_mapping.values()))
+        project_key = build_row_projection([column_to_index_mapper[column_name] for column_name in self.group_by])
+        # Results of the columns by position, those of every group being resolved once per group
+        positional_results = tuple(column_results[column_name] for column_name in summarised_names)
+        group_results: dict[tuple, tuple[ColumnResult, ...]] = {}
+        tracks_invalid = any(column_result.tracks_invalid for column_result in column_results.values())
+        process_values = self.row_processor.process_values
+        progress_hook = self.progress_hook
+        progress_results = list(column_results.values())
+        # A single comparison per row, the rows scanned never reach -1 when there is no hook
+        next_progress_row = self.progress_hook_interval if progress_hook is not None else -1
 
-        for row in self.file_reader.iter_rows(min_row=row_number + 1):
-            try:
-                converted_row = self.row_converter.convert(row=row, index_mapping=column_to_index_mapper)
-            except UnconvertibleRowError:
-                continue
+        with stats.stages.stage(STAGE_ROWS):
+            for row in rows:
+                stats.rows_scanned += 1
+                if stats.rows_scanned == next_progress_row and progress_hook is not None:
+                    progress_hook(stats, groups.totals() if groups is not None else progress_results)
+                    next_progress_row += self.progress_hook_interval
+                if row_predicate is not None and not row_predicate(row):
+                    stats.rows_filtered += 1
+                    continue
+                try:
+                    cells = project(row)
+                    if groups is not None:
+                        key = project_key(row)
+                except IndexError:
+                    stats.add_unconvertible_row(row)
+                    if debug:
+                        logger.debug("Unconvertible row", row=row, index_mapping=column_to_index_mapper)
+                    continue
+                if groups is not None:
+                    results = group_results.get(key)
+                    if results is None:
+                        results = group_results[key] = tuple(groups.get(key)[name] for name in summarised_names)
+                else:
+                    results = positional_results
+                try:
+                    values = process_values(cells)
+                except UnprocessableRowError:
+                    # Skipped rows are sampled and checked by column name, as dicts
+                    converted_row = self.row_converter.convert(row=row, index_mapping=summarised_mapping)
+                    stats.add_unprocessable_row(converted_row)
+                    if debug:
+                        logger.debug("Unprocessable row", row_dict=converted_row)
+                    if tracks_invalid:
+                        self._add_invalid_values(
+                            row_dict=converted_row, column_results=dict(zip(summarised_names, results))
+                        )
+                    continue
+
+                for column_result, value in zip(results, values):
+                    column_result.add(value)
+        stats.finish()
+        logger.info("Finished generating summary", **stats.as_dict())
+        if groups is not None:
+            return groups.totals()
+        return list(column_results.values())
+
+    def _add_invalid_values(self, row_dict: Mapping[str, Any], column_results: dict[str, ColumnResult]) -> None:
+        """Find which values of an unprocessable row cannot be processed, one column at a time"""
+        for column_name, column_value in row_dict.items():
             try:
-                processed_row = self.row_processor.process(row_dict=converted_row)
+                self.row_processor.process(row_dict={column_name: column_value})
             except UnprocessableRowError:
-                continue
-
-            for column_name, row_result in processed_row.items():
-                column_results[column_name].add(value=row_result)
-        logger.debug("Finished generating summary")
-        return [column_result.calculate() for column_result in column_results.values()]
+                column_results[column_name].add_invalid(column_value)
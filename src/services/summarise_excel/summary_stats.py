@@ -0,0 +1,63 @@
+import time
+
+from typing import Any
+
+from services.summarise_excel.metrics import StageTimings
+
+
+DEFAULT_BAD_ROW_SAMPLE_SIZE = 10
+
+SKIP_REASON_UNCONVERTIBLE = "unconvertible"
+SKIP_REASON_UNPROCESSABLE = "unprocessable"
+
+
+class SummaryStats:
+    """Counters of a single summary, reported once at the end instead of logging every row"""
+
+    def __init__(self, bad_row_sample_size: int = DEFAULT_BAD_ROW_SAMPLE_SIZE) -> None:
+        self.rows_scanned = 0
+        self.rows_filtered = 0
+        self.rows_unconvertible = 0
+        self.rows_unprocessable = 0
+        self.bad_row_sample_size = bad_row_sample_size
+        self.bad_rows: list[dict[str, Any]] = []
+        self.started_at = time.perf_counter()
+        self.elapsed = 0.0
+        self.stages = StageTimings()
+
+    def add_unconvertible_row(self, row: Any) -> None:
+        self.rows_unconvertible += 1
+        self._sample_bad_row(reason=SKIP_REASON_UNCONVERTIBLE, row=row)
+
+    def add_unprocessable_row(self, row: Any) -> None:
+        self.rows_unprocessable += 1
+        self._sample_bad_row(reason=SKIP_REASON_UNPROCESSABLE, row=row)
+
+    def _sample_bad_row(self, reason: str, row: Any) -> None:
+        if len(self.bad_rows) < self.bad_row_sample_size:
+            self.bad_rows.append({"reason": reason, "row": row})
+
+    def merge(self, other: "SummaryStats") -> None:
+        """
+        Add the counters of another part of the same summary, e.g. a range of rows read by another process.
+        Its stages are not added, as parts run at the same time and the stages are timed around all of them.
+        """
+        self.rows_scanned += other.rows_scanned
+        self.rows_filtered += other.rows_filtered
+        self.rows_unconvertible += other.rows_unconvertible
+        self.rows_unprocessable += other.rows_unprocessable
+        self.bad_rows.extend(other.bad_rows[: self.bad_row_sample_size - len(self.bad_rows)])
+
+    def finish(self) -> None:
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "rows_scanned": self.rows_scanned,
+            "rows_filtered": self.rows_filtered,
+            "rows_skipped_unconvertible": self.rows_unconvertible,
+            "rows_skipped_unprocessable": self.rows_unprocessable,
+            "elapsed_seconds": round(self.elapsed, 6),
+            "stage_seconds": self.stages.as_dict(),
+            "bad_rows_sample": self.bad_rows,
+        }
@@ -0,0 +1,94 @@
+import contextvars
+import queue
+import threading
+
+from typing import Any, Callable, Iterator, Sequence
+
+import structlog
+
+from services.summarise_excel.exceptions import BaseExcelSummaryError, SummaryCancelledError
+from services.summarise_excel.summary_generator import BaseSummaryGenerator, ColumnResult
+from services.summarise_excel.summary_stats import SummaryStats
+
+
+logger = structlog.getLogger(__name__)
+
+RECORD_PROGRESS = "progress"
+RECORD_SUMMARY = "summary"
+RECORD_ERROR = "error"
+INTERNAL_ERROR_DETAIL = "Summary cannot be generated"
+# Progress records waiting for a slow client before the summary blocks
+DEFAULT_QUEUE_SIZE = 16
+# Seconds a blocked summary waits between checks that the client is still reading
+PUT_TIMEOUT = 0.5
+
+
+def build_progress_record(
+    stats: SummaryStats, column_results: Sequence[ColumnResult], row_count: int | None = None
+) -> dict[str, Any]:
+    """Return the rows scanned, the estimated percent of the sheet read and the running sum and count of every column"""
+    percent = None
+    if row_count:
+        percent = round(min(stats.rows_scanned / row_count, 1.0) * 100, 1)
+    return {
+        "type": RECORD_PROGRESS,
+        "rows_scanned": stats.rows_scanned,
+        "percent": percent,
+        "columns": [
+            {"column": column_result.name, "sum": str(column_result.total_value), "count": column_result.count}
+            for column_result in column_results
+        ],
+    }
+
+
+def iter_summary_records(
+    build_generator: Callable[..., BaseSummaryGenerator],
+    column_names: Sequence[str],
+    row_count: int | None = None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> Iterator[dict[str, Any]]:
+    """
+    Yield progress records while the generator, built given a `progress_hook`, summarises the columns in a thread,
+    then a record with the whole summary, or an error record when the summary fails. Once the records are no longer
+    read, the summary stops at its next progress report.
+    """
+    records: queue.Queue[dict[str, Any] | None] = queue.Queue(maxsize=queue_size)
+    closed = threading.Event()
+
+    def put(record: dict[str, Any] | None) -> None:
+        while not closed.is_set():
+            try:
+                records.put(record, timeout=PUT_TIMEOUT)
+            except queue.Full:
+                continue
+            return
+        raise SummaryCancelledError
+
+    def report_progress(stats: SummaryStats, column_results: list[ColumnResult]) -> None:
+        put(build_progress_record(stats, column_results, row_count=row_count))
+
+    def summarise() -> None:
+        try:
+            try:
+                summary = build_generator(progress_hook=report_progress).generate_summary(column_names=column_names)
+                record = {"type": RECORD_SUMMARY, **summary}
+            except SummaryCancelledError:
+                raise
+            except BaseExcelSummaryError as e:
+                record = {"type": RECORD_ERROR, "detail": e.detail}
+            except Exception:
+                logger.exception("Streamed summary failed")
+                record = {"type": RECORD_ERROR, "detail": INTERNAL_ERROR_DETAIL}
+            put(record)
+            put(None)
+        except SummaryCancelledError:
+            logger.info("Streamed summary cancelled, its records are no longer read")
+
+    # The thread logs with the context of the request, e.g. its correlation id
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(summarise,), daemon=True)
+    thread.start()
+    try:
+        while (record := records.get()) is not None:
+            yield record
+    finally:
+        closed.set()
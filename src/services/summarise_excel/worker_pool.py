@@ -0,0 +1,80 @@
+import concurrent.futures
+import contextlib
+import functools
+import multiprocessing
+import threading
+
+from typing import Any, Callable, Iterator
+
+import structlog
+
+
+logger = structlog.getLogger(__name__)
+
+# Workers are started by a server process rather than forked from a web process, which may run threads
+WORKER_START_METHOD = "forkserver"
+
+
+class WorkerPool:
+    """
+    Pool of at most `max_workers` worker processes, shared by the summaries of one process, so that concurrent
+    summaries queue their sheets, files or row ranges rather than each starting processes. The workers are started
+    with the first task and started anew once one of them died.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max_workers
+        self._executor: concurrent.futures.ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context(WORKER_START_METHOD)
+                )
+            return self._executor
+
+    def submit(self, function: Callable[..., Any], **kwargs: Any) -> concurrent.futures.Future:
+        executor = self._get_executor()
+        try:
+            future = executor.submit(function, **kwargs)
+        except concurrent.futures.process.BrokenProcessPool:
+            self._discard(executor)
+            executor = self._get_executor()
+            future = executor.submit(function, **kwargs)
+        future.add_done_callback(functools.partial(self._on_done, executor))
+        return future
+
+    def _on_done(self, executor: concurrent.futures.ProcessPoolExecutor, future: concurrent.futures.Future) -> None:
+        # Every task of the workers fails once one of them died, their first failure starts new workers
+        if not future.cancelled() and isinstance(future.exception(), concurrent.futures.process.BrokenProcessPool):
+            self._discard(executor)
+
+    def _discard(self, executor: concurrent.futures.ProcessPoolExecutor) -> None:
+        with self._lock:
+            # Workers started anew by another task are kept
+            if self._executor is not executor:
+                return
+            self._executor = None
+        logger.warning("Worker pool broken, starting new workers")
+        executor.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+@contextlib.contextmanager
+def borrow_worker_pool(worker_pool: WorkerPool | None, max_workers: int) -> Iterator[WorkerPool]:
+    """Yield the shared pool, or a pool of `max_workers` started for the caller and shut down once it is done"""
+    if worker_pool is not None:
+        yield worker_pool
+        return
+    worker_pool = WorkerPool(max_workers=max_workers)
+    try:
+        yield worker_pool
+    finally:
+        worker_pool.shutdown()
@@ -0,0 +1,489 @@
+import datetime
+import functools
+import mmap
+import posixpath
+import re
+import zipfile
+
+from typing import IO, TYPE_CHECKING, Any, Iterator
+from xml.etree import ElementTree
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+
+if TYPE_CHECKING:
+    from services.summarise_excel.file_readers import ColumnProjection
+
+
+SHEET_MAIN_NAMESPACE = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+DOCUMENT_RELATIONSHIPS_NAMESPACE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_RELATIONSHIPS_NAMESPACE = "http://schemas.openxmlformats.org/package/2006/relationships"
+OFFICE_DOCUMENT_RELATIONSHIP_TYPE = f"{DOCUMENT_RELATIONSHIPS_NAMESPACE}/officeDocument"
+
+WORKBOOK_PR_TAG = f"{{{SHEET_MAIN_NAMESPACE}}}workbookPr"
+WORKBOOK_VIEW_TAG = f"{{{SHEET_MAIN_NAMESPACE}}}workbookView"
+SHEET_TAG = f"{{{SHEET_MAIN_NAMESPACE}}}sheet"
+RELATIONSHIP_TAG = f"{{{PACKAGE_RELATIONSHIPS_NAMESPACE}}}Relationship"
+RELATIONSHIP_ID_ATTRIBUTE = f"{{{DOCUMENT_RELATIONSHIPS_NAMESPACE}}}id"
+STRING_ITEM_TAG = f"{{{SHEET_MAIN_NAMESPACE}}}si"
+TEXT_TAG = f"{{{SHEET_MAIN_NAMESPACE}}}t"
+RICH_TEXT_RUN_TAG = f"{{{SHEET_MAIN_NAMESPACE}}}r"
+NUMBER_FORMAT_TAG = f"{{{SHEET_MAIN_NAMESPACE}}}numFmt"
+CELL_FORMATS_TAG = f"{{{SHEET_MAIN_NAMESPACE}}}cellXfs"
+DIMENSION_TAG = f"{{{SHEET_MAIN_NAMESPACE}}}dimension"
+VALUE_TAG = f"{{{SHEET_MAIN_NAMESPACE}}}v"
+FORMULA_TAG = f"{{{SHEET_MAIN_NAMESPACE}}}f"
+INLINE_STRING_TAG = f"{{{SHEET_MAIN_NAMESPACE}}}is"
+
+# Worksheet content being searched for row boundaries, decompressed files of whole worksheets are memory-mapped
+Buffer = bytes | mmap.mmap
+
+DIGITS = "0123456789"
+CHUNK_SIZE = 1 << 20
+ROW_TAG_DELIMITERS = (b" ", b">", b"/", b"\t", b"\n", b"\r")
+ROOT_PATTERN = re.compile(rb"<((?:[\w.-]+:)?worksheet)(?:\s[^>]*)?>")
+SHEET_DATA_PATTERN = re.compile(rb"<([\w.-]+:)?sheetData\s*(/?>)")
+ROW_REFERENCE_PATTERN = re.compile(rb"<(?:[\w.-]+:)?row\b[^>]*?\sr=[\"'](\d+)")
+
+
+class UnnumberedRowError(ValueError):
+    """A row without a reference was found in a row range, whose rows cannot be numbered from the previous rows"""
+
+
+@functools.cache
+def column_index(letters: str) -> int:
+    """Convert column letters into a 0-based index, e.g. "A" -> 0, "AA" -> 26"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def parse_number(value: str) -> int | float:
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def parse_text(element: ElementTree.Element) -> str:
+    """Return the plain text of a shared or inline string, ignoring phonetic runs"""
+    snippets = []
+    for child in element:
+        if child.tag == TEXT_TAG:
+            snippets.append(child.text or "")
+        elif child.tag == RICH_TEXT_RUN_TAG:
+            snippets.append(child.findtext(TEXT_TAG) or "")
+    return "".join(snippets)
+
+
+class XlsxWorkbook:
+    """Minimal reader of the xlsx package parts needed to stream worksheet values"""
+
+    def __init__(self, archive: zipfile.ZipFile) -> None:
+        self.archive = archive
+        self.workbook_path = self._find_workbook_path()
+        self.epoch = CALENDAR_WINDOWS_1900
+        self.active_index = 0
+        self.sheet_paths: dict[str, str] = {}
+        self._read_workbook()
+
+    def _read_relationships(self, part_path: str) -> dict[str, tuple[str, str]]:
+        directory, file_name = posixpath.split(part_path)
+        relationships_path = posixpath.join(directory, "_rels", f"{file_name}.rels")
+        root = ElementTree.fromstring(self.archive.read(relationships_path))
+        return {
+            relationship.get("Id", ""): (
+                relationship.get("Type", ""),
+                self._resolve_target(directory, relationship.get("Target", "")),
+            )
+            for relationship in root.iter(RELATIONSHIP_TAG)
+        }
+
+    @staticmethod
+    def _resolve_target(directory: str, target: str) -> str:
+        if target.startswith("/"):
+            return target.lstrip("/")
+        return posixpath.normpath(posixpath.join(directory, target))
+
+    def _find_workbook_path(self) -> str:
+        for relationship_type, target in self._read_relationships("").values():
+            if relationship_type == OFFICE_DOCUMENT_RELATIONSHIP_TYPE:
+                return target
+        return "xl/workbook.xml"
+
+    def _read_workbook(self) -> None:
+        root = ElementTree.fromstring(self.archive.read(self.workbook_path))
+        relationships = self._read_relationships(self.workbook_path)
+
+        properties = root.find(f".//{WORKBOOK_PR_TAG}")
+        if properties is not None and properties.get("date1904") in ("1", "true"):
+            self.epoch = CALENDAR_MAC_1904
+
+        view = root.find(f".//{WORKBOOK_VIEW_TAG}")
+        if view is not None:
+            self.active_index = int(view.get("activeTab", 0))
+
+        for sheet in root.iter(SHEET_TAG):
+            _, target = relationships[sheet.get(RELATIONSHIP_ID_ATTRIBUTE, "")]
+            self.sheet_paths[sheet.get("name", "")] = target
+
+    @property
+    def active_sheet_path(self) -> str:
+        return list(self.sheet_paths.values())[self.active_index]
+
+    @functools.cached_property
+    def shared_strings(self) -> list[str]:
+        path = posixpath.join(posixpath.dirname(self.workbook_path), "sharedStrings.xml")
+        if path not in self.archive.namelist():
+            return []
+        strings = []
+        with self.archive.open(path) as source:
+            for _, element in ElementTree.iterparse(source):
+                if element.tag == STRING_ITEM_TAG:
+                    strings.append(parse_text(element).replace("x005F_", ""))
+                    element.clear()
+        return strings
+
+    @functools.cached_property
+    def _styles(self) -> tuple[frozenset[int], frozenset[int]]:
+        path = posixpath.join(posixpath.dirname(self.workbook_path), "styles.xml")
+        if path not in self.archive.namelist():
+            return frozenset(), frozenset()
+        root = ElementTree.fromstring(self.archive.read(path))
+        custom_formats = {
+            int(number_format.get("numFmtId", 0)): number_format.get("formatCode", "")
+            for number_format in root.iter(NUMBER_FORMAT_TAG)
+        }
+        date_styles = set()
+        timedelta_styles = set()
+        cell_formats = root.find(CELL_FORMATS_TAG)
+        for style_index, cell_format in enumerate(cell_formats if cell_formats is not None else []):
+            format_id = int(cell_format.get("numFmtId", 0))
+            format_code = custom_formats.get(format_id, BUILTIN_FORMATS.get(format_id))
+            if format_code is None:
+                continue
+            if is_date_format(format_code):
+                date_styles.add(style_index)
+            if is_timedelta_format(format_code):
+                timedelta_styles.add(style_index)
+        return frozenset(date_styles), frozenset(timedelta_styles)
+
+    def row_parser(self) -> "XlsxRowParser":
+        date_styles, timedelta_styles = self._styles
+        return XlsxRowParser(
+            shared_strings=self.shared_strings,
+            date_styles=date_styles,
+            timedelta_styles=timedelta_styles,
+            epoch=self.epoch,
+        )
+
+
+class SheetLayout:
+    """Byte-level layout of a worksheet part, used to cut its sheetData into parseable chunks of rows"""
+
+    def __init__(
+        self, root_tag: bytes, root_start: bytes, prefix: bytes, max_column: int | None, max_row: int | None = None
+    ) -> None:
+        self.root_start = root_start
+        self.root_end = b"</" + root_tag + b">"
+        self.row_start = b"<" + prefix + b"row"
+        self.sheet_data_end = b"</" + prefix + b"sheetData>"
+        self.max_column = max_column
+        self.max_row = max_row
+
+    def parse_rows(self, chunk: bytes) -> ElementTree.Element:
+        """Parse a chunk made of whole rows, returning an element whose children are the rows"""
+        return ElementTree.fromstring(self.root_start + chunk + self.root_end)
+
+    def next_row_start(self, buffer: Buffer, start: int = 0) -> int:
+        position = buffer.find(self.row_start, start)
+        while position != -1:
+            next_byte = buffer[position + len(self.row_start) : position + len(self.row_start) + 1]
+            if next_byte in ROW_TAG_DELIMITERS:
+                return position
+            position = buffer.find(self.row_start, position + 1)
+        return -1
+
+    def last_row_start(self, buffer: Buffer, end: int | None = None) -> int:
+        position = buffer.rfind(self.row_start, 0, len(buffer) if end is None else end)
+        while position != -1:
+            next_byte = buffer[position + len(self.row_start) : position + len(self.row_start) + 1]
+            if next_byte in ROW_TAG_DELIMITERS:
+                return position
+            position = buffer.rfind(self.row_start, 0, position)
+        return -1
+
+
+def read_sheet_layout(source: IO[bytes], chunk_size: int = CHUNK_SIZE) -> tuple[SheetLayout, bytes]:
+    """Read the worksheet part up to its sheetData, returning the layout and the bytes that follow it"""
+    buffer = b""
+    while (match := SHEET_DATA_PATTERN.search(buffer)) is None:
+        block = source.read(chunk_size)
+        if not block:
+            msg = "Worksheet has no sheetData"
+            raise ValueError(msg)
+        buffer += block
+
+    root_match = ROOT_PATTERN.search(buffer, 0, match.start())
+    if root_match is None:
+        msg = "Worksheet has no root element"
+        raise ValueError(msg)
+    root_tag = root_match.group(1)
+    head = ElementTree.fromstring(buffer[root_match.start() : match.start()] + b"</" + root_tag + b">")
+
+    max_column = None
+    max_row = None
+    dimension = head.find(DIMENSION_TAG)
+    if dimension is not None:
+        reference = dimension.get("ref", "").rpartition(":")[2].replace("$", "")
+        column_reference = reference.rstrip(DIGITS)
+        if column_reference:
+            max_column = column_index(column_reference) + 1
+        if reference[len(column_reference) :]:
+            max_row = int(reference[len(column_reference) :])
+
+    layout = SheetLayout(
+        root_tag=root_tag,
+        root_start=root_match.group(0),
+        prefix=match.group(1) or b"",
+        max_column=max_column,
+        max_row=max_row,
+    )
+    if match.group(2) == b"/>":
+        layout.sheet_data_end = b""
+    return layout, buffer[match.end() :]
+
+
+def iter_row_chunks(
+    source: IO[bytes], layout: SheetLayout, buffer: bytes = b"", chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Yield chunks of the sheetData content, each of them made of whole rows"""
+    if not layout.sheet_data_end:
+        return
+    while True:
+        end = buffer.find(layout.sheet_data_end, max(len(buffer) - chunk_size - len(layout.sheet_data_end), 0))
+        if end != -1:
+            if end:
+                yield buffer[:end]
+            return
+        block = source.read(chunk_size)
+        if not block:
+            msg = "Worksheet sheetData is not closed"
+            raise ValueError(msg)
+        buffer += block
+        cut = layout.last_row_start(buffer)
+        if cut > 0:
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+
+
+def iter_row_chunks_between(
+    source: IO[bytes], layout: SheetLayout, start: int, end: int, chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Yield chunks of whole rows from a byte range of the sheetData content which starts and ends at row boundaries"""
+    source.seek(start)
+    remaining = end - start
+    buffer = b""
+    while remaining > 0:
+        block = source.read(min(chunk_size, remaining))
+        if not block:
+            msg = "Worksheet ends before the row range"
+            raise ValueError(msg)
+        remaining -= len(block)
+        buffer += block
+        if remaining:
+            cut = layout.last_row_start(buffer)
+            if cut > 0:
+                yield buffer[:cut]
+                buffer = buffer[cut:]
+    if buffer.strip():
+        yield buffer
+
+
+def split_row_ranges(buffer: Buffer, layout: SheetLayout, start: int, end: int, count: int) -> list[tuple[int, int]]:
+    """Split the sheetData content between start and end into at most `count` byte ranges of whole rows"""
+    boundaries = [start]
+    for index in range(1, count):
+        position = layout.next_row_start(buffer, start + (end - start) * index // count)
+        if position == -1 or position >= end:
+            break
+        if position > boundaries[-1]:
+            boundaries.append(position)
+    boundaries.append(end)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+class XlsxRowParser:
+    """Streams worksheet rows as plain value tuples, mirroring openpyxl's read-only values"""
+
+    def __init__(
+        self,
+        shared_strings: list[str],
+        date_styles: frozenset[int],
+        timedelta_styles: frozenset[int],
+        epoch: datetime.datetime,
+    ) -> None:
+        self.shared_strings = shared_strings
+        self.date_styles = date_styles
+        self.timedelta_styles = timedelta_styles
+        self.epoch = epoch
+        self._date_style_ids = frozenset(str(style_id) for style_id in date_styles)
+
+    def iter_rows(
+        self, source: IO[bytes], min_row: int = 0, projection: "ColumnProjection | None" = None
+    ) -> Iterator[tuple]:
+        layout, buffer = read_sheet_layout(source)
+        max_column = layout.max_column
+        empty_row = (None,) * max_column if max_column else ()
+        min_row = min_row or 1
+        row_counter = 0
+        counter = min_row
+
+        for chunk in iter_row_chunks(source=source, layout=layout, buffer=buffer):
+            for row in layout.parse_rows(chunk):
+                row_reference = row.get("r")
+                row_counter = int(row_reference) if row_reference else row_counter + 1
+
+                for _ in range(counter, row_counter):
+                    counter += 1
+                    yield empty_row
+                if counter <= row_counter:
+                    counter += 1
+                    yield self._parse_row(row, max_column, projection)
+
+    def iter_rows_between(
+        self,
+        source: IO[bytes],
+        layout: SheetLayout,
+        start: int,
+        end: int,
+        min_row: int = 0,
+        projection: "ColumnProjection | None" = None,
+    ) -> Iterator[tuple]:
+        """
+        Yield the rows of a byte range of the sheet from `min_row` on. Rows missing between the rows of the range
+        are not yielded, as the rows of one range cannot tell which rows precede them in other ranges.
+        """
+        for chunk in iter_row_chunks_between(source=source, layout=layout, start=start, end=end):
+            for row in layout.parse_rows(chunk):
+                row_reference = row.get("r")
+                if not row_reference:
+                    raise UnnumberedRowError
+                if int(row_reference) >= min_row:
+                    yield self._parse_row(row, layout.max_column, projection)
+
+    def iter_rows_stride(
+        self,
+        source: IO[bytes],
+        stride: int,
+        start: int = 0,
+        min_row: int = 0,
+        projection: "ColumnProjection | None" = None,
+    ) -> Iterator[tuple]:
+        """
+        Yield every `stride`-th row of the sheet from `min_row` on, the `start`-th one first. Rows are told apart by
+        their tags and only the yielded ones are parsed. Rows missing from the sheet, which are empty, are not counted.
+        """
+        layout, buffer = read_sheet_layout(source)
+        min_row = min_row or 1
+        row_counter = 0
+        skip = start
+        for chunk in iter_row_chunks(source=source, layout=layout, buffer=buffer):
+            selected = []
+            position = layout.next_row_start(chunk)
+            while position != -1:
+                next_position = layout.next_row_start(chunk, position + 1)
+                # Rows are numbered until the first one to yield, the rows after it all follow min_row
+                if row_counter < min_row:
+                    match = ROW_REFERENCE_PATTERN.match(chunk, position)
+                    row_counter = int(match.group(1)) if match else row_counter + 1
+                    if row_counter < min_row:
+                        position = next_position
+                        continue
+                if skip:
+                    skip -= 1
+                else:
+                    selected.append(chunk[position : next_position if next_position != -1 else len(chunk)])
+                    skip = stride - 1
+                position = next_position
+            if selected:
+                for row in layout.parse_rows(b"".join(selected)):
+                    yield self._parse_row(row, layout.max_column, projection)
+
+    def _parse_row(
+        self, row: ElementTree.Element, max_column: int | None, projection: "ColumnProjection | None"
+    ) -> tuple:
+        columns = projection.columns if projection is not None else None
+        limit = projection.max_column + 1 if projection is not None and projection.max_column is not None else None
+        if limit is not None and max_column is not None:
+            max_column = min(max_column, limit)
+
+        values: list[Any] = [None] * max_column if max_column else []
+        width = len(values)
+        date_style_ids = self._date_style_ids
+        column = -1
+        for cell in row:
+            reference = cell.get("r")
+            column = column_index(reference.rstrip(DIGITS)) if reference else column + 1
+            if limit is not None and column >= limit:
+                # The row is at least this wide, cells to the right of the projection are not needed
+                if not max_column:
+                    values.extend([None] * (limit - width))
+                break
+            if column >= width:
+                if max_column:
+                    continue
+                values.extend([None] * (column + 1 - width))
+                width = column + 1
+            if columns is not None and column not in columns:
+                continue
+
+            # Fast path for plain numeric cells, which make up most of the cells in numeric sheets
+            if len(cell) == 1 and cell.get("t", "n") == "n" and cell.get("s") not in date_style_ids:
+                value_element = cell[0]
+                text = value_element.text
+                if value_element.tag == VALUE_TAG and text:
+                    values[column] = float(text) if "." in text or "E" in text or "e" in text else int(text)
+                    continue
+            values[column] = self._parse_cell(cell)
+        return tuple(values)
+
+    def _parse_cell(self, cell: ElementTree.Element) -> Any:
+        data_type = cell.get("t", "n")
+        value = None
+        formula = None
+        inline_string = None
+        for child in cell:
+            if child.tag == VALUE_TAG:
+                value = child.text or None
+            elif child.tag == FORMULA_TAG:
+                formula = child
+            elif child.tag == INLINE_STRING_TAG:
+                inline_string = child
+
+        # openpyxl is used with data_only=False, so formulas are reported instead of their cached values
+        if formula is not None:
+            return f"={formula.text or ''}"
+        if data_type == "inlineStr":
+            return parse_text(inline_string) if inline_string is not None else None
+        if value is None:
+            return None
+        if data_type == "n":
+            return self._parse_numeric_cell(value, int(cell.get("s", 0)))
+        if data_type == "s":
+            return self.shared_strings[int(value)]
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "d":
+            return datetime.datetime.fromisoformat(value)
+        return value
+
+    def _parse_numeric_cell(self, value: str, style_id: int) -> Any:
+        number = parse_number(value)
+        if style_id not in self.date_styles:
+            return number
+        try:
+            return from_excel(number, self.epoch, timedelta=style_id in self.timedelta_styles)
+        except (OverflowError, ValueError):
+            return "#VALUE!"
@@ -1,11 +1,16 @@
+import zipfile
+
 from pathlib import Path
 from typing import Any, Iterable
+from xml.sax.saxutils import escape, quoteattr
 
 import pytest
 
 from openpyxl import Workbook
 from rest_framework.test import APIClient
 
+from api.v1.views import _extract_caches, _job_runners, _result_caches
+
 
 @pytest.fixture
 def sample_excel_file_factory(tmp_path):
@@ -22,6 +27,87 @@ def sample_excel_file_factory(tmp_path):
     return _builder
 
 
+@pytest.fixture
+def sample_excel_workbook_factory(tmp_path):
+    def _builder(sheets: dict[str, Iterable[Any]], file_name: str = "test.xlsx", active: int = 0) -> Path:
+        file_path = tmp_path / file_name
+        wb = Workbook()
+        wb.remove(wb.active)
+        for title, data in sheets.items():
+            ws = wb.create_sheet(title=title)
+            for row in data:
+                ws.append(row)
+        wb.active = active
+        wb.save(file_path)
+        wb.close()
+        return file_path
+
+    return _builder
+
+
+def build_ods_cell(value: Any) -> str:
+    if value is None:
+        return "<table:table-cell/>"
+    if isinstance(value, bool):
+        return f'<table:table-cell office:value-type="boolean" office:boolean-value="{str(value).lower()}"/>'
+    if isinstance(value, (int, float)):
+        return f'<table:table-cell office:value-type="float" office:value="{value}"/>'
+    return f'<table:table-cell office:value-type="string"><text:p>{escape(str(value))}</text:p></table:table-cell>'
+
+
+@pytest.fixture
+def sample_ods_file_factory(tmp_path):
+    def _builder(sheets: dict[str, Iterable[Any]], file_name: str = "test.ods", active: str | None = None) -> Path:
+        tables = "".join(
+            f"<table:table table:name={quoteattr(title)}>"
+            + "".join(f"<table:table-row>{''.join(map(build_ods_cell, row))}</table:table-row>" for row in data)
+            + "</table:table>"
+            for title, data in sheets.items()
+        )
+        content = (
+            '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+            ' xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"'
+            ' xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">'
+            f"<office:body><office:spreadsheet>{tables}</office:spreadsheet></office:body></office:document-content>"
+        )
+        file_path = tmp_path / file_name
+        with zipfile.ZipFile(file_path, "w") as archive:
+            archive.writestr("mimetype", "application/vnd.oasis.opendocument.spreadsheet", zipfile.ZIP_STORED)
+            archive.writestr("content.xml", content, zipfile.ZIP_DEFLATED)
+            if active is not None:
+                archive.writestr(
+                    "settings.xml",
+                    '<office:document-settings xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+                    ' xmlns:config="urn:oasis:names:tc:opendocument:xmlns:config:1.0">'
+                    f'<config:config-item config:name="ActiveTable" config:type="string">{escape(active)}'
+                    "</config:config-item></office:document-settings>",
+                )
+        return file_path
+
+    return _builder
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
+
+
+@pytest.fixture(autouse=True)
+def clear_result_caches():
+    _result_caches.clear()
+    _extract_caches.clear()
+
+
+@pytest.fixture(autouse=True)
+def extract_cache_directory(tmp_path, settings):
+    settings.EXCEL_SUMMARY_EXTRACT_CACHE = {"DIRECTORY": tmp_path / "extracts", "MAX_BYTES": 1 << 30}
+    return tmp_path / "extracts"
+
+
+@pytest.fixture(autouse=True)
+def job_runners(tmp_path, settings):
+    settings.EXCEL_SUMMARY_JOBS = {"DIRECTORY": tmp_path / "jobs", "MAX_WORKERS": 1, "MAX_QUEUED": 1}
+    yield _job_runners
+    for job_runner in _job_runners.values():
+        job_runner.shutdown()
+    _job_runners.clear()
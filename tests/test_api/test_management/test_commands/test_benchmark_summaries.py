@@ -0,0 +1,56 @@
+import json
+
+from io import StringIO
+
+import pytest
+
+from django.core.management import CommandError, call_command
+
+
+def benchmark(tmp_path, *args):
+    stdout = StringIO()
+    call_command(
+        "benchmark_summaries",
+        "--workbooks",
+        "narrow",
+        "--benchmarks",
+        "row_processor",
+        "--scale",
+        "0.001",
+        "--repeat",
+        "1",
+        "--baseline",
+        str(tmp_path / "baseline.json"),
+        *args,
+        stdout=stdout,
+    )
+    return stdout.getvalue()
+
+
+class TestBenchmarkSummariesCommand:
+    def test_save_baseline(self, tmp_path):
+        output = benchmark(tmp_path, "--save-baseline", "--output", str(tmp_path / "results.json"))
+
+        baseline = json.loads((tmp_path / "baseline.json").read_text())
+        assert list(baseline["results"]) == ["narrow/row_processor"]
+        assert baseline["workbooks"]["narrow"]["rows"] == 50
+        assert baseline == json.loads((tmp_path / "results.json").read_text())
+        assert "narrow/row_processor" in output
+        assert "Stored the baseline" in output
+
+    def test_without_baseline(self, tmp_path):
+        assert "No baseline" in benchmark(tmp_path)
+
+    def test_within_threshold_of_baseline(self, tmp_path):
+        benchmark(tmp_path, "--save-baseline")
+
+        assert "No regression above 1000%" in benchmark(tmp_path, "--threshold", "10")
+
+    def test_regression(self, tmp_path):
+        benchmark(tmp_path, "--save-baseline")
+        baseline = json.loads((tmp_path / "baseline.json").read_text())
+        baseline["results"]["narrow/row_processor"]["items_per_second"] *= 1000
+        (tmp_path / "baseline.json").write_text(json.dumps(baseline))
+
+        with pytest.raises(CommandError, match="narrow/row_processor: .* slower than the baseline"):
+            benchmark(tmp_path)
@@ -0,0 +1,119 @@
+import json
+
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+
+from django.core.management import CommandError, call_command
+
+from services.summarise_excel.file_readers import OLE2_MAGIC
+
+
+@pytest.fixture
+def workbook_directory(tmp_path, sample_excel_file_factory):
+    directory = tmp_path / "workbooks"
+    directory.mkdir()
+    sample_excel_file_factory([("a", "b"), (1, 2), (3, 4)], file_name="workbooks/first.xlsx")
+    sample_excel_file_factory([("note",), ("text",)], file_name="workbooks/notes.xlsx")
+    (directory / "second.csv").write_text("b,a\n10,20\n")
+    return directory
+
+
+def read_lines(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+class TestSummariseWorkbooksCommand:
+    def test_writes_summary_of_every_file(self, workbook_directory):
+        stdout = StringIO()
+
+        call_command("summarise_workbooks", str(workbook_directory), "--columns", "a", "--workers", "1", stdout=stdout)
+
+        assert read_lines(stdout.getvalue()) == [
+            {
+                "file": str(workbook_directory / "first.xlsx"),
+                "summary": [{"column": "a", "sum": "4", "avg": "2"}],
+                "detail": None,
+            },
+            {"file": str(workbook_directory / "notes.xlsx"), "summary": None, "detail": "Column row cannot be found"},
+            {
+                "file": str(workbook_directory / "second.csv"),
+                "summary": [{"column": "a", "sum": "20", "avg": "20"}],
+                "detail": None,
+            },
+        ]
+
+    def test_writes_error_of_unreadable_file(self, workbook_directory):
+        (workbook_directory / "legacy.xls").write_bytes(OLE2_MAGIC + bytes(504))
+        stdout = StringIO()
+
+        call_command("summarise_workbooks", str(workbook_directory), "--columns", "a", stdout=stdout)
+
+        file_summaries = read_lines(stdout.getvalue())
+        assert file_summaries[1] == {
+            "file": str(workbook_directory / "legacy.xls"),
+            "summary": None,
+            "detail": "Cannot read file",
+        }
+        assert len(file_summaries) == 4
+
+    def test_writes_grouped_and_filtered_summaries_to_output(self, tmp_path, workbook_directory):
+        output_path = tmp_path / "summaries.jsonl"
+
+        call_command(
+            "summarise_workbooks",
+            str(workbook_directory / "*.xlsx"),
+            "--columns",
+            "a",
+            "--group-by",
+            "b",
+            "--filter",
+            "a > 1",
+            "--aggregates",
+            "count",
+            "--output",
+            str(output_path),
+        )
+
+        file_summaries = read_lines(output_path.read_text())
+        assert file_summaries[0]["summary"] == [{"column": "a", "count": 1}]
+        assert file_summaries[0]["groups"] == [{"group": {"b": 4}, "rows": 1, "summary": [{"column": "a", "count": 1}]}]
+
+    def test_resume_skips_files_in_checkpoint(self, tmp_path, workbook_directory):
+        output_path = tmp_path / "summaries.jsonl"
+        checkpoint_path = tmp_path / "checkpoint"
+        arguments = ["summarise_workbooks", str(workbook_directory), "--columns", "a", "--output", str(output_path)]
+
+        with patch(
+            "services.summarise_excel.batch_summaries.summarise_file",
+            side_effect=[([], None, None), KeyboardInterrupt],
+        ):
+            with pytest.raises(KeyboardInterrupt):
+                call_command(*arguments, "--checkpoint", str(checkpoint_path))
+        assert checkpoint_path.read_text() == f"{workbook_directory / 'first.xlsx'}\n"
+
+        call_command(*arguments, "--checkpoint", str(checkpoint_path), "--resume")
+
+        assert [file_summary["file"] for file_summary in read_lines(output_path.read_text())] == [
+            str(workbook_directory / "first.xlsx"),
+            str(workbook_directory / "notes.xlsx"),
+            str(workbook_directory / "second.csv"),
+        ]
+        assert checkpoint_path.read_text().splitlines() == [
+            str(workbook_directory / "first.xlsx"),
+            str(workbook_directory / "notes.xlsx"),
+            str(workbook_directory / "second.csv"),
+        ]
+
+    def test_resume_without_checkpoint(self, workbook_directory):
+        with pytest.raises(CommandError):
+            call_command("summarise_workbooks", str(workbook_directory), "--columns", "a", "--resume")
+
+    def test_top_without_group_by(self, workbook_directory):
+        with pytest.raises(CommandError, match="Only grouped summaries take top"):
+            call_command("summarise_workbooks", str(workbook_directory), "--columns", "a", "--top", "1")
+
+    def test_invalid_filter(self, workbook_directory):
+        with pytest.raises(CommandError, match="Invalid filter"):
+            call_command("summarise_workbooks", str(workbook_directory), "--columns", "a", "--filter", "a >")
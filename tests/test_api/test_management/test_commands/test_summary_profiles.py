@@ -0,0 +1,53 @@
+import cProfile
+import uuid
+
+from io import StringIO
+
+import pytest
+
+from django.core.management import CommandError, call_command
+
+from services.summarise_excel.profiles import ProfileStore
+
+
+def slow_function():
+    return sorted(range(10000), reverse=True)
+
+
+@pytest.fixture
+def profile_id(tmp_path):
+    profile_id = str(uuid.uuid4())
+    profiler = cProfile.Profile()
+    profiler.runcall(slow_function)
+    ProfileStore(directory=tmp_path).save(profile_id, profiler, file="slow.xlsx", status=200, seconds=2.5)
+    return profile_id
+
+
+class TestSummaryProfilesCommand:
+    def test_lists_profiles(self, tmp_path, profile_id):
+        stdout = StringIO()
+
+        call_command("summary_profiles", "--directory", str(tmp_path), stdout=stdout)
+
+        assert stdout.getvalue().startswith(profile_id)
+        assert stdout.getvalue().rstrip().endswith("200       2.500s  slow.xlsx")
+
+    def test_lists_no_profile(self, tmp_path):
+        stdout = StringIO()
+
+        call_command("summary_profiles", "--directory", str(tmp_path), stdout=stdout)
+
+        assert stdout.getvalue() == f"No profile in {tmp_path}\n"
+
+    def test_prints_top_functions(self, tmp_path, profile_id):
+        stdout = StringIO()
+
+        call_command("summary_profiles", profile_id, "--directory", str(tmp_path), "--top", "3", stdout=stdout)
+
+        assert stdout.getvalue().startswith(f"Profile {profile_id} of slow.xlsx, status 200, 2.500s\n")
+        assert "slow_function" in stdout.getvalue()
+        assert "Ordered by: cumulative time" in stdout.getvalue()
+
+    def test_when_profile_cannot_be_found(self, tmp_path):
+        with pytest.raises(CommandError, match="cannot be found"):
+            call_command("summary_profiles", "missing", "--directory", str(tmp_path))
@@ -0,0 +1,49 @@
+import hashlib
+import os
+
+import pytest
+
+from api.v1.upload_handlers import HashingTemporaryFileUploadHandler, UploadTooLargeError
+
+
+@pytest.fixture
+def upload_handler(settings):
+    settings.EXCEL_SUMMARY_UPLOAD = {"MAX_BYTES": 10}
+    upload_handler = HashingTemporaryFileUploadHandler()
+    upload_handler.new_file("file", "test.xlsx", "application/octet-stream", None)
+    return upload_handler
+
+
+class TestHashingTemporaryFileUploadHandler:
+    def test_file_complete(self, upload_handler):
+        upload_handler.receive_data_chunk(b"12345", 0)
+        upload_handler.receive_data_chunk(b"678", 5)
+
+        file = upload_handler.file_complete(8)
+
+        assert file.read() == b"12345678"
+        assert file.size == 8
+        assert file.file_hash == hashlib.sha256(b"12345678").hexdigest()
+        assert os.path.exists(file.temporary_file_path())
+
+    def test_receive_data_chunk_above_max_bytes(self, upload_handler):
+        path = upload_handler.file.temporary_file_path()
+        upload_handler.receive_data_chunk(b"12345", 0)
+
+        with pytest.raises(UploadTooLargeError):
+            upload_handler.receive_data_chunk(b"678901", 5)
+        assert not os.path.exists(path)
+
+    def test_handle_raw_input_above_max_bytes(self, upload_handler, settings):
+        settings.DATA_UPLOAD_MAX_MEMORY_SIZE = 100
+
+        assert upload_handler.handle_raw_input(None, {}, 110, "boundary") is None
+        with pytest.raises(UploadTooLargeError):
+            upload_handler.handle_raw_input(None, {}, 111, "boundary")
+
+    def test_upload_interrupted(self, upload_handler):
+        path = upload_handler.file.temporary_file_path()
+
+        upload_handler.upload_interrupted()
+
+        assert not os.path.exists(path)
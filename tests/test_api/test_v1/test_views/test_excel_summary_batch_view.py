@@ -0,0 +1,50 @@
+import zipfile
+
+from rest_framework import status
+
+
+class TestExcelSummaryBatchView:
+    def test_excel_summary_batch(self, api_client, sample_excel_file_factory, tmp_path):
+        url = "/api/v1/excel-summary/batch/"
+        first_path = sample_excel_file_factory(data=[["a"], [1], [3]], file_name="first.xlsx")
+        second_path = sample_excel_file_factory(data=[["a"], [5]], file_name="second.xlsx")
+        notes_path = sample_excel_file_factory(data=[["note"], ["text"]], file_name="notes.xlsx")
+        archive_path = tmp_path / "branches.zip"
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.write(second_path, "second.xlsx")
+            archive.write(notes_path, "notes.xlsx")
+
+        with open(first_path, "rb") as first, open(archive_path, "rb") as branches:
+            data = {"files": [first, branches], "column_names": ["a"]}
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            "summary": [{"column": "a", "sum": "9", "avg": "3"}],
+            "files": [
+                {"file": "first.xlsx", "summary": [{"column": "a", "sum": "4", "avg": "2"}], "detail": None},
+                {
+                    "file": "branches.zip/second.xlsx",
+                    "summary": [{"column": "a", "sum": "5", "avg": "5"}],
+                    "detail": None,
+                },
+                {"file": "branches.zip/notes.xlsx", "summary": None, "detail": "Column row cannot be found"},
+            ],
+        }
+
+    def test_excel_summary_batch_when_too_many_files(self, api_client, sample_excel_file_factory, settings):
+        settings.EXCEL_SUMMARY_BATCH = dict(settings.EXCEL_SUMMARY_BATCH, MAX_FILES=1)
+        url = "/api/v1/excel-summary/batch/"
+        first_path = sample_excel_file_factory(data=[["a"], [1]], file_name="first.xlsx")
+        second_path = sample_excel_file_factory(data=[["a"], [5]], file_name="second.xlsx")
+
+        with open(first_path, "rb") as first, open(second_path, "rb") as second:
+            response = api_client.post(url, {"files": [first, second], "column_names": ["a"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == {"detail": "A batch cannot hold more than 1 files"}
+
+    def test_excel_summary_batch_without_files(self, api_client):
+        response = api_client.post("/api/v1/excel-summary/batch/", {"column_names": ["a"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,84 @@
+import time
+import uuid
+
+from rest_framework import status
+
+
+class TestExcelSummaryJobViews:
+    def wait_for_job(self, api_client, job_id):
+        deadline = time.monotonic() + 30
+        while True:
+            response = api_client.get(f"/api/v1/excel-summary/jobs/{job_id}/")
+            if response.data["status"] not in ("queued", "running") or time.monotonic() > deadline:
+                return response
+            time.sleep(0.05)
+
+    def test_create_job_and_get_result(self, api_client, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b", "c"], [1, 2, 3], [3, 4, 5]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["a", "c"]}
+            response = api_client.post("/api/v1/excel-summary/jobs/", data, format="multipart")
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data["status"] == "queued"
+        assert response.data["file"] == "test.xlsx"
+        response = self.wait_for_job(api_client, response.data["id"])
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["status"] == "succeeded"
+        assert response.data["rows_scanned"] == 3
+        assert response.data["summary"] == [
+            {"column": "a", "sum": "4", "avg": "2"},
+            {"column": "c", "sum": "8", "avg": "4"},
+        ]
+
+    def test_create_job_when_column_row_not_found(self, api_client, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b", "c"], [1, 2, 3]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["d"]}
+            response = api_client.post("/api/v1/excel-summary/jobs/", data, format="multipart")
+
+        response = self.wait_for_job(api_client, response.data["id"])
+        assert response.data["status"] == "failed"
+        assert response.data["detail"] == "Column row cannot be found"
+
+    def test_create_job_when_data_is_invalid(self, api_client):
+        response = api_client.post("/api/v1/excel-summary/jobs/", {"column_names": ["a"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_get_job_when_missing(self, api_client):
+        response = api_client.get(f"/api/v1/excel-summary/jobs/{uuid.uuid4()}/")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_cancel_finished_job(self, api_client, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(data=[["a"], [1]])
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["a"]}
+            response = api_client.post("/api/v1/excel-summary/jobs/", data, format="multipart")
+        job_id = response.data["id"]
+        self.wait_for_job(api_client, job_id)
+
+        response = api_client.delete(f"/api/v1/excel-summary/jobs/{job_id}/")
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_cancel_job_when_missing(self, api_client):
+        response = api_client.delete(f"/api/v1/excel-summary/jobs/{uuid.uuid4()}/")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_create_job_for_sheets(self, api_client, sample_excel_workbook_factory):
+        sample_excel_file_path = sample_excel_workbook_factory({"first": [["a"], [1]], "second": [["a"], [2]]})
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["a"], "sheets": ["second", "first"]}
+            response = api_client.post("/api/v1/excel-summary/jobs/", data, format="multipart")
+
+        response = self.wait_for_job(api_client, response.data["id"])
+        assert response.data["status"] == "succeeded"
+        assert response.data["rows_scanned"] == 4
+        assert response.data["summary"] == [{"column": "a", "sum": "3", "avg": "1.5"}]
+        assert [sheet["sheet"] for sheet in response.data["sheets"]] == ["second", "first"]
@@ -0,0 +1,63 @@
+import json
+
+from rest_framework import status
+
+
+class TestExcelSummaryStreamView:
+    url = "/api/v1/excel-summary/stream/"
+
+    def test_stream_ndjson(self, api_client, sample_excel_file_factory, settings):
+        settings.EXCEL_SUMMARY_STREAMING = {"PROGRESS_INTERVAL": 2}
+        sample_excel_file_path = sample_excel_file_factory(
+            data=[["a", "b"], [1, 2], [3, 4], [5, 6]], file_name="t.xlsx"
+        )
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(self.url, {"file": file, "column_names": ["a"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/x-ndjson"
+        records = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        assert records == [
+            {
+                "type": "progress",
+                "rows_scanned": 2,
+                "percent": 50.0,
+                "columns": [{"column": "a", "sum": "1", "count": 1}],
+            },
+            {"type": "summary", "file": "t.xlsx", "summary": [{"column": "a", "sum": "9", "avg": "3"}]},
+        ]
+
+    def test_stream_server_sent_events(self, api_client, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b"], [1, 2]], file_name="t.xlsx")
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(
+                self.url, {"file": file, "column_names": ["a"]}, format="multipart", HTTP_ACCEPT="text/event-stream"
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "text/event-stream"
+        assert response["Cache-Control"] == "no-cache"
+        assert b"".join(response.streaming_content).decode() == (
+            "event: summary\n"
+            'data: {"type": "summary", "file": "t.xlsx", "summary": [{"column": "a", "sum": "1", "avg": "1"}]}\n\n'
+        )
+
+    def test_stream_when_summary_fails(self, api_client, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b"], [1, 2]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(self.url, {"file": file, "column_names": ["c"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert json.loads(b"".join(response.streaming_content)) == {
+            "type": "error",
+            "detail": "Column row cannot be found",
+        }
+
+    def test_stream_when_request_is_invalid(self, api_client):
+        response = api_client.post(self.url, {"column_names": ["a"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert json.loads(response.content) == {"file": ["No file was submitted."]}
@@ -1,5 +1,12 @@
+from unittest.mock import patch
+
+import pytest
+
 from rest_framework import status
 
+from services.summarise_excel.file_readers import XlsxFileReader
+from services.summarise_excel.profiles import ProfileStore
+
 
 class TestExcelSummaryView:
     def test_excel_summary_one_column_row_and_one_data_row(self, api_client, sample_excel_file_factory):
@@ -20,6 +27,197 @@ class TestExcelSummaryView:
             "summary": [{"column": "a", "sum": "1", "avg": "1"}, {"column": "b", "sum": "2", "avg": "2"}],
         }
 
+    def test_excel_summary_with_openpyxl_file_reader(self, api_client, sample_excel_file_factory, settings):
+        settings.EXCEL_SUMMARY_FILE_READER = "openpyxl"
+        url = "/api/v1/excel-summary/"
+        file_name = "test.xlsx"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b", "c"], [1, 2, 3]], file_name=file_name)
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {
+                "file": file,
+                "column_names": ["a", "b"],
+            }
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            "file": file_name,
+            "summary": [{"column": "a", "sum": "1", "avg": "1"}, {"column": "b", "sum": "2", "avg": "2"}],
+        }
+
+    @pytest.mark.parametrize("file_name", ["test.csv", "test.xlsx"])
+    def test_excel_summary_of_csv_file(self, api_client, tmp_path, file_name):
+        url = "/api/v1/excel-summary/"
+        file_path = tmp_path / file_name
+        file_path.write_bytes("a\tb\tc\n1\t2\t3\n".encode("utf-16"))
+
+        with open(file_path, "rb") as file:
+            response = api_client.post(url, {"file": file, "column_names": ["a", "b"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            "file": file_name,
+            "summary": [{"column": "a", "sum": "1", "avg": "1"}, {"column": "b", "sum": "2", "avg": "2"}],
+        }
+
+    def test_excel_summary_of_ods_file(self, api_client, sample_ods_file_factory):
+        url = "/api/v1/excel-summary/"
+        file_path = sample_ods_file_factory({"data": [["a", "b", "c"], [1, 2, 3]]})
+
+        with open(file_path, "rb") as file:
+            response = api_client.post(url, {"file": file, "column_names": ["a"], "sheets": ["*"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["summary"] == [{"column": "a", "sum": "1", "avg": "1"}]
+        assert response.data["sheets"][0]["sheet"] == "data"
+
+    def test_excel_summary_with_numpy_engine(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        file_name = "test.xlsx"
+        sample_excel_file_path = sample_excel_file_factory(
+            data=[["a", "b", "c"], [1, None, 3], [1, 2, 3], [3, 4, 5]], file_name=file_name
+        )
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {
+                "file": file,
+                "column_names": ["a", "b"],
+                "engine": "numpy",
+            }
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            "file": file_name,
+            "summary": [{"column": "a", "sum": "4", "avg": "2"}, {"column": "b", "sum": "6", "avg": "3"}],
+        }
+
+    def test_excel_summary_with_aggregates(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b"], [1, 2], [3, None], [5, 4]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["a", "b"], "aggregates": ["max", "nulls", "stddev"]}
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["summary"] == [
+            {"column": "a", "max": "5", "nulls": 0, "stddev": "2.828427124746190097603377448"},
+            {"column": "b", "max": "4", "nulls": 1, "stddev": "1.414213562373095048801688724"},
+        ]
+
+    def test_excel_summary_with_approximate_aggregates(self, api_client, sample_excel_file_factory, settings):
+        settings.EXCEL_SUMMARY_SKETCHES = {"QUANTILE_SIZE": 100, "DISTINCT_PRECISION": 10}
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a"]] + [[index % 10] for index in range(101)])
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["a"], "aggregates": ["median", "p90", "distinct"]}
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["summary"] == [
+            {
+                "column": "a",
+                "median": "4",
+                "p90": "8",
+                "distinct": 10,
+                "quantile_rank_error": 0.0261,
+                "distinct_relative_error": 0.0325,
+            }
+        ]
+
+    def test_excel_summary_filtered(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(
+            data=[["status", "a"], ["Paid", 1], ["Open", 2], ["Paid", 3], ["Refunded", 4]]
+        )
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["a"], "filter": 'status in ("Paid", "Refunded") and a > 1'}
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["summary"] == [{"column": "a", "sum": "7", "avg": "3.5"}]
+
+    def test_excel_summary_when_filter_is_invalid(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a"], [1]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(url, {"file": file, "column_names": ["a"], "filter": "a >"}, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == {"filter": ["Invalid filter: expression ends unexpectedly"]}
+
+    def test_excel_summary_when_filter_nests_too_deep(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a"], [1]])
+        row_filter = "(" * 3000 + "a > 0" + ")" * 3000
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(
+                url, {"file": file, "column_names": ["a"], "filter": row_filter}, format="multipart"
+            )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == {
+            "filter": ["Invalid filter: more than 100 nested parentheses or negations at position 100"]
+        }
+
+    def test_excel_summary_grouped(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(
+            data=[["region", "a"], ["north", 1], ["south", 2], ["north", 3], ["east", 4]]
+        )
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["a"], "aggregates": ["sum"], "group_by": ["region"], "top": 1}
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            "file": "test.xlsx",
+            "summary": [{"column": "a", "sum": "10"}],
+            "groups": [{"group": {"region": "north"}, "rows": 2, "summary": [{"column": "a", "sum": "4"}]}],
+        }
+
+    def test_excel_summary_when_too_many_groups(self, api_client, sample_excel_file_factory, settings):
+        settings.EXCEL_SUMMARY_GROUPS = {"MAX_GROUPS": 2}
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(
+            data=[["region", "a"], ["north", 1], ["south", 2], ["east", 3]]
+        )
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["a"], "group_by": ["region"]}
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == {"detail": "Rows cannot be grouped in more than 2 groups"}
+
+    def test_excel_summary_when_column_is_summarised_and_grouped(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a"], [1]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["a"], "group_by": ["a"]}
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_excel_summary_when_top_without_group_by(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a"], [1]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["a"], "top": 1}
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == {"top": ["Only grouped summaries take top, set group_by"]}
+
     def test_excel_summary_two_data_rows(self, api_client, sample_excel_file_factory):
         url = "/api/v1/excel-summary/"
         file_name = "test.xlsx"
@@ -95,4 +293,263 @@ class TestExcelSummaryView:
             response = api_client.post(url, data, format="multipart")
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
-        assert response.data["detail"] == "Column row cannot be found"
+        assert response.data["detail"] == "Column row cannot be found; 'ab' may be 'b' or 'a'; 'ba' may be 'b' or 'a'"
+
+    def test_excel_summary_with_header_row(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b"], [1, 2], ["a", "b"], [3, 4]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["a"], "header_row": 3}
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["summary"] == [{"column": "a", "sum": "3", "avg": "3"}]
+
+    def test_excel_summary_when_column_row_is_beyond_header_scan_rows(
+        self, api_client, sample_excel_file_factory, settings
+    ):
+        settings.EXCEL_SUMMARY_HEADER = {"MAX_SCAN_ROWS": 2}
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(
+            data=[["title"], ["Amount", "Quantities"], [], ["Amount", "Quantity"]]
+        )
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["Amount", "Quantity"]}
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["detail"] == (
+            "Column row cannot be found in the first 2 rows; row 2 lacks 'Quantity'; 'Quantity' may be 'Quantities'"
+        )
+
+    def test_excel_summary_result_cache(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b", "c"], [1, 2, 3]])
+        responses = []
+        for column_names, engine in [[["a"], "decimal"], [["a"], "decimal"], [["b"], "decimal"], [["a"], "numpy"]]:
+            with open(sample_excel_file_path, "rb") as file:
+                data = {"file": file, "column_names": column_names, "engine": engine}
+                responses.append(api_client.post(url, data, format="multipart"))
+
+        assert [response.status_code for response in responses] == [status.HTTP_200_OK] * 4
+        assert [response.headers["X-Summary-Cache"] for response in responses] == ["miss", "hit", "miss", "miss"]
+        assert responses[1].data == responses[0].data
+
+    def test_excel_summary_when_result_cache_is_disabled(self, api_client, sample_excel_file_factory, settings):
+        settings.EXCEL_SUMMARY_RESULT_CACHE = {"BACKEND": None}
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b", "c"], [1, 2, 3]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(url, {"file": file, "column_names": ["a"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "X-Summary-Cache" not in response.headers
+
+    def test_excel_summary_reads_other_columns_from_extract(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b", "c"], [1, 2, 3], [3, 4, 5]])
+        responses = []
+        with patch.object(
+            XlsxFileReader, "iter_rows", autospec=True, side_effect=XlsxFileReader.iter_rows
+        ) as iter_rows:
+            for column_names in [["a"], ["b", "c"]]:
+                with open(sample_excel_file_path, "rb") as file:
+                    data = {"file": file, "column_names": column_names}
+                    responses.append(api_client.post(url, data, format="multipart"))
+
+        assert [response.data["summary"] for response in responses] == [
+            [{"column": "a", "sum": "4", "avg": "2"}],
+            [{"column": "b", "sum": "6", "avg": "3"}, {"column": "c", "sum": "8", "avg": "4"}],
+        ]
+        iter_rows.assert_called_once()
+
+    def test_excel_summary_of_all_sheets(self, api_client, sample_excel_workbook_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_workbook_factory({"first": [["a"], [1], [3]], "second": [["a"], [5]]})
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(url, {"file": file, "column_names": ["a"], "sheets": ["*"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            "file": "test.xlsx",
+            "summary": [{"column": "a", "sum": "9", "avg": "3"}],
+            "sheets": [
+                {"sheet": "first", "summary": [{"column": "a", "sum": "4", "avg": "2"}], "detail": None},
+                {"sheet": "second", "summary": [{"column": "a", "sum": "5", "avg": "5"}], "detail": None},
+            ],
+        }
+
+    @pytest.mark.parametrize("sheets", [["third"], ["*", "first"]])
+    def test_excel_summary_when_sheets_are_invalid(self, api_client, sample_excel_workbook_factory, sheets):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_workbook_factory({"first": [["a"], [1]]})
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(url, {"file": file, "column_names": ["a"], "sheets": sheets}, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_excel_summary_sampled(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b"], [1, 2], [3, 4], [5, 6], [7, 8]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            data = {"file": file, "column_names": ["a"], "mode": "sample", "sample_fraction": 1}
+            response = api_client.post(url, data, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            "file": "test.xlsx",
+            "summary": [
+                {
+                    "column": "a",
+                    "sum": "16",
+                    "sum_low": "16",
+                    "sum_high": "16",
+                    "avg": "4",
+                    "avg_low": "4",
+                    "avg_high": "4",
+                    "count": 4,
+                }
+            ],
+            "sample": {"method": "stride", "rows_examined": 4, "rows_total": 4, "fraction": 1.0, "confidence": 0.95},
+        }
+
+    def test_excel_summary_sampled_is_not_served_exact_result(self, api_client, sample_excel_file_factory, settings):
+        settings.EXCEL_SUMMARY_SAMPLING = {"DEFAULT_ROWS": 2}
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a"], [1], [3], [5], [7]])
+        responses = []
+        for mode in ["exact", "sample"]:
+            with open(sample_excel_file_path, "rb") as file:
+                data = {"file": file, "column_names": ["a"], "mode": mode}
+                responses.append(api_client.post(url, data, format="multipart"))
+
+        assert [response.headers["X-Summary-Cache"] for response in responses] == ["miss", "miss"]
+        assert "sample" not in responses[0].data
+        assert responses[1].data["sample"]["rows_examined"] == 2
+        assert responses[1].data["sample"]["rows_total"] == 4
+
+    @pytest.mark.parametrize(
+        ("data", "field"),
+        [
+            [{"sample_rows": 10}, "mode"],
+            [{"mode": "sample", "sample_rows": 10, "sample_fraction": 0.5}, "sample_fraction"],
+            [{"mode": "sample", "aggregates": ["sum", "median"]}, "aggregates"],
+            [{"mode": "sample", "group_by": ["b"]}, "group_by"],
+            [{"mode": "sample", "sheets": ["*"]}, "sheets"],
+            [{"mode": "sample", "sample_fraction": 0}, "sample_fraction"],
+        ],
+    )
+    def test_excel_summary_when_sample_options_are_invalid(self, api_client, sample_excel_file_factory, data, field):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b"], [1, 2]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(url, {"file": file, "column_names": ["a"], **data}, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert field in response.data
+
+    def test_excel_summary_uses_hash_of_upload(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b", "c"], [1, 2, 3]])
+
+        with patch("api.v1.views.hash_file") as hash_file, open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(url, {"file": file, "column_names": ["a"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        hash_file.assert_not_called()
+
+    @pytest.mark.parametrize("data_upload_max_memory_size", [None, 2621440])
+    def test_excel_summary_when_file_is_too_large(
+        self, api_client, sample_excel_file_factory, settings, data_upload_max_memory_size
+    ):
+        settings.EXCEL_SUMMARY_UPLOAD = {"MAX_BYTES": 1024}
+        settings.DATA_UPLOAD_MAX_MEMORY_SIZE = data_upload_max_memory_size
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b", "c"], [1, 2, 3]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(url, {"file": file, "column_names": ["a"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert response.data["detail"] == "Uploaded file is too large"
+
+    def test_excel_summary_server_timing(self, api_client, sample_excel_file_factory, settings):
+        settings.EXCEL_SUMMARY_METRICS = {"ENABLED": True, "SERVER_TIMING": True}
+        settings.EXCEL_SUMMARY_RESULT_CACHE = {"BACKEND": None}
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b", "c"], [1, 2, 3]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(url, {"file": file, "column_names": ["a"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        stages = [metric.split(";dur=")[0] for metric in response.headers["Server-Timing"].split(", ")]
+        assert stages == ["upload", "cache", "header_search", "rows", "summary", "serialize", "total"]
+
+    def test_excel_summary_server_timing_of_invalid_request(self, api_client, settings):
+        settings.EXCEL_SUMMARY_METRICS = {"ENABLED": True, "SERVER_TIMING": True}
+
+        response = api_client.post("/api/v1/excel-summary/", {"column_names": ["a"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.headers["Server-Timing"].startswith("upload;dur=")
+
+    def test_excel_summary_without_server_timing(self, api_client, sample_excel_file_factory):
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b", "c"], [1, 2, 3]])
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(url, {"file": file, "column_names": ["a"]}, format="multipart")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "Server-Timing" not in response.headers
+
+    def test_excel_summary_profiled(self, api_client, sample_excel_file_factory, settings, tmp_path):
+        settings.EXCEL_SUMMARY_PROFILING = {"ENABLED": True, "DIRECTORY": tmp_path}
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b", "c"], [1, 2, 3]], file_name="slow.xlsx")
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(
+                url, {"file": file, "column_names": ["a"]}, format="multipart", headers={"X-Summary-Profile": "1"}
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        profile_id = response.headers["X-Summary-Profile"]
+        assert (tmp_path / f"{profile_id}.prof").exists()
+        profile = ProfileStore(directory=tmp_path).get(profile_id)
+        assert (profile["file"], profile["status"]) == ("slow.xlsx", 200)
+
+    def test_excel_summary_profiled_when_refused(self, api_client, settings, tmp_path):
+        settings.EXCEL_SUMMARY_PROFILING = {"ENABLED": True, "DIRECTORY": tmp_path}
+
+        response = api_client.post(
+            "/api/v1/excel-summary/", {"column_names": ["a"]}, format="multipart", headers={"X-Summary-Profile": "1"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        profile = ProfileStore(directory=tmp_path).get(response.headers["X-Summary-Profile"])
+        assert (profile["file"], profile["status"]) == (None, 400)
+
+    @pytest.mark.parametrize(("enabled", "headers"), [[False, {"X-Summary-Profile": "1"}], [True, {}]])
+    def test_excel_summary_not_profiled(
+        self, api_client, sample_excel_file_factory, settings, tmp_path, enabled, headers
+    ):
+        settings.EXCEL_SUMMARY_PROFILING = {"ENABLED": enabled, "DIRECTORY": tmp_path / "profiles"}
+        url = "/api/v1/excel-summary/"
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b", "c"], [1, 2, 3]])
+
+        with patch("api.v1.views.cProfile.Profile") as profile_mock, open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(url, {"file": file, "column_names": ["a"]}, format="multipart", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        profile_mock.assert_not_called()
+        assert "X-Summary-Profile" not in response.headers
+        assert not (tmp_path / "profiles").exists()
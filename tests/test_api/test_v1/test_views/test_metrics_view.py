@@ -0,0 +1,43 @@
+from rest_framework import status
+
+from services.summarise_excel.metrics import BYTES_READ, REQUESTS, ROWS, STAGE_SECONDS
+
+
+class TestMetricsView:
+    def test_metrics_count_summary_requests(self, api_client, sample_excel_file_factory, settings):
+        settings.EXCEL_SUMMARY_RESULT_CACHE = {"BACKEND": None}
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b"], [1, 2], ["x", 4], [5, 6]])
+        requests = REQUESTS.value(status="200")
+        rows_scanned = ROWS.value(outcome="scanned")
+        rows_unprocessable = ROWS.value(outcome="unprocessable")
+        bytes_read = BYTES_READ.value()
+        row_stages = STAGE_SECONDS.count(stage="rows")
+
+        with open(sample_excel_file_path, "rb") as file:
+            response = api_client.post(
+                "/api/v1/excel-summary/", {"file": file, "column_names": ["a"]}, format="multipart"
+            )
+        assert response.status_code == status.HTTP_200_OK
+
+        assert REQUESTS.value(status="200") == requests + 1
+        assert ROWS.value(outcome="scanned") == rows_scanned + 3
+        assert ROWS.value(outcome="unprocessable") == rows_unprocessable + 1
+        assert BYTES_READ.value() == bytes_read + sample_excel_file_path.stat().st_size
+        assert STAGE_SECONDS.count(stage="rows") == row_stages + 1
+
+        response = api_client.get("/metrics")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+        lines = response.content.decode().splitlines()
+        assert "# TYPE excel_summary_stage_seconds histogram" in lines
+        assert f'excel_summary_requests_total{{status="200"}} {requests + 1:.0f}' in lines
+        assert f'excel_summary_stage_seconds_count{{stage="rows"}} {row_stages + 1}' in lines
+        assert any(line.startswith("excel_summary_peak_rss_bytes ") for line in lines)
+
+    def test_metrics_when_disabled(self, api_client, settings):
+        settings.EXCEL_SUMMARY_METRICS = {"ENABLED": False, "SERVER_TIMING": False}
+
+        response = api_client.get("/metrics")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,190 @@
+import zipfile
+
+from unittest.mock import patch
+
+import pytest
+
+from services.summarise_excel.batch_summaries import (
+    expand_archives,
+    find_files,
+    is_workbook_archive,
+    iter_file_summaries,
+    summarise_files,
+)
+from services.summarise_excel.exceptions import ArchiveTooLargeError, TooManyFilesError
+from services.summarise_excel.file_readers import OLE2_MAGIC
+from services.summarise_excel.worker_pool import WorkerPool
+
+
+@pytest.fixture
+def workbook_paths(sample_excel_file_factory):
+    return [
+        str(sample_excel_file_factory([("a", "b"), (1, 2), (3, 4)], file_name="first.xlsx")),
+        str(sample_excel_file_factory([("note",), ("text",)], file_name="notes.xlsx")),
+        str(sample_excel_file_factory([("b", "a"), (10, 20)], file_name="second.xlsx")),
+    ]
+
+
+@pytest.fixture
+def archive_path(tmp_path, workbook_paths):
+    path = tmp_path / "branches.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.write(workbook_paths[0], "branches/first.xlsx")
+        archive.write(workbook_paths[2], "second.xlsx")
+        archive.writestr("__MACOSX/._second.xlsx", b"")
+        archive.writestr("branches/", b"")
+    return str(path)
+
+
+class TestExpandArchives:
+    def test_is_workbook_archive(self, workbook_paths, archive_path):
+        assert not is_workbook_archive(workbook_paths[0])
+        assert is_workbook_archive(archive_path)
+        with open(archive_path, "rb") as file:
+            assert is_workbook_archive(file)
+            assert file.tell() == 0
+
+    def test_is_workbook_archive_when_file_is_ods(self, sample_ods_file_factory):
+        assert not is_workbook_archive(str(sample_ods_file_factory({"data": [("a",), (1,)]})))
+
+    def test_expand_archives(self, tmp_path, workbook_paths, archive_path):
+        files = expand_archives(
+            files=[("first.xlsx", workbook_paths[0]), ("branches.zip", archive_path)], directory=tmp_path
+        )
+
+        assert [name for name, _file in files] == [
+            "first.xlsx",
+            "branches.zip/branches/first.xlsx",
+            "branches.zip/second.xlsx",
+        ]
+        with open(files[2][1], "rb") as extracted, open(workbook_paths[2], "rb") as original:
+            assert extracted.read() == original.read()
+
+    def test_expand_archives_when_too_many_files(self, tmp_path, workbook_paths, archive_path):
+        with pytest.raises(TooManyFilesError):
+            expand_archives(
+                files=[("first.xlsx", workbook_paths[0]), ("branches.zip", archive_path)],
+                directory=tmp_path,
+                max_files=2,
+            )
+
+    def test_expand_archives_when_archive_is_too_large(self, tmp_path, archive_path):
+        with pytest.raises(ArchiveTooLargeError):
+            expand_archives(files=[("branches.zip", archive_path)], directory=tmp_path, max_archive_bytes=1000)
+
+
+class TestSummariseFiles:
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_summarise_files(self, workbook_paths, max_workers):
+        files = [(path.rsplit("/", 1)[-1], path) for path in workbook_paths]
+
+        with patch("services.summarise_excel.batch_summaries.os.cpu_count", return_value=2):
+            result = summarise_files(files=files, column_names=["a", "b"], max_workers=max_workers)
+
+        assert result == {
+            "summary": [
+                {"column": "a", "sum": "24", "avg": "8"},
+                {"column": "b", "sum": "16", "avg": "5.333333333333333333333333333"},
+            ],
+            "files": [
+                {
+                    "file": "first.xlsx",
+                    "summary": [{"column": "a", "sum": "4", "avg": "2"}, {"column": "b", "sum": "6", "avg": "3"}],
+                    "detail": None,
+                },
+                {"file": "notes.xlsx", "summary": None, "detail": "Column row cannot be found"},
+                {
+                    "file": "second.xlsx",
+                    "summary": [{"column": "a", "sum": "20", "avg": "20"}, {"column": "b", "sum": "10", "avg": "10"}],
+                    "detail": None,
+                },
+            ],
+        }
+
+    def test_summarise_files_in_shared_worker_pool(self, workbook_paths):
+        files = [(path.rsplit("/", 1)[-1], path) for path in workbook_paths]
+        worker_pool = WorkerPool(max_workers=2)
+
+        try:
+            with patch("services.summarise_excel.batch_summaries.os.cpu_count", return_value=2):
+                result = summarise_files(files=files, column_names=["a"], max_workers=2, worker_pool=worker_pool)
+
+            assert worker_pool._executor is not None
+        finally:
+            worker_pool.shutdown()
+
+        assert result["summary"] == [{"column": "a", "sum": "24", "avg": "8"}]
+
+    def test_summarise_files_reports_unexpected_errors_per_file(self, workbook_paths):
+        files = [("first.xlsx", workbook_paths[0]), ("second.xlsx", workbook_paths[2])]
+
+        with patch("services.summarise_excel.batch_summaries.build_summary_generator") as build_summary_generator_mock:
+            build_summary_generator_mock.return_value.generate_column_results.side_effect = [RuntimeError, []]
+            build_summary_generator_mock.return_value.groups = None
+            result = summarise_files(files=files, column_names=["a"])
+
+        assert result["files"][0] == {"file": "first.xlsx", "summary": None, "detail": "Unexpected processing error"}
+        assert result["files"][1] == {"file": "second.xlsx", "summary": [], "detail": None}
+
+    def test_summarise_files_reports_unreadable_file(self, tmp_path, workbook_paths):
+        legacy_path = tmp_path / "legacy.xls"
+        legacy_path.write_bytes(OLE2_MAGIC + bytes(504))
+        files = [("legacy.xls", str(legacy_path)), ("first.xlsx", workbook_paths[0])]
+
+        result = summarise_files(files=files, column_names=["a"])
+
+        assert result == {
+            "summary": [{"column": "a", "sum": "4", "avg": "2"}],
+            "files": [
+                {"file": "legacy.xls", "summary": None, "detail": "Cannot read file"},
+                {"file": "first.xlsx", "summary": [{"column": "a", "sum": "4", "avg": "2"}], "detail": None},
+            ],
+        }
+
+    def test_summarise_files_when_no_file_can_be_summarised(self, workbook_paths):
+        result = summarise_files(files=[("notes.xlsx", workbook_paths[1])], column_names=["a"])
+
+        assert result == {
+            "summary": None,
+            "files": [{"file": "notes.xlsx", "summary": None, "detail": "Column row cannot be found"}],
+        }
+
+
+class TestFindFiles:
+    def test_find_files(self, tmp_path):
+        (tmp_path / "nested").mkdir()
+        for name in ["b.xlsx", "a.csv", ".hidden.xlsx", "nested/c.xlsx"]:
+            (tmp_path / name).write_bytes(b"")
+
+        assert find_files([str(tmp_path)]) == [str(tmp_path / "a.csv"), str(tmp_path / "b.xlsx")]
+        assert find_files([str(tmp_path / "*.xlsx"), str(tmp_path / "b.*")]) == [str(tmp_path / "b.xlsx")]
+        assert find_files([str(tmp_path)], recursive=True) == [
+            str(tmp_path / "a.csv"),
+            str(tmp_path / "b.xlsx"),
+            str(tmp_path / "nested" / "c.xlsx"),
+        ]
+
+
+class TestIterFileSummaries:
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_iter_file_summaries(self, workbook_paths, max_workers):
+        with patch("services.summarise_excel.batch_summaries.os.cpu_count", return_value=2):
+            file_summaries = list(iter_file_summaries(workbook_paths, column_names=["a"], max_workers=max_workers))
+
+        assert sorted(file_summaries, key=lambda file_summary: file_summary["file"]) == [
+            {"file": workbook_paths[0], "summary": [{"column": "a", "sum": "4", "avg": "2"}], "detail": None},
+            {"file": workbook_paths[1], "summary": None, "detail": "Column row cannot be found"},
+            {"file": workbook_paths[2], "summary": [{"column": "a", "sum": "20", "avg": "20"}], "detail": None},
+        ]
+
+    def test_iter_file_summaries_of_csv_and_ods_files(self, tmp_path, sample_ods_file_factory):
+        csv_path = tmp_path / "first.csv"
+        csv_path.write_text("a;b\n1;2\n3;4\n")
+        ods_path = sample_ods_file_factory({"data": [("b", "a"), (10, 20)]})
+
+        file_summaries = list(iter_file_summaries([str(csv_path), str(ods_path)], column_names=["a"]))
+
+        assert [file_summary["summary"] for file_summary in file_summaries] == [
+            [{"column": "a", "sum": "4", "avg": "2"}],
+            [{"column": "a", "sum": "20", "avg": "20"}],
+        ]
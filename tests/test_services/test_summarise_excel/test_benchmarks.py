@@ -0,0 +1,86 @@
+import pytest
+
+from services.summarise_excel.benchmarks import (
+    BENCHMARKS,
+    WorkbookSpec,
+    compare_with_baseline,
+    generate_workbook,
+    iter_workbook_rows,
+    run_benchmark,
+)
+from services.summarise_excel.file_readers import XlsxFileReader
+
+
+@pytest.fixture
+def spec():
+    return WorkbookSpec(name="small", rows=200, columns=4, dirty_ratio=0.25, shared_string_ratio=0.5, header_offset=3)
+
+
+def build_results(rows=200, items_per_second=1000.0, peak_rss_bytes=100 << 20):
+    return {
+        "workbooks": {"small": {"rows": rows}},
+        "results": {"small/row_processor": {"items_per_second": items_per_second, "peak_rss_bytes": peak_rss_bytes}},
+    }
+
+
+class TestWorkbookGenerator:
+    def test_iter_workbook_rows_is_deterministic(self, spec):
+        rows = list(iter_workbook_rows(spec))
+
+        assert rows == list(iter_workbook_rows(spec))
+        assert rows != list(iter_workbook_rows(WorkbookSpec(name="small", rows=200, columns=4, seed=1)))
+        assert len(rows) == 3 + 1 + 200
+        assert rows[3] == ["value_0", "value_1", "label_0", "label_1"]
+        dirty_rows = [row for row in rows[4:] if not all(isinstance(value, (int, float)) for value in row[:2])]
+        assert 20 < len(dirty_rows) < 80
+        assert all(isinstance(value, str) for row in rows[4:] for value in row[2:])
+
+    def test_generate_workbook(self, tmp_path, spec):
+        path = generate_workbook(spec, tmp_path / "small.xlsx")
+
+        rows = list(XlsxFileReader(file=str(path)).iter_rows())
+        # Empty strings are not stored, their cells are read as empty
+        expected_rows = [[None if value == "" else value for value in row] for row in iter_workbook_rows(spec)]
+        assert [list(row) for row in rows[3:]] == expected_rows[3:]
+
+    def test_scaled(self, spec):
+        assert spec.scaled(0.5).as_dict() == dict(spec.as_dict(), rows=100)
+
+
+class TestRunBenchmark:
+    @pytest.mark.parametrize("benchmark", list(BENCHMARKS))
+    def test_run_benchmark(self, tmp_path, spec, benchmark):
+        path = str(generate_workbook(spec, tmp_path / "small.xlsx"))
+
+        result = run_benchmark(benchmark, path, spec, repeat=1)
+
+        assert result["items"] == (400 if result["unit"] == "values" else pytest.approx(200, abs=4))
+        assert result["items_per_second"] > 0
+        assert result["peak_rss_bytes"] > 0
+        assert (result["megabytes_per_second"] is not None) == benchmark.startswith(("file_reader", "summary"))
+
+
+class TestCompareWithBaseline:
+    def test_compare_with_baseline_within_threshold(self):
+        results = build_results(items_per_second=850.0, peak_rss_bytes=110 << 20)
+
+        assert compare_with_baseline(results, build_results(), threshold=0.2) == []
+
+    def test_compare_with_baseline_when_slower(self):
+        results = build_results(items_per_second=700.0)
+
+        assert compare_with_baseline(results, build_results(), threshold=0.2) == [
+            "small/row_processor: 700 items/s, 30% slower than the baseline 1000 items/s"
+        ]
+
+    def test_compare_with_baseline_when_peak_rss_grew(self):
+        results = build_results(peak_rss_bytes=150 << 20)
+
+        assert compare_with_baseline(results, build_results(), threshold=0.2) == [
+            "small/row_processor: peak RSS of 150 MiB, 50% above the baseline 100 MiB"
+        ]
+
+    def test_compare_with_baseline_of_other_workbook_shape(self):
+        results = build_results(rows=100, items_per_second=10.0)
+
+        assert compare_with_baseline(results, build_results(), threshold=0.2) == []
@@ -2,7 +2,11 @@ from unittest.mock import MagicMock
 
 import pytest
 
-from services.summarise_excel.column_row_finder import ColumnRowNotFoundError, ExcelColumnRowFinder
+from services.summarise_excel.column_row_finder import (
+    ColumnRowNotFoundError,
+    ExcelColumnRowFinder,
+    FixedColumnRowFinder,
+)
 from services.summarise_excel.file_readers import BaseFileReader
 
 
@@ -43,10 +47,10 @@ class TestExcelColumnRowFinder:
         finder = ExcelColumnRowFinder()
         columns_names = [present_column_name_1, present_column_name_2]
 
-        row, row_number = finder.find(file_reader=file_reader, column_names=columns_names)
+        row, rows = finder.find(file_reader=file_reader, column_names=columns_names)
 
-        assert row_number == 1
         assert row == column_row
+        assert list(rows) == []
 
     def test_find_when_column_row_is_not_first(self):
         file_reader = MagicMock(spec=BaseFileReader)
@@ -58,7 +62,118 @@ class TestExcelColumnRowFinder:
         finder = ExcelColumnRowFinder()
         columns_names = [present_column_name_1, present_column_name_2]
 
-        row, row_number = finder.find(file_reader=file_reader, column_names=columns_names)
+        row, rows = finder.find(file_reader=file_reader, column_names=columns_names)
 
-        assert row_number == 2
         assert row == column_row
+        assert list(rows) == []
+
+    def test_find_returns_rows_positioned_after_column_row(self):
+        file_reader = MagicMock(spec=BaseFileReader)
+        present_column_name = "present_column_name"
+        data_row_1 = [1]
+        data_row_2 = [2]
+        file_reader.iter_rows.return_value = [["title"], [present_column_name], data_row_1, data_row_2]
+        finder = ExcelColumnRowFinder()
+
+        row, rows = finder.find(file_reader=file_reader, column_names=[present_column_name])
+
+        assert row == [present_column_name]
+        assert list(rows) == [data_row_1, data_row_2]
+        file_reader.iter_rows.assert_called_once_with(projection=None)
+
+    def test_find_skips_rows_without_text(self):
+        file_reader = MagicMock(spec=BaseFileReader)
+        file_reader.iter_rows.return_value = [[1, None], [], [" a ", 2.5, "b"], [3, 4, 5]]
+        finder = ExcelColumnRowFinder()
+
+        column_row, rows = finder.find(file_reader=file_reader, column_names=["a", "b"])
+
+        assert column_row == ["a", 2.5, "b"]
+        assert list(rows) == [[3, 4, 5]]
+
+    def test_find_stops_after_max_scan_rows(self):
+        file_reader = MagicMock(spec=BaseFileReader)
+        file_reader.iter_rows.return_value = iter([["x"], ["a", "c"], ["y"], ["a", "b"]])
+        finder = ExcelColumnRowFinder(max_scan_rows=3)
+
+        with pytest.raises(ColumnRowNotFoundError) as error:
+            finder.find(file_reader=file_reader, column_names=["a", "b"])
+
+        assert error.value.max_rows == 3
+        assert error.value.candidates == [{"row": 2, "missing": ["b"]}]
+        assert error.value.detail == "Column row cannot be found in the first 3 rows; row 2 lacks 'b'"
+
+    def test_find_in_header_row(self):
+        file_reader = MagicMock(spec=BaseFileReader)
+        file_reader.iter_rows.return_value = [["a", "b"], [1, 2], ["a", "b"], [3, 4]]
+        finder = ExcelColumnRowFinder(header_row=3)
+
+        column_row, rows = finder.find(file_reader=file_reader, column_names=["a", "b"])
+
+        assert column_row == ["a", "b"]
+        assert list(rows) == [[3, 4]]
+
+    def test_find_when_header_row_does_not_hold_column_names(self):
+        file_reader = MagicMock(spec=BaseFileReader)
+        file_reader.iter_rows.return_value = [["a", "b"], ["Amount", "Quantity"]]
+        finder = ExcelColumnRowFinder(header_row=1)
+
+        with pytest.raises(ColumnRowNotFoundError) as error:
+            finder.find(file_reader=file_reader, column_names=["amount"])
+
+        assert error.value.candidates == []
+        assert error.value.suggestions == {}
+        assert error.value.detail == "Column row cannot be found in row 1"
+
+    @pytest.mark.parametrize(
+        ("rows", "detail"),
+        [
+            [[["x"], ["a", "c"], ["y"]], "Column row cannot be found in row 2; row 2 lacks 'b'"],
+            [[["x"], ["a", "c"]], "Column row cannot be found in row 2; row 2 lacks 'b'"],
+            [[["x"]], "Column row cannot be found in row 2"],
+        ],
+    )
+    def test_find_tells_header_row_when_not_found(self, rows, detail):
+        file_reader = MagicMock(spec=BaseFileReader)
+        file_reader.iter_rows.return_value = rows
+        finder = ExcelColumnRowFinder(header_row=2)
+
+        with pytest.raises(ColumnRowNotFoundError) as error:
+            finder.find(file_reader=file_reader, column_names=["a", "b"])
+
+        assert error.value.header_row == 2
+        assert error.value.max_rows is None
+        assert error.value.detail == detail
+
+    def test_find_tells_closest_candidates(self):
+        file_reader = MagicMock(spec=BaseFileReader)
+        file_reader.iter_rows.return_value = [
+            ["Report"],
+            ["Date", "Amount", "Quantity", "Region"],
+            ["Date", "Amount", "Qty", "Price"],
+            ["Region", "Price"],
+        ]
+        finder = ExcelColumnRowFinder(max_candidates=2)
+
+        with pytest.raises(ColumnRowNotFoundError) as error:
+            finder.find(file_reader=file_reader, column_names=["Date", "Amount", "Quantity", "Prices"])
+
+        assert error.value.candidates == [
+            {"row": 2, "missing": ["Prices"]},
+            {"row": 3, "missing": ["Prices", "Quantity"]},
+        ]
+        assert error.value.suggestions == {"Prices": ["Price"]}
+        assert error.value.detail == "Column row cannot be found; row 2 lacks 'Prices'; 'Prices' may be 'Price'"
+
+
+class TestFixedColumnRowFinder:
+    def test_find(self):
+        file_reader = MagicMock(spec=BaseFileReader)
+        file_reader.iter_rows.return_value = [[1, 2], [3, 4]]
+        finder = FixedColumnRowFinder(column_row=["a", "b"])
+
+        column_row, rows = finder.find(file_reader=file_reader, column_names=["a"])
+
+        assert column_row == ["a", "b"]
+        assert list(rows) == [[1, 2], [3, 4]]
+        file_reader.iter_rows.assert_called_once_with(projection=None)
@@ -0,0 +1,176 @@
+import datetime
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.summarise_excel.column_row_finder import ExcelColumnRowFinder
+from services.summarise_excel.exceptions import CannotReadFileError, ColumnRowNotFoundError
+from services.summarise_excel.extract_cache import ColumnarExtractCache, ExtractFileReader
+from services.summarise_excel.file_readers import BaseFileReader, ColumnProjection, XlsxFileReader
+
+
+@pytest.fixture
+def sample_rows():
+    return [
+        ("title", None),
+        ("id", "name", "amount", "paid", "date"),
+        (1, "Blob", 3.5, True, datetime.datetime(2024, 1, 2, 3, 4, 5)),
+        (2, "Alice", "$4.25", False, datetime.date(2024, 1, 2)),
+        (2**70, "Blob", -0.1, None, datetime.timedelta(days=1, seconds=2)),
+        (),
+        (None, None, None, None, datetime.time(1, 2, 3)),
+    ]
+
+
+@pytest.fixture
+def file_reader_mock(sample_rows):
+    file_reader_mock = MagicMock(spec=BaseFileReader)
+    file_reader_mock.iter_rows.side_effect = lambda **_: iter(sample_rows)
+    return file_reader_mock
+
+
+class TestColumnarExtractCache:
+    def test_build_keeps_every_row(self, tmp_path, file_reader_mock, sample_rows):
+        extract_cache = ColumnarExtractCache(directory=tmp_path)
+
+        extract = extract_cache.build(key="key", file_reader=file_reader_mock)
+
+        assert list(extract.iter_rows()) == sample_rows
+        assert list(extract_cache.get("key").iter_rows(min_row=3)) == sample_rows[2:]
+
+    def test_build_writes_rows_in_blocks(self, tmp_path):
+        rows = [(index,) if index < 5 else (index, f"text {index % 3}", f"unique {index}") for index in range(12)]
+        file_reader_mock = MagicMock(spec=BaseFileReader)
+        file_reader_mock.iter_rows.return_value = iter(rows)
+        extract_cache = ColumnarExtractCache(directory=tmp_path)
+
+        with (
+            patch("services.summarise_excel.extract_cache.BLOCK_ROWS", 4),
+            patch("services.summarise_excel.extract_cache.MAX_DISTINCT_TEXTS", 4),
+        ):
+            extract = extract_cache.build(key="key", file_reader=file_reader_mock)
+
+        assert list(extract.iter_rows()) == rows
+
+    def test_build_from_xlsx_file(self, tmp_path, sample_excel_file_factory):
+        data = [["a", "b", "c"], [1, 2.5, "x"], [None, True, "=A2+1"]]
+        file_reader = XlsxFileReader(str(sample_excel_file_factory(data)))
+        extract_cache = ColumnarExtractCache(directory=tmp_path / "extracts")
+
+        extract = extract_cache.build(key="key", file_reader=file_reader)
+
+        assert list(extract.iter_rows()) == list(file_reader.iter_rows())
+
+    def test_get_when_missing(self, tmp_path):
+        assert ColumnarExtractCache(directory=tmp_path).get("key") is None
+
+    def test_iter_rows_with_projection(self, tmp_path, file_reader_mock):
+        extract = ColumnarExtractCache(directory=tmp_path).build(key="key", file_reader=file_reader_mock)
+
+        rows = list(extract.iter_rows(projection=ColumnProjection(columns=[0, 2])))
+
+        assert rows == [
+            ("title", None),
+            ("id", None, "amount"),
+            (1, None, 3.5),
+            (2, None, "$4.25"),
+            (2**70, None, -0.1),
+            (),
+            (None, None, None),
+        ]
+
+    def test_iter_rows_with_projection_updated_while_iterating(self, tmp_path):
+        file_reader_mock = MagicMock(spec=BaseFileReader)
+        file_reader_mock.iter_rows.return_value = [("a", "b", "c")] + [(1, 2, 3)] * 199
+        extract = ColumnarExtractCache(directory=tmp_path).build(key="key", file_reader=file_reader_mock)
+        projection = ColumnProjection()
+        rows = extract.iter_rows(projection=projection)
+
+        first_row = next(rows)
+        projection.update([1])
+        rows = list(rows)
+
+        # Rows already rebuilt before the update keep every column, the next blocks only hold the projected ones
+        assert first_row == ("a", "b", "c")
+        assert len(rows) == 199
+        assert rows[-1] == (None, 2)
+
+    def test_build_evicts_extracts_used_least_recently(self, tmp_path, file_reader_mock):
+        extract_cache = ColumnarExtractCache(directory=tmp_path)
+        extract_cache.build(key="first", file_reader=file_reader_mock)
+        extract_size = sum(file.stat().st_size for file in (tmp_path / "first").iterdir())
+        extract_cache.max_bytes = extract_size
+
+        extract_cache.build(key="second", file_reader=file_reader_mock)
+
+        assert extract_cache.get("first") is None
+        assert extract_cache.get("second") is not None
+
+    def test_build_keeps_new_extract_over_budget(self, tmp_path, file_reader_mock):
+        extract_cache = ColumnarExtractCache(directory=tmp_path, max_bytes=0)
+
+        extract_cache.build(key="key", file_reader=file_reader_mock)
+
+        assert extract_cache.get("key") is not None
+
+
+class TestExtractFileReader:
+    def test_iter_rows_builds_extract_once(self, tmp_path, file_reader_mock, sample_rows):
+        reader = ExtractFileReader(
+            extract_cache=ColumnarExtractCache(directory=tmp_path), key="key", source=file_reader_mock
+        )
+
+        assert list(reader.iter_rows()) == sample_rows
+        assert list(reader.iter_rows()) == sample_rows
+        file_reader_mock.iter_rows.assert_called_once_with()
+
+    def test_iter_rows_when_extract_cannot_be_stored(self, tmp_path, file_reader_mock, sample_rows):
+        extract_cache = ColumnarExtractCache(directory=tmp_path)
+        reader = ExtractFileReader(extract_cache=extract_cache, key="key", source=file_reader_mock)
+
+        with patch("services.summarise_excel.extract_cache.ExtractWriter.append", side_effect=OSError):
+            rows = list(reader.iter_rows(min_row=2))
+
+        assert rows == sample_rows[1:]
+        assert extract_cache.get("key") is None
+        assert not list(tmp_path.iterdir())
+
+    def test_iter_rows_yields_rows_while_extract_is_built(self, tmp_path, file_reader_mock, sample_rows):
+        extract_cache = ColumnarExtractCache(directory=tmp_path)
+        reader = ExtractFileReader(extract_cache=extract_cache, key="key", source=file_reader_mock)
+        rows = reader.iter_rows()
+
+        first_rows = [next(rows), next(rows)]
+        rows.close()
+
+        # Rows not read to the end, e.g. once the column row is not found, leave no extract behind
+        assert first_rows == sample_rows[:2]
+        assert extract_cache.get("key") is None
+        assert not list(tmp_path.iterdir())
+
+    def test_iter_rows_keeps_column_row_search_bounded(self, tmp_path):
+        rows_read = []
+        file_reader_mock = MagicMock(spec=BaseFileReader)
+        file_reader_mock.iter_rows.return_value = (rows_read.append(index) or (index,) for index in range(1000))
+        reader = ExtractFileReader(
+            extract_cache=ColumnarExtractCache(directory=tmp_path), key="key", source=file_reader_mock
+        )
+
+        with pytest.raises(ColumnRowNotFoundError):
+            ExcelColumnRowFinder(max_scan_rows=3).find(file_reader=reader, column_names=["missing"])
+
+        # The search stops at its bound rather than at the end of the sheet
+        assert len(rows_read) < 10
+        assert not list(tmp_path.iterdir())
+
+    def test_iter_rows_when_file_cannot_be_read(self, tmp_path):
+        file_reader_mock = MagicMock(spec=BaseFileReader)
+        file_reader_mock.iter_rows.side_effect = CannotReadFileError
+        reader = ExtractFileReader(
+            extract_cache=ColumnarExtractCache(directory=tmp_path), key="key", source=file_reader_mock
+        )
+
+        with pytest.raises(CannotReadFileError):
+            list(reader.iter_rows())
+        assert not list(tmp_path.iterdir())
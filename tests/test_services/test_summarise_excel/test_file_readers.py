@@ -1,6 +1,35 @@
+import codecs
+import datetime
+import io
+import random
+import zipfile
+
+from unittest.mock import MagicMock, call
+
 import pytest
 
-from services.summarise_excel.file_readers import ExcelFileReader
+from openpyxl import Workbook
+
+from services.summarise_excel.exceptions import CannotReadFileError, SheetNotFoundError
+from services.summarise_excel.file_readers import (
+    FILE_FORMAT_CSV,
+    FILE_FORMAT_ODS,
+    FILE_FORMAT_XLS,
+    FILE_FORMAT_XLSX,
+    BaseFileReader,
+    ColumnProjection,
+    CountingFileReader,
+    CsvFileReader,
+    ExcelFileReader,
+    OdsFileReader,
+    ProgressFileReader,
+    ReservoirFileReader,
+    StrideFileReader,
+    XlsxFileReader,
+    XlsxRowRangeFileReader,
+    sniff_file_format,
+)
+from services.summarise_excel.xlsx import XlsxWorkbook, read_sheet_layout, split_row_ranges
 
 
 @pytest.fixture
@@ -32,3 +61,416 @@ class TestExcelFileReader:
         reader = ExcelFileReader(str(sample_excel_file_path))
         rows = list(reader.iter_rows())
         assert rows == []
+
+
+class TestXlsxFileReader:
+    def test_iter_rows_reads_all_rows(self, sample_excel_file_factory, sample_data):
+        sample_excel_file_path = sample_excel_file_factory(sample_data)
+        reader = XlsxFileReader(str(sample_excel_file_path))
+        rows = list(reader.iter_rows())
+        assert rows == sample_data
+
+    def test_iter_rows_with_min_row(self, sample_excel_file_factory, sample_data):
+        sample_excel_file_path = sample_excel_file_factory(sample_data)
+        reader = XlsxFileReader(str(sample_excel_file_path))
+        rows = list(reader.iter_rows(min_row=2))
+        assert rows == sample_data[1:]
+
+    def test_iter_rows_empty_file(self, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory([])
+        reader = XlsxFileReader(str(sample_excel_file_path))
+        rows = list(reader.iter_rows())
+        assert rows == []
+
+    def test_row_count(self, sample_excel_file_factory, sample_data):
+        sample_excel_file_path = sample_excel_file_factory(sample_data)
+
+        assert XlsxFileReader(str(sample_excel_file_path)).row_count() == len(sample_data)
+
+    def test_row_count_when_file_is_not_xlsx(self, tmp_path):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text("a,b\n1,2\n")
+
+        assert XlsxFileReader(str(file_path)).row_count() is None
+        assert CsvFileReader(str(file_path)).row_count() is None
+
+    @pytest.mark.parametrize(("stride", "start", "min_row"), [[1, 0, 0], [3, 0, 0], [3, 2, 0], [4, 1, 3], [50, 0, 0]])
+    def test_iter_rows_stride_matches_iter_rows(self, sample_excel_file_factory, stride, start, min_row):
+        data = [("id", "value"), *[(index, f"row {index}") for index in range(1, 21)]]
+        reader = XlsxFileReader(str(sample_excel_file_factory(data)))
+
+        rows = list(reader.iter_rows_stride(stride=stride, start=start, min_row=min_row))
+
+        assert rows == data[max(min_row - 1, 0) :][start::stride]
+
+    def test_iter_rows_stride_skips_missing_rows(self, tmp_path):
+        file_path = tmp_path / "test.xlsx"
+        workbook = Workbook()
+        worksheet = workbook.active
+        worksheet["A1"] = "id"
+        worksheet["A2"] = 1
+        worksheet["A5"] = 2
+        worksheet["A6"] = 3
+        workbook.save(file_path)
+
+        rows = list(XlsxFileReader(str(file_path)).iter_rows_stride(stride=2, min_row=2))
+
+        assert rows == [(1,), (3,)]
+
+    def test_iter_rows_matches_excel_file_reader(self, tmp_path):
+        file_path = tmp_path / "test.xlsx"
+        workbook = Workbook()
+        worksheet = workbook.active
+        worksheet.append(["text", 1, 2.5, True, datetime.datetime(2024, 1, 2), "=A1&B1"])
+        worksheet["C4"] = datetime.date(2020, 1, 1)
+        worksheet["F5"] = "  padded  "
+        workbook.create_sheet("other").append(["other sheet"])
+        workbook.save(file_path)
+
+        rows = list(XlsxFileReader(str(file_path)).iter_rows())
+
+        assert rows == list(ExcelFileReader(str(file_path)).iter_rows())
+        assert rows[0] == ("text", 1, 2.5, True, datetime.datetime(2024, 1, 2), "=A1&B1")
+
+    def test_iter_rows_reads_active_sheet(self, tmp_path):
+        file_path = tmp_path / "test.xlsx"
+        workbook = Workbook()
+        workbook.active.append(["first"])
+        workbook.create_sheet("second").append(["second"])
+        workbook.active = 1
+        workbook.save(file_path)
+
+        rows = list(XlsxFileReader(str(file_path)).iter_rows())
+
+        assert rows == [("second",)]
+
+    def test_iter_rows_with_projection(self, sample_excel_file_factory, sample_data):
+        sample_excel_file_path = sample_excel_file_factory(sample_data)
+        reader = XlsxFileReader(str(sample_excel_file_path))
+        rows = list(reader.iter_rows(projection=ColumnProjection(columns={1})))
+        assert rows == [(None, "name"), (None, "Blob"), (None, "Alice"), (None, None), (None, 2)]
+
+    def test_iter_rows_when_projection_is_updated_during_iteration(self, sample_excel_file_factory, sample_data):
+        sample_excel_file_path = sample_excel_file_factory(sample_data)
+        reader = XlsxFileReader(str(sample_excel_file_path))
+        projection = ColumnProjection()
+        rows = reader.iter_rows(projection=projection)
+
+        column_row = next(rows)
+        projection.update({0, 2})
+
+        assert column_row == sample_data[0]
+        assert list(rows) == [(1, None, 3), (2, None, 4), (None, None, None), (1, None, None)]
+
+    def test_iter_rows_from_file_object(self, sample_excel_file_factory, sample_data):
+        sample_excel_file_path = sample_excel_file_factory(sample_data)
+        with open(sample_excel_file_path, "rb") as file:
+            rows = list(XlsxFileReader(file).iter_rows())
+        assert rows == sample_data
+
+    def test_iter_rows_when_file_is_not_xlsx(self, tmp_path):
+        file_path = tmp_path / "test.xlsx"
+        file_path.write_bytes(b"not a zip file")
+        reader = XlsxFileReader(str(file_path))
+
+        with pytest.raises(CannotReadFileError):
+            list(reader.iter_rows())
+
+
+@pytest.mark.parametrize("reader_class", [ExcelFileReader, XlsxFileReader])
+class TestFileReaderSheets:
+    @pytest.fixture
+    def workbook_path(self, sample_excel_workbook_factory):
+        return sample_excel_workbook_factory({"first": [("a",), (1,)], "second": [("b",), (2,)]}, active=1)
+
+    def test_sheet_names(self, reader_class, workbook_path):
+        assert reader_class(str(workbook_path)).sheet_names() == ["first", "second"]
+
+    def test_iter_rows_reads_active_sheet(self, reader_class, workbook_path):
+        assert list(reader_class(str(workbook_path)).iter_rows()) == [("b",), (2,)]
+
+    def test_iter_rows_reads_sheet(self, reader_class, workbook_path):
+        assert list(reader_class(str(workbook_path), sheet="first").iter_rows()) == [("a",), (1,)]
+
+    def test_iter_rows_when_sheet_is_missing(self, reader_class, workbook_path):
+        with pytest.raises(SheetNotFoundError):
+            list(reader_class(str(workbook_path), sheet="third").iter_rows())
+
+
+class TestCsvFileReader:
+    @pytest.fixture
+    def csv_text(self):
+        return "id,name,age\n1,Blob,3\n2,Alice,4\n,,\n1,2,\n"
+
+    def test_iter_rows_reads_all_rows(self, tmp_path, csv_text, sample_data):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text(csv_text)
+        rows = list(CsvFileReader(str(file_path)).iter_rows())
+        assert rows == sample_data
+
+    def test_iter_rows_with_min_row(self, tmp_path, csv_text, sample_data):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text(csv_text)
+        rows = list(CsvFileReader(str(file_path)).iter_rows(min_row=2))
+        assert rows == sample_data[1:]
+
+    @pytest.mark.parametrize("delimiter", [";", "\t", "|"])
+    def test_iter_rows_sniffs_delimiter(self, tmp_path, csv_text, sample_data, delimiter):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text(csv_text.replace(",", delimiter))
+        rows = list(CsvFileReader(str(file_path)).iter_rows())
+        assert rows == sample_data
+
+    @pytest.mark.parametrize(
+        ("encoding", "byte_order_mark"),
+        [["utf-8", b""], ["utf-8", codecs.BOM_UTF8], ["utf-16-le", codecs.BOM_UTF16_LE], ["cp1252", b""]],
+    )
+    def test_iter_rows_sniffs_encoding(self, tmp_path, encoding, byte_order_mark):
+        file_path = tmp_path / "test.csv"
+        file_path.write_bytes(byte_order_mark + "name;price\nCafé;1,5\nNaïve;2\n".encode(encoding))
+        rows = list(CsvFileReader(str(file_path)).iter_rows())
+        assert rows == [("name", "price"), ("Café", "1,5"), ("Naïve", 2)]
+
+    def test_iter_rows_reads_numbers_as_workbook_cells(self, tmp_path):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text('a,b,c,d\n7,-1.25,1e3,"007 "\n')
+        rows = list(CsvFileReader(str(file_path)).iter_rows())
+        assert rows == [("a", "b", "c", "d"), (7, -1.25, 1000.0, "007 ")]
+
+    def test_iter_rows_with_projection(self, tmp_path, csv_text):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text(csv_text)
+        rows = list(CsvFileReader(str(file_path)).iter_rows(projection=ColumnProjection([0, 2])))
+        assert rows[:2] == [("id", None, "age"), (1, None, 3)]
+
+    def test_iter_rows_when_projection_is_updated_during_iteration(self, tmp_path, csv_text):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text(csv_text)
+        projection = ColumnProjection()
+        rows = CsvFileReader(str(file_path)).iter_rows(projection=projection)
+
+        assert next(rows) == ("id", "name", "age")
+        projection.update([0])
+        assert next(rows) == (1, None, None)
+
+    def test_iter_rows_with_given_delimiter(self, tmp_path):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text("a;b\n1;2\n")
+        rows = list(CsvFileReader(str(file_path), delimiter=",").iter_rows())
+        assert rows == [("a;b",), ("1;2",)]
+
+    def test_iter_rows_from_file_object(self, csv_text, sample_data):
+        file = io.BytesIO(csv_text.encode())
+        rows = list(CsvFileReader(file).iter_rows())
+        assert rows == sample_data
+        assert not file.closed
+
+    def test_sheet_names(self, tmp_path):
+        assert CsvFileReader(str(tmp_path / "test.csv")).sheet_names() == ["Sheet1"]
+
+    def test_iter_rows_when_sheet_is_missing(self, tmp_path, csv_text):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text(csv_text)
+        with pytest.raises(SheetNotFoundError):
+            list(CsvFileReader(str(file_path), sheet="second").iter_rows())
+
+    def test_iter_rows_when_file_is_missing(self, tmp_path):
+        with pytest.raises(CannotReadFileError):
+            list(CsvFileReader(str(tmp_path / "missing.csv")).iter_rows())
+
+
+class TestOdsFileReader:
+    @pytest.fixture
+    def workbook_path(self, sample_ods_file_factory, sample_data):
+        return sample_ods_file_factory({"first": sample_data, "second": [("b", True), (2.5, "x & y")]}, active="second")
+
+    def test_sheet_names(self, workbook_path):
+        assert OdsFileReader(str(workbook_path)).sheet_names() == ["first", "second"]
+
+    def test_iter_rows_reads_active_sheet(self, workbook_path):
+        assert list(OdsFileReader(str(workbook_path)).iter_rows()) == [("b", True), (2.5, "x & y")]
+
+    def test_iter_rows_reads_sheet(self, workbook_path):
+        # Rows keep their position, but empty cells after the last value are not yielded
+        rows = list(OdsFileReader(str(workbook_path), sheet="first").iter_rows())
+        assert rows == [("id", "name", "age"), (1, "Blob", 3), (2, "Alice", 4), (), (1, 2)]
+
+    def test_iter_rows_with_min_row_and_projection(self, workbook_path):
+        reader = OdsFileReader(str(workbook_path), sheet="first")
+        rows = list(reader.iter_rows(min_row=2, projection=ColumnProjection([1])))
+        assert rows == [(None, "Blob"), (None, "Alice"), (), (None, 2)]
+
+    def test_iter_rows_reads_first_sheet_without_settings(self, sample_ods_file_factory):
+        workbook_path = sample_ods_file_factory({"first": [("a",)], "second": [("b",)]})
+        assert list(OdsFileReader(str(workbook_path)).iter_rows()) == [("a",)]
+
+    def test_iter_rows_expands_repeated_rows_and_cells(self, tmp_path):
+        content = (
+            '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+            ' xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"><office:body><office:spreadsheet>'
+            '<table:table table:name="data"><table:table-row>'
+            '<table:table-cell office:value-type="float" office:value="1" table:number-columns-repeated="2"/>'
+            "</table:table-row>"
+            '<table:table-row table:number-rows-repeated="2"><table:table-cell/></table:table-row>'
+            '<table:table-row table:number-rows-repeated="2">'
+            '<table:table-cell table:number-columns-repeated="2"/>'
+            '<table:table-cell office:value-type="date" office:date-value="2026-01-02"/>'
+            '<table:table-cell table:number-columns-repeated="16000"/>'
+            "</table:table-row>"
+            '<table:table-row table:number-rows-repeated="1048000"><table:table-cell/></table:table-row>'
+            "</table:table></office:spreadsheet></office:body></office:document-content>"
+        )
+        file_path = tmp_path / "test.ods"
+        with zipfile.ZipFile(file_path, "w") as archive:
+            archive.writestr("mimetype", "application/vnd.oasis.opendocument.spreadsheet")
+            archive.writestr("content.xml", content)
+        date_row = (None, None, datetime.datetime(2026, 1, 2))
+        assert list(OdsFileReader(str(file_path)).iter_rows()) == [(1, 1), (), (), date_row, date_row]
+
+    def test_iter_rows_when_sheet_is_missing(self, workbook_path):
+        with pytest.raises(SheetNotFoundError):
+            list(OdsFileReader(str(workbook_path), sheet="third").iter_rows())
+
+    def test_iter_rows_when_file_is_not_ods(self, tmp_path):
+        file_path = tmp_path / "test.ods"
+        file_path.write_bytes(b"not a zip file")
+        with pytest.raises(CannotReadFileError):
+            list(OdsFileReader(str(file_path)).iter_rows())
+
+
+class TestSniffFileFormat:
+    def test_xlsx(self, sample_excel_file_factory, sample_data):
+        assert sniff_file_format(str(sample_excel_file_factory(sample_data, file_name="test.csv"))) == FILE_FORMAT_XLSX
+
+    def test_ods(self, sample_ods_file_factory, sample_data):
+        assert sniff_file_format(str(sample_ods_file_factory({"data": sample_data}))) == FILE_FORMAT_ODS
+
+    def test_xls(self, tmp_path):
+        file_path = tmp_path / "test.xls"
+        file_path.write_bytes(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + bytes(512))
+        assert sniff_file_format(str(file_path)) == FILE_FORMAT_XLS
+
+    def test_csv(self, tmp_path):
+        file_path = tmp_path / "test.xlsx"
+        file_path.write_text("a,b\n1,2\n")
+        assert sniff_file_format(str(file_path)) == FILE_FORMAT_CSV
+
+    def test_file_object_is_left_at_its_start(self):
+        file = io.BytesIO(b"a,b\n1,2\n")
+        assert sniff_file_format(file) == FILE_FORMAT_CSV
+        assert file.tell() == 0
+
+
+class TestProgressFileReader:
+    def test_iter_rows_reports_progress(self, sample_data):
+        file_reader_mock = MagicMock(spec=BaseFileReader)
+        file_reader_mock.iter_rows.return_value = iter(sample_data)
+        callback = MagicMock()
+        projection = ColumnProjection()
+        reader = ProgressFileReader(file_reader=file_reader_mock, callback=callback, interval=2)
+
+        rows = list(reader.iter_rows(min_row=1, projection=projection))
+
+        assert rows == sample_data
+        assert callback.call_args_list == [call(2), call(4), call(5)]
+        file_reader_mock.iter_rows.assert_called_once_with(min_row=1, projection=projection)
+
+
+class TestCountingFileReader:
+    def test_iter_rows_counts_rows(self, sample_data):
+        file_reader_mock = MagicMock(spec=BaseFileReader)
+        file_reader_mock.iter_rows.return_value = iter(sample_data)
+        reader = CountingFileReader(file_reader=file_reader_mock)
+        rows = reader.iter_rows()
+
+        next(rows)
+        next(rows)
+
+        assert reader.rows_read == 2
+
+
+class TestStrideFileReader:
+    def test_iter_rows_reads_every_nth_row_after_first_row(self, sample_data):
+        file_reader_mock = MagicMock(spec=BaseFileReader)
+        file_reader_mock.iter_rows_stride.return_value = iter(sample_data[1::2])
+        projection = ColumnProjection()
+        reader = StrideFileReader(file_reader=file_reader_mock, stride=2, start=1, first_row=2)
+
+        rows = list(reader.iter_rows(projection=projection))
+
+        assert rows == sample_data[1::2]
+        file_reader_mock.iter_rows_stride.assert_called_once_with(stride=2, start=1, min_row=2, projection=projection)
+
+    def test_iter_rows_of_reader_without_stride(self, tmp_path):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text("a\n" + "".join(f"{index}\n" for index in range(10)))
+
+        rows = list(StrideFileReader(file_reader=CsvFileReader(str(file_path)), stride=3, first_row=2).iter_rows())
+
+        assert rows == [(0,), (3,), (6,), (9,)]
+
+
+class TestReservoirFileReader:
+    def test_iter_rows_keeps_sample_of_rows(self):
+        file_reader_mock = MagicMock(spec=BaseFileReader)
+        file_reader_mock.iter_rows.return_value = iter([(index,) for index in range(100)])
+        reader = ReservoirFileReader(file_reader=file_reader_mock, size=10, first_row=2, generator=random.Random(0))
+
+        rows = list(reader.iter_rows())
+
+        assert len(rows) == 10
+        assert len(set(rows)) == 10
+        assert reader.rows_read == 100
+        file_reader_mock.iter_rows.assert_called_once_with(min_row=2, projection=None)
+
+    def test_iter_rows_keeps_every_row_below_size(self, sample_data):
+        file_reader_mock = MagicMock(spec=BaseFileReader)
+        file_reader_mock.iter_rows.return_value = iter(sample_data)
+        reader = ReservoirFileReader(file_reader=file_reader_mock, size=10)
+
+        assert list(reader.iter_rows()) == sample_data
+        assert reader.rows_read == len(sample_data)
+
+
+class TestXlsxRowRangeFileReader:
+    @pytest.fixture
+    def sheet_part_path(self, sample_excel_file_factory, sample_data, tmp_path):
+        sample_excel_file_path = sample_excel_file_factory(sample_data + [(5, "Bob", 6)] * 20)
+        sheet_part_path = tmp_path / "sheet.xml"
+        with zipfile.ZipFile(sample_excel_file_path) as archive:
+            sheet_part_path.write_bytes(archive.read(XlsxWorkbook(archive=archive).active_sheet_path))
+        return sample_excel_file_path, sheet_part_path
+
+    def test_iter_rows_of_ranges(self, sheet_part_path, sample_data):
+        sample_excel_file_path, sheet_part_path = sheet_part_path
+        with open(sheet_part_path, "rb") as source:
+            layout, buffer = read_sheet_layout(source)
+            start = source.tell() - len(buffer)
+        content = sheet_part_path.read_bytes()
+        ranges = split_row_ranges(content, layout, start, content.rfind(layout.sheet_data_end), count=3)
+
+        rows = [
+            row
+            for range_start, range_end in ranges
+            for row in XlsxRowRangeFileReader(
+                file=str(sample_excel_file_path),
+                sheet_part_path=str(sheet_part_path),
+                start=range_start,
+                end=range_end,
+                first_row=2,
+            ).iter_rows()
+        ]
+
+        assert len(ranges) == 3
+        assert rows == sample_data[1:] + [(5, "Bob", 6)] * 20
+
+    def test_iter_rows_when_sheet_part_is_missing(self, sample_excel_file_factory, sample_data, tmp_path):
+        reader = XlsxRowRangeFileReader(
+            file=str(sample_excel_file_factory(sample_data)),
+            sheet_part_path=str(tmp_path / "missing.xml"),
+            start=0,
+            end=10,
+        )
+
+        with pytest.raises(CannotReadFileError):
+            list(reader.iter_rows())
@@ -0,0 +1,254 @@
+import concurrent.futures
+import os
+import threading
+import time
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.summarise_excel.exceptions import JobNotFoundError, JobQueueFullError
+from services.summarise_excel.jobs import (
+    JOB_STATUS_CANCELLED,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_QUEUED,
+    JOB_STATUS_RUNNING,
+    JOB_STATUS_SUCCEEDED,
+    JobRunner,
+    JobStore,
+    run_job,
+)
+
+
+@pytest.fixture
+def job_store(tmp_path):
+    return JobStore(directory=tmp_path / "jobs")
+
+
+@pytest.fixture
+def job_factory(job_store, sample_excel_file_factory):
+    def _builder(data, column_names):
+        content = sample_excel_file_factory(data).read_bytes()
+        return job_store.create(
+            file_name="test.xlsx",
+            chunks=[content[:10], content[10:]],
+            column_names=column_names,
+            options={"engine": "decimal", "file_reader": "xlsx"},
+        )
+
+    return _builder
+
+
+class TestJobStore:
+    def test_create(self, job_store):
+        job = job_store.create(file_name="test.xlsx", chunks=[b"ab", b"c"], column_names=["a"], options={})
+
+        assert job_store.get(job["id"]) == job
+        assert job["status"] == JOB_STATUS_QUEUED
+        assert job["cancel_requested"] is False
+        assert job_store.upload_path(job["id"]).read_bytes() == b"abc"
+
+    def test_update(self, job_store):
+        job = job_store.create(file_name="test.xlsx", chunks=[], column_names=["a"], options={})
+
+        updated_job = job_store.update(job["id"], status=JOB_STATUS_RUNNING, rows_scanned=10)
+
+        assert job_store.get(job["id"]) == updated_job
+        assert updated_job["status"] == JOB_STATUS_RUNNING
+        assert updated_job["rows_scanned"] == 10
+
+    def test_update_keeps_concurrent_changes(self, job_store):
+        job = job_store.create(file_name="test.xlsx", chunks=[], column_names=["a"], options={})
+        fields = [f"field_{index}" for index in range(20)]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda field: job_store.update(job["id"], **{field: True}), fields))
+
+        assert all(job_store.get(job["id"])[field] for field in fields)
+
+    def test_create_removes_expired_jobs(self, job_store):
+        expired_job = job_store.create(file_name="test.xlsx", chunks=[b"a"], column_names=["a"], options={})
+        recent_job = job_store.create(file_name="test.xlsx", chunks=[b"a"], column_names=["a"], options={})
+        expired_at = time.time() - job_store.retention_seconds - 1
+        os.utime(job_store.directory / expired_job["id"] / "job.json", (expired_at, expired_at))
+
+        job_store.create(file_name="test.xlsx", chunks=[], column_names=["a"], options={})
+
+        with pytest.raises(JobNotFoundError):
+            job_store.get(expired_job["id"])
+        assert not (job_store.directory / expired_job["id"]).exists()
+        assert job_store.get(recent_job["id"])["status"] == JOB_STATUS_QUEUED
+
+    def test_update_when_job_was_removed(self, job_store):
+        with pytest.raises(JobNotFoundError):
+            job_store.update("missing", status=JOB_STATUS_RUNNING)
+
+    def test_get_when_missing(self, job_store):
+        with pytest.raises(JobNotFoundError):
+            job_store.get("missing")
+
+    def test_request_cancel(self, job_store):
+        job = job_store.create(file_name="test.xlsx", chunks=[], column_names=["a"], options={})
+
+        job_store.request_cancel(job["id"])
+
+        assert job_store.get(job["id"])["cancel_requested"] is True
+
+
+class TestRunJob:
+    def test_run_job(self, job_store, job_factory):
+        job = job_factory(data=[["a", "b"], [1, 2], [3, 4]], column_names=["a"])
+
+        run_job(directory=str(job_store.directory), job_id=job["id"])
+
+        job = job_store.get(job["id"])
+        assert job["status"] == JOB_STATUS_SUCCEEDED
+        assert job["summary"] == [{"column": "a", "sum": "4", "avg": "2"}]
+        assert job["rows_scanned"] == 3
+        assert not job_store.upload_path(job["id"]).exists()
+
+    def test_run_job_when_column_row_not_found(self, job_store, job_factory):
+        job = job_factory(data=[["a", "b"], [1, 2]], column_names=["c"])
+
+        run_job(directory=str(job_store.directory), job_id=job["id"])
+
+        job = job_store.get(job["id"])
+        assert job["status"] == JOB_STATUS_FAILED
+        assert job["detail"] == "Column row cannot be found"
+
+    def test_run_job_when_cancelled_before_start(self, job_store, job_factory):
+        job = job_factory(data=[["a"], [1]], column_names=["a"])
+        job_store.request_cancel(job["id"])
+
+        run_job(directory=str(job_store.directory), job_id=job["id"])
+
+        assert job_store.get(job["id"])["status"] == JOB_STATUS_CANCELLED
+
+    def test_run_job_when_cancelled_while_running(self, job_store, job_factory):
+        job = job_factory(data=[["a"], [1], [2], [3]], column_names=["a"])
+        update = JobStore.update
+
+        def update_and_cancel(store, job_id, **changes):
+            updated_job = update(store, job_id, **changes)
+            if changes.get("status") == JOB_STATUS_RUNNING:
+                store.request_cancel(job_id)
+            return updated_job
+
+        with (
+            patch("services.summarise_excel.jobs.PROGRESS_INTERVAL", 1),
+            patch.object(JobStore, "update", autospec=True, side_effect=update_and_cancel),
+        ):
+            run_job(directory=str(job_store.directory), job_id=job["id"])
+
+        job = job_store.get(job["id"])
+        assert job["status"] == JOB_STATUS_CANCELLED
+        assert job["summary"] is None
+
+
+class TestJobRunner:
+    def test_submit_runs_job_in_worker_process(self, job_store, sample_excel_file_factory):
+        content = sample_excel_file_factory([["a", "b"], [1, 2], [3, 4]]).read_bytes()
+        job_runner = JobRunner(store=job_store, max_workers=1)
+        try:
+            job = job_runner.submit(
+                file_name="test.xlsx", chunks=[content], column_names=["b"], options={"engine": "numpy"}
+            )
+            deadline = time.monotonic() + 30
+            while job["status"] not in (JOB_STATUS_SUCCEEDED, JOB_STATUS_FAILED) and time.monotonic() < deadline:
+                time.sleep(0.05)
+                job = job_store.get(job["id"])
+        finally:
+            job_runner.shutdown()
+
+        assert job["status"] == JOB_STATUS_SUCCEEDED
+        assert job["summary"] == [{"column": "b", "sum": "6", "avg": "3"}]
+
+    def test_submit_when_queue_is_full(self, job_store):
+        job_runner = JobRunner(store=job_store, max_workers=1, max_queued=1)
+        job_runner._futures = {"first": concurrent.futures.Future(), "second": concurrent.futures.Future()}
+
+        with pytest.raises(JobQueueFullError):
+            job_runner.submit(file_name="test.xlsx", chunks=[], column_names=["a"], options={})
+        assert not job_store.directory.exists()
+
+    def test_submit_when_queue_fills_during_upload(self, job_store):
+        job_runner = JobRunner(store=job_store, max_workers=1, max_queued=1)
+
+        def chunks():
+            job_runner._futures = {"first": concurrent.futures.Future(), "second": concurrent.futures.Future()}
+            yield b"content"
+
+        with pytest.raises(JobQueueFullError):
+            job_runner.submit(file_name="test.xlsx", chunks=chunks(), column_names=["a"], options={})
+        assert list(job_store.directory.iterdir()) == []
+
+    def test_submit_writes_upload_without_lock(self, job_store):
+        job_runner = JobRunner(store=job_store)
+        job_runner._executor = MagicMock(spec=concurrent.futures.ProcessPoolExecutor)
+        job_runner._executor.submit.return_value = concurrent.futures.Future()
+        lock_acquired = []
+
+        def acquire_lock():
+            lock_acquired.append(job_runner._lock.acquire(blocking=False))
+            if lock_acquired[-1]:
+                job_runner._lock.release()
+
+        def chunks():
+            thread = threading.Thread(target=acquire_lock)
+            thread.start()
+            thread.join()
+            yield b"content"
+
+        job_runner.submit(file_name="test.xlsx", chunks=chunks(), column_names=["a"], options={})
+
+        assert lock_acquired == [True]
+
+    def test_cancel_queued_job(self, job_store):
+        job_runner = JobRunner(store=job_store)
+        job_runner._executor = MagicMock(spec=concurrent.futures.ProcessPoolExecutor)
+        job_runner._executor.submit.return_value = concurrent.futures.Future()
+        job = job_runner.submit(file_name="test.xlsx", chunks=[b"content"], column_names=["a"], options={})
+
+        job = job_runner.cancel(job["id"])
+
+        assert job["status"] == JOB_STATUS_CANCELLED
+        assert job["cancel_requested"] is True
+        assert not job_store.upload_path(job["id"]).exists()
+        assert job_runner._futures == {}
+
+    def test_cancel_running_job(self, job_store):
+        job_runner = JobRunner(store=job_store)
+        job_runner._executor = MagicMock(spec=concurrent.futures.ProcessPoolExecutor)
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        job_runner._executor.submit.return_value = future
+        job = job_runner.submit(file_name="test.xlsx", chunks=[b"content"], column_names=["a"], options={})
+
+        job = job_runner.cancel(job["id"])
+
+        # The worker marks the job as cancelled at its next progress report
+        assert job["status"] == JOB_STATUS_QUEUED
+        assert job["cancel_requested"] is True
+
+    def test_cancel_finished_job(self, job_store):
+        job_runner = JobRunner(store=job_store)
+        job = job_store.create(file_name="test.xlsx", chunks=[], column_names=["a"], options={})
+        job_store.update(job["id"], status=JOB_STATUS_SUCCEEDED)
+
+        job = job_runner.cancel(job["id"])
+
+        assert job["status"] == JOB_STATUS_SUCCEEDED
+        assert job["cancel_requested"] is False
+
+    def test_job_fails_when_worker_dies(self, job_store):
+        job_runner = JobRunner(store=job_store)
+        job_runner._executor = MagicMock(spec=concurrent.futures.ProcessPoolExecutor)
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        job_runner._executor.submit.return_value = future
+        job = job_runner.submit(file_name="test.xlsx", chunks=[], column_names=["a"], options={})
+
+        future.set_exception(concurrent.futures.process.BrokenProcessPool())
+
+        job = job_store.get(job["id"])
+        assert job["status"] == JOB_STATUS_FAILED
+        assert job["detail"] == "Unexpected processing error"
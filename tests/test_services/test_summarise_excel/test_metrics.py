@@ -0,0 +1,82 @@
+import pytest
+
+from services.summarise_excel.metrics import Counter, Gauge, Histogram, MetricsRegistry, StageTimings
+
+
+class TestMetrics:
+    def test_counter(self):
+        counter = Counter("rows_total", "Rows", labelnames=["outcome"])
+        counter.inc(2, outcome="scanned")
+        counter.inc(outcome="scanned")
+        counter.inc(outcome='"skipped"\n')
+
+        assert counter.value(outcome="scanned") == 3
+        assert counter.render() == [
+            "# HELP rows_total Rows",
+            "# TYPE rows_total counter",
+            'rows_total{outcome="\\"skipped\\"\\n"} 1',
+            'rows_total{outcome="scanned"} 3',
+        ]
+
+    def test_counter_with_other_labels(self):
+        counter = Counter("rows_total", "Rows", labelnames=["outcome"])
+
+        with pytest.raises(ValueError, match="rows_total takes the labels"):
+            counter.inc(stage="rows")
+
+    def test_gauge(self):
+        gauge = Gauge("peak_bytes", "Peak")
+        gauge.set(10)
+        gauge.set(2.5)
+
+        assert gauge.samples() == ["peak_bytes 2.5"]
+
+    def test_histogram(self):
+        histogram = Histogram("stage_seconds", "Stages", labelnames=["stage"], buckets=[0.1, 1])
+        for value in [0.05, 0.1, 0.5, 3]:
+            histogram.observe(value, stage="rows")
+
+        assert histogram.count(stage="rows") == 4
+        assert histogram.count(stage="upload") == 0
+        assert histogram.samples() == [
+            'stage_seconds_bucket{stage="rows",le="0.1"} 2',
+            'stage_seconds_bucket{stage="rows",le="1"} 3',
+            'stage_seconds_bucket{stage="rows",le="+Inf"} 4',
+            'stage_seconds_sum{stage="rows"} 3.65',
+            'stage_seconds_count{stage="rows"} 4',
+        ]
+
+    def test_registry(self):
+        registry = MetricsRegistry()
+        counter = registry.register(Counter("requests_total", "Requests"))
+        counter.inc()
+
+        assert registry.render() == "# HELP requests_total Requests\n# TYPE requests_total counter\nrequests_total 1\n"
+        with pytest.raises(ValueError, match="already registered"):
+            registry.register(Gauge("requests_total", "Requests"))
+
+
+class TestStageTimings:
+    def test_stages(self):
+        timings = StageTimings()
+        with timings.stage("rows"):
+            pass
+        timings.add("upload", 0.25)
+        timings.add("upload", 0.5)
+        other_timings = StageTimings()
+        other_timings.add("rows", 1)
+        timings.update(other_timings)
+        timings.finish()
+
+        assert list(timings.seconds) == ["rows", "upload", "total"]
+        assert 1 <= timings.seconds["rows"] < 1.1
+        assert timings.seconds["upload"] == 0.75
+        assert timings.server_timing().split(", ")[1] == "upload;dur=750.0"
+
+    def test_stage_when_it_fails(self):
+        timings = StageTimings()
+
+        with pytest.raises(ZeroDivisionError), timings.stage("rows"):
+            1 / 0
+
+        assert list(timings.seconds) == ["rows"]
@@ -0,0 +1,181 @@
+import concurrent.futures
+import re
+import zipfile
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.summarise_excel.exceptions import ColumnRowNotFoundError, SheetNotFoundError
+from services.summarise_excel.generator_factory import build_summary_generator
+from services.summarise_excel.parallel_summary_generator import ParallelSummaryGenerator
+from services.summarise_excel.worker_pool import WorkerPool
+
+
+@pytest.fixture
+def sample_data():
+    return [["title"], [], ["id", "a", "b"]] + [
+        [index, index * 1.5, index * 2 if index % 3 else "x"] for index in range(500)
+    ]
+
+
+class TestParallelSummaryGenerator:
+    @pytest.mark.parametrize("engine", ["decimal", "numpy"])
+    def test_generate_matches_single_process(self, sample_excel_file_factory, sample_data, engine):
+        sample_excel_file_path = str(sample_excel_file_factory(sample_data))
+        generator = ParallelSummaryGenerator(
+            file=sample_excel_file_path, engine=engine, max_workers=3, min_range_size=1000
+        )
+
+        with patch(
+            "services.summarise_excel.parallel_summary_generator.ParallelSummaryGenerator._generate_in_process"
+        ) as generate_in_process:
+            summary = generator.generate(column_names=["b", "a"])
+
+        generate_in_process.assert_not_called()
+        assert summary == build_summary_generator(file=sample_excel_file_path, engine=engine).generate(
+            column_names=["b", "a"]
+        )
+        assert generator.stats.rows_scanned == 500
+        assert generator.stats.rows_unprocessable == 167
+
+    def test_generate_aggregates_match_single_process(self, sample_excel_file_factory, sample_data):
+        sample_excel_file_path = str(sample_excel_file_factory(sample_data))
+        aggregates = ["min", "max", "count", "nulls", "invalid"]
+        generator = ParallelSummaryGenerator(
+            file=sample_excel_file_path, max_workers=3, min_range_size=1000, aggregates=aggregates
+        )
+
+        summary = generator.generate(column_names=["b", "a"])
+
+        assert summary == build_summary_generator(file=sample_excel_file_path, aggregates=aggregates).generate(
+            column_names=["b", "a"]
+        )
+        assert summary[0] == {"column": "b", "min": "2", "max": "998", "count": 333, "nulls": 0, "invalid": 167}
+
+    @pytest.mark.parametrize("engine", ["decimal", "numpy"])
+    def test_generate_grouped_matches_single_process(self, sample_excel_file_factory, engine):
+        data = [["region", "a"]] + [[f"r{index % 4}", index] for index in range(500)]
+        sample_excel_file_path = str(sample_excel_file_factory(data))
+        generator = ParallelSummaryGenerator(
+            file=sample_excel_file_path, engine=engine, max_workers=3, min_range_size=1000, group_by=["region"]
+        )
+
+        summary = generator.generate_summary(column_names=["a"])
+
+        assert summary == build_summary_generator(
+            file=sample_excel_file_path, engine=engine, group_by=["region"]
+        ).generate_summary(column_names=["a"])
+        assert summary["summary"] == [{"column": "a", "sum": "124750", "avg": "249.5"}]
+        assert [group["rows"] for group in summary["groups"]] == [125, 125, 125, 125]
+
+    def test_generate_filtered_matches_single_process(self, sample_excel_file_factory, sample_data):
+        sample_excel_file_path = str(sample_excel_file_factory(sample_data))
+        generator = ParallelSummaryGenerator(
+            file=sample_excel_file_path, max_workers=3, min_range_size=1000, row_filter="id < 100 and b != 'x'"
+        )
+
+        summary = generator.generate(column_names=["a"])
+
+        assert summary == build_summary_generator(
+            file=sample_excel_file_path, row_filter="id < 100 and b != 'x'"
+        ).generate(column_names=["a"])
+        assert summary == [{"column": "a", "sum": "4900.5", "avg": "74.25"}]
+        assert generator.stats.rows_filtered == 434
+
+    def test_generate_small_sheet_in_process(self, sample_excel_file_factory, sample_data):
+        generator = ParallelSummaryGenerator(file=str(sample_excel_file_factory(sample_data)), max_workers=3)
+
+        with patch("services.summarise_excel.worker_pool.concurrent.futures") as futures:
+            summary = generator.generate(column_names=["a"])
+
+        futures.ProcessPoolExecutor.assert_not_called()
+        assert summary == [{"column": "a", "sum": "187125.0", "avg": "374.25"}]
+
+    def test_generate_csv_file_in_process(self, tmp_path, sample_data):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text("\n".join(",".join(map(str, row)) for row in sample_data))
+        generator = ParallelSummaryGenerator(file=str(file_path), max_workers=3, min_range_size=1)
+
+        with patch("services.summarise_excel.worker_pool.concurrent.futures") as futures:
+            summary = generator.generate(column_names=["a"])
+
+        futures.ProcessPoolExecutor.assert_not_called()
+        assert summary == [{"column": "a", "sum": "187125.0", "avg": "374.25"}]
+
+    def test_generate_with_shared_worker_pool(self, sample_excel_file_factory, sample_data):
+        sample_excel_file_path = str(sample_excel_file_factory(sample_data))
+        worker_pool = WorkerPool(max_workers=2)
+        generator = ParallelSummaryGenerator(
+            file=sample_excel_file_path, max_workers=3, min_range_size=1000, worker_pool=worker_pool
+        )
+
+        try:
+            first_summary = generator.generate(column_names=["a"])
+            executor = worker_pool._executor
+            second_summary = generator.generate(column_names=["a"])
+
+            assert worker_pool._executor is executor
+        finally:
+            worker_pool.shutdown()
+
+        assert first_summary == second_summary == [{"column": "a", "sum": "187125.0", "avg": "374.25"}]
+        assert worker_pool._executor is None
+
+    def test_generate_in_process_when_worker_dies(self, sample_excel_file_factory, sample_data):
+        sample_excel_file_path = str(sample_excel_file_factory(sample_data))
+        worker_pool = MagicMock(spec=WorkerPool)
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        future.set_exception(concurrent.futures.process.BrokenProcessPool())
+        worker_pool.submit.return_value = future
+        generator = ParallelSummaryGenerator(
+            file=sample_excel_file_path, max_workers=3, min_range_size=1000, worker_pool=worker_pool
+        )
+
+        summary = generator.generate(column_names=["a"])
+
+        assert summary == [{"column": "a", "sum": "187125.0", "avg": "374.25"}]
+        assert generator.stats.rows_scanned == 500
+
+    def test_generate_rows_without_reference_in_process(self, sample_excel_file_factory, sample_data, tmp_path):
+        sample_excel_file_path = sample_excel_file_factory(sample_data)
+        file_path = tmp_path / "unnumbered.xlsx"
+        with zipfile.ZipFile(sample_excel_file_path) as source, zipfile.ZipFile(file_path, "w") as target:
+            for info in source.infolist():
+                content = source.read(info)
+                if info.filename == "xl/worksheets/sheet1.xml":
+                    # Only the first row keeps its reference, which is the one checked before the split
+                    content = re.sub(rb'(<row\b[^>]*?) r="(?!1")\d+"', rb"\1", content)
+                target.writestr(info, content)
+        generator = ParallelSummaryGenerator(file=str(file_path), max_workers=3, min_range_size=1000)
+
+        with patch(
+            "services.summarise_excel.parallel_summary_generator.ParallelSummaryGenerator._generate_in_process",
+            wraps=generator._generate_in_process,
+        ) as generate_in_process:
+            summary = generator.generate(column_names=["a"])
+
+        generate_in_process.assert_called_once()
+        assert summary == [{"column": "a", "sum": "187125.0", "avg": "374.25"}]
+        assert generator.stats.rows_scanned == 500
+
+    def test_generate_without_data_rows(self, sample_excel_file_factory):
+        generator = ParallelSummaryGenerator(
+            file=str(sample_excel_file_factory([["a"] * 1000])), max_workers=3, min_range_size=100
+        )
+
+        assert generator.generate(column_names=["a"]) == [{"column": "a", "sum": "N/A", "avg": "N/A"}]
+
+    def test_generate_when_column_row_not_found(self, sample_excel_file_factory, sample_data):
+        generator = ParallelSummaryGenerator(
+            file=str(sample_excel_file_factory(sample_data)), max_workers=3, min_range_size=1000
+        )
+
+        with pytest.raises(ColumnRowNotFoundError):
+            generator.generate(column_names=["c"])
+
+    def test_generate_when_sheet_is_missing(self, sample_excel_file_factory, sample_data):
+        generator = ParallelSummaryGenerator(file=str(sample_excel_file_factory(sample_data)), sheet="missing")
+
+        with pytest.raises(SheetNotFoundError):
+            generator.generate(column_names=["a"])
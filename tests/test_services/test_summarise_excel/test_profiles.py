@@ -0,0 +1,77 @@
+import cProfile
+import os
+import uuid
+
+import pytest
+
+from services.summarise_excel.exceptions import ProfileNotFoundError
+from services.summarise_excel.profiles import ProfileStore
+
+
+def slow_function():
+    return sum(range(10000))
+
+
+def build_profiler():
+    profiler = cProfile.Profile()
+    profiler.runcall(slow_function)
+    return profiler
+
+
+class TestProfileStore:
+    def test_save_and_get(self, tmp_path):
+        store = ProfileStore(directory=tmp_path / "profiles")
+        profile_id = str(uuid.uuid4())
+
+        profile = store.save(profile_id, build_profiler(), file="slow.xlsx", status=200, seconds=1.5)
+
+        assert store.get(profile_id) == profile
+        assert profile == {
+            "id": profile_id,
+            "created_at": profile["created_at"],
+            "file": "slow.xlsx",
+            "status": 200,
+            "seconds": 1.5,
+        }
+        assert (tmp_path / "profiles" / f"{profile_id}.prof").exists()
+
+    def test_list_profiles(self, tmp_path):
+        store = ProfileStore(directory=tmp_path)
+        profile_ids = [str(uuid.uuid4()) for _ in range(2)]
+        for profile_id in profile_ids:
+            store.save(profile_id, build_profiler())
+        (tmp_path / "notes.json").write_text("{}")
+
+        assert [profile["id"] for profile in store.list_profiles()] == profile_ids[::-1]
+
+    def test_save_removes_oldest_profiles(self, tmp_path):
+        store = ProfileStore(directory=tmp_path, max_profiles=2)
+        profile_ids = [str(uuid.uuid4()) for _ in range(3)]
+        for mtime, profile_id in enumerate(profile_ids):
+            store.save(profile_id, build_profiler())
+            os.utime(tmp_path / f"{profile_id}.json", (mtime, mtime))
+
+        store.save(str(uuid.uuid4()), build_profiler())
+
+        assert {profile["id"] for profile in store.list_profiles()} >= set(profile_ids[2:])
+        assert len(store.list_profiles()) == 2
+        assert not (tmp_path / f"{profile_ids[0]}.prof").exists()
+
+    def test_top_functions(self, tmp_path):
+        store = ProfileStore(directory=tmp_path)
+        profile_id = str(uuid.uuid4())
+        store.save(profile_id, build_profiler())
+
+        top_functions = store.top_functions(profile_id, limit=5, sort_key="tottime")
+
+        assert "slow_function" in top_functions
+        assert "Ordered by: internal time" in top_functions
+
+    @pytest.mark.parametrize("profile_id", ["../secrets", str(uuid.uuid4())])
+    def test_when_profile_cannot_be_found(self, tmp_path, profile_id):
+        store = ProfileStore(directory=tmp_path)
+
+        with pytest.raises(ProfileNotFoundError):
+            store.get(profile_id)
+        with pytest.raises(ProfileNotFoundError):
+            store.top_functions(profile_id)
@@ -0,0 +1,104 @@
+import io
+
+from unittest.mock import patch
+
+import pytest
+
+from services.summarise_excel.result_cache import (
+    DjangoResultCache,
+    FileResultCache,
+    InMemoryResultCache,
+    build_cache_key,
+    hash_file,
+)
+
+
+@pytest.fixture
+def summary():
+    return [{"column": "a", "sum": "1", "avg": "1"}]
+
+
+class TestHashFile:
+    def test_hash_file_rewinds_file(self):
+        file = io.BytesIO(b"content")
+
+        file_hash = hash_file(file, chunk_size=2)
+
+        assert file_hash == "ed7002b439e9ac845f22357d822bac1444730fbdb6016d3ec9432297b9ec9f73"
+        assert file.tell() == 0
+
+
+class TestBuildCacheKey:
+    @pytest.mark.parametrize(
+        ("column_names", "options"),
+        [
+            [["b"], {"engine": "decimal"}],
+            [["a", "b"], {"engine": "decimal"}],
+            [["a"], {"engine": "numpy"}],
+            [["a"], {"engine": "decimal", "file_reader": "openpyxl"}],
+        ],
+    )
+    def test_build_cache_key_changes_with_columns_and_options(self, column_names, options):
+        key = build_cache_key(file_hash="hash", column_names=["a"], options={"engine": "decimal"})
+
+        assert key != build_cache_key(file_hash="hash", column_names=column_names, options=options)
+
+    def test_build_cache_key_does_not_depend_on_options_order(self):
+        options = {"engine": "decimal", "file_reader": "xlsx"}
+        key = build_cache_key(file_hash="hash", column_names=["a"], options=options)
+
+        assert key == build_cache_key(
+            file_hash="hash", column_names=["a"], options={"file_reader": "xlsx", "engine": "decimal"}
+        )
+
+
+class TestInMemoryResultCache:
+    def test_get_when_missing(self):
+        assert InMemoryResultCache().get("key") is None
+
+    def test_set_and_get(self, summary):
+        cache = InMemoryResultCache()
+        cache.set("key", summary)
+        assert cache.get("key") == summary
+
+    def test_set_evicts_least_recently_used(self, summary):
+        cache = InMemoryResultCache(max_size=2)
+        cache.set("key_1", summary)
+        cache.set("key_2", summary)
+        cache.get("key_1")
+        cache.set("key_3", summary)
+
+        assert cache.get("key_1") == summary
+        assert cache.get("key_2") is None
+        assert cache.get("key_3") == summary
+
+    def test_get_when_expired(self, summary):
+        cache = InMemoryResultCache(ttl=10)
+        with patch("services.summarise_excel.result_cache.time.monotonic", side_effect=[0, 11]):
+            cache.set("key", summary)
+            assert cache.get("key") is None
+
+
+class TestDjangoResultCache:
+    def test_set_and_get(self, summary):
+        cache = DjangoResultCache()
+        cache.set("key", summary)
+        assert cache.get("key") == summary
+        assert DjangoResultCache(key_prefix="other").get("key") is None
+
+
+class TestFileResultCache:
+    def test_get_when_missing(self, tmp_path):
+        assert FileResultCache(directory=tmp_path).get("key") is None
+
+    def test_set_and_get(self, tmp_path, summary):
+        FileResultCache(directory=tmp_path / "cache").set("key", summary)
+        assert FileResultCache(directory=tmp_path / "cache").get("key") == summary
+
+    def test_get_when_expired(self, tmp_path, summary):
+        cache = FileResultCache(directory=tmp_path, ttl=10)
+        cache.set("key", summary)
+        expired_at = (tmp_path / "key.json").stat().st_mtime + 11
+        with patch("services.summarise_excel.result_cache.time.time", return_value=expired_at):
+            assert cache.get("key") is None
+        assert not (tmp_path / "key.json").exists()
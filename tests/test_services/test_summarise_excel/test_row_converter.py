@@ -1,6 +1,6 @@
 import pytest
 
-from services.summarise_excel.row_converter import ExcelRowConverter, UnconvertibleRowError
+from services.summarise_excel.row_converter import ExcelRowConverter, UnconvertibleRowError, build_row_projection
 
 
 class TestExcelRowConverter:
@@ -39,3 +39,17 @@ class TestExcelRowConverter:
 
         with pytest.raises(UnconvertibleRowError):
             converter.convert(row=row, index_mapping=index_mapping)
+
+
+class TestBuildRowProjection:
+    @pytest.mark.parametrize(
+        ("column_indexes", "expected"),
+        [[[0, 2], ("a", "c")], [[2, 0], ("c", "a")], [[1], ("b",)], [[], ()]],
+    )
+    def test_project(self, column_indexes, expected):
+        assert build_row_projection(column_indexes)(("a", "b", "c")) == expected
+
+    @pytest.mark.parametrize("column_indexes", [[0, 3], [3]])
+    def test_project_when_row_too_short(self, column_indexes):
+        with pytest.raises(IndexError):
+            build_row_projection(column_indexes)(("a", "b", "c"))
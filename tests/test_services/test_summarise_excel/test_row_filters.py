@@ -0,0 +1,73 @@
+import datetime
+
+import pytest
+
+from services.summarise_excel.exceptions import InvalidRowFilterError
+from services.summarise_excel.row_filters import RowFilter
+
+
+@pytest.fixture
+def column_row():
+    return ["Status", "Order date", "Amount", "Region"]
+
+
+class TestRowFilter:
+    @pytest.mark.parametrize(
+        ("expression", "row", "expected"),
+        [
+            ['Status == "Paid"', ["Paid"], True],
+            ["Status == 'Paid'", ["Open"], False],
+            ["Status != null", ["Open"], True],
+            ["`Order date` >= 2026-01-01", ["Paid", datetime.datetime(2026, 1, 1, 10)], True],
+            ["`Order date` < 2026-01-01T10:00", ["Paid", datetime.datetime(2026, 1, 1, 10)], False],
+            ["Amount > 10", ["Paid", None, 10.5], True],
+            ["Amount <= 1.5", ["Paid", None, 1.5], True],
+            ["Amount > 10", ["Paid", None, "text"], False],
+            ["Amount > 10", ["Paid", None, None], False],
+            ["Amount in (1, 2.5, null)", ["Paid"], True],
+            ['Region not in ("North", "South")', ["Paid", None, 1, "East"], True],
+            ['Region not in ("North", "South")', ["Paid", None, 1, "North"], False],
+            ['Status == "Paid" and Amount > 1 or Region == "East"', ["Open", None, 5, "East"], True],
+            ['Status == "Paid" and (Amount > 1 or Region == "East")', ["Open", None, 5, "East"], False],
+            ['not Status == "Paid" AND NOT Amount > 1', ["Open", None, 0], True],
+            ['Status == "Say \\"hi\\""', ['Say "hi"'], True],
+            ["(" * 100 + "Amount > 1" + ")" * 100, ["Paid", None, 5], True],
+        ],
+    )
+    def test_compile(self, column_row, expression, row, expected):
+        predicate = RowFilter(expression).compile(column_row)
+
+        assert predicate(row) is expected
+
+    def test_column_names(self):
+        row_filter = RowFilter('Status == "Paid" and (`Order date` > 2026-01-01 or Status in ("Open"))')
+
+        assert row_filter.column_names == ["Status", "Order date"]
+
+    @pytest.mark.parametrize(
+        ("expression", "detail"),
+        [
+            ["  ", "Invalid filter: expression is empty"],
+            ["Amount >", "Invalid filter: expression ends unexpectedly"],
+            ["Amount > Status", "Invalid filter: expected a value, got 'Status' at position 9"],
+            ["> 1", "Invalid filter: expected a column name, got '>' at position 0"],
+            ["Amount 1", "Invalid filter: expected a comparison operator, got '1' at position 7"],
+            ["Amount in 1", "Invalid filter: expected '(', got '1' at position 10"],
+            ["Amount == 1 Status", "Invalid filter: unexpected 'Status' at position 12"],
+            ["Amount = 1", "Invalid filter: unexpected character '=' at position 7"],
+            ["Date > 2026-13-01", "Invalid filter: invalid date '2026-13-01' at position 7"],
+            [
+                "(" * 3000 + "Amount == 1" + ")" * 3000,
+                "Invalid filter: more than 100 nested parentheses or negations at position 100",
+            ],
+            [
+                "not " * 3000 + "Amount == 1",
+                "Invalid filter: more than 100 nested parentheses or negations at position 400",
+            ],
+        ],
+    )
+    def test_invalid_expression(self, expression, detail):
+        with pytest.raises(InvalidRowFilterError) as error:
+            RowFilter(expression)
+
+        assert error.value.detail == detail
@@ -38,3 +38,19 @@ class TestExcelRowProcessor:
 
         with pytest.raises(UnprocessableRowError):
             processor.process(row_dict=row_dict)
+
+    def test_process_values(self):
+        value_processor_mock = MagicMock(spec=BaseValueProcessor)
+        value_processor_mock.process.side_effect = lambda x: x * 2
+        processor = ExcelRowProcessor(value_processor=value_processor_mock)
+
+        assert processor.process_values((1, 2)) == (2, 4)
+
+    @pytest.mark.parametrize("error", [ColumnValueUnprocessableError, IndexError])
+    def test_process_values_when_unprocessable_value(self, error):
+        value_processor_mock = MagicMock(spec=BaseValueProcessor)
+        value_processor_mock.process.side_effect = error
+        processor = ExcelRowProcessor(value_processor=value_processor_mock)
+
+        with pytest.raises(UnprocessableRowError):
+            processor.process_values((1, 2))
@@ -0,0 +1,187 @@
+from decimal import Decimal
+
+import pytest
+
+from services.summarise_excel.generator_factory import build_summary_generator
+from services.summarise_excel.sampling import SampledSummaryGenerator, estimate_column, z_score
+from services.summarise_excel.summary_generator import ColumnResult
+
+
+@pytest.fixture
+def sample_data():
+    return [["title"], [], ["id", "a", "b"]] + [
+        [index, index * 1.5, index * 2 if index % 3 else "x"] for index in range(500)
+    ]
+
+
+def build_column_result(values):
+    column_result = ColumnResult(name="a", aggregates=["sum", "count", "variance"])
+    for value in values:
+        column_result.add(Decimal(value))
+    return column_result
+
+
+class TestZScore:
+    def test_z_score(self):
+        assert float(z_score(0.95)) == pytest.approx(1.959964)
+
+
+class TestEstimateColumn:
+    def test_estimate_column_of_every_row(self):
+        estimate = estimate_column(
+            build_column_result([1, 2, 3, 4]), rows_examined=4, rows_total=Decimal(4), fraction=Decimal(1), z=Decimal(2)
+        )
+
+        assert estimate == {
+            "column": "a",
+            "sum": "10",
+            "sum_low": "10",
+            "sum_high": "10",
+            "avg": "2.5",
+            "avg_low": "2.5",
+            "avg_high": "2.5",
+            "count": 4,
+        }
+
+    def test_estimate_column_of_sample(self):
+        estimate = estimate_column(
+            build_column_result([1, 2, 3, 4]),
+            rows_examined=4,
+            rows_total=Decimal(8),
+            fraction=Decimal("0.5"),
+            z=Decimal(2),
+        )
+
+        assert Decimal(estimate["sum"]) == 20
+        assert float(estimate["sum_low"]) == pytest.approx(20 - 7.302967)
+        assert float(estimate["sum_high"]) == pytest.approx(20 + 7.302967)
+        assert Decimal(estimate["avg"]) == Decimal("2.5")
+        assert float(estimate["avg_low"]) == pytest.approx(2.5 - 0.912871)
+        assert float(estimate["avg_high"]) == pytest.approx(2.5 + 0.912871)
+
+    def test_estimate_column_counts_rows_without_value_in_sum(self):
+        estimate = estimate_column(
+            build_column_result([2, 2]),
+            rows_examined=4,
+            rows_total=Decimal(8),
+            fraction=Decimal("0.5"),
+            z=Decimal(2),
+            aggregates=["sum"],
+        )
+
+        # Per row values 2, 2, 0, 0: variance 4 / 3
+        assert Decimal(estimate["sum"]) == 8
+        assert float(estimate["sum_high"]) == pytest.approx(8 + 2 * 8 * (0.5 * 4 / 3 / 4) ** 0.5)
+        assert "avg" not in estimate
+
+    def test_estimate_column_without_values(self):
+        estimate = estimate_column(
+            build_column_result([]), rows_examined=4, rows_total=Decimal(8), fraction=Decimal("0.5"), z=Decimal(2)
+        )
+
+        assert estimate == {
+            "column": "a",
+            "sum": "N/A",
+            "sum_low": "N/A",
+            "sum_high": "N/A",
+            "avg": "N/A",
+            "avg_low": "N/A",
+            "avg_high": "N/A",
+            "count": 0,
+        }
+
+
+class TestSampledSummaryGenerator:
+    @pytest.mark.parametrize("engine", ["decimal", "numpy"])
+    @pytest.mark.parametrize(
+        ("method", "options"), [["stride", {"sample_fraction": 1}], ["reservoir", {"sample_rows": 1000}]]
+    )
+    def test_generate_summary_of_every_row_is_exact(
+        self, sample_excel_file_factory, sample_data, engine, method, options
+    ):
+        sample_excel_file_path = str(sample_excel_file_factory(sample_data))
+        generator = SampledSummaryGenerator(file=sample_excel_file_path, engine=engine, method=method, **options)
+
+        summary = generator.generate_summary(column_names=["b", "a"])
+
+        exact_summary = build_summary_generator(file=sample_excel_file_path).generate(column_names=["b", "a"])
+        for estimate, exact in zip(summary["summary"], exact_summary):
+            assert Decimal(estimate["sum"]) == Decimal(exact["sum"])
+            assert Decimal(estimate["sum_low"]) == Decimal(estimate["sum_high"]) == Decimal(exact["sum"])
+            assert Decimal(estimate["avg"]) == Decimal(exact["avg"])
+        assert summary["summary"][0]["count"] == 333
+        assert summary["sample"] == {
+            "method": method,
+            "rows_examined": 500,
+            "rows_total": 500,
+            "fraction": 1.0,
+            "confidence": 0.95,
+        }
+
+    @pytest.mark.parametrize(
+        ("method", "options"), [["stride", {"sample_rows": 50}], ["reservoir", {"sample_fraction": 0.1}]]
+    )
+    def test_generate_summary_of_sample(self, sample_excel_file_factory, sample_data, method, options):
+        sample_excel_file_path = str(sample_excel_file_factory(sample_data))
+        generator = SampledSummaryGenerator(
+            file=sample_excel_file_path, method=method, confidence=0.99, seed=1, **options
+        )
+
+        summary = generator.generate_summary(column_names=["a"])
+
+        estimate = summary["summary"][0]
+        assert Decimal(estimate["sum_low"]) < Decimal(estimate["sum"]) < Decimal(estimate["sum_high"])
+        assert Decimal(estimate["sum_low"]) <= Decimal("186937.5") <= Decimal(estimate["sum_high"])
+        assert Decimal(estimate["avg_low"]) <= Decimal("373.875") <= Decimal(estimate["avg_high"])
+        assert estimate["count"] == 50
+        assert summary["sample"] == {
+            "method": method,
+            "rows_examined": 50,
+            "rows_total": 500,
+            "fraction": 0.1,
+            "confidence": 0.99,
+        }
+        assert generator.stats.rows_scanned == 50
+
+    def test_generate_summary_of_stride_sample_scales_to_sheet_size(self, sample_excel_file_factory):
+        data = [["a"]] + [[1] for _ in range(503)]
+        generator = SampledSummaryGenerator(
+            file=str(sample_excel_file_factory(data)), method="stride", sample_rows=50, seed=1
+        )
+
+        summary = generator.generate_summary(column_names=["a"])
+
+        # A stride of 11 examines 45 or 46 rows, which would stand for 495 or 506 rows
+        assert summary["sample"]["rows_total"] == 503
+        assert Decimal(summary["summary"][0]["sum"]) == 503
+
+    def test_generate_summary_of_stride_sample_when_sheet_size_is_unknown(self, tmp_path):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text("a\n" + "".join(f"{index}\n" for index in range(103)))
+        generator = SampledSummaryGenerator(file=str(file_path), method="stride", sample_fraction=0.1, seed=1)
+
+        summary = generator.generate_summary(column_names=["a"])
+
+        assert summary["sample"]["method"] == "stride"
+        assert summary["sample"]["rows_total"] == summary["sample"]["rows_examined"] * 10
+
+    def test_generate_summary_with_row_filter(self, sample_excel_file_factory, sample_data):
+        sample_excel_file_path = str(sample_excel_file_factory(sample_data))
+        generator = SampledSummaryGenerator(file=sample_excel_file_path, sample_fraction=1, row_filter="id < 10")
+
+        summary = generator.generate_summary(column_names=["a"])
+
+        assert Decimal(summary["summary"][0]["sum"]) == Decimal("67.5")
+        assert summary["summary"][0]["count"] == 10
+        assert generator.stats.rows_filtered == 490
+
+    def test_generate_summary_when_sheet_size_is_unknown(self, tmp_path):
+        file_path = tmp_path / "test.csv"
+        file_path.write_text("a\n" + "".join(f"{index}\n" for index in range(100)))
+        generator = SampledSummaryGenerator(file=str(file_path), method="stride", sample_rows=10, seed=1)
+
+        summary = generator.generate_summary(column_names=["a"])
+
+        assert summary["sample"]["method"] == "reservoir"
+        assert summary["sample"]["rows_examined"] == 10
+        assert summary["sample"]["rows_total"] == 100
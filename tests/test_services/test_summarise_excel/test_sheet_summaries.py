@@ -0,0 +1,138 @@
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from services.summarise_excel.exceptions import BaseExcelSummaryError, SheetNotFoundError
+from services.summarise_excel.sheet_summaries import resolve_sheet_names, summarise_sheets
+from services.summarise_excel.worker_pool import WorkerPool
+
+
+@pytest.fixture
+def workbook_path(sample_excel_workbook_factory):
+    return sample_excel_workbook_factory(
+        {
+            "first": [("a", "b"), (1, 2), (3, 4)],
+            "notes": [("note",), ("text",)],
+            "second": [("b", "a"), (10, 20)],
+        }
+    )
+
+
+class TestResolveSheetNames:
+    def test_resolve_all_sheets(self, workbook_path):
+        assert resolve_sheet_names(file=str(workbook_path), sheets=["*"]) == ["first", "notes", "second"]
+
+    def test_resolve_sheet_names(self, workbook_path):
+        sheet_names = resolve_sheet_names(file=str(workbook_path), sheets=["second", "first", "second"])
+
+        assert sheet_names == ["second", "first"]
+
+    def test_resolve_sheet_names_when_sheet_is_missing(self, workbook_path):
+        with pytest.raises(SheetNotFoundError):
+            resolve_sheet_names(file=str(workbook_path), sheets=["first", "third"])
+
+
+class TestSummariseSheets:
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_summarise_sheets(self, workbook_path, max_workers):
+        with patch("services.summarise_excel.sheet_summaries.os.cpu_count", return_value=2):
+            result = summarise_sheets(
+                file=str(workbook_path), sheets=["*"], column_names=["a", "b"], max_workers=max_workers
+            )
+
+        assert result == {
+            "summary": [
+                {"column": "a", "sum": "24", "avg": "8"},
+                {"column": "b", "sum": "16", "avg": "5.333333333333333333333333333"},
+            ],
+            "sheets": [
+                {
+                    "sheet": "first",
+                    "summary": [{"column": "a", "sum": "4", "avg": "2"}, {"column": "b", "sum": "6", "avg": "3"}],
+                    "detail": None,
+                },
+                {"sheet": "notes", "summary": None, "detail": "Column row cannot be found"},
+                {
+                    "sheet": "second",
+                    "summary": [{"column": "a", "sum": "20", "avg": "20"}, {"column": "b", "sum": "10", "avg": "10"}],
+                    "detail": None,
+                },
+            ],
+        }
+
+    def test_summarise_sheets_grouped(self, sample_excel_workbook_factory):
+        workbook_path = sample_excel_workbook_factory(
+            {
+                "first": [("region", "a"), ("north", 1), ("south", 2)],
+                "second": [("a", "region"), (3, "north")],
+            }
+        )
+
+        result = summarise_sheets(
+            file=str(workbook_path), sheets=["*"], column_names=["a"], aggregates=["sum"], group_by=["region"]
+        )
+
+        assert result["summary"] == [{"column": "a", "sum": "6"}]
+        assert result["groups"] == [
+            {"group": {"region": "north"}, "rows": 2, "summary": [{"column": "a", "sum": "4"}]},
+            {"group": {"region": "south"}, "rows": 1, "summary": [{"column": "a", "sum": "2"}]},
+        ]
+        assert result["sheets"][1]["groups"] == [
+            {"group": {"region": "north"}, "rows": 1, "summary": [{"column": "a", "sum": "3"}]}
+        ]
+
+    def test_summarise_sheets_in_shared_worker_pool(self, workbook_path):
+        worker_pool = WorkerPool(max_workers=2)
+
+        try:
+            with patch("services.summarise_excel.sheet_summaries.os.cpu_count", return_value=2):
+                result = summarise_sheets(
+                    file=str(workbook_path),
+                    sheets=["first", "second"],
+                    column_names=["a"],
+                    max_workers=2,
+                    worker_pool=worker_pool,
+                )
+
+            assert worker_pool._executor is not None
+        finally:
+            worker_pool.shutdown()
+
+        assert result["summary"] == [{"column": "a", "sum": "24", "avg": "8"}]
+
+    def test_summarise_sheets_reports_unexpected_errors_per_sheet(self, workbook_path):
+        with patch("services.summarise_excel.sheet_summaries.build_summary_generator") as build_summary_generator_mock:
+            build_summary_generator_mock.return_value.generate_column_results.side_effect = [RuntimeError, []]
+            build_summary_generator_mock.return_value.groups = None
+            result = summarise_sheets(file=str(workbook_path), sheets=["first", "second"], column_names=["a"])
+
+        assert result["sheets"] == [
+            {"sheet": "first", "summary": None, "detail": "Unexpected processing error"},
+            {"sheet": "second", "summary": [], "detail": None},
+        ]
+
+    def test_summarise_sheets_from_file_object(self, workbook_path):
+        with open(workbook_path, "rb") as file:
+            result = summarise_sheets(file=file, sheets=["second"], column_names=["a"], max_workers=2)
+
+        assert result["summary"] == [{"column": "a", "sum": "20", "avg": "20"}]
+
+    def test_summarise_sheets_when_no_sheet_can_be_summarised(self, workbook_path):
+        with pytest.raises(BaseExcelSummaryError) as e:
+            summarise_sheets(file=str(workbook_path), sheets=["notes"], column_names=["a"])
+
+        assert e.value.detail == "notes: Column row cannot be found"
+
+    def test_summarise_sheets_reports_progress_over_sheets(self, workbook_path):
+        progress_callback = MagicMock()
+
+        summarise_sheets(
+            file=str(workbook_path),
+            sheets=["first", "second"],
+            column_names=["a"],
+            max_workers=2,
+            progress_callback=progress_callback,
+            progress_interval=1,
+        )
+
+        assert progress_callback.call_args_list == [call(1), call(2), call(3), call(3), call(4), call(5), call(5)]
@@ -0,0 +1,84 @@
+import bisect
+import random
+
+from decimal import Decimal
+
+import pytest
+
+from services.summarise_excel.sketches import DistinctCountSketch, QuantileSketch
+
+
+@pytest.fixture
+def sample_values():
+    generator = random.Random(1)
+    return [generator.gauss(0, 1) for _ in range(100000)]
+
+
+class TestQuantileSketch:
+    @pytest.mark.parametrize("size", [50, 200])
+    def test_quantile_within_rank_error(self, sample_values, size):
+        sketch = QuantileSketch(size=size)
+        sketch.update(sample_values)
+        sorted_values = sorted(sample_values)
+
+        for fraction in [0.01, 0.5, 0.9, 0.99]:
+            rank = bisect.bisect_right(sorted_values, sketch.quantile(fraction)) / len(sorted_values)
+            assert rank == pytest.approx(fraction, abs=sketch.rank_error)
+
+    def test_memory_is_bounded(self, sample_values):
+        sketch = QuantileSketch(size=100)
+        sketch.update(sample_values)
+
+        assert sketch.count == len(sample_values)
+        assert sum(len(compactor) for compactor in sketch.compactors) <= 3 * 100 + 2 * len(sketch.compactors)
+
+    def test_merge(self, sample_values):
+        sketch = QuantileSketch()
+        for start in range(0, len(sample_values), 30000):
+            partial_sketch = QuantileSketch()
+            partial_sketch.update(sample_values[start : start + 30000])
+            sketch.merge(partial_sketch)
+        sorted_values = sorted(sample_values)
+
+        assert sketch.count == len(sample_values)
+        rank = bisect.bisect_right(sorted_values, sketch.quantile(0.5)) / len(sorted_values)
+        assert rank == pytest.approx(0.5, abs=sketch.rank_error)
+
+    def test_quantile_of_few_values(self):
+        sketch = QuantileSketch()
+        sketch.update([Decimal(3), Decimal(1), Decimal(2)])
+
+        assert [sketch.quantile(fraction) for fraction in [0, 0.5, 1]] == [Decimal(1), Decimal(2), Decimal(3)]
+
+    def test_quantile_without_values(self):
+        assert QuantileSketch().quantile(0.5) is None
+
+
+class TestDistinctCountSketch:
+    @pytest.mark.parametrize("distinct_count", [10, 1000, 100000])
+    def test_estimate_within_error(self, distinct_count):
+        sketch = DistinctCountSketch(precision=12)
+        sketch.update(value % distinct_count for value in range(200000))
+
+        assert sketch.estimate() == pytest.approx(distinct_count, rel=3 * sketch.relative_error)
+
+    def test_equal_numbers_are_counted_once(self):
+        sketch = DistinctCountSketch()
+        sketch.update([1, 1.0, Decimal("1.00"), Decimal("2.5"), 2.5])
+
+        assert sketch.estimate() == 2
+
+    def test_merge(self):
+        sketch = DistinctCountSketch()
+        sketch.update(range(1000))
+        other_sketch = DistinctCountSketch()
+        other_sketch.update(range(500, 2000))
+
+        sketch.merge(other_sketch)
+
+        assert sketch.estimate() == pytest.approx(2000, rel=3 * sketch.relative_error)
+
+    @pytest.mark.parametrize("precision", [3, 17])
+    def test_invalid_precision(self, precision):
+        with pytest.raises(ValueError, match="Precision must be between 4 and 16"):
+            DistinctCountSketch(precision=precision)
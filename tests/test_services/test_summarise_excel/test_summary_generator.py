@@ -1,13 +1,21 @@
+import tracemalloc
+
 from decimal import Decimal
-from unittest.mock import MagicMock, call
+from unittest.mock import ANY, MagicMock, call, patch
 
 import pytest
 
-from services.summarise_excel.column_row_finder import BaseColumnRowFinder
-from services.summarise_excel.file_readers import BaseFileReader
-from services.summarise_excel.row_converter import BaseRowConverter, UnconvertibleRowError
-from services.summarise_excel.row_processors import BaseRowProcessor, UnprocessableRowError
-from services.summarise_excel.summary_generator import ColumnResult, ExcelSummaryGenerator
+from openpyxl import load_workbook
+from structlog.testing import capture_logs
+
+from services.summarise_excel.column_row_finder import BaseColumnRowFinder, ExcelColumnRowFinder
+from services.summarise_excel.exceptions import TooManyGroupsError
+from services.summarise_excel.file_readers import BaseFileReader, ExcelFileReader
+from services.summarise_excel.row_converter import BaseRowConverter, ExcelRowConverter
+from services.summarise_excel.row_filters import RowFilter
+from services.summarise_excel.row_processors import BaseRowProcessor, ExcelRowProcessor, UnprocessableRowError
+from services.summarise_excel.summary_generator import AGGREGATES, ColumnGroups, ColumnResult, ExcelSummaryGenerator
+from services.summarise_excel.value_processors import ExcelValueProcessor
 
 
 class TestColumnResult:
@@ -20,6 +28,17 @@ class TestColumnResult:
         assert column_result.count == 1
         assert column_result.total_value == value
 
+    def test_merge(self):
+        column_result = ColumnResult(name="name")
+        column_result.add(value=Decimal("2"))
+        other_column_result = ColumnResult(name="name")
+        other_column_result.add_chunk(total_value=Decimal("3.5"), count=2)
+
+        column_result.merge(other_column_result)
+
+        assert column_result.count == 3
+        assert column_result.total_value == Decimal("5.5")
+
     def test_calculate_when_count_is_zero(self):
         name = "name"
         column_result = ColumnResult(name=name)
@@ -44,6 +63,106 @@ class TestColumnResult:
             "avg": str(Decimal("5") / 2),
         }
 
+    def test_calculate_every_aggregate(self):
+        column_result = ColumnResult(name="name", aggregates=AGGREGATES)
+        for value in ["4", "2", "6"]:
+            column_result.add(value=Decimal(value))
+        column_result.add_invalid(None)
+        column_result.add_invalid(" ")
+        column_result.add_invalid("x")
+
+        assert column_result.calculate() == {
+            "column": "name",
+            "sum": "12",
+            "avg": "4",
+            "min": "2",
+            "max": "6",
+            "count": 3,
+            "nulls": 2,
+            "invalid": 1,
+            "variance": "4",
+            "stddev": "2",
+            "median": "4",
+            "p90": "6",
+            "p99": "6",
+            "distinct": 3,
+            "quantile_rank_error": 0.0133,
+            "distinct_relative_error": 0.0081,
+        }
+
+    def test_calculate_every_aggregate_when_count_is_zero(self):
+        assert ColumnResult(name="name", aggregates=["min", "count", "variance", "stddev"]).calculate() == {
+            "column": "name",
+            "min": "N/A",
+            "count": 0,
+            "variance": "N/A",
+            "stddev": "N/A",
+        }
+
+    def test_merge_every_aggregate(self):
+        values = [Decimal(value) for value in ["1.5", "-2", "7", "3.25", "0", "11"]]
+        column_result = ColumnResult(name="name", aggregates=AGGREGATES)
+        for value in values:
+            column_result.add(value=value)
+        merged_result = ColumnResult(name="name", aggregates=AGGREGATES)
+        for start, stop in [(0, 1), (1, 4), (4, 6)]:
+            partial_result = ColumnResult(name="name", aggregates=AGGREGATES)
+            for value in values[start:stop]:
+                partial_result.add(value=value)
+            partial_result.add_invalid("x")
+            merged_result.merge(partial_result)
+
+        assert merged_result.min_value == column_result.min_value == Decimal("-2")
+        assert merged_result.max_value == column_result.max_value == Decimal("11")
+        assert merged_result.invalid_count == 3
+        assert merged_result.variance() == pytest.approx(column_result.variance(), abs=Decimal("1e-20"))
+
+
+class TestColumnGroups:
+    def test_get(self):
+        column_groups = ColumnGroups(group_by=["region"], column_names=["a", "b"])
+
+        column_results = column_groups.get(("north",))
+
+        assert list(column_results) == ["a", "b"]
+        assert column_groups.get(("north",)) is column_results
+        assert column_groups.get(("south",)) is not column_results
+
+    def test_get_when_too_many_groups(self):
+        column_groups = ColumnGroups(group_by=["region"], column_names=["a"], max_groups=1)
+        column_groups.get(("north",))
+
+        with pytest.raises(TooManyGroupsError):
+            column_groups.get(("south",))
+
+    def test_merge_and_totals(self):
+        column_groups = ColumnGroups(group_by=["region"], column_names=["a"])
+        column_groups.get(("north",))["a"].add(Decimal(1))
+        other = ColumnGroups(group_by=["region"], column_names=["a"])
+        other.get(("north",))["a"].add(Decimal(2))
+        other.get(("south",))["a"].add(Decimal(4))
+
+        column_groups.merge(other)
+
+        assert [column_result.calculate() for column_result in column_groups.totals()] == [
+            {"column": "a", "sum": "7", "avg": "2.333333333333333333333333333"}
+        ]
+        assert column_groups.calculate()[0] == {
+            "group": {"region": "north"},
+            "rows": 2,
+            "summary": [{"column": "a", "sum": "3", "avg": "1.5"}],
+        }
+
+    def test_calculate_top_groups(self):
+        column_groups = ColumnGroups(group_by=["region", "year"], column_names=["a"], top=1, aggregates=["count"])
+        column_groups.get(("north", 2024))["a"].add(Decimal(1))
+        for value in (1, 2):
+            column_groups.get(("south", None))["a"].add(Decimal(value))
+
+        assert column_groups.calculate() == [
+            {"group": {"region": "south", "year": None}, "rows": 2, "summary": [{"column": "a", "count": 2}]}
+        ]
+
 
 @pytest.fixture
 def row_processor_mock():
@@ -75,6 +194,33 @@ def excel_summary_generator(row_converter_mock, file_reader_mock, column_row_fin
     )
 
 
+def measure_row_memory(row_processor, column_row_finder_mock, column_row, rows):
+    """Return the most memory allocated while rows are summarised, above the memory still held after them"""
+    column_row_finder_mock.find.return_value = column_row, iter(rows)
+    row_memory = []
+
+    def measure(_stats, _column_results):
+        current, peak = tracemalloc.get_traced_memory()
+        row_memory.append(peak - current)
+        tracemalloc.reset_peak()
+
+    generator = ExcelSummaryGenerator(
+        row_processor=row_processor,
+        row_converter=ExcelRowConverter(),
+        file_reader=MagicMock(spec=BaseFileReader),
+        column_row_finder=column_row_finder_mock,
+        progress_hook=measure,
+        progress_hook_interval=10,
+    )
+    tracemalloc.start()
+    try:
+        generator.generate_column_results(column_names=column_row)
+    finally:
+        tracemalloc.stop()
+    # The first report also counts the results built before the rows
+    return max(row_memory[1:])
+
+
 class TestExcelSummaryGenerator:
     def test_generate(
         self,
@@ -86,27 +232,51 @@ class TestExcelSummaryGenerator:
     ):
         column_name_1 = "column_1"
         column_row = [column_name_1, "column_2"]
-        row_number = 1
-        column_row_finder_mock.find.return_value = column_row, 1
-
         row = (1, 2)
-        file_reader_mock.iter_rows.return_value = [row]
-        expected_column_to_index_mapper = {column_name_1: 0}
-        converted_value = Decimal("2")
-        row_converter_mock.convert.return_value = {column_name_1: converted_value}
-
+        column_row_finder_mock.find.return_value = column_row, iter([row])
         processed_value = Decimal(1)
-        row_processor_mock.process.return_value = {column_name_1: processed_value}
+        row_processor_mock.process_values.return_value = (processed_value,)
 
         column_names = [column_name_1]
         result = excel_summary_generator.generate(column_names=column_names)
-        column_row_finder_mock.find.assert_called_with(column_names=column_names, file_reader=file_reader_mock)
-        file_reader_mock.iter_rows.assert_called_once_with(min_row=row_number + 1)
-        row_converter_mock.convert.assert_called_once_with(row=row, index_mapping=expected_column_to_index_mapper)
-        row_processor_mock.process.assert_called_once_with(row_dict={column_name_1: converted_value})
+        column_row_finder_mock.find.assert_called_with(
+            column_names=column_names, file_reader=file_reader_mock, projection=ANY
+        )
+        file_reader_mock.iter_rows.assert_not_called()
+        row_processor_mock.process_values.assert_called_once_with((1,))
+        row_converter_mock.convert.assert_not_called()
+        row_processor_mock.process.assert_not_called()
 
         assert result == [{"column": column_name_1, "sum": str(processed_value), "avg": str(processed_value)}]
 
+    def test_generate_projects_columns_after_column_row_is_found(self, column_row_finder_mock, excel_summary_generator):
+        column_row = ["column_1", "column_2", "column_3"]
+        column_row_finder_mock.find.return_value = column_row, iter([])
+
+        excel_summary_generator.generate(column_names=["column_1", "column_3"])
+
+        projection = column_row_finder_mock.find.call_args.kwargs["projection"]
+        assert projection.columns == {0, 2}
+        assert projection.max_column == 2
+
+    def test_generate_skips_filtered_rows_before_conversion(
+        self, column_row_finder_mock, row_processor_mock, excel_summary_generator
+    ):
+        column_row_finder_mock.find.return_value = ["column_1", "status"], iter([(1, "Paid"), (2, "Open")])
+        row_processor_mock.process_values.return_value = (Decimal(1),)
+        excel_summary_generator.row_filter = RowFilter('status == "Paid"')
+
+        result = excel_summary_generator.generate(column_names=["column_1"])
+
+        column_row_finder_mock.find.assert_called_with(
+            column_names=["column_1", "status"], file_reader=ANY, projection=ANY
+        )
+        assert column_row_finder_mock.find.call_args.kwargs["projection"].columns == {0, 1}
+        row_processor_mock.process_values.assert_called_once_with((1,))
+        assert result == [{"column": "column_1", "sum": "1", "avg": "1"}]
+        assert excel_summary_generator.stats.rows_scanned == 2
+        assert excel_summary_generator.stats.rows_filtered == 1
+
     def test_generate_when_unconvertible_row(
         self,
         row_converter_mock,
@@ -115,61 +285,38 @@ class TestExcelSummaryGenerator:
         row_processor_mock,
         excel_summary_generator,
     ):
-        column_name_1 = "column_1"
-        column_row = [column_name_1, "column_2"]
-        row_number = 1
-        column_row_finder_mock.find.return_value = column_row, 1
-
-        row = (1, 2)
-        file_reader_mock.iter_rows.return_value = [row]
-        expected_column_to_index_mapper = {column_name_1: 0}
-        row_converter_mock.convert.side_effect = UnconvertibleRowError
+        column_name_2 = "column_2"
+        column_row = ["column_1", column_name_2]
+        column_row_finder_mock.find.return_value = column_row, iter([(1,)])
 
-        column_names = [column_name_1]
+        column_names = [column_name_2]
         result = excel_summary_generator.generate(column_names=column_names)
-        row_processor_mock.process.assert_not_called()
-        column_row_finder_mock.find.assert_called_with(column_names=column_names, file_reader=file_reader_mock)
-        file_reader_mock.iter_rows.assert_called_once_with(min_row=row_number + 1)
-        row_converter_mock.convert.assert_called_once_with(row=row, index_mapping=expected_column_to_index_mapper)
+        row_processor_mock.process_values.assert_not_called()
+        row_converter_mock.convert.assert_not_called()
+        column_row_finder_mock.find.assert_called_with(
+            column_names=column_names, file_reader=file_reader_mock, projection=ANY
+        )
+        file_reader_mock.iter_rows.assert_not_called()
 
-        assert result == [{"column": column_name_1, "sum": "N/A", "avg": "N/A"}]
+        assert result == [{"column": column_name_2, "sum": "N/A", "avg": "N/A"}]
+        assert excel_summary_generator.stats.bad_rows == [{"reason": "unconvertible", "row": (1,)}]
 
     def test_generate_when_one_unconvertible_row_and_one_row_convertible(
         self,
-        row_converter_mock,
-        file_reader_mock,
         column_row_finder_mock,
         row_processor_mock,
         excel_summary_generator,
     ):
-        column_name_1 = "column_1"
-        column_row = [column_name_1, "column_2"]
-        row_number = 1
-        column_row_finder_mock.find.return_value = column_row, 1
-
-        row_1 = (1, 2)
-        row_2 = (3, 4)
-        file_reader_mock.iter_rows.return_value = [row_1, row_2]
-        expected_column_to_index_mapper = {column_name_1: 0}
-        converted_value = Decimal("2")
-        row_converter_mock.convert.side_effect = [UnconvertibleRowError, {column_name_1: converted_value}]
-
+        column_name_2 = "column_2"
+        column_row = ["column_1", column_name_2]
+        column_row_finder_mock.find.return_value = column_row, iter([(1,), (3, 4)])
         processed_value = Decimal(1)
-        row_processor_mock.process.return_value = {column_name_1: processed_value}
+        row_processor_mock.process_values.return_value = (processed_value,)
 
-        column_names = [column_name_1]
-        result = excel_summary_generator.generate(column_names=column_names)
-        column_row_finder_mock.find.assert_called_with(column_names=column_names, file_reader=file_reader_mock)
-        file_reader_mock.iter_rows.assert_called_once_with(min_row=row_number + 1)
-        row_converter_mock.convert.assert_has_calls(
-            [
-                call(row=row_1, index_mapping=expected_column_to_index_mapper),
-                call(row=row_2, index_mapping=expected_column_to_index_mapper),
-            ]
-        )
-        row_processor_mock.process.assert_called_once_with(row_dict={column_name_1: converted_value})
+        result = excel_summary_generator.generate(column_names=[column_name_2])
+        row_processor_mock.process_values.assert_called_once_with((4,))
 
-        assert result == [{"column": column_name_1, "sum": str(processed_value), "avg": str(processed_value)}]
+        assert result == [{"column": column_name_2, "sum": str(processed_value), "avg": str(processed_value)}]
 
     def test_generate_when_unprocessable_row(
         self,
@@ -181,61 +328,195 @@ class TestExcelSummaryGenerator:
     ):
         column_name_1 = "column_1"
         column_row = [column_name_1, "column_2"]
-        row_number = 1
-        column_row_finder_mock.find.return_value = column_row, 1
-
         row = (1, 2)
-        file_reader_mock.iter_rows.return_value = [row]
+        column_row_finder_mock.find.return_value = column_row, iter([row])
         expected_column_to_index_mapper = {column_name_1: 0}
-        converted_value = Decimal("2")
-        row_converter_mock.convert.return_value = {column_name_1: converted_value}
-
-        row_processor_mock.process.side_effect = UnprocessableRowError
+        converted_row = {column_name_1: 1}
+        row_converter_mock.convert.return_value = converted_row
+        row_processor_mock.process_values.side_effect = UnprocessableRowError
 
         column_names = [column_name_1]
         result = excel_summary_generator.generate(column_names=column_names)
-        column_row_finder_mock.find.assert_called_with(column_names=column_names, file_reader=file_reader_mock)
-        file_reader_mock.iter_rows.assert_called_once_with(min_row=row_number + 1)
+        column_row_finder_mock.find.assert_called_with(
+            column_names=column_names, file_reader=file_reader_mock, projection=ANY
+        )
+        file_reader_mock.iter_rows.assert_not_called()
+        row_processor_mock.process_values.assert_called_once_with((1,))
+        # Only skipped rows are converted into dicts, to be sampled
         row_converter_mock.convert.assert_called_once_with(row=row, index_mapping=expected_column_to_index_mapper)
-        row_processor_mock.process.assert_called_once_with(row_dict={column_name_1: converted_value})
 
         assert result == [{"column": column_name_1, "sum": "N/A", "avg": "N/A"}]
+        assert excel_summary_generator.stats.bad_rows == [{"reason": "unprocessable", "row": converted_row}]
 
     def test_generate_when_one_unprocessable_row_and_one_row_processable(
         self,
         row_converter_mock,
-        file_reader_mock,
         column_row_finder_mock,
         row_processor_mock,
         excel_summary_generator,
     ):
         column_name_1 = "column_1"
         column_row = [column_name_1, "column_2"]
-        row_number = 1
-        column_row_finder_mock.find.return_value = column_row, 1
-
         row_1 = (1, 2)
         row_2 = (3, 4)
-        file_reader_mock.iter_rows.return_value = [row_1, row_2]
-        expected_column_to_index_mapper = {column_name_1: 0}
-        converted_value = Decimal("2")
-        row_converter_mock.convert.return_value = {column_name_1: converted_value}
-
+        column_row_finder_mock.find.return_value = column_row, iter([row_1, row_2])
+        row_converter_mock.convert.return_value = {column_name_1: 1}
         processed_value = Decimal(1)
-        row_processor_mock.process.side_effect = [UnprocessableRowError, {column_name_1: processed_value}]
+        row_processor_mock.process_values.side_effect = [UnprocessableRowError, (processed_value,)]
 
-        column_names = [column_name_1]
-        result = excel_summary_generator.generate(column_names=column_names)
-        column_row_finder_mock.find.assert_called_with(column_names=column_names, file_reader=file_reader_mock)
-        file_reader_mock.iter_rows.assert_called_once_with(min_row=row_number + 1)
-        row_converter_mock.convert.assert_has_calls(
-            [
-                call(row=row_1, index_mapping=expected_column_to_index_mapper),
-                call(row=row_2, index_mapping=expected_column_to_index_mapper),
-            ]
+        result = excel_summary_generator.generate(column_names=[column_name_1])
+        row_processor_mock.process_values.assert_has_calls([call((1,)), call((3,))])
+        row_converter_mock.convert.assert_called_once_with(row=row_1, index_mapping={column_name_1: 0})
+
+        assert result == [{"column": column_name_1, "sum": str(processed_value), "avg": str(processed_value)}]
+
+    def test_generate_reports_skipped_rows_once(
+        self,
+        row_converter_mock,
+        column_row_finder_mock,
+        row_processor_mock,
+        excel_summary_generator,
+    ):
+        column_name_1 = "column_1"
+        column_row_finder_mock.find.return_value = [column_name_1], iter([(), (2,), (3,)])
+        converted_row = {column_name_1: 2}
+        row_converter_mock.convert.return_value = converted_row
+        row_processor_mock.process_values.side_effect = [UnprocessableRowError, (Decimal(3),)]
+
+        with capture_logs() as logs:
+            excel_summary_generator.generate(column_names=[column_name_1])
+
+        stats = excel_summary_generator.stats
+        assert stats.rows_scanned == 3
+        assert stats.rows_unconvertible == 1
+        assert stats.rows_unprocessable == 1
+        assert stats.bad_rows == [
+            {"reason": "unconvertible", "row": ()},
+            {"reason": "unprocessable", "row": converted_row},
+        ]
+        finished_logs = [log for log in logs if log["event"] == "Finished generating summary"]
+        assert len(finished_logs) == 1
+        assert finished_logs[0]["rows_scanned"] == 3
+        assert finished_logs[0]["rows_skipped_unconvertible"] == 1
+        assert finished_logs[0]["rows_skipped_unprocessable"] == 1
+        assert "elapsed_seconds" in finished_logs[0]
+
+    def test_generate_allocates_less_per_row_than_row_dicts(self, column_row_finder_mock):
+        column_row = [f"column_{index}" for index in range(8)]
+        rows = [tuple(range(8)) for _ in range(100)]
+
+        class RowDictProcessor(ExcelRowProcessor):
+            """Processes rows as dicts of the converted and of the processed values, as they were before tuples"""
+
+            def process_values(self, values):
+                return tuple(self.process(row_dict=dict(zip(column_row, values))).values())
+
+        row_memory = measure_row_memory(
+            ExcelRowProcessor(value_processor=ExcelValueProcessor()), column_row_finder_mock, column_row, rows
         )
-        row_processor_mock.process.assert_has_calls(
-            [call(row_dict={column_name_1: converted_value}), call(row_dict={column_name_1: converted_value})]
+        dict_row_memory = measure_row_memory(
+            RowDictProcessor(value_processor=ExcelValueProcessor()), column_row_finder_mock, column_row, rows
         )
 
-        assert result == [{"column": column_name_1, "sum": str(processed_value), "avg": str(processed_value)}]
+        assert row_memory < dict_row_memory
+
+
+class TestExcelSummaryGeneratorWithExcelFile:
+    def test_generate_opens_workbook_once(self, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(data=[["title"], ["a", "b"], [1, 2], [3, None], [5, 6]])
+        generator = ExcelSummaryGenerator(
+            row_processor=ExcelRowProcessor(value_processor=ExcelValueProcessor()),
+            row_converter=ExcelRowConverter(),
+            file_reader=ExcelFileReader(file=str(sample_excel_file_path)),
+            column_row_finder=ExcelColumnRowFinder(),
+        )
+
+        with patch("services.summarise_excel.file_readers.load_workbook", wraps=load_workbook) as load_workbook_mock:
+            result = generator.generate(column_names=["a", "b"])
+
+        load_workbook_mock.assert_called_once()
+        assert result == [{"column": "a", "sum": "6", "avg": "3"}, {"column": "b", "sum": "8", "avg": "4"}]
+
+    def test_generate_times_stages(self, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(data=[["title"], ["a", "b"], [1, 2], [3, 4]])
+        generator = ExcelSummaryGenerator(
+            row_processor=ExcelRowProcessor(value_processor=ExcelValueProcessor()),
+            row_converter=ExcelRowConverter(),
+            file_reader=ExcelFileReader(file=str(sample_excel_file_path)),
+            column_row_finder=ExcelColumnRowFinder(),
+        )
+
+        generator.generate(column_names=["a", "b"])
+
+        assert list(generator.stats.stages.seconds) == ["header_search", "rows"]
+        assert all(seconds > 0 for seconds in generator.stats.stages.seconds.values())
+
+    def test_generate_reports_progress(self, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "g"], [1, "x"], [2, "y"], [3, "x"], [4, "y"]])
+        progress = []
+        generator = ExcelSummaryGenerator(
+            row_processor=ExcelRowProcessor(value_processor=ExcelValueProcessor()),
+            row_converter=ExcelRowConverter(),
+            file_reader=ExcelFileReader(file=str(sample_excel_file_path)),
+            column_row_finder=ExcelColumnRowFinder(),
+            group_by=["g"],
+            progress_hook=lambda stats, results: progress.append(
+                (stats.rows_scanned, [(result.name, result.total_value, result.count) for result in results])
+            ),
+            progress_hook_interval=2,
+        )
+
+        generator.generate(column_names=["a"])
+
+        assert progress == [(2, [("a", Decimal(1), 1)]), (4, [("a", Decimal(6), 3)])]
+
+    def test_generate_with_aggregates(self, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(
+            data=[["a", "b"], [1, 2], [3, None], [5, 6], ["x", ""], [9, 10]]
+        )
+        generator = ExcelSummaryGenerator(
+            row_processor=ExcelRowProcessor(value_processor=ExcelValueProcessor()),
+            row_converter=ExcelRowConverter(),
+            file_reader=ExcelFileReader(file=str(sample_excel_file_path)),
+            column_row_finder=ExcelColumnRowFinder(),
+            aggregates=["min", "max", "count", "nulls", "invalid", "variance"],
+        )
+
+        result = generator.generate(column_names=["a", "b"])
+
+        assert result == [
+            {"column": "a", "min": "1", "max": "9", "count": 3, "nulls": 0, "invalid": 1, "variance": "16"},
+            {"column": "b", "min": "2", "max": "10", "count": 3, "nulls": 2, "invalid": 0, "variance": "16"},
+        ]
+
+    def test_generate_summary_grouped(self, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(
+            data=[["region", "a", "b"], ["north", 1, 2], ["south", 3, "x"], ["north", 5, 6], [None, 7, 8]]
+        )
+        generator = ExcelSummaryGenerator(
+            row_processor=ExcelRowProcessor(value_processor=ExcelValueProcessor()),
+            row_converter=ExcelRowConverter(),
+            file_reader=ExcelFileReader(file=str(sample_excel_file_path)),
+            column_row_finder=ExcelColumnRowFinder(),
+            aggregates=["sum", "invalid"],
+            group_by=["region"],
+            top_groups=2,
+        )
+
+        result = generator.generate_summary(column_names=["a", "b"])
+
+        assert result == {
+            "summary": [{"column": "a", "sum": "13", "invalid": 0}, {"column": "b", "sum": "16", "invalid": 1}],
+            "groups": [
+                {
+                    "group": {"region": "north"},
+                    "rows": 2,
+                    "summary": [{"column": "a", "sum": "6", "invalid": 0}, {"column": "b", "sum": "8", "invalid": 0}],
+                },
+                {
+                    "group": {"region": None},
+                    "rows": 1,
+                    "summary": [{"column": "a", "sum": "7", "invalid": 0}, {"column": "b", "sum": "8", "invalid": 0}],
+                },
+            ],
+        }
@@ -0,0 +1,58 @@
+from services.summarise_excel.summary_stats import SummaryStats
+
+
+class TestSummaryStats:
+    def test_add_unconvertible_row(self):
+        stats = SummaryStats()
+        stats.add_unconvertible_row((1,))
+
+        assert stats.rows_unconvertible == 1
+        assert stats.bad_rows == [{"reason": "unconvertible", "row": (1,)}]
+
+    def test_add_unprocessable_row(self):
+        stats = SummaryStats()
+        stats.add_unprocessable_row({"a": None})
+
+        assert stats.rows_unprocessable == 1
+        assert stats.bad_rows == [{"reason": "unprocessable", "row": {"a": None}}]
+
+    def test_bad_rows_sample_is_capped(self):
+        stats = SummaryStats(bad_row_sample_size=2)
+        for index in range(5):
+            stats.add_unprocessable_row({"a": index})
+
+        assert stats.rows_unprocessable == 5
+        assert [bad_row["row"] for bad_row in stats.bad_rows] == [{"a": 0}, {"a": 1}]
+
+    def test_merge(self):
+        stats = SummaryStats(bad_row_sample_size=2)
+        stats.rows_scanned = 2
+        stats.add_unconvertible_row((1,))
+        other_stats = SummaryStats()
+        other_stats.rows_scanned = 3
+        other_stats.add_unprocessable_row({"a": 1})
+        other_stats.add_unprocessable_row({"a": 2})
+
+        stats.merge(other_stats)
+
+        assert stats.rows_scanned == 5
+        assert stats.rows_unconvertible == 1
+        assert stats.rows_unprocessable == 2
+        assert [bad_row["row"] for bad_row in stats.bad_rows] == [(1,), {"a": 1}]
+
+    def test_as_dict(self):
+        stats = SummaryStats()
+        with stats.stages.stage("rows"):
+            stats.rows_scanned = 3
+            stats.add_unconvertible_row((1,))
+        stats.finish()
+
+        assert stats.as_dict() == {
+            "rows_scanned": 3,
+            "rows_filtered": 0,
+            "rows_skipped_unconvertible": 1,
+            "rows_skipped_unprocessable": 0,
+            "elapsed_seconds": round(stats.elapsed, 6),
+            "stage_seconds": {"rows": round(stats.stages.seconds["rows"], 6)},
+            "bad_rows_sample": [{"reason": "unconvertible", "row": (1,)}],
+        }
@@ -0,0 +1,81 @@
+import functools
+import time
+
+from decimal import Decimal
+
+from structlog.testing import capture_logs
+
+from services.summarise_excel.generator_factory import build_summary_generator
+from services.summarise_excel.summary_generator import ColumnResult
+from services.summarise_excel.summary_stats import SummaryStats
+from services.summarise_excel.summary_streams import build_progress_record, iter_summary_records
+
+
+def build_generator_factory(file, **options):
+    return functools.partial(build_summary_generator, file=str(file), progress_hook_interval=1, **options)
+
+
+class TestBuildProgressRecord:
+    def test_build_progress_record(self):
+        stats = SummaryStats()
+        stats.rows_scanned = 3
+        column_result = ColumnResult(name="a")
+        column_result.add(Decimal("1.5"))
+
+        assert build_progress_record(stats, [column_result], row_count=8) == {
+            "type": "progress",
+            "rows_scanned": 3,
+            "percent": 37.5,
+            "columns": [{"column": "a", "sum": "1.5", "count": 1}],
+        }
+
+    def test_build_progress_record_without_row_count(self):
+        assert build_progress_record(SummaryStats(), [])["percent"] is None
+
+
+class TestIterSummaryRecords:
+    def test_iter_summary_records(self, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b"], [1, 2], [3, 4]])
+
+        records = list(
+            iter_summary_records(build_generator_factory(sample_excel_file_path), column_names=["a"], row_count=3)
+        )
+
+        assert records == [
+            {
+                "type": "progress",
+                "rows_scanned": 1,
+                "percent": 33.3,
+                "columns": [{"column": "a", "sum": "0", "count": 0}],
+            },
+            {
+                "type": "progress",
+                "rows_scanned": 2,
+                "percent": 66.7,
+                "columns": [{"column": "a", "sum": "1", "count": 1}],
+            },
+            {"type": "summary", "summary": [{"column": "a", "sum": "4", "avg": "2"}]},
+        ]
+
+    def test_iter_summary_records_when_summary_fails(self, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(data=[["a", "b"], [1, 2]])
+
+        records = list(iter_summary_records(build_generator_factory(sample_excel_file_path), column_names=["c"]))
+
+        assert records == [{"type": "error", "detail": "Column row cannot be found"}]
+
+    def test_iter_summary_records_stops_summary_once_closed(self, sample_excel_file_factory):
+        sample_excel_file_path = sample_excel_file_factory(data=[["a"], *([index] for index in range(100))])
+
+        with capture_logs() as logs:
+            records = iter_summary_records(
+                build_generator_factory(sample_excel_file_path), column_names=["a"], queue_size=1
+            )
+            assert next(records)["type"] == "progress"
+            records.close()
+            deadline = time.monotonic() + 5
+            while not any(log["event"].startswith("Streamed summary cancelled") for log in logs):
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+
+        assert not any(log["event"] == "Finished generating summary" for log in logs)
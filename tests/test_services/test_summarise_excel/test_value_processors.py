@@ -1,8 +1,14 @@
+import datetime
+
 from decimal import Decimal
 
 import pytest
 
-from services.summarise_excel.value_processors import ColumnValueUnprocessableError, ExcelValueProcessor
+from services.summarise_excel.value_processors import (
+    CachedValueProcessor,
+    ColumnValueUnprocessableError,
+    ExcelValueProcessor,
+)
 
 
 class TestExcelValueProcessor:
@@ -43,3 +49,79 @@ class TestExcelValueProcessor:
         processor = ExcelValueProcessor()
         with pytest.raises(ColumnValueUnprocessableError):
             processor.process(value)
+
+
+class TestCachedValueProcessor:
+    @pytest.mark.parametrize(
+        ("value", "expected_value"),
+        [
+            [1, Decimal("1")],
+            [True, Decimal("1")],
+            ["  2  ", Decimal("2")],
+            ["2.333333333333333333", Decimal("2.333333333333333333")],
+            [1.2, Decimal(1.2)],
+            [Decimal("1.2"), Decimal("1.2")],
+        ],
+    )
+    def test_process(self, value, expected_value):
+        processor = CachedValueProcessor()
+        processed_value = processor.process(value)
+        assert processed_value == expected_value
+
+    @pytest.mark.parametrize(
+        ("value", "supported_currencies", "expected_value"),
+        [
+            ["1$", ["$"], Decimal("1")],
+            ["$$1##", ["$", "#"], Decimal("1")],
+            ["$#1#$", ["$", "#"], Decimal("1")],
+            ["1USD", ["USD"], Decimal("1")],
+        ],
+    )
+    def test_process_with_supported_currencies(self, value, expected_value, supported_currencies):
+        processor = CachedValueProcessor(supported_currencies=supported_currencies)
+        processed_value = processor.process(value)
+        assert processed_value == expected_value
+
+    @pytest.mark.parametrize("value", [None, "string", datetime.datetime(2024, 1, 1)])
+    def test_process_when_unprocessable_value(self, value):
+        processor = CachedValueProcessor()
+        with pytest.raises(ColumnValueUnprocessableError):
+            processor.process(value)
+
+    def test_process_caches_strings(self):
+        processor = CachedValueProcessor()
+
+        assert processor.process("1.5") == Decimal("1.5")
+        assert processor.process("1.5") == Decimal("1.5")
+        assert processor.process("2") == Decimal("2")
+        assert processor.hits == 1
+        assert processor.misses == 2
+
+    def test_process_caches_unprocessable_strings(self):
+        processor = CachedValueProcessor()
+
+        for _ in range(2):
+            with pytest.raises(ColumnValueUnprocessableError):
+                processor.process("string")
+
+        assert processor.hits == 1
+        assert processor.misses == 1
+
+    def test_process_does_not_cache_numbers(self):
+        processor = CachedValueProcessor()
+
+        processor.process(1)
+        processor.process(1.5)
+
+        assert processor.hits == 0
+        assert processor.misses == 0
+
+    def test_process_when_cache_is_full(self):
+        processor = CachedValueProcessor(cache_size=1)
+
+        processor.process("1")
+        processor.process("2")
+        processor.process("1")
+
+        assert processor.hits == 0
+        assert processor.misses == 3
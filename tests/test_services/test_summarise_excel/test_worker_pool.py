@@ -0,0 +1,34 @@
+import concurrent.futures
+import functools
+import os
+
+import pytest
+
+from services.summarise_excel.worker_pool import WorkerPool
+
+
+@pytest.fixture
+def worker_pool():
+    worker_pool = WorkerPool(max_workers=1)
+    yield worker_pool
+    worker_pool.shutdown()
+
+
+class TestWorkerPool:
+    def test_submit(self, worker_pool):
+        assert worker_pool.submit(functools.partial(int, "7")).result() == 7
+
+    def test_submit_after_worker_died(self, worker_pool):
+        with pytest.raises(concurrent.futures.process.BrokenProcessPool):
+            worker_pool.submit(functools.partial(os._exit, 1)).result()
+        executor = worker_pool._executor
+
+        assert worker_pool.submit(functools.partial(int, "7")).result() == 7
+        assert worker_pool._executor is not executor
+
+    def test_shutdown(self, worker_pool):
+        worker_pool.submit(functools.partial(int, "7")).result()
+
+        worker_pool.shutdown()
+
+        assert worker_pool._executor is None